@@ -209,8 +209,14 @@ def import_file(app, file_type):
                                               f"The SQL file contains commands that may not be fully supported:\n\n{issues_msg}\n\nDo you want to proceed anyway?"):
                         return
                 
-                # Proceed with import
-                message, error_count, success_count = SQLVMImporter.import_from_sql(app.sqlvm, db_name, file_path)
+                # Proceed with import, showing the progress in the status bar
+                def show_progress(bytes_read, total_bytes, statements):
+                    percent = bytes_read * 100 // total_bytes if total_bytes else 100
+                    app.set_status(f"Importing {os.path.basename(file_path)}: {percent}% ({statements} statements)")
+                    app.root.update_idletasks()
+
+                message, error_count, success_count = SQLVMImporter.import_from_sql(
+                    app.sqlvm, db_name, file_path, progress=show_progress)
                 
                 if error_count > 0:
                     messagebox.showwarning("Import Warnings", message)
@@ -0,0 +1,349 @@
+import re
+
+from .pipeline import Operator, SpillFile, _estimate_row_bytes
+
+# Estimated memory the groups of a HashAggregate may hold before they are spilled to partitions
+AGGREGATE_MEMORY_BYTES = 64 * 1024 * 1024
+# Number of partitions spilled groups are hashed into
+AGGREGATE_PARTITIONS = 16
+
+_AGGREGATE = r"(?P<function>COUNT|SUM|AVG|MIN|MAX)\s*\(\s*(?P<distinct>DISTINCT\s+(?=`?\w))?(?P<argument>\*|`?\w+`?)\s*\)"
+_AGGREGATE_RE = re.compile(_AGGREGATE, re.I)
+# Function calls of a SELECT list, which must all be aggregates
+_CALL_RE = re.compile(r"\b\w+\s*\(")
+# One item of a SELECT list: an aggregate call or a column, with an optional alias
+_SELECT_ITEM_RE = re.compile(rf"(?:{_AGGREGATE}|`?(?P<column>\w+)`?)(?:\s+(?:AS\s+)?`?(?P<alias>\w+)`?)?", re.I)
+# Aggregate calls of a HAVING clause; quoted strings are skipped
+_HAVING_RE = re.compile(rf"""'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\b{_AGGREGATE}""", re.I)
+
+
+def _count_all(state, value):
+    return state + 1
+
+
+def _count(state, value):
+    return state if value is None else state + 1
+
+
+def _sum(state, value):
+    if (value is None):
+        return state
+    return value if state is None else state + value
+
+
+def _min(state, value):
+    if (value is None or (state is not None and state <= value)):
+        return state
+    return value
+
+
+def _max(state, value):
+    if (value is None or (state is not None and state >= value)):
+        return state
+    return value
+
+
+def _avg(state, value):
+    if (value is None):
+        return state
+    if (state is None):
+        return (value, 1)
+    return (state[0] + value, state[1] + 1)
+
+
+def _collect(state, value):
+    if (value is None):
+        return state
+    if (state is None):
+        return {value}
+    state.add(value)
+    return state
+
+
+def _merge_sets(state, other):
+    if (state is None or other is None):
+        return other if state is None else state
+    state.update(other)
+    return state
+
+
+def _merge_count(state, other):
+    return state + other
+
+
+def _merge_avg(state, other):
+    if (other is None):
+        return state
+    if (state is None):
+        return other
+    return (state[0] + other[0], state[1] + other[1])
+
+
+def _final_avg(state):
+    return None if state is None else state[0] / state[1]
+
+
+# Results of the DISTINCT aggregates from the set of distinct values
+_DISTINCT_FINALS = {
+    "COUNT": lambda values: 0 if values is None else len(values),
+    "SUM": lambda values: None if values is None else sum(values),
+    "AVG": lambda values: None if values is None else sum(values) / len(values),
+    "MIN": lambda values: None if values is None else min(values),
+    "MAX": lambda values: None if values is None else max(values),
+}
+
+
+class Aggregate:
+    """
+    One aggregate function of a SELECT list or HAVING clause.
+
+    Groups hold a partial state per aggregate: a count for COUNT, the value
+    so far (None before the first non-NULL value) for SUM, MIN and MAX, and
+    a (sum, count) pair for AVG. With DISTINCT the state is the set of
+    non-NULL values (None before the first one), and the function is
+    applied to it at the end. step() folds one input value into a state,
+    merge() combines two partial states (spilled partitions, vectorized
+    batches) and final() turns a state into the result value.
+
+    Args:
+        function: COUNT, SUM, AVG, MIN or MAX
+        column: Column the function reads (None for COUNT(*))
+        distinct: Whether each distinct value is counted once (FUNC(DISTINCT column))
+    """
+
+    def __init__(self, function, column, distinct=False):
+        self.function = function.upper()
+        self.column = column
+        self.distinct = distinct
+        if (distinct):
+            self.initial = None
+            self.step = _collect
+            self.merge = _merge_sets
+            self.final = _DISTINCT_FINALS[self.function]
+            return
+        self.initial = 0 if self.function == "COUNT" else None
+        self.step = {"COUNT": _count if column is not None else _count_all, "SUM": _sum,
+                     "AVG": _avg, "MIN": _min, "MAX": _max}[self.function]
+        self.merge = {"COUNT": _merge_count, "AVG": _merge_avg}.get(self.function, self.step)
+        self.final = _final_avg if self.function == "AVG" else None
+
+    @property
+    def label(self):
+        argument = "*" if self.column is None else self.column
+        return f"{self.function}({'DISTINCT ' if self.distinct else ''}{argument})"
+
+    def result_type(self, types):
+        """SQL type of the result, given the types of the table columns"""
+        if (self.function == "COUNT"):
+            return "INT"
+        if (self.function == "AVG"):
+            return "FLOAT"
+        typ = types.get(self.column, "TEXT")
+        if (self.function == "SUM" and not typ.upper().startswith("INT")):
+            return "FLOAT"
+        return typ
+
+    def __eq__(self, other):
+        return isinstance(other, Aggregate) and self.label == other.label
+
+    def __hash__(self):
+        return hash(self.label)
+
+    def __repr__(self):
+        return f"Aggregate({self.label})"
+
+
+def _aggregate(match):
+    argument = match.group("argument").strip("`")
+    return Aggregate(match.group("function"), None if argument == "*" else argument, match.group("distinct") is not None)
+
+
+def parse_select_list(text):
+    """
+    Parse the column list of a SELECT statement with aggregate functions.
+
+    Returns:
+        List of (item, label) pairs, the item being a column name or an
+        Aggregate; None if an item is malformed
+    """
+    items = []
+    for part in text.split(","):
+        match = _SELECT_ITEM_RE.fullmatch(part.strip())
+        if (not match):
+            return None
+        item = match.group("column") or _aggregate(match)
+        label = match.group("alias") or (item if isinstance(item, str) else item.label)
+        items.append((item, label))
+    return items
+
+
+def has_aggregate(text):
+    """Return True if a SELECT list calls an aggregate function"""
+    return _AGGREGATE_RE.search(text) is not None
+
+
+def unsupported_call(text):
+    """
+    First function call of a SELECT list that is not an aggregate this
+    module computes (e.g. 'UPPER(name)' or 'COUNT(a + 1)'), or None
+    """
+    for call in _CALL_RE.finditer(text):
+        if (_AGGREGATE_RE.match(text, call.start()) is None):
+            end = text.find(")", call.end())
+            return text[call.start():len(text) if end < 0 else end + 1].strip()
+    return None
+
+
+def aggregate_label(text):
+    """Normalized label of an aggregate call (e.g. 'count( * )' -> 'COUNT(*)'), or the text itself"""
+    match = _AGGREGATE_RE.fullmatch(text.strip())
+    return _aggregate(match).label if match else text
+
+
+def rewrite_having(text, aggregates):
+    """
+    Replace the aggregate calls of a HAVING clause by the keys their results
+    are stored under, so the clause parses as a WHERE expression over the
+    result rows. Aggregates not in the list are appended to it.
+
+    Args:
+        text: HAVING clause
+        aggregates: List of the Aggregates computed by the statement
+
+    Returns:
+        The rewritten clause
+    """
+    def replace(match):
+        if (match.group("function") is None):
+            return match.group(0)
+        found = _aggregate(match)
+        if (found not in aggregates):
+            aggregates.append(found)
+        return result_key(aggregates.index(found))
+    return _HAVING_RE.sub(replace, text)
+
+
+def result_key(number):
+    """Key of the result of the aggregate `number` in the rows HAVING is evaluated on"""
+    return f"__sqlvm_aggregate_{number}__"
+
+
+class HashAggregate(Operator):
+    """
+    Group the rows of the child by their leading values in a hash table and
+    compute the aggregates of each group, yielding (group values...,
+    aggregate results...) tuples in the order the groups were first seen.
+
+    The child produces either input rows (group values..., inputs...), of
+    which inputs[i] is the value aggregate i reads, or partial aggregates
+    (group values tuple, list of states), e.g. of a vectorized batch, which
+    are merged. When the groups held pass memory_limit they are spilled as
+    partial states to AGGREGATE_PARTITIONS temporary files by the hash of
+    their key, and each partition is merged on its own at the end, so only
+    the groups of one partition are in memory at a time.
+
+    Without group columns there is always one result row, also for no input.
+
+    Args:
+        child: Operator producing input rows or partial aggregates
+        width: Number of group values
+        aggregates: List of Aggregates
+        inputs: Position of the value of each aggregate in an input row (None for none)
+        partial: Whether the child produces partial aggregates
+        memory_limit: Estimated bytes of groups held before spilling (None for AGGREGATE_MEMORY_BYTES)
+    """
+
+    def __init__(self, child, width, aggregates, inputs=None, partial=False, memory_limit=None):
+        super().__init__(child)
+        self.width = width
+        self.aggregates = aggregates
+        self.inputs = inputs
+        self.partial = partial
+        self.memory_limit = AGGREGATE_MEMORY_BYTES if memory_limit is None else memory_limit
+        self.spills = 0
+        self.groups = 0
+
+    def describe(self):
+        parts = [self.detail] if self.detail else []
+        parts.append(", ".join(aggregate.label for aggregate in self.aggregates))
+        if (self.spills):
+            parts.append(f"spilled {self.spills} times to {AGGREGATE_PARTITIONS} partitions")
+        return f"Hash aggregate ({'; '.join(part for part in parts if part)})"
+
+    def _measure(self, groups):
+        """Record the size of the groups held in memory, under EXPLAIN ANALYZE"""
+        if (self.stats is not None and groups):
+            sample = [key + tuple(states) for key, states in list(groups.items())[:1024]]
+            self.memory_bytes = max(self.memory_bytes or 0, len(groups) * _estimate_row_bytes(sample))
+
+    def _results(self, groups):
+        finals = [aggregate.final for aggregate in self.aggregates]
+        for key, states in groups.items():
+            self.groups += 1
+            yield key + tuple(state if final is None else final(state) for final, state in zip(finals, states))
+
+    def _merge(self, groups, key, states):
+        current = groups.get(key)
+        if (current is None):
+            groups[key] = states
+        else:
+            current[:] = [aggregate.merge(state, other)
+                          for aggregate, state, other in zip(self.aggregates, current, states)]
+
+    def _spill(self, groups, partitions):
+        buckets = [[] for _ in partitions]
+        for key, states in groups.items():
+            buckets[hash(key) % len(partitions)].append((key, states))
+        for partition, bucket in zip(partitions, buckets):
+            partition.write(bucket)
+        self.spills += 1
+
+    def rows(self):
+        width = self.width
+        initial = [aggregate.initial for aggregate in self.aggregates]
+        steps = [(number, aggregate.step, index)
+                 for number, (aggregate, index) in enumerate(zip(self.aggregates, self.inputs or [None] * len(initial)))]
+        groups = {}
+        partitions = None
+        max_groups = None
+        for item in self.child:
+            if (self.partial):
+                key, partial = item
+                states = groups.get(key)
+                new = states is None
+                if (new):
+                    groups[key] = list(partial)
+                else:
+                    self._merge(groups, key, partial)
+            else:
+                key = item[:width]
+                states = groups.get(key)
+                new = states is None
+                if (new):
+                    states = groups[key] = list(initial)
+                for number, step, index in steps:
+                    states[number] = step(states[number], None if index is None else item[index])
+            if (new and len(groups) % 1024 == 0):
+                if (max_groups is None):
+                    sample = [key + tuple(states) for key, states in list(groups.items())[:1024]]
+                    max_groups = max(1, self.memory_limit // _estimate_row_bytes(sample))
+                if (len(groups) >= max_groups):
+                    self._measure(groups)
+                    if (partitions is None):
+                        partitions = [SpillFile() for _ in range(AGGREGATE_PARTITIONS)]
+                    self._spill(groups, partitions)
+                    groups = {}
+
+        self._measure(groups)
+        if (partitions is None):
+            if (not groups and width == 0):
+                groups[()] = list(initial)
+            yield from self._results(groups)
+            return
+        self._spill(groups, partitions)
+        groups = None
+        for partition in partitions:
+            merged = {}
+            for key, states in partition:
+                self._merge(merged, key, states)
+            yield from self._results(merged)
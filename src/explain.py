@@ -0,0 +1,89 @@
+import time
+
+
+class OperatorStats:
+    """
+    What an operator did while a statement ran under EXPLAIN ANALYZE: the
+    rows it produced, how many times it was iterated (loops) and the time
+    spent producing its rows, including the time of its inputs.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.loops = 0
+        self.time = 0.0
+
+    def measure(self, rows):
+        """Wrap an iterator of rows, counting them and timing every step"""
+        self.loops += 1
+        clock = time.perf_counter
+        try:
+            while True:
+                start = clock()
+                try:
+                    row = next(rows)
+                except StopIteration:
+                    self.time += clock() - start
+                    return
+                self.time += clock() - start
+                self.rows += 1
+                yield row
+        finally:
+            close = getattr(rows, "close", None)
+            if (close is not None):
+                close()
+
+
+class Explain:
+    """
+    An EXPLAIN or EXPLAIN ANALYZE request. The SELECT it is made for stores
+    the root of its operator tree in root; under ANALYZE every operator is
+    instrumented with OperatorStats before the statement runs.
+
+    Args:
+        analyze: Whether the statement is run and measured (EXPLAIN ANALYZE)
+    """
+
+    def __init__(self, analyze=False):
+        self.analyze = analyze
+        self.root = None
+        self.time = None
+
+    def instrument(self, operator):
+        """Attach OperatorStats to an operator and the operators below it"""
+        if (operator.stats is None):
+            operator.stats = OperatorStats()
+        for child in operator.children():
+            self.instrument(child)
+
+    def lines(self):
+        """The plan as one line per operator, inputs indented below the operator reading them"""
+        lines = []
+        if (self.root is not None):
+            self._format(self.root, 0, lines)
+        if (self.time is not None):
+            lines.append(f"Execution time: {self.time * 1000:.3f} ms")
+        return lines
+
+    def _format(self, operator, depth, lines):
+        description = operator.describe()
+        if (description is None):
+            for child in operator.children():
+                self._format(child, depth, lines)
+            return
+        line = ("  " * depth + "-> " if depth else "") + description
+        estimated = operator.estimate()
+        if (estimated is not None):
+            line += f"  (estimated rows={int(round(estimated))})"
+        if (self.analyze):
+            stats = operator.stats
+            if (stats is None or not stats.loops):
+                line += "  (never executed)"
+            else:
+                line += f"  (actual rows={stats.rows} loops={stats.loops} time={stats.time * 1000:.3f} ms"
+                if (operator.memory_bytes is not None):
+                    line += f" memory={max(1, round(operator.memory_bytes / 1024))} kB"
+                line += ")"
+        lines.append(line)
+        for child in operator.children():
+            self._format(child, depth + 1, lines)
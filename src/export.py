@@ -2,17 +2,55 @@ import json
 import os
 from datetime import datetime
 import re
+from .storage import ColumnStore, ROW_ENGINE, table_engine
+
+# Rows read from a table and written to the file at a time
+EXPORT_CHUNK_ROWS = 1000
+
+# Rows per INSERT statement in SQL exports
+INSERT_BATCH_ROWS = 100
+
+# Table dictionary keys written to JSON exports, besides the rows
+_SCHEMA_KEYS = ("columns", "types", "auto_increment", "indexes", "primary_key", "secondary_indexes")
+
+
+def _row_chunks(table_info, columns, chunk_rows):
+    """Yield the rows of a table as lists of value tuples in column order, chunk_rows rows at a time"""
+    rows = table_info.get('rows', [])
+    for start in range(0, len(rows), chunk_rows):
+        if (isinstance(rows, ColumnStore)):
+            # Read a slice of each column vector instead of building row views
+            yield list(zip(*(rows.column(col, start, start + chunk_rows) for col in columns)))
+        else:
+            yield [tuple(row.get(col) for col in columns) for row in rows[start:start + chunk_rows]]
+
+
+def _sql_literal(val):
+    """Format a value as an SQL literal"""
+    if val is None:
+        return "NULL"
+    if isinstance(val, str):
+        # Double the quotes in string values; backslashes are written as they are,
+        # the way the parser and SQLStatementReader read them back
+        return "'" + val.replace("'", "''") + "'"
+    return str(val)
+
 
 class SQLVMExporter:
     @staticmethod
-    def export_to_sql(vm, db_name=None, file_path=None):
+    def export_to_sql(vm, db_name=None, file_path=None, batch_rows=None):
         """
         Export database(s) to SQL format
+
+        Tables are written one after the other, EXPORT_CHUNK_ROWS rows at a
+        time, as multi-row INSERT statements, so memory use does not grow
+        with the size of the database.
         
         Args:
             vm: The SQLVM instance
             db_name: Specific database to export (None for all)
             file_path: Path to save the SQL file (None for auto-generated)
+            batch_rows: Rows per INSERT statement (None for INSERT_BATCH_ROWS)
             
         Returns:
             Tuple of (success message, file path)
@@ -22,6 +60,7 @@ class SQLVMExporter:
             file_name = f"{db_name or 'all_databases'}_{timestamp}.sql"
             file_path = os.path.join(os.getcwd(), file_name)
         
+        batch_rows = batch_rows or INSERT_BATCH_ROWS
         try:
             with open(file_path, 'w') as f:
                 # If specific database is requested
@@ -74,23 +113,21 @@ class SQLVMExporter:
                         if primary_keys:
                             col_defs.append(f"PRIMARY KEY (`{'`, `'.join(primary_keys)}`)")
                         
-                        f.write(f"CREATE TABLE `{table_name}` (\n  {',\n  '.join(col_defs)}\n);\n\n")
+                        # Non-default storage engines are kept as a table option
+                        engine = table_engine(table_info)
+                        engine_clause = f" ENGINE={engine}" if engine != ROW_ENGINE else ""
+                        f.write(f"CREATE TABLE `{table_name}` (\n  {',\n  '.join(col_defs)}\n){engine_clause};\n\n")
                         
-                        # Insert statements for each row with SQL-like syntax
-                        for row in table_info.get('rows', []):
-                            values = []
-                            for col in columns:
-                                val = row.get(col)
-                                if val is None:
-                                    values.append("NULL")
-                                elif isinstance(val, str):
-                                    # Escape any quotes in string values
-                                    escaped_val = val.replace("'", "''")
-                                    values.append(f"'{escaped_val}'")
-                                else:
-                                    values.append(str(val))
-                            
-                            f.write(f"INSERT INTO `{table_name}` VALUES ({', '.join(values)});\n")
+                        # Multi-row INSERT statements, written a chunk of rows at a time
+                        insert_head = f"INSERT INTO `{table_name}` VALUES\n"
+                        for chunk in _row_chunks(table_info, columns, EXPORT_CHUNK_ROWS):
+                            values = [f"({', '.join(map(_sql_literal, row))})" for row in chunk]
+                            f.write("".join(insert_head + ",\n".join(values[i:i + batch_rows]) + ";\n"
+                                            for i in range(0, len(values), batch_rows)))
+
+                        # Secondary indexes are created after the rows so they are built once
+                        for index_name, index_columns in table_info.get('secondary_indexes', {}).items():
+                            f.write(f"CREATE INDEX `{index_name}` ON `{table_name}` (`{'`, `'.join(index_columns)}`);\n")
                         f.write("\n")
                 
             return f"Successfully exported to SQL file: {file_path}", file_path
@@ -101,6 +138,10 @@ class SQLVMExporter:
     def export_to_json(vm, db_name=None, file_path=None):
         """
         Export database(s) to JSON format
+
+        The document is written table by table, with the rows serialized
+        EXPORT_CHUNK_ROWS at a time (one row per line), so memory use does
+        not grow with the size of the database.
         
         Args:
             vm: The SQLVM instance
@@ -120,15 +161,75 @@ class SQLVMExporter:
             if db_name:
                 if db_name not in vm.databases:
                     return f"Error: Database '{db_name}' does not exist.", None
-                export_data = {db_name: vm.databases[db_name]}
+                databases = {db_name: vm.databases[db_name]}
             else:
-                export_data = vm.databases
+                databases = vm.databases
             
-            # Convert to serializable format if needed
-            # Some data types might need special handling for JSON serialization
+            # Only export the table definition and data, not in-memory index structures
+            # Some data types might need special handling for JSON serialization (default=str)
             with open(file_path, 'w') as f:
-                json.dump(export_data, f, indent=2, default=str)
+                f.write("{")
+                for db_number, (db, tables) in enumerate(databases.items()):
+                    f.write(f"{',' if db_number else ''}\n  {json.dumps(db)}: {{")
+                    for table_number, (table_name, table_info) in enumerate(tables.items()):
+                        f.write(f"{',' if table_number else ''}\n    {json.dumps(table_name)}: {{")
+                        for key, value in SQLVMExporter._table_schema(table_info).items():
+                            f.write(f"\n      {json.dumps(key)}: {json.dumps(value, default=str)},")
+                        f.write('\n      "rows": [')
+                        columns = table_info['columns']
+                        separator = "\n        "
+                        for chunk in _row_chunks(table_info, columns, EXPORT_CHUNK_ROWS):
+                            f.write(separator + ",\n        ".join(json.dumps(dict(zip(columns, row)), default=str) for row in chunk))
+                            separator = ",\n        "
+                        f.write("\n      ]\n    }")
+                    f.write("\n  }")
+                f.write("\n}\n")
             
             return f"Successfully exported to JSON file: {file_path}", file_path
         except Exception as e:
             return f"Error exporting to JSON: {str(e)}", None
+
+    @staticmethod
+    def export_table_to_ndjson(vm, table_name, file_path=None, db_name=None):
+        """
+        Export the rows of one table as newline-delimited JSON, one object per
+        line, which COPY table FROM 'file.ndjson' loads back
+
+        Args:
+            vm: The SQLVM instance
+            table_name: Table to export
+            file_path: Path to save the NDJSON file (None for auto-generated)
+            db_name: Database of the table (None for the current database)
+
+        Returns:
+            Tuple of (success message, file path)
+        """
+        db_name = db_name or vm.current_db
+        if db_name not in vm.databases:
+            return f"Error: Database '{db_name}' does not exist." if db_name else "Error: No database selected. Use USE database_name;", None
+        if table_name not in vm.databases[db_name]:
+            return f"Error: Table {table_name} does not exist.", None
+        if not file_path:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            file_path = os.path.join(os.getcwd(), f"{db_name}_{table_name}_{timestamp}.ndjson")
+
+        table_info = vm.databases[db_name][table_name]
+        columns = table_info['columns']
+        try:
+            with open(file_path, 'w') as f:
+                for chunk in _row_chunks(table_info, columns, EXPORT_CHUNK_ROWS):
+                    f.write("".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in chunk))
+            return f"Successfully exported {table_name} to NDJSON file: {file_path}", file_path
+        except Exception as e:
+            return f"Error exporting to NDJSON: {str(e)}", None
+
+    @staticmethod
+    def _table_schema(table_info):
+        """
+        Return the parts of a table dictionary that describe its schema
+        """
+        data = {key: table_info[key] for key in _SCHEMA_KEYS if key in table_info}
+        # Columnar and mapped tables are written as row dicts, with the engine as a table option
+        if ("rows" in table_info and table_engine(table_info) != ROW_ENGINE):
+            data["engine"] = table_engine(table_info)
+        return data
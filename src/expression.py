@@ -0,0 +1,584 @@
+import re
+import operator
+from functools import lru_cache
+
+# Tokens of a WHERE clause. Strings may use single or double quotes (a doubled
+# quote escapes the quote, backslashes are plain characters), identifiers may be qualified (table.column)
+# or quoted with backticks.
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+\.\d*|\.\d+|\d+)
+      | '(?P<squote>(?:[^']|'')*)'
+      | "(?P<dquote>(?:[^"]|"")*)"
+      | (?P<ident>`[^`]+`(?:\.`[^`]+`)?|[A-Za-z_]\w*(?:\.(?:[A-Za-z_]\w*|\*))?)
+      | (?P<op><>|!=|<=|>=|=|<|>|\(|\)|,|-|\*|;)
+    )""", re.VERBOSE)
+
+KEYWORDS = {"AND", "OR", "NOT", "IN", "LIKE", "IS", "NULL", "BETWEEN", "TRUE", "FALSE", "SELECT"}
+
+_COMPARISONS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+}
+
+# Operator to use when the operands of a comparison are swapped (5 < col -> col > 5)
+_SWAPPED = {"=": "=", "!=": "!=", "<": ">", ">": "<", "<=": ">=", ">=": "<="}
+
+
+def tokenize(text):
+    """
+    Split an expression into (kind, value, start, end) tuples. Kinds are
+    "number", "string", "ident", "keyword" and "op".
+    """
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if (not match or match.end() == pos):
+            raise ValueError(f"Error: Invalid WHERE clause near '{text[pos:pos + 20].strip()}'")
+        kind = match.lastgroup
+        value = match.group(kind)
+        start = match.start(kind) - (1 if kind in ("squote", "dquote") else 0)
+        if (kind == "number"):
+            value = float(value) if "." in value else int(value)
+        elif (kind in ("squote", "dquote")):
+            quote = "'" if kind == "squote" else '"'
+            value = value.replace(quote * 2, quote)
+            kind = "string"
+        elif (kind == "ident"):
+            value = value.replace("`", "")
+            if (value.upper() in KEYWORDS):
+                kind = "keyword"
+                value = value.upper()
+        tokens.append((kind, value, start, match.end()))
+        pos = match.end()
+    return tokens
+
+
+class ExpressionParser:
+    """
+    Recursive descent parser turning a WHERE clause into an AST of tuples
+    only, so that parsed clauses can be cached and shared.
+
+    Precedence (lowest to highest): OR, AND, NOT, comparison/IN/LIKE/IS/BETWEEN.
+    Nodes:
+        ("col", name)                       column reference
+        ("lit", value)                      literal (None for NULL)
+        ("cmp", op, left, right)            =, !=, <, >, <=, >=
+        ("and", (nodes)) / ("or", (nodes))
+        ("not", node)
+        ("in", expr, (nodes), negated)      IN (v1, v2, ...)
+        ("in_select", expr, sql, negated)   IN (SELECT ...)
+        ("like", expr, pattern, negated)
+        ("is_null", expr, negated)
+        ("between", expr, low, high, negated)
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def parse(text):
+        """Parse a WHERE clause. ASTs are nested tuples, so results are cached by text and shared."""
+        parser = ExpressionParser(text)
+        node = parser.parse_or()
+        # A trailing semicolon is allowed, anything else is a syntax error
+        if (parser.peek_op(";")):
+            parser.pos += 1
+        if (parser.pos < len(parser.tokens)):
+            raise ValueError(f"Error: Invalid WHERE clause near '{text[parser.tokens[parser.pos][2]:][:20]}'")
+        return node
+
+    # Token helpers
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None, len(self.text), len(self.text))
+
+    def peek_op(self, op):
+        token = self.peek()
+        return token[0] == "op" and token[1] == op
+
+    def peek_keyword(self, *keywords):
+        token = self.peek()
+        return token[0] == "keyword" and token[1] in keywords
+
+    def advance(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect_op(self, op):
+        if (not self.peek_op(op)):
+            raise ValueError(f"Error: Expected '{op}' in WHERE clause near '{self.text[self.peek()[2]:][:20]}'")
+        return self.advance()
+
+    def expect_keyword(self, keyword):
+        if (not self.peek_keyword(keyword)):
+            raise ValueError(f"Error: Expected {keyword} in WHERE clause near '{self.text[self.peek()[2]:][:20]}'")
+        return self.advance()
+
+    # Grammar
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self.peek_keyword("OR"):
+            self.advance()
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ("or", tuple(nodes))
+
+    def parse_and(self):
+        nodes = [self.parse_not()]
+        while self.peek_keyword("AND"):
+            self.advance()
+            nodes.append(self.parse_not())
+        return nodes[0] if len(nodes) == 1 else ("and", tuple(nodes))
+
+    def parse_not(self):
+        if (self.peek_keyword("NOT")):
+            self.advance()
+            return ("not", self.parse_not())
+        return self.parse_predicate()
+
+    def parse_predicate(self):
+        left = self.parse_operand()
+        token = self.peek()
+
+        if (token[0] == "op" and token[1] in ("=", "!=", "<>", "<", ">", "<=", ">=")):
+            self.advance()
+            op = "!=" if token[1] == "<>" else token[1]
+            return ("cmp", op, left, self.parse_operand())
+
+        negated = False
+        if (self.peek_keyword("NOT")):
+            self.advance()
+            negated = True
+
+        if (self.peek_keyword("IN")):
+            self.advance()
+            return self.parse_in(left, negated)
+        if (self.peek_keyword("LIKE")):
+            self.advance()
+            return ("like", left, self.parse_operand(), negated)
+        if (self.peek_keyword("BETWEEN")):
+            self.advance()
+            low = self.parse_operand()
+            self.expect_keyword("AND")
+            return ("between", left, low, self.parse_operand(), negated)
+        if (not negated and self.peek_keyword("IS")):
+            self.advance()
+            if (self.peek_keyword("NOT")):
+                self.advance()
+                negated = True
+            self.expect_keyword("NULL")
+            return ("is_null", left, negated)
+        if (negated):
+            raise ValueError(f"Error: Expected IN, LIKE or BETWEEN after NOT near '{self.text[self.peek()[2]:][:20]}'")
+        return left
+
+    def parse_in(self, left, negated):
+        open_token = self.expect_op("(")
+        if (self.peek_keyword("SELECT")):
+            # Keep the subquery as SQL text; it is planned separately
+            depth = 1
+            while depth:
+                token = self.advance()
+                if (token[0] is None):
+                    raise ValueError("Error: Unbalanced parentheses in WHERE clause.")
+                if (token[0] == "op" and token[1] == "("):
+                    depth += 1
+                elif (token[0] == "op" and token[1] == ")"):
+                    depth -= 1
+            sql = self.text[open_token[3]:token[2]].strip()
+            return ("in_select", left, sql, negated)
+
+        values = []
+        if (not self.peek_op(")")):
+            values.append(self.parse_operand())
+            while self.peek_op(","):
+                self.advance()
+                values.append(self.parse_operand())
+        self.expect_op(")")
+        return ("in", left, tuple(values), negated)
+
+    def parse_operand(self):
+        token = self.advance()
+        kind, value = token[0], token[1]
+        if (kind == "op" and value == "("):
+            node = self.parse_or()
+            self.expect_op(")")
+            return node
+        if (kind == "op" and value == "-" and self.peek()[0] == "number"):
+            return ("lit", -self.advance()[1])
+        if (kind in ("number", "string")):
+            return ("lit", value)
+        if (kind == "ident"):
+            return ("col", value)
+        if (kind == "keyword" and value == "NULL"):
+            return ("lit", None)
+        if (kind == "keyword" and value in ("TRUE", "FALSE")):
+            return ("lit", value == "TRUE")
+        if (kind is None):
+            raise ValueError("Error: Unexpected end of WHERE clause.")
+        raise ValueError(f"Error: Unexpected '{value}' in WHERE clause.")
+
+
+def _always_unknown(row):
+    return None
+
+
+def _negate(predicate):
+    """NOT of a three-valued predicate: unknown (None) stays unknown"""
+    def negated(row):
+        value = predicate(row)
+        return None if value is None else not value
+    return negated
+
+
+class PredicateCompiler:
+    """
+    Compile a WHERE AST into a Python closure evaluated once per row.
+
+    Literals compared with a column are converted to the column's type at
+    compile time, and IN lists become sets, so the per-row work is a dict
+    lookup and a comparison.
+
+    Args:
+        scope: Dict mapping column references (plain or table-qualified) to row keys
+        types: Dict mapping row keys to SQL types
+        convert: Function (value, type) -> value converting literals to a column type
+        subquery: Function (sql, compiler) -> SemiJoin planning IN (SELECT ...) for this scope
+    """
+
+    def __init__(self, scope, types, convert, subquery=None):
+        self.scope = scope
+        self.types = types
+        self.convert = convert
+        self.subquery = subquery
+
+    @staticmethod
+    def table_scope(table_name, columns):
+        """Scope for a single table: plain and table-qualified column names"""
+        scope = {col: col for col in columns}
+        scope.update({f"{table_name}.{col}": col for col in columns})
+        return scope
+
+    def compile(self, node):
+        """
+        Compile a node used as a condition into a function row -> True,
+        False or None. Conditions are three-valued as in SQL: a comparison
+        with NULL is unknown (None), NOT keeps it unknown, and a row matches
+        only when the condition is True.
+        """
+        kind = node[0]
+        if (kind == "and"):
+            return self._compile_and([self.compile(child) for child in node[1]])
+        if (kind == "or"):
+            return self._compile_or([self.compile(child) for child in node[1]])
+        if (kind == "not"):
+            return _negate(self.compile(node[1]))
+        if (kind == "cmp"):
+            return self._compile_cmp(node[1], self._resolve(node[2]), self._resolve(node[3]))
+        if (kind == "in"):
+            return self._compile_in(self._resolve(node[1]), [self._resolve(value) for value in node[2]], node[3])
+        if (kind == "in_select"):
+            if (self.subquery is None):
+                raise ValueError("Error: Subqueries are not supported here.")
+            # The subquery is materialized once and probed as a hash semi-join
+            semi_join = self.subquery(node[2], self)
+            return semi_join.compile(self, self._resolve(node[1]), node[3])
+        if (kind == "like"):
+            return self._compile_like(self._resolve(node[1]), self._resolve(node[2]), node[3])
+        if (kind == "is_null"):
+            getter = self.compile_value(node[1])
+            if (node[2]):
+                return lambda row: getter(row) is not None
+            return lambda row: getter(row) is None
+        if (kind == "between"):
+            expr = self._resolve(node[1])
+            low = self._compile_cmp(">=", expr, self._resolve(node[2]))
+            high = self._compile_cmp("<=", expr, self._resolve(node[3]))
+            between = self._compile_and([low, high])
+            return _negate(between) if node[4] else between
+        # A bare column or literal used as a condition
+        getter = self.compile_value(node)
+
+        def truth(row):
+            value = getter(row)
+            return None if value is None else bool(value)
+        return truth
+
+    def compile_value(self, node):
+        """Compile a node used as a value into a function row -> value"""
+        node = self._resolve(node)
+        if (node[0] == "lit"):
+            value = node[1]
+            return lambda row: value
+        if (node[0] == "col"):
+            key = node[1]
+            return lambda row: row.get(key)
+        predicate = self.compile(node)
+        return predicate
+
+    def _resolve(self, node):
+        """
+        Map column references onto row keys. Identifiers that are not columns of
+        the scope are treated as bare string literals, as the old evaluator did.
+        """
+        if (node[0] == "col"):
+            if (node[1] in self.scope):
+                return ("col", self.scope[node[1]])
+            return ("lit", node[1])
+        return node
+
+    def _coerce(self, column_node, literal):
+        """Convert a literal to the type of the column it is compared with"""
+        typ = self.types.get(column_node[1])
+        if (literal is None or typ is None):
+            return literal
+        # Keep fractional numbers intact when compared with an INT column
+        if (isinstance(literal, float) and typ.upper().startswith("INT")):
+            return literal
+        try:
+            return self.convert(literal, typ)
+        except Exception:
+            return literal
+
+    def _compile_and(self, predicates):
+        # False if a term is False, else unknown (None) if a term is unknown
+        if (len(predicates) == 2):
+            first, second = predicates
+
+            def and_two(row):
+                a = first(row)
+                if (a is False):
+                    return False
+                b = second(row)
+                return False if b is False else a and b
+            return and_two
+
+        def and_predicate(row):
+            result = True
+            for predicate in predicates:
+                value = predicate(row)
+                if (value is False):
+                    return False
+                if (value is None):
+                    result = None
+            return result
+        return and_predicate
+
+    def _compile_or(self, predicates):
+        # True if a term is True, else unknown (None) if a term is unknown
+        if (len(predicates) == 2):
+            first, second = predicates
+
+            def or_two(row):
+                a = first(row)
+                if (a):
+                    return True
+                b = second(row)
+                if (b):
+                    return True
+                return None if (a is None or b is None) else False
+            return or_two
+
+        def or_predicate(row):
+            result = False
+            for predicate in predicates:
+                value = predicate(row)
+                if (value):
+                    return True
+                if (value is None):
+                    result = None
+            return result
+        return or_predicate
+
+    def _compile_cmp(self, op, left, right):
+        # Normalize literal-op-column to column-op-literal
+        if (left[0] == "lit" and right[0] == "col"):
+            left, right, op = right, left, _SWAPPED[op]
+        compare = _COMPARISONS[op]
+
+        if (left[0] == "col" and right[0] == "lit"):
+            key = left[1]
+            value = self._coerce(left, right[1])
+            if (value is None):
+                return _always_unknown
+
+            def compare_literal(row):
+                row_value = row.get(key)
+                if (row_value is None):
+                    return None
+                try:
+                    return compare(row_value, value)
+                except TypeError:
+                    return False
+            return compare_literal
+
+        left_value = self.compile_value(left)
+        right_value = self.compile_value(right)
+
+        def compare_values(row):
+            a = left_value(row)
+            b = right_value(row)
+            if (a is None or b is None):
+                return None
+            try:
+                return compare(a, b)
+            except TypeError:
+                return False
+        return compare_values
+
+    def _compile_in(self, expr, values, negated):
+        if (any(value[0] != "lit" for value in values)):
+            raise ValueError("Error: IN lists may only contain literal values.")
+        # A NULL in the list makes a non-matching value unknown instead of false
+        has_null = any(value[1] is None for value in values)
+        literals = [value[1] for value in values if value[1] is not None]
+
+        # Convert the list to the column type once, reporting values that do not fit
+        if (expr[0] == "col" and expr[1] in self.types):
+            column_type = self.types[expr[1]]
+            try:
+                literals = [self.convert(value, column_type) for value in literals]
+            except ValueError as e:
+                raise ValueError(f"Error: {e}. Ensure the values in the IN condition match the column type '{column_type}'.")
+
+        try:
+            members = frozenset(literals)
+        except TypeError:
+            members = literals
+        getter = self.compile_value(expr)
+        missing = None if has_null else False
+
+        def is_in(row):
+            value = getter(row)
+            if (value is None):
+                return None
+            return True if value in members else missing
+        return _negate(is_in) if negated else is_in
+
+    def _compile_like(self, expr, pattern, negated):
+        if (pattern[0] != "lit" or not isinstance(pattern[1], str)):
+            raise ValueError("Error: LIKE patterns must be string literals.")
+        regex = like_to_regex(pattern[1])
+        getter = self.compile_value(expr)
+
+        def like(row):
+            value = getter(row)
+            if (value is None):
+                return None
+            return (regex.match(str(value)) is not None) != negated
+        return like
+
+
+@lru_cache(maxsize=256)
+def like_to_regex(pattern):
+    """Translate a SQL LIKE pattern (% and _ wildcards) into a compiled regex"""
+    parts = []
+    for char in pattern:
+        if (char == "%"):
+            parts.append(".*")
+        elif (char == "_"):
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("^" + "".join(parts) + "$", re.IGNORECASE | re.DOTALL)
+
+
+def format_node(node):
+    """Render an AST back to SQL, parenthesizing AND/OR groups to show precedence"""
+    kind = node[0]
+    if (kind == "col"):
+        return node[1]
+    if (kind == "lit"):
+        if (node[1] is None):
+            return "NULL"
+        if (isinstance(node[1], str)):
+            return "'" + node[1].replace("'", "''") + "'"
+        return str(node[1]).upper() if isinstance(node[1], bool) else str(node[1])
+    if (kind in ("and", "or")):
+        return "(" + f" {kind.upper()} ".join(format_node(child) for child in node[1]) + ")"
+    if (kind == "not"):
+        return f"NOT {format_node(node[1])}"
+    if (kind == "cmp"):
+        return f"{format_node(node[2])} {node[1]} {format_node(node[3])}"
+    negation = "NOT " if node[-1] else ""
+    if (kind == "in"):
+        return f"{format_node(node[1])} {negation}IN ({', '.join(format_node(value) for value in node[2])})"
+    if (kind == "in_select"):
+        return f"{format_node(node[1])} {negation}IN ({node[2]})"
+    if (kind == "like"):
+        return f"{format_node(node[1])} {negation}LIKE {format_node(node[2])}"
+    if (kind == "is_null"):
+        return f"{format_node(node[1])} IS {negation}NULL"
+    if (kind == "between"):
+        return f"{format_node(node[1])} {negation}BETWEEN {format_node(node[2])} AND {format_node(node[3])}"
+    return str(node)
+
+
+def conjuncts(node):
+    """Split a predicate into the list of its top-level AND terms"""
+    if (node[0] == "and"):
+        terms = []
+        for child in node[1]:
+            terms.extend(conjuncts(child))
+        return terms
+    return [node]
+
+
+def column_refs(node):
+    """Return the column names referenced by a predicate, excluding subquery bodies"""
+    kind = node[0]
+    if (kind == "col"):
+        return [node[1]]
+    if (kind == "lit"):
+        return []
+    if (kind in ("and", "or")):
+        children = node[1]
+    elif (kind == "not"):
+        children = [node[1]]
+    elif (kind == "cmp"):
+        children = [node[2], node[3]]
+    elif (kind == "in"):
+        children = [node[1]] + list(node[2])
+    elif (kind in ("in_select", "is_null")):
+        children = [node[1]]
+    elif (kind == "like"):
+        children = [node[1], node[2]]
+    elif (kind == "between"):
+        children = [node[1], node[2], node[3]]
+    else:
+        children = []
+    refs = []
+    for child in children:
+        refs.extend(column_refs(child))
+    return refs
+
+
+def rename_columns(node, names):
+    """Return a copy of a predicate with its column references renamed through the dict `names`"""
+    kind = node[0]
+    if (kind == "col"):
+        return ("col", names.get(node[1], node[1]))
+    if (kind in ("and", "or")):
+        return (kind, tuple(rename_columns(child, names) for child in node[1]))
+    if (kind == "not"):
+        return ("not", rename_columns(node[1], names))
+    if (kind == "cmp"):
+        return ("cmp", node[1], rename_columns(node[2], names), rename_columns(node[3], names))
+    if (kind == "in"):
+        return ("in", rename_columns(node[1], names), tuple(rename_columns(value, names) for value in node[2]), node[3])
+    if (kind in ("in_select", "is_null")):
+        return (kind, rename_columns(node[1], names)) + tuple(node[2:])
+    if (kind == "like"):
+        return ("like", rename_columns(node[1], names), rename_columns(node[2], names), node[3])
+    if (kind == "between"):
+        return ("between",) + tuple(rename_columns(child, names) for child in node[1:4]) + (node[4],)
+    return node
@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 
+# Rows shown when previewing a table; the scan stops once they are read
+PREVIEW_ROWS = 100
+
 class DataTab:
     def __init__(self, parent, main_app):
         self.parent = parent
@@ -33,15 +36,18 @@ class DataTab:
         for widget in self.data_frame.winfo_children():
             widget.destroy()
         
-        # Get table data using select method
-        result = self.sqlvm.select(self.main_app.current_table)
+        # Get the first rows of the table using select method
+        result = self.sqlvm.select(self.main_app.current_table, limit=PREVIEW_ROWS)
         
         # Create text widget to display data
         data_display = scrolledtext.ScrolledText(self.data_frame)
         data_display.pack(fill=tk.BOTH, expand=True)
         
         # Insert formatted data
-        data_display.insert(tk.END, result)
+        data_display.insert(tk.END, str(result))
+        total = len(self.sqlvm.tables[self.main_app.current_table]["rows"])
+        if not isinstance(result, str) and total > len(result):
+            data_display.insert(tk.END, f"\n(Showing the first {len(result)} of {total} rows)")
     
     def insert_row_dialog(self):
         if not self.main_app.current_table:
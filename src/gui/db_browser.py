@@ -3,36 +3,48 @@ from tkinter import ttk, messagebox, filedialog
 import os
 import json
 import sys
-import pickle
 import atexit
 
+from src.snapshot import read_database_file
+from src.wal import WriteAheadLog
+
 # Define database directory constant - will be created if it doesn't exist
 DB_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'db'))
 # Define default database file path
 DEFAULT_DB_FILE = os.path.join(DB_DIR, 'sqlvm_database.db')
+# Write-ahead log holding the changes made since the last snapshot
+DEFAULT_WAL_FILE = os.path.join(DB_DIR, 'sqlvm_database.wal')
+# Directory of the memory-mapped files of ENGINE=MMAP tables
+MMAP_DIR = os.path.join(DB_DIR, 'mmap')
+# Interval between forced syncs of the write-ahead log (milliseconds)
+WAL_SYNC_INTERVAL_MS = 1000
+# Estimated memory for tables paged in from the database file; unchanged tables beyond it are evicted
+TABLE_MEMORY_BUDGET = 512 * 1024 * 1024
 
 class DatabaseBrowser:
     def __init__(self, parent, main_app):
         self.parent = parent
         self.main_app = main_app
         self.sqlvm = main_app.sqlvm
+        self.sqlvm.mmap_dir = MMAP_DIR
         
         # Create database directory if it doesn't exist
         if not os.path.exists(DB_DIR):
             os.makedirs(DB_DIR)
         
-        # Load database from file if exists
+        # Load the last snapshot and replay the write-ahead log
+        self.wal = WriteAheadLog(DEFAULT_WAL_FILE, DEFAULT_DB_FILE)
         self.load_database()
         
         # Register save function to be called when program exits
-        atexit.register(self.save_database)
+        atexit.register(self.close_database)
         
         # Also register with parent window close event
         if isinstance(parent.winfo_toplevel(), tk.Tk):
             parent.winfo_toplevel().protocol("WM_DELETE_WINDOW", self.on_close)
             
-        # Monkey patch SQLVM methods to add auto-save
-        self._setup_auto_save()
+        # Log every change to the write-ahead log
+        self._setup_write_ahead_log()
         
         # Try to set the icon for any dialogs we create
         self.icon_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'assets', 'quail.ico'))
@@ -40,48 +52,30 @@ class DatabaseBrowser:
         self.setup_tree()
         self.setup_toolbar()
     
-    def _setup_auto_save(self):
+    def _setup_write_ahead_log(self):
         """
-        Monkey patch SQLVM methods to add auto-save functionality
-        This will automatically save the database after any modification
+        Attach the write-ahead log to SQLVM. Every change is appended to the log
+        as it happens, so a write costs time proportional to the change instead
+        of re-pickling all databases. The log is checkpointed into the snapshot
+        file once it grows large.
         """
-        # Store original methods
-        original_execute = self.sqlvm.execute_command
-        original_create_db = self.sqlvm.create_database
-        original_drop_db = self.sqlvm.drop_database
-        
-        # Override execute_command with auto-save functionality
-        def execute_with_autosave(command, *args, **kwargs):
-            result = original_execute(command, *args, **kwargs)
-            
-            # Check if this is a data-modifying command
-            command_upper = command.strip().upper()
-            if any(cmd in command_upper for cmd in ["CREATE", "INSERT", "UPDATE", "DELETE", "DROP", "ALTER"]):
-                self.save_database()
-                
-            return result
-        
-        # Override create_database with auto-save functionality
-        def create_db_with_autosave(db_name):
-            result = original_create_db(db_name)
-            self.save_database()
-            return result
-        
-        # Override drop_database with auto-save functionality
-        def drop_db_with_autosave(db_name):
-            result = original_drop_db(db_name)
-            self.save_database()
-            return result
-        
-        # Replace the methods
-        self.sqlvm.execute_command = execute_with_autosave
-        self.sqlvm.create_database = create_db_with_autosave
-        self.sqlvm.drop_database = drop_db_with_autosave
+        self.wal.attach(self.sqlvm)
+        self._schedule_wal_sync()
+    
+    def _schedule_wal_sync(self):
+        """Periodically sync committed log records that are still waiting for a group commit"""
+        def sync():
+            try:
+                self.wal.commit(sync=True)
+            except Exception as e:
+                print(f"Error syncing write-ahead log: {str(e)}")
+            self.parent.after(WAL_SYNC_INTERVAL_MS, sync)
+        self.parent.after(WAL_SYNC_INTERVAL_MS, sync)
     
     def on_close(self):
         """Called when the application window is closed"""
         try:
-            self.save_database()
+            self.close_database()
             self.parent.winfo_toplevel().destroy()
         except Exception as e:
             messagebox.showerror("Error", f"Error while closing: {str(e)}")
@@ -89,48 +83,35 @@ class DatabaseBrowser:
             self.parent.winfo_toplevel().destroy()
     
     def save_database(self):
-        """Save the database schema and data to a file"""
+        """Checkpoint: write a snapshot of all databases and truncate the write-ahead log"""
         try:
-            # Create a backup of the previous database file if it exists
-            if os.path.exists(DEFAULT_DB_FILE):
-                backup_file = f"{DEFAULT_DB_FILE}.bak"
-                try:
-                    if os.path.exists(backup_file):
-                        os.remove(backup_file)
-                    os.rename(DEFAULT_DB_FILE, backup_file)
-                except Exception as e:
-                    print(f"Warning: Could not create backup: {str(e)}")
-            
-            # Get database dictionary from sqlvm
-            databases = self.sqlvm.databases
-            
-            # Save to file using pickle (for complex objects)
-            with open(DEFAULT_DB_FILE, 'wb') as db_file:
-                pickle.dump(databases, db_file)
-                
-            print(f"Database automatically saved to {DEFAULT_DB_FILE}")
+            self.wal.checkpoint()
+            print(f"Database checkpoint saved to {DEFAULT_DB_FILE}")
             return True
             
         except Exception as e:
             print(f"Error saving database: {str(e)}")
             return False
     
+    def close_database(self):
+        """Commit and sync the write-ahead log before exiting"""
+        try:
+            self.wal.close()
+        except Exception as e:
+            print(f"Error closing write-ahead log: {str(e)}")
+    
     def load_database(self):
         """Load the database schema and data from a file"""
         try:
-            # Check if the database file exists
-            if not os.path.exists(DEFAULT_DB_FILE):
+            # Check if the database file or its write-ahead log exists
+            if not os.path.exists(DEFAULT_DB_FILE) and not os.path.exists(DEFAULT_WAL_FILE):
                 print(f"No database file found at {DEFAULT_DB_FILE}")
                 return False
             
-            # Load from file using pickle
-            with open(DEFAULT_DB_FILE, 'rb') as db_file:
-                databases = pickle.load(db_file)
-            
-            # Update sqlvm databases
-            self.sqlvm.databases = databases
+            # Open the snapshot, then replay the changes logged after it; tables are read on first use
+            loaded, replayed = self.wal.recover(self.sqlvm, lazy=True, memory_budget=TABLE_MEMORY_BUDGET)
             
-            print(f"Database loaded from {DEFAULT_DB_FILE}")
+            print(f"Database loaded from {DEFAULT_DB_FILE} ({replayed} log records replayed)")
             return True
             
         except Exception as e:
@@ -140,8 +121,7 @@ class DatabaseBrowser:
                 backup_file = f"{DEFAULT_DB_FILE}.bak"
                 if os.path.exists(backup_file):
                     print("Attempting to load from backup...")
-                    with open(backup_file, 'rb') as db_file:
-                        databases = pickle.load(db_file)
+                    databases, _ = read_database_file(self.sqlvm, backup_file)
                     self.sqlvm.databases = databases
                     print(f"Database loaded from backup: {backup_file}")
                     return True
@@ -266,26 +266,24 @@ class SelectTab:
             
             query += f" WHERE {' AND '.join(conditions)}"
         
-        # Debug: Print the query
-        print(f"Executing SQL query: {query}")
-        
-        # Execute the query
-        result = self.sqlvm.execute_command(query)
+        # Execute the query and keep the typed rows for display
+        result = self.sqlvm.query(query)
         
         # Display results in the treeview
         self.display_results(result, query, selected_columns)
     
-    def display_results(self, result_text, query=None, selected_columns=None):
+    def display_results(self, result, query=None, selected_columns=None):
         # Clear existing widgets
         for widget in self.select_results_frame.winfo_children():
             widget.destroy()
         
-        # Debug info
-        print(f"Raw result: {result_text}")
+        # Errors come back as messages instead of a result set
+        if isinstance(result, str):
+            self.no_results_label = ttk.Label(self.select_results_frame, text=result, wraplength=600)
+            self.no_results_label.pack(pady=20)
+            return
         
-        # Parse the result into a table
-        lines = result_text.strip().split('\n')
-        if len(lines) < 3:  # Need at least header, separator, and one data row
+        if len(result) == 0:
             self.no_results_label = ttk.Label(self.select_results_frame, text="No results found.")
             self.no_results_label.pack(pady=20)
             
@@ -300,12 +298,8 @@ class SelectTab:
         container = ttk.Frame(self.select_results_frame)
         container.pack(fill=tk.BOTH, expand=True)
         
-        # Use the selected_columns passed from execute_interactive_select
-        if not selected_columns:
-            selected_columns = []
-            for col, var in self.select_column_vars.items():
-                if var.get():
-                    selected_columns.append(col)
+        # The result set carries its own column names
+        selected_columns = result.columns
         
         # Create treeview with selected columns
         tree = ttk.Treeview(container, columns=selected_columns, show="headings")
@@ -327,41 +321,9 @@ class SelectTab:
             tree.heading(col, text=col)
             tree.column(col, width=150)
         
-        # Improved parsing of data rows
-        # First, determine if we have a result with data
-        if len(lines) < 3:
-            # No data
-            return
-        
-        # Parse data rows more carefully
-        for line_idx, line in enumerate(lines[2:]):  # Skip header and separator lines
-            if not line or '|' not in line:
-                continue
-                
-            # Split the line by | character and extract values
-            raw_values = line.split('|')
-            # Remove first and last elements (they're usually empty)
-            if raw_values and not raw_values[0].strip():
-                raw_values = raw_values[1:]
-            if raw_values and not raw_values[-1].strip():
-                raw_values = raw_values[:-1]
-                
-            values = [v.strip() for v in raw_values]
-            
-            # Debug the extracted values
-            print(f"Row {line_idx}: Extracted values: {values}")
-            
-            # Insert into tree if we have values
-            if values and len(values) > 0:
-                # If values and columns don't match, try to pad or truncate
-                if len(values) != len(selected_columns):
-                    print(f"Warning: Values count ({len(values)}) doesn't match columns count ({len(selected_columns)})")
-                    if len(values) < len(selected_columns):
-                        values.extend([''] * (len(selected_columns) - len(values)))
-                    else:
-                        values = values[:len(selected_columns)]
-                
-                tree.insert("", "end", values=values)
+        # Insert the rows directly, formatting each value for display
+        for row in result.rows:
+            tree.insert("", "end", values=[result.format_value(value) for value in row])
         
         # Store reference to tree
         self.results_tree = tree
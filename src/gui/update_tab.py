@@ -149,49 +149,25 @@ class UpdateTab:
             self.data_tree.heading(col, text=col)
             self.data_tree.column(col, width=100)
         
-        # Parse the result into rows
+        # Fill the tree straight from the result set rows
         try:
-            # Skip the first two lines (header and separator)
-            lines = result.strip().split('\n')
-            if len(lines) < 3:
+            if isinstance(result, str):
+                ttk.Label(self.table_frame, text=result).pack(pady=20)
+                return
+            if len(result) == 0:
                 ttk.Label(self.table_frame, text="No data in table").pack(pady=20)
                 return
             
-            # Process each data row
-            for line_idx, line in enumerate(lines[2:]):
-                if not line or '|' not in line:
-                    continue
-                    
-                # Split the line by | character and extract values
-                raw_values = line.split('|')
-                
-                # Remove first and last elements (they're usually empty)
-                if raw_values and not raw_values[0].strip():
-                    raw_values = raw_values[1:]
-                if raw_values and not raw_values[-1].strip():
-                    raw_values = raw_values[:-1]
-                    
-                values = [v.strip() for v in raw_values]
+            for row_idx, row in enumerate(result.rows):
+                row_id = f"row_{row_idx}"
+                values = [result.format_value(value) for value in row]
+                self.data_tree.insert("", "end", iid=row_id, values=values)
                 
-                # Insert into tree
-                if values and len(values) > 0:
-                    # Add identifier to the row
-                    row_id = f"row_{line_idx}"
-                    
-                    # If values and columns don't match, try to pad or truncate
-                    if len(values) != len(self.column_names):
-                        if len(values) < len(self.column_names):
-                            values.extend([''] * (len(self.column_names) - len(values)))
-                        else:
-                            values = values[:len(self.column_names)]
-                    
-                    self.data_tree.insert("", "end", iid=row_id, values=values)
-                    
-                    # Apply alternating row colors
-                    if line_idx % 2 == 0:
-                        self.data_tree.item(row_id, tags=('evenrow',))
-                    else:
-                        self.data_tree.item(row_id, tags=('oddrow',))
+                # Apply alternating row colors
+                if row_idx % 2 == 0:
+                    self.data_tree.item(row_id, tags=('evenrow',))
+                else:
+                    self.data_tree.item(row_id, tags=('oddrow',))
             
             # Apply tag configurations for row colors
             self.data_tree.tag_configure('oddrow', background='#f0f0f0')
@@ -204,7 +180,7 @@ class UpdateTab:
             self.status_label.config(text=f"Table '{table_name}' loaded. Double-click a row to edit it.")
         
         except Exception as e:
-            ttk.Label(self.table_frame, text=f"Error parsing result: {str(e)}").pack(pady=20)
+            ttk.Label(self.table_frame, text=f"Error loading table data: {str(e)}").pack(pady=20)
     
     def edit_selected_row(self, event):
         # Get the selected item
@@ -1,19 +1,181 @@
 import os
 import json
 import re
+import codecs
+import io
 from datetime import datetime
+from .parser import SQLParser
+from .parallel_import import ParallelImporter
+
+# Bytes read from a dump file at a time
+READ_CHUNK_SIZE = 1 << 20
+
+# Characters that change the tokenizer state outside strings and comments
+_SQL_SPECIAL_RE = re.compile(r"""['"`;]|--|/\*""")
+# Closing quote of a quoted string; a doubled quote closes and reopens it,
+# and backslashes are plain characters
+_QUOTE_END_RE = {
+    "'": re.compile(r"'"),
+    '"': re.compile(r'"'),
+    "`": re.compile(r"`"),
+}
+# Next backslash escape or closing quote, for dumps written with backslash escapes
+_ESCAPED_QUOTE_END_RE = {
+    "'": re.compile(r"[\\']"),
+    '"': re.compile(r'[\\"]'),
+    "`": re.compile(r"`"),
+}
+# Characters of MySQL's backslash escapes; other escaped characters stand for themselves
+_BACKSLASH_ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a",
+                      "%": "\\%", "_": "\\_"}
+
+# Statements of a dump that are not imported
+_SKIPPED_STATEMENT_RE = re.compile(r"(?:USE|SET|LOCK\s+TABLES|UNLOCK\s+TABLES)\b", re.IGNORECASE)
+
+
+class SQLStatementReader:
+    """
+    Split an SQL dump into statements while reading it in chunks.
+
+    The reader is a small tokenizer: it jumps from one special character to
+    the next (quote, semicolon, comment start), so string contents are never
+    looked at one character at a time, and collects the pieces of the current
+    statement in a list. Semicolons inside quoted strings and -- and /* */
+    comments are handled across chunk boundaries, and only the statement
+    being read is held in memory.
+
+    Strings use the standard rule by default: a doubled quote escapes the
+    quote and backslashes are plain characters, as SQLVM's own exports and
+    dumps written with MySQL's NO_BACKSLASH_ESCAPES mode have them. Dumps of
+    mysqldump's default mode escape with backslashes (\\' and \\\\); with
+    backslash_escapes their strings are rewritten to the standard rule while
+    they are split, so the statements parse as SQLVM expects.
+
+    Args:
+        file: File object opened in binary (decoded as UTF-8) or text mode
+        chunk_size: Bytes or characters read at a time
+        backslash_escapes: Whether a backslash escapes the next character in strings
+    """
+
+    def __init__(self, file, chunk_size=None, backslash_escapes=False):
+        self.file = file
+        self.chunk_size = chunk_size or READ_CHUNK_SIZE
+        self.quote_end_re = _ESCAPED_QUOTE_END_RE if backslash_escapes else _QUOTE_END_RE
+        self.bytes_read = 0
+        self.decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+    def _read(self):
+        data = self.file.read(self.chunk_size)
+        self.bytes_read += len(data)
+        if (isinstance(data, bytes)):
+            return self.decoder.decode(data, final=not data)
+        return data
+
+    def __iter__(self):
+        buffer = ""
+        pos = 0  # Scan position in buffer
+        start = 0  # Start of the statement text not yet moved to pieces
+        pieces = []
+        state = None  # None, a quote character, "line" or "block"
+        at_end = False
+        while True:
+            # Scan the buffer until a statement ends or more text is needed
+            while True:
+                if (state is None):
+                    match = _SQL_SPECIAL_RE.search(buffer, pos)
+                    if (match is None):
+                        # A trailing - or / may start a comment in the next chunk
+                        pos = max(pos, len(buffer) - 1) if (not at_end and buffer[-1:] in ("-", "/")) else len(buffer)
+                        break
+                    token = match.group()
+                    if (token == ";"):
+                        pieces.append(buffer[start:match.start()])
+                        statement = "".join(pieces).strip()
+                        pieces = []
+                        start = pos = match.end()
+                        if (statement):
+                            yield statement
+                    elif (token in _QUOTE_END_RE):
+                        state = token
+                        pos = match.end()
+                    else:
+                        pieces.append(buffer[start:match.start()])
+                        pieces.append(" ")
+                        state = "line" if token == "--" else "block"
+                        start = pos = match.end()
+                elif (state == "line"):
+                    end = buffer.find("\n", pos)
+                    if (end < 0):
+                        start = pos = len(buffer)
+                        break
+                    state = None
+                    start = pos = end + 1
+                elif (state == "block"):
+                    end = buffer.find("*/", pos)
+                    if (end < 0):
+                        start = pos = max(pos, len(buffer) - 1)
+                        break
+                    state = None
+                    start = pos = end + 2
+                else:
+                    match = self.quote_end_re[state].search(buffer, pos)
+                    if (match is None):
+                        pos = len(buffer)
+                        break
+                    if (match.group() == "\\"):
+                        if (match.end() >= len(buffer) and not at_end):
+                            pos = match.start()
+                            break
+                        # Rewrite the escape as the standard rule has it
+                        escaped = buffer[match.end():match.end() + 1]
+                        pieces.append(buffer[start:match.start()])
+                        pieces.append(state * 2 if escaped == state else _BACKSLASH_ESCAPES.get(escaped, escaped))
+                        start = pos = match.end() + 1
+                    else:
+                        state = None
+                        pos = match.end()
+            if (at_end):
+                break
+            # Keep the unfinished statement text and read the next chunk
+            if (state in ("line", "block")):
+                buffer = buffer[pos:]
+            else:
+                pieces.append(buffer[start:pos])
+                buffer = buffer[pos:]
+            start = pos = 0
+            chunk = self._read()
+            if (not chunk):
+                at_end = True
+            buffer += chunk
+        if (state not in ("line", "block")):
+            pieces.append(buffer[start:])
+        statement = "".join(pieces).strip()
+        if (statement):
+            yield statement
+
 
 class SQLVMImporter:
     @staticmethod
-    def import_from_sql(vm, db_name, file_path):
+    def import_from_sql(vm, db_name, file_path, progress=None, chunk_size=None, workers=None, backslash_escapes=False):
         """
         Import SQL file into a specified database
-        
+
+        The file is read in chunks and split into statements as it goes, and
+        each statement is executed as soon as it is complete, so large dumps
+        are imported in bounded memory. With `workers`, the INSERT statements
+        are parsed and converted in worker processes (see ParallelImporter).
+
         Args:
             vm: The SQLVM instance
             db_name: Target database name
             file_path: Path to the SQL file to import
-            
+            progress: Optional function called as progress(bytes_read, total_bytes, statements)
+                whenever a new chunk of the file has been read, and once at the end
+            chunk_size: Bytes read at a time (None for READ_CHUNK_SIZE)
+            workers: Number of worker processes (None to import in this process)
+            backslash_escapes: Whether strings escape with backslashes, as in
+                mysqldump's default output (see SQLStatementReader)
+
         Returns:
             Tuple of (success message, error_count, success_count)
         """
@@ -25,81 +187,49 @@ class SQLVMImporter:
             result = vm.use_database(db_name)
             if "Error" in result:
                 return f"Error: Could not use database '{db_name}': {result}", 0, 0
-                
-            # Read SQL file
-            with open(file_path, 'r') as sql_file:
-                sql_content = sql_file.read()
-            
-            print(f"Processing SQL file: {file_path}")
-            
-            # Pre-process the SQL content
-            # 1. Remove comments
-            sql_content = re.sub(r'--.*?$', '', sql_content, flags=re.MULTILINE)  # Single line comments
-            sql_content = re.sub(r'/\*[\s\S]*?\*/', '', sql_content)  # Multi-line comments
-            
-            # 2. Normalize line endings
-            sql_content = sql_content.replace('\r\n', '\n').replace('\r', '\n')
-            
-            # 3. Split commands more intelligently
-            commands = SQLVMImporter._parse_sql_commands(sql_content)
-            
-            print(f"Found {len(commands)} commands in SQL file")
-            
-            # Process commands for SQLVM compatibility
-            processed_commands = []
-            for i, cmd in enumerate(commands):
-                # Skip empty commands
-                if not cmd.strip():
-                    continue
-                
-                # Skip certain statements
-                # 1. Skip USE statements
-                if re.match(r'^\s*USE\s+', cmd, re.IGNORECASE):
-                    print(f"Skipping USE statement: {cmd}")
-                    continue
-                
-                # 2. Skip CREATE DATABASE for the current DB
-                if re.match(r'^\s*CREATE\s+DATABASE\s+(?:IF\s+NOT\s+EXISTS\s+)?[`"\']?' + db_name + r'[`"\']?', cmd, re.IGNORECASE):
-                    print(f"Skipping CREATE DATABASE statement: {cmd}")
-                    continue
-                
-                # 3. Skip SET statements
-                if re.match(r'^\s*SET\s+', cmd, re.IGNORECASE):
-                    print(f"Skipping SET statement: {cmd}")
-                    continue
-                
-                # Standardize SQL syntax for SQLVM compatibility
-                standardized_cmd = SQLVMImporter._standardize_identifiers(cmd)
-                processed_commands.append(standardized_cmd)
-                print(f"Command {i+1}: {standardized_cmd[:75]}..." if len(standardized_cmd) > 75 else standardized_cmd)
-            
-            # Execute each processed command
+
+            if workers:
+                return ParallelImporter(vm, workers).import_sql(db_name, file_path, progress, chunk_size, backslash_escapes)
+
+            total_bytes = os.path.getsize(file_path)
             success_count = 0
-            errors = []
-            
-            for i, cmd in enumerate(processed_commands):
-                try:
-                    print(f"Executing command {i+1}/{len(processed_commands)}")
-                    result = vm.execute_command(cmd)
-                    
-                    if "Error" in result:
-                        detailed_error = SQLVMImporter._get_detailed_error(cmd, result)
-                        errors.append(detailed_error)
-                        print(f"Error in command {i+1}: {detailed_error[:100]}...")
-                    else:
-                        success_count += 1
-                        print(f"Command {i+1} executed successfully")
-                except Exception as e:
-                    error_msg = f"Exception executing: {cmd[:50]}{'...' if len(cmd) > 50 else ''}\n{str(e)}"
-                    errors.append(error_msg)
-                    print(f"Exception in command {i+1}: {error_msg}")
-            
+            error_count = 0
+            errors = []  # Details of the first errors only
+            statements = 0
+            reported = 0
+
+            with open(file_path, 'rb') as sql_file:
+                reader = SQLStatementReader(sql_file, chunk_size, backslash_escapes)
+                for cmd in reader:
+                    statements += 1
+                    if not SQLVMImporter._skip_statement(cmd, db_name):
+                        # Standardize SQL syntax for SQLVM compatibility and run it directly
+                        standardized_cmd = SQLVMImporter._standardize_identifiers(cmd)
+                        try:
+                            results = vm._run_bytecode(SQLParser.parse_to_bytecode(standardized_cmd))
+                            failed = [r for r in results if isinstance(r, str) and r.startswith("Error")]
+                            if failed:
+                                error_count += 1
+                                if len(errors) < 3:
+                                    errors.append(SQLVMImporter._get_detailed_error(standardized_cmd, failed[0]))
+                            else:
+                                success_count += 1
+                        except Exception as e:
+                            error_count += 1
+                            if len(errors) < 3:
+                                errors.append(f"Exception executing: {cmd[:50]}{'...' if len(cmd) > 50 else ''}\n{str(e)}")
+                    if progress and reader.bytes_read != reported:
+                        reported = reader.bytes_read
+                        progress(reported, total_bytes, statements)
+            if progress:
+                progress(reader.bytes_read, total_bytes, statements)
+
             # Generate result message
-            if errors:
-                error_message = f"Imported with {len(errors)} errors. {success_count} commands succeeded."
-                if len(errors) <= 3:
+            if error_count:
+                error_message = f"Imported with {error_count} errors. {success_count} commands succeeded."
+                if error_count <= 3:
                     error_message += "\n\nErrors:\n" + "\n".join(errors)
-                return error_message, len(errors), success_count
+                return error_message, error_count, success_count
             else:
                 success_message = f"Successfully imported {success_count} SQL commands into {db_name}."
                 return success_message, 0, success_count
@@ -107,6 +237,13 @@ class SQLVMImporter:
         except Exception as e:
             return f"Error importing SQL file: {str(e)}", 1, 0
 
+    @staticmethod
+    def _skip_statement(cmd, db_name):
+        """Return True for dump statements that are not imported: USE, SET, table locks and CREATE DATABASE of the target"""
+        if _SKIPPED_STATEMENT_RE.match(cmd):
+            return True
+        return bool(re.match(r'CREATE\s+DATABASE\s+(?:IF\s+NOT\s+EXISTS\s+)?[`"\']?' + re.escape(db_name) + r'[`"\']?', cmd, re.IGNORECASE))
+
     @staticmethod
     def _standardize_identifiers(cmd):
         """
@@ -129,6 +266,9 @@ class SQLVMImporter:
             for pattern, replacement in patterns:
                 result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
             
+            # SQLVM's own storage engines are kept; other ENGINE options are dropped below
+            engine_match = re.search(r'\)\s*ENGINE\s*=\s*(COLUMNAR|MMAP|ROW)\b', result, re.IGNORECASE)
+            
             # Extract and preserve composite primary key definition
             composite_pk_match = re.search(r'PRIMARY\s+KEY\s+\(\s*(`[^`]+`|"[^"]+"|\'[^\']+\'|\w+)(?:\s*,\s*(`[^`]+`|"[^"]+"|\'[^\']+\'|\w+))+\s*\)', result, re.IGNORECASE)
             composite_pk = None
@@ -185,45 +325,22 @@ class SQLVMImporter:
                     if table_name_match:
                         table_name = table_name_match.group(1)
                         result = f"CREATE TABLE {table_name} ({', '.join(cleaned_cols)})"
+                        if engine_match:
+                            result += f" ENGINE={engine_match.group(1).upper()}"
         
         # Handle quoted table names in INSERT statements
+        elif re.match(r'^\s*(CREATE|DROP)\s+INDEX\s+', result, re.IGNORECASE):
+            # Unquote the index, table and column names
+            result = re.sub(r"[`\"']([^`\"']+)[`\"']", r"\1", result)
         elif re.match(r'^\s*INSERT\s+INTO\s+', result, re.IGNORECASE):
-            # Handle INSERT INTO commands with quoted table names
-            # Match patterns like: INSERT INTO `table` or INSERT INTO 'table' or INSERT INTO "table"
-            patterns = [
-                (r"INSERT\s+INTO\s+`([^`]+)`", r"INSERT INTO \1"),
-                (r"INSERT\s+INTO\s+'([^']+)'", r"INSERT INTO \1"),
-                (r'INSERT\s+INTO\s+"([^"]+)"', r"INSERT INTO \1")
-            ]
-            
-            for pattern, replacement in patterns:
-                result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
-            
-            # Standardize values in INSERT statements
-            # First, extract everything after VALUES to handle the values part separately
-            values_match = re.search(r'(VALUES\s*\()(.+)(\))', result, re.IGNORECASE)
+            # Unquote the table and column names; the values are parsed as they are
+            # (quoted strings with '' escapes), so extended INSERTs of
+            # a dump are not rewritten and their strings keep their whitespace
+            values_match = re.search(r'\bVALUES\b', result, re.IGNORECASE)
             if values_match:
-                prefix = values_match.group(1)
-                values_content = values_match.group(2)
-                suffix = values_match.group(3)
-                
-                # Process values: standardize quotes for string values
-                processed_values = []
-                # Split by comma, but respect quotes
-                value_parts = SQLVMImporter._split_by_comma_respecting_quotes(values_content)
-                
-                for value in value_parts:
-                    value = value.strip()
-                    # Convert 'string' or `string` to "string" for consistency
-                    if (value.startswith("'") and value.endswith("'")) or (value.startswith("`") and value.endswith("`")):
-                        inner_value = value[1:-1].replace('"', '\\"')  # Escape any double quotes
-                        processed_value = f'"{inner_value}"'
-                        processed_values.append(processed_value)
-                    else:
-                        processed_values.append(value)
-                
-                # Reconstruct the INSERT statement
-                result = result.replace(values_match.group(0), f"{prefix}{', '.join(processed_values)}{suffix}")
+                head = re.sub(r"[`\"']([^`\"']+)[`\"']", r"\1", result[:values_match.start()])
+                head = re.sub(r'^\s*INSERT\s+INTO\s+', 'INSERT INTO ', head, flags=re.IGNORECASE)
+                return f"{head.strip()} VALUES {result[values_match.end():].strip()}"
         
         # Handle generic UPDATE, SELECT, and DELETE operations with quoted table names
         cmd_patterns = [
@@ -245,7 +362,7 @@ class SQLVMImporter:
         
         # Always remove unsupported clauses from statements, regardless of statement type
         clauses_to_remove = [
-            r"ENGINE\s*=\s*\w+",
+            r"ENGINE\s*=\s*(?!(?:COLUMNAR|MMAP|ROW)\b)\w+",
             r"DEFAULT\s+CHARACTER\s+SET\s*=?\s*\w+",
             r"COLLATE\s+\w+",
             r"AUTO_INCREMENT\s*=\s*\d+",
@@ -340,76 +457,9 @@ class SQLVMImporter:
     @staticmethod
     def _parse_sql_commands(sql_content):
         """
-        More intelligent parsing of SQL commands, handling different quoting styles
-        and respecting statement boundaries.
+        Split SQL text into statements, respecting quoted strings and comments.
         """
-        commands = []
-        current_cmd = ""
-        in_quotes = False
-        quote_char = None
-        paren_level = 0
-        comment_mode = None  # None, 'line', or 'block'
-        i = 0
-        
-        while i < len(sql_content):
-            char = sql_content[i]
-            next_char = sql_content[i+1] if i < len(sql_content) - 1 else None
-            
-            # Handle comments
-            if comment_mode == 'line' and char == '\n':
-                # End of line comment
-                comment_mode = None
-                i += 1
-                continue
-            elif comment_mode == 'block' and char == '*' and next_char == '/':
-                # End of block comment
-                comment_mode = None
-                i += 2
-                continue
-            elif comment_mode:
-                # Inside a comment, continue to next character
-                i += 1
-                continue
-            elif char == '-' and next_char == '-':
-                # Start of line comment
-                comment_mode = 'line'
-                i += 2
-                continue
-            elif char == '/' and next_char == '*':
-                # Start of block comment
-                comment_mode = 'block'
-                i += 2
-                continue
-            
-            # Handle quotes and special characters
-            if char in ["'", '"', '`'] and (not in_quotes or quote_char == char):
-                in_quotes = not in_quotes
-                if in_quotes:
-                    quote_char = char
-                else:
-                    quote_char = None
-                current_cmd += char
-            elif char == '(' and not in_quotes:
-                paren_level += 1
-                current_cmd += char
-            elif char == ')' and not in_quotes:
-                paren_level -= 1
-                current_cmd += char
-            elif char == ';' and not in_quotes and paren_level == 0:
-                # End of command
-                if current_cmd.strip():
-                    commands.append(current_cmd.strip())
-                current_cmd = ""
-            else:
-                current_cmd += char
-            
-            i += 1
-        
-        # Add the last command if it exists
-        if current_cmd.strip():
-            commands.append(current_cmd.strip())
-        
-        return commands
+        return list(SQLStatementReader(io.StringIO(sql_content)))
 
     @staticmethod
     def _get_detailed_error(cmd, error_msg):
@@ -484,19 +534,9 @@ class SQLVMImporter:
             Dict with validation info
         """
         try:
-            with open(file_path, 'r') as sql_file:
-                sql_content = sql_file.read()
-            
-            # Remove comments
-            sql_content = re.sub(r'--.*?\n', '\n', sql_content)
-            sql_content = re.sub(r'/\*.*?\*/', '', sql_content, flags=re.DOTALL)
-            
-            # Find all commands by splitting on semicolons (simplistic approach)
-            raw_commands = [cmd.strip() for cmd in sql_content.split(";") if cmd.strip()]
-            
             # Check for common SQL statements
             stats = {
-                "total_commands": len(raw_commands),
+                "total_commands": 0,
                 "create_database": 0,
                 "create_table": 0,
                 "insert": 0,
@@ -504,24 +544,15 @@ class SQLVMImporter:
                 "problematic": []
             }
             
-            for cmd in raw_commands:
-                cmd_upper = cmd.upper()
-                if "CREATE DATABASE" in cmd_upper or "CREATE SCHEMA" in cmd_upper:
-                    stats["create_database"] += 1
-                elif "CREATE TABLE" in cmd_upper:
-                    stats["create_table"] += 1
-                elif "INSERT" in cmd_upper:
-                    stats["insert"] += 1
-                else:
-                    stats["other"] += 1
-                
-                # Check for potential issues
-                if "FOREIGN KEY" in cmd_upper or "CONSTRAINT" in cmd_upper:
-                    stats["problematic"].append("Command contains FOREIGN KEY or CONSTRAINT which may not be supported")
-                elif "TRIGGER" in cmd_upper:
-                    stats["problematic"].append("Command contains TRIGGER which is not supported")
-                elif "PROCEDURE" in cmd_upper or "FUNCTION" in cmd_upper:
-                    stats["problematic"].append("Command contains PROCEDURE or FUNCTION which is not supported")
+            # Statements are read one at a time, so large dumps are not loaded into memory
+            with open(file_path, 'rb') as sql_file:
+                for cmd in SQLStatementReader(sql_file):
+                    stats["total_commands"] += 1
+                    if re.match(r'INSERT\b', cmd, re.IGNORECASE):
+                        # Row data is not inspected
+                        stats["insert"] += 1
+                        continue
+                    SQLVMImporter._classify_statement(cmd, stats)
             
             return {
                 "valid": True,
@@ -537,7 +568,28 @@ class SQLVMImporter:
             }
 
     @staticmethod
-    def import_from_json(vm, db_name, file_path):
+    def _classify_statement(cmd, stats):
+        """Count a statement in the validation stats and record potential issues"""
+        cmd_upper = cmd.upper()
+        if "CREATE DATABASE" in cmd_upper or "CREATE SCHEMA" in cmd_upper:
+            stats["create_database"] += 1
+        elif "CREATE TABLE" in cmd_upper:
+            stats["create_table"] += 1
+        elif "INSERT" in cmd_upper:
+            stats["insert"] += 1
+        else:
+            stats["other"] += 1
+        
+        # Check for potential issues
+        if "FOREIGN KEY" in cmd_upper or "CONSTRAINT" in cmd_upper:
+            stats["problematic"].append("Command contains FOREIGN KEY or CONSTRAINT which may not be supported")
+        elif "TRIGGER" in cmd_upper:
+            stats["problematic"].append("Command contains TRIGGER which is not supported")
+        elif "PROCEDURE" in cmd_upper or "FUNCTION" in cmd_upper:
+            stats["problematic"].append("Command contains PROCEDURE or FUNCTION which is not supported")
+
+    @staticmethod
+    def import_from_json(vm, db_name, file_path, workers=None):
         """
         Import JSON file into a specified database
         
@@ -545,6 +597,8 @@ class SQLVMImporter:
             vm: The SQLVM instance
             db_name: Target database name
             file_path: Path to the JSON file to import
+            workers: Number of worker processes converting the rows of exported tables
+                (None to import in this process)
             
         Returns:
             Tuple of (success message, error_count, success_count)
@@ -572,12 +626,12 @@ class SQLVMImporter:
                 if db_name in data:
                     # Extract just this database's tables
                     tables_data = data[db_name]
-                    result, error_count, success_count = SQLVMImporter._import_tables_dict(vm, tables_data)
+                    result, error_count, success_count = SQLVMImporter._import_tables_dict(vm, tables_data, workers)
                     return result, error_count, success_count
                 
                 # Check if this is a direct tables dictionary
                 elif all(isinstance(val, dict) for val in data.values()):
-                    result, error_count, success_count = SQLVMImporter._import_tables_dict(vm, data)
+                    result, error_count, success_count = SQLVMImporter._import_tables_dict(vm, data, workers)
                     return result, error_count, success_count
                 
                 # Check if this is a single table definition
@@ -604,8 +658,55 @@ class SQLVMImporter:
             return f"Error importing JSON file: {str(e)}", 1, 0
     
     @staticmethod
-    def _import_tables_dict(vm, tables_data):
+    def _create_table_command(table_name, table_info):
+        """
+        CREATE TABLE statement for a table of a JSON export, with its
+        AUTO_INCREMENT, PRIMARY KEY and UNIQUE/INDEX columns and its engine
+
+        Args:
+            table_name: Name of the table
+            table_info: Exported table ({columns, types, auto_increment, indexes, primary_key, ...})
+        """
+        types = table_info.get('types', {})
+        auto_increment = table_info.get('auto_increment', {})
+        indexes = table_info.get('indexes', {})
+        primary_key = list(table_info.get('primary_key') or [])
+
+        col_defs = []
+        for col in table_info.get('columns', []):
+            col_def = f"{col} {types.get(col, 'TEXT')}"
+            if col in auto_increment and "AUTO_INCREMENT" not in col_def.upper():
+                col_def += " AUTO_INCREMENT"
+            index_type = indexes.get(col, "")
+            if index_type in ("PRIMARY", "PRIMARY KEY"):
+                # Older exports only list the key in indexes
+                if col not in primary_key:
+                    primary_key.append(col)
+            elif index_type:
+                col_def += f" {index_type}"
+            col_defs.append(col_def)
+        if primary_key:
+            col_defs.append(f"PRIMARY KEY ({', '.join(primary_key)})")
+
+        create_cmd = f"CREATE TABLE {table_name} ({', '.join(col_defs)})"
+        if table_info.get("engine"):
+            create_cmd += f" ENGINE={table_info['engine']}"
+        return create_cmd
+
+    @staticmethod
+    def _restore_auto_increment(vm, table_name, table_info):
+        """Continue the auto-increment counters of an imported table from the exported ones"""
+        counters = vm.tables[table_name].get("auto_increment", {})
+        for col, value in table_info.get("auto_increment", {}).items():
+            if col in counters and isinstance(value, int):
+                counters[col] = max(counters[col], value)
+
+    @staticmethod
+    def _import_tables_dict(vm, tables_data, workers=None):
         """Import tables from a dictionary of table definitions"""
+        if workers:
+            return ParallelImporter(vm, workers).import_tables(tables_data)
+
         success_tables = 0
         success_records = 0
         errors = []
@@ -619,16 +720,7 @@ class SQLVMImporter:
                     continue
                 
                 columns = table_info.get('columns', [])
-                types = table_info.get('types', {})
-                
-                # Build column definitions
-                col_defs = []
-                for col in columns:
-                    col_type = types.get(col, "TEXT")
-                    col_defs.append(f"{col} {col_type}")
-                
-                create_cmd = f"CREATE TABLE {table_name} ({', '.join(col_defs)})"
-                result = vm.execute_command(create_cmd)
+                result = vm.execute_command(SQLVMImporter._create_table_command(table_name, table_info))
                 
                 if "Error" in result and "already exists" not in result:
                     errors.append(f"Error creating table {table_name}: {result}")
@@ -656,6 +748,13 @@ class SQLVMImporter:
                             errors.append(f"Error inserting into {table_name}: {result}")
                         else:
                             success_records += 1
+                SQLVMImporter._restore_auto_increment(vm, table_name, table_info)
+
+                # Build the secondary indexes once the rows are in
+                for index_name, index_columns in table_info.get("secondary_indexes", {}).items():
+                    result = vm.execute_command(f"CREATE INDEX {index_name} ON {table_name} ({', '.join(index_columns)})")
+                    if "Error" in result:
+                        errors.append(f"Error creating index {index_name} on {table_name}: {result}")
                 
             except Exception as e:
                 errors.append(f"Error processing table {table_name}: {str(e)}")
@@ -0,0 +1,329 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class HashIndex:
+    """
+    Hash index over one or more columns of a table.
+
+    Used to enforce PRIMARY KEY and UNIQUE constraints without scanning the
+    table. Maps a key (a single value, or a tuple of values for composite keys)
+    to the position of the row in table["rows"].
+    """
+
+    def __init__(self, name, columns, index_type):
+        self.name = name
+        self.columns = list(columns)
+        self.index_type = index_type
+        self.entries = {}
+
+    def key_for(self, row):
+        """
+        Build the index key for a row dict. Returns None if any key column is
+        NULL, since NULL values never collide in a UNIQUE index.
+        """
+        if (len(self.columns) == 1):
+            return row.get(self.columns[0])
+        key = tuple(row.get(col) for col in self.columns)
+        if (None in key):
+            return None
+        return key
+
+    def format_key(self, key):
+        """Format a key the way duplicate-entry errors display it"""
+        if (isinstance(key, tuple)):
+            return "-".join(str(part) for part in key)
+        return str(key)
+
+    def lookup(self, key):
+        """Return the row position stored for key, or None"""
+        if (key is None):
+            return None
+        return self.entries.get(key)
+
+    def add(self, key, position):
+        if (key is not None):
+            self.entries[key] = position
+
+    def add_many(self, keys, start):
+        """Register keys for the consecutive row positions starting at start"""
+        keys = keys if isinstance(keys, list) else list(keys)
+        if (None in keys):
+            self.entries.update((key, position) for position, key in enumerate(keys, start) if key is not None)
+        else:
+            self.entries.update(zip(keys, range(start, start + len(keys))))
+
+    def keys_for_columns(self, column_values, length):
+        """
+        Build the index keys of a batch of rows given as column lists.
+
+        Args:
+            column_values: Dict mapping column names to lists of values
+            length: Number of rows in the batch
+        """
+        parts = [column_values.get(col) or [None] * length for col in self.columns]
+        if (len(parts) == 1):
+            return parts[0]
+        return [None if None in key else key for key in zip(*parts)]
+
+    def find_duplicate(self, keys):
+        """Return the first key of a batch that is already indexed or repeated in the batch, or None"""
+        present = [key for key in keys if key is not None]
+        if (len(set(present)) == len(present) and self.entries.keys().isdisjoint(present)):
+            return None
+        seen = set()
+        for key in present:
+            if (key in seen or key in self.entries):
+                return key
+            seen.add(key)
+        return None
+
+    def remove(self, key):
+        if (key is not None):
+            self.entries.pop(key, None)
+
+    def build(self, rows):
+        """Rebuild the index from scratch over a list of rows"""
+        self.entries = {}
+        if (hasattr(rows, "column")):
+            # Columnar storage: read the key columns whole instead of row by row
+            keys = self.keys_for_columns({col: rows.column(col) for col in self.columns}, len(rows))
+        else:
+            keys = map(self.key_for, rows)
+        self.add_many(keys, 0)
+
+    def remove_positions(self, deleted):
+        """
+        Drop the entries for deleted row positions and shift the remaining
+        positions down so they match the compacted row list.
+
+        Args:
+            deleted: Sorted list of deleted row positions
+        """
+        if (not deleted):
+            return
+        deleted_set = set(deleted)
+        remapped = {}
+        for key, position in self.entries.items():
+            if (position in deleted_set):
+                continue
+            remapped[key] = position - bisect_left(deleted, position)
+        self.entries = remapped
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class OrderedIndex:
+    """
+    Ordered (B-tree) secondary index over one or more columns of a table.
+
+    Created from INDEX/KEY column modifiers and CREATE INDEX statements, and
+    used by the WHERE planner for point lookups and range scans. Keys are kept
+    in sorted leaf blocks of at most LEAF_SIZE keys, with the largest key of
+    every leaf in a separate list acting as the inner node; lookups bisect the
+    inner node and then one leaf, and inserts split leaves as they fill up.
+    Each key maps to the sorted positions of its rows in table["rows"].
+
+    Single-column keys are the column values themselves, and NULLs are not
+    indexed. Composite keys are tuples in which every part is encoded as (1, value)
+    or (0,) for NULL, so they always compare and NULLs sort first; range scans
+    on a composite index use its leading column.
+    """
+
+    LEAF_SIZE = 256
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.columns = list(columns)
+        self.index_type = "INDEX"
+        self.leaves = []
+        self.maxes = []
+        self.postings = {}
+        # Number of indexed row positions; rows not counted hold NULL
+        self.size = 0
+        # False once a key could not be ordered against the others (mixed types)
+        self.valid = True
+
+    def key_for(self, row):
+        """Build the index key for a row dict, or None if it is not indexed"""
+        if (len(self.columns) == 1):
+            return row.get(self.columns[0])
+        return tuple((0,) if value is None else (1, value) for value in (row.get(col) for col in self.columns))
+
+    def keys_for_columns(self, column_values, length):
+        """Build the index keys of a batch of rows given as a dict of column value lists"""
+        parts = [column_values.get(col) or [None] * length for col in self.columns]
+        if (len(parts) == 1):
+            return parts[0]
+        return [tuple((0,) if value is None else (1, value) for value in key) for key in zip(*parts)]
+
+    def encode_prefix(self, value):
+        """Encode a value of the leading column the way it appears in composite keys"""
+        if (len(self.columns) == 1):
+            return value
+        return (1, value)
+
+    def _prefix(self, key):
+        return key if len(self.columns) == 1 else key[0]
+
+    # Maintenance
+    def add(self, key, position):
+        if (key is None or not self.valid):
+            return
+        positions = self.postings.get(key)
+        if (positions is not None):
+            if (not positions or positions[-1] < position):
+                positions.append(position)
+            else:
+                insort(positions, position)
+            self.size += 1
+            return
+        try:
+            self._insert_key(key)
+        except TypeError:
+            self.valid = False
+            return
+        self.postings[key] = [position]
+        self.size += 1
+
+    def _insert_key(self, key):
+        if (not self.leaves):
+            self.leaves.append([key])
+            self.maxes.append(key)
+            return
+        i = bisect_left(self.maxes, key)
+        if (i == len(self.maxes)):
+            # Larger than every key: append to the last leaf
+            i -= 1
+            self.leaves[i].append(key)
+            self.maxes[i] = key
+        else:
+            insort(self.leaves[i], key)
+        leaf = self.leaves[i]
+        if (len(leaf) > 2 * self.LEAF_SIZE):
+            # Split a full leaf in two
+            half = len(leaf) // 2
+            self.leaves[i:i + 1] = [leaf[:half], leaf[half:]]
+            self.maxes[i:i + 1] = [leaf[half - 1], leaf[-1]]
+
+    def remove(self, key, position):
+        if (key is None or not self.valid):
+            return
+        positions = self.postings.get(key)
+        if (positions is None):
+            return
+        i = bisect_left(positions, position)
+        if (i < len(positions) and positions[i] == position):
+            del positions[i]
+            self.size -= 1
+        if (positions):
+            return
+        del self.postings[key]
+        i = bisect_left(self.maxes, key)
+        leaf = self.leaves[i]
+        del leaf[bisect_left(leaf, key)]
+        if (not leaf):
+            del self.leaves[i]
+            del self.maxes[i]
+        else:
+            self.maxes[i] = leaf[-1]
+
+    def build(self, rows):
+        """Rebuild the index from scratch over a list of rows"""
+        postings = {}
+        for position, row in enumerate(rows):
+            key = self.key_for(row)
+            if (key is not None):
+                postings.setdefault(key, []).append(position)
+        self.postings = postings
+        self.size = sum(map(len, postings.values()))
+        self.valid = True
+        try:
+            keys = sorted(postings)
+        except TypeError:
+            self.valid = False
+            keys = []
+        self._load(keys)
+
+    def _load(self, keys):
+        size = self.LEAF_SIZE
+        self.leaves = [keys[i:i + size] for i in range(0, len(keys), size)]
+        self.maxes = [leaf[-1] for leaf in self.leaves]
+
+    def remove_positions(self, deleted):
+        """
+        Drop the entries for deleted row positions and shift the remaining
+        positions down so they match the compacted row list.
+
+        Args:
+            deleted: Sorted list of deleted row positions
+        """
+        if (not deleted or not self.valid):
+            return
+        deleted_set = set(deleted)
+        postings = {}
+        for key, positions in self.postings.items():
+            kept = [position - bisect_left(deleted, position) for position in positions if position not in deleted_set]
+            if (kept):
+                postings[key] = kept
+        if (len(postings) != len(self.postings)):
+            self._load([key for leaf in self.leaves for key in leaf if key in postings])
+        self.postings = postings
+        self.size = sum(map(len, postings.values()))
+
+    # Lookups
+    def lookup(self, key):
+        """Return the positions of the rows with the given key"""
+        if (key is None):
+            return []
+        return list(self.postings.get(key, ()))
+
+    def range(self, low=None, high=None, include_low=True, include_high=True):
+        """
+        Return the positions of the rows whose key (or leading column, for
+        composite indexes) lies between low and high, in key order. A bound of
+        None is open. Raises TypeError if a bound cannot be compared with the keys.
+        """
+        prefix = self._prefix
+        if (low is None):
+            leaf_index, offset = 0, 0
+        else:
+            low = self.encode_prefix(low)
+            find = bisect_left if include_low else bisect_right
+            leaf_index = find(self.maxes, low, key=prefix)
+            offset = find(self.leaves[leaf_index], low, key=prefix) if leaf_index < len(self.leaves) else 0
+        if (high is not None):
+            high = self.encode_prefix(high)
+
+        positions = []
+        postings = self.postings
+        for leaf in self.leaves[leaf_index:]:
+            stop = len(leaf)
+            if (high is not None and (prefix(leaf[-1]) > high or (not include_high and prefix(leaf[-1]) == high))):
+                stop = (bisect_right if include_high else bisect_left)(leaf, high, lo=offset, key=prefix)
+            for key in leaf[offset:stop]:
+                positions.extend(postings[key])
+            if (stop < len(leaf)):
+                break
+            offset = 0
+        return positions
+
+    def ordered_groups(self, descending=False):
+        """
+        Yield the positions of the rows of each key in key order (descending
+        keys if requested), one list per key; positions within a key are
+        ascending. Rows with a NULL key are not indexed and not yielded.
+        """
+        for _, positions in self.items(descending):
+            yield positions
+
+    def items(self, descending=False):
+        """Yield (key, positions) pairs in key order, like ordered_groups"""
+        leaves = reversed(self.leaves) if descending else self.leaves
+        postings = self.postings
+        for leaf in leaves:
+            for key in (reversed(leaf) if descending else leaf):
+                yield key, postings[key]
+
+    def __len__(self):
+        return len(self.postings)
@@ -0,0 +1,343 @@
+from .pipeline import Operator, null_positions, _estimate_row_bytes
+from .storage import ColumnStore
+
+# Relative costs the join planner compares: reading a row from a scan or an
+# index walk is 1, adding a row to a hash table HASH_BUILD_COST and looking
+# a key up in an index INDEX_PROBE_COST
+HASH_BUILD_COST = 1.5
+INDEX_PROBE_COST = 3.0
+# Fraction of a table a WHERE/ON filter is assumed to keep when it is not known
+FILTER_SELECTIVITY = 0.3
+
+
+def value_getter(store, column):
+    """Function position -> value of a column, for the rows of a table"""
+    if (isinstance(store, ColumnStore)):
+        vector = store.vectors.get(column)
+        return (lambda pos: None) if vector is None else vector.get
+    return lambda pos: store[pos].get(column)
+
+
+def plan_join(left_rows, right_rows, right_filtered, index=False, merge=False):
+    """
+    Pick the join algorithm with the lowest estimated cost.
+
+    Args:
+        left_rows: Rows of the outer (left) input
+        right_rows: Rows of the inner table
+        right_filtered: Estimated rows of the inner table left by its filters
+        index: Whether an index on the join columns of the inner table can be probed
+        merge: Whether both inputs are tables with ordered indexes on the join column
+
+    Returns:
+        Tuple of (algorithm, estimated cost), the algorithm being "hash",
+        "merge" or "index"
+    """
+    costs = {"hash": left_rows + right_rows + right_filtered * HASH_BUILD_COST}
+    if (index):
+        costs["index"] = left_rows * INDEX_PROBE_COST
+    if (merge):
+        costs["merge"] = left_rows + right_rows
+    algorithm = min(costs, key=costs.get)
+    return algorithm, costs[algorithm]
+
+
+class Join(Operator):
+    """
+    Base of the join operators. The child produces tuples of row positions,
+    one per table joined so far; each output tuple adds the position of the
+    matching row of the inner table, or None when an outer join pads the row.
+
+    Args:
+        child: Operator producing the outer (left) position tuples
+        width: Number of positions in a left tuple
+        kind: INNER, LEFT, RIGHT or CROSS
+        residual: Optional function output tuple -> bool for the ON conditions
+            that are not part of the join key
+    """
+
+    algorithm = None
+
+    def __init__(self, child, width, kind, residual=None):
+        super().__init__(child)
+        self.width = width
+        self.kind = kind
+        self.residual = residual
+
+    def describe(self):
+        name = f"{self.algorithm} join"
+        if (self.kind in ("LEFT", "RIGHT")):
+            name = f"{self.kind.lower()} {name}"
+        name = name[0].upper() + name[1:]
+        return name + (f" ({self.detail})" if self.detail else "")
+
+    def children(self):
+        inner = getattr(self, "right_positions", None)
+        return super().children() + ([inner] if isinstance(inner, Operator) else [])
+
+    def _measure(self, items):
+        """Record the size of a built hash table or buffered input, under EXPLAIN ANALYZE"""
+        if (self.stats is not None and items):
+            sample = list(items.items())[:1024] if isinstance(items, dict) else [(item,) for item in items[:1024]]
+            self.memory_bytes = len(items) * _estimate_row_bytes(sample)
+
+    def _padded_right(self, positions, matched):
+        """Rows of the inner table no left row matched, for RIGHT joins"""
+        padding = (None,) * self.width
+        for pos in positions:
+            if (pos not in matched):
+                yield padding + (pos,)
+
+    def _accept(self, row):
+        return self.residual is None or self.residual(row)
+
+
+class NestedLoopJoin(Join):
+    """
+    Compare every left tuple with every inner row: CROSS joins and joins
+    whose ON clause has no equality between the two sides.
+
+    Args:
+        right_positions: Positions of the inner rows passing their filters
+    """
+
+    algorithm = "nested loop"
+
+    def __init__(self, child, width, kind, right_positions, residual=None):
+        super().__init__(child, width, kind, residual)
+        self.right_positions = right_positions
+
+    def rows(self):
+        right = list(self.right_positions)
+        self._measure(right)
+        matched = set()
+        for left in self.child:
+            found = False
+            for pos in right:
+                row = left + (pos,)
+                if (self._accept(row)):
+                    found = True
+                    if (self.kind == "RIGHT"):
+                        matched.add(pos)
+                    yield row
+            if (not found and self.kind == "LEFT"):
+                yield left + (None,)
+        if (self.kind == "RIGHT"):
+            yield from self._padded_right(right, matched)
+
+
+class HashJoin(Join):
+    """
+    Build a hash table on the join keys of one input and probe it with the
+    other. The planner builds on the smaller input; rows with a NULL key
+    never match.
+
+    Args:
+        left_key: Function left tuple -> join key (None if a part is NULL)
+        right_positions: Positions of the inner rows passing their filters
+        right_key: Function inner position -> join key
+        build_right: Build on the inner rows (True) or on the left tuples
+    """
+
+    algorithm = "hash"
+
+    def __init__(self, child, width, kind, left_key, right_positions, right_key, residual=None, build_right=True):
+        super().__init__(child, width, kind, residual)
+        self.left_key = left_key
+        self.right_positions = right_positions
+        self.right_key = right_key
+        self.build_right = build_right
+
+    def rows(self):
+        if (self.build_right):
+            return self._probe_left()
+        return self._probe_right()
+
+    def _probe_left(self):
+        table = {}
+        unmatched = []
+        right_key = self.right_key
+        for pos in self.right_positions:
+            key = right_key(pos)
+            if (key is None):
+                unmatched.append(pos)
+            else:
+                table.setdefault(key, []).append(pos)
+        self._measure(table)
+        left_key = self.left_key
+        matched = set()
+        for left in self.child:
+            key = left_key(left)
+            found = False
+            for pos in (table.get(key, ()) if key is not None else ()):
+                row = left + (pos,)
+                if (self._accept(row)):
+                    found = True
+                    if (self.kind == "RIGHT"):
+                        matched.add(pos)
+                    yield row
+            if (not found and self.kind == "LEFT"):
+                yield left + (None,)
+        if (self.kind == "RIGHT"):
+            yield from self._padded_right((pos for positions in table.values() for pos in positions), matched)
+            yield from self._padded_right(unmatched, matched)
+
+    def _probe_right(self):
+        table = {}
+        lefts = []
+        left_key = self.left_key
+        for left in self.child:
+            key = left_key(left)
+            lefts.append(left)
+            if (key is not None):
+                table.setdefault(key, []).append(len(lefts) - 1)
+        self._measure(table)
+        right_key = self.right_key
+        matched = set()
+        for pos in self.right_positions:
+            key = right_key(pos)
+            found = False
+            for number in (table.get(key, ()) if key is not None else ()):
+                row = lefts[number] + (pos,)
+                if (self._accept(row)):
+                    found = True
+                    if (self.kind == "LEFT"):
+                        matched.add(number)
+                    yield row
+            if (not found and self.kind == "RIGHT"):
+                yield (None,) * self.width + (pos,)
+        if (self.kind == "LEFT"):
+            for number, left in enumerate(lefts):
+                if (number not in matched):
+                    yield left + (None,)
+
+
+class IndexNestedLoopJoin(Join):
+    """
+    Look the join key of every left tuple up in an index of the inner table,
+    reading only the inner rows that match.
+
+    Args:
+        left_key: Function left tuple -> join key (None if a part is NULL)
+        probe: Function key -> positions of the inner rows with that key
+        right_filter: Optional function inner position -> bool for the filters of the inner table
+        right_positions: Function returning all positions of the inner rows
+            passing their filters, read for RIGHT joins only
+        index_name: Name of the probed index
+    """
+
+    algorithm = "index nested loop"
+
+    def __init__(self, child, width, kind, left_key, probe, right_filter=None, right_positions=None,
+                 residual=None, index_name=None):
+        super().__init__(child, width, kind, residual)
+        self.left_key = left_key
+        self.probe = probe
+        self.right_filter = right_filter
+        self.right_positions = right_positions
+        self.index_name = index_name
+
+    def rows(self):
+        left_key = self.left_key
+        probe = self.probe
+        right_filter = self.right_filter
+        matched = set()
+        for left in self.child:
+            key = left_key(left)
+            found = False
+            for pos in (probe(key) if key is not None else ()):
+                if (right_filter is not None and not right_filter(pos)):
+                    continue
+                row = left + (pos,)
+                if (self._accept(row)):
+                    found = True
+                    if (self.kind == "RIGHT"):
+                        matched.add(pos)
+                    yield row
+            if (not found and self.kind == "LEFT"):
+                yield left + (None,)
+        if (self.kind == "RIGHT"):
+            yield from self._padded_right(self.right_positions(), matched)
+
+
+class MergeJoin(Join):
+    """
+    Join two tables by walking ordered indexes on their join columns side by
+    side in key order, so neither input is hashed or sorted. Rows with a NULL
+    key are not in the indexes; an outer join reads them from the column.
+    Leaf operator: the left input is the first table of the statement.
+
+    Args:
+        left: Tuple of (OrderedIndex, rows, column) of the left table
+        right: Tuple of (OrderedIndex, rows, column) of the inner table
+        left_filter: Optional function left position -> bool
+        right_filter: Optional function inner position -> bool
+    """
+
+    algorithm = "merge"
+
+    def __init__(self, left, right, kind, left_filter=None, right_filter=None, residual=None):
+        super().__init__(None, 1, kind, residual)
+        self.left = left
+        self.right = right
+        self.left_filter = left_filter
+        self.right_filter = right_filter
+
+    @staticmethod
+    def _filtered(positions, keep):
+        return positions if keep is None else [pos for pos in positions if keep(pos)]
+
+    def _unmatched_left(self, positions):
+        if (self.kind == "LEFT"):
+            for pos in self._filtered(positions, self.left_filter):
+                yield (pos, None)
+
+    def _unmatched_right(self, positions):
+        if (self.kind == "RIGHT"):
+            for pos in self._filtered(positions, self.right_filter):
+                yield (None, pos)
+
+    def rows(self):
+        left_index, left_store, left_column = self.left
+        right_index, right_store, right_column = self.right
+        lefts = left_index.items()
+        rights = right_index.items()
+        left_item = next(lefts, None)
+        right_item = next(rights, None)
+        while (left_item is not None and right_item is not None):
+            if (left_item[0] < right_item[0]):
+                yield from self._unmatched_left(left_item[1])
+                left_item = next(lefts, None)
+            elif (right_item[0] < left_item[0]):
+                yield from self._unmatched_right(right_item[1])
+                right_item = next(rights, None)
+            else:
+                left_positions = self._filtered(left_item[1], self.left_filter)
+                right_positions = self._filtered(right_item[1], self.right_filter)
+                matched = set()
+                for left in left_positions:
+                    found = False
+                    for pos in right_positions:
+                        row = (left, pos)
+                        if (self._accept(row)):
+                            found = True
+                            matched.add(pos)
+                            yield row
+                    if (not found and self.kind == "LEFT"):
+                        yield (left, None)
+                if (self.kind == "RIGHT"):
+                    for pos in right_positions:
+                        if (pos not in matched):
+                            yield (None, pos)
+                left_item = next(lefts, None)
+                right_item = next(rights, None)
+        while (left_item is not None):
+            yield from self._unmatched_left(left_item[1])
+            left_item = next(lefts, None)
+        while (right_item is not None):
+            yield from self._unmatched_right(right_item[1])
+            right_item = next(rights, None)
+        if (self.kind == "LEFT" and left_index.size != len(left_store)):
+            yield from self._unmatched_left(null_positions(left_store, left_column))
+        if (self.kind == "RIGHT" and right_index.size != len(right_store)):
+            yield from self._unmatched_right(null_positions(right_store, right_column))
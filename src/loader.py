@@ -0,0 +1,185 @@
+import csv
+import json
+import os
+from itertools import chain, islice
+
+from .storage import _base_type
+
+# Rows read from the file and inserted together
+CHUNK_ROWS = 10000
+
+# Field value standing for NULL in CSV files
+CSV_NULL = "\\N"
+
+FORMATS = ("CSV", "NDJSON")
+
+_SCALAR_TYPES = {str, int, float, bool, type(None)}
+
+_EXTENSION_FORMATS = {".csv": "CSV", ".tsv": "CSV", ".txt": "CSV", ".ndjson": "NDJSON", ".jsonl": "NDJSON", ".json": "NDJSON"}
+
+
+class LoadError(ValueError):
+    """A row of the file cannot be loaded; `row` is its number within the chunk"""
+
+    def __init__(self, message, row):
+        super().__init__(message)
+        self.row = row
+
+
+def detect_format(file_path):
+    """Guess the file format from the file extension, or None"""
+    return _EXTENSION_FORMATS.get(os.path.splitext(file_path)[1].lower())
+
+
+def _csv_chunks(file, columns, types, delimiter, chunk_rows):
+    """
+    Yield chunks of a CSV file as dicts of column value lists.
+
+    Empty fields are NULL in non-text columns; \\N is NULL in any column.
+    """
+    reader = csv.reader(file, delimiter=delimiter)
+    width = len(columns)
+    nullable_empty = {col for col in columns if _base_type(types.get(col, "TEXT")) not in ("TEXT", "CHAR", "VARCHAR")}
+    while True:
+        chunk = list(islice(reader, chunk_rows))
+        if (not chunk):
+            return
+        if ([] in chunk):
+            chunk = [row for row in chunk if row]
+        if (len(set(map(len, chunk))) > 1 or len(chunk[0]) != width):
+            number, row = next((number, row) for number, row in enumerate(chunk, 1) if len(row) != width)
+            raise LoadError(f"row has {len(row)} value(s), expected {width}", number)
+        chunk_values = {}
+        for col, values in zip(columns, zip(*chunk)):
+            if (CSV_NULL in values):
+                values = [None if value == CSV_NULL else value for value in values]
+            if (col in nullable_empty and "" in values):
+                values = [None if value == "" else value for value in values]
+            chunk_values[col] = values if isinstance(values, list) else list(values)
+        yield len(chunk), chunk_values
+
+
+def _ndjson_chunks(file, columns, chunk_rows):
+    """
+    Yield chunks of a newline-delimited JSON file as dicts of column value
+    lists. Each line holds an object (keys are column names, missing keys are
+    NULL) or an array of values in column order. The lines of a chunk are
+    decoded with a single json.loads call.
+    """
+    known = set(columns)
+    width = len(columns)
+    while True:
+        lines = [line for line in islice(file, chunk_rows) if not line.isspace()]
+        if (not lines):
+            return
+        try:
+            records = json.loads("[" + ",".join(lines) + "]")
+        except ValueError:
+            for number, line in enumerate(lines, 1):
+                try:
+                    json.loads(line)
+                except ValueError as e:
+                    raise LoadError(f"invalid JSON: {e}", number)
+            raise
+        kinds = set(map(type, records))
+        if (kinds == {dict}):
+            unknown = set(chain.from_iterable(records)) - known
+            if (unknown):
+                number = next(number for number, record in enumerate(records, 1) if not record.keys() <= known)
+                raise LoadError(f"unknown column '{sorted(unknown)[0]}'", number)
+            chunk_values = {col: [record.get(col) for record in records] for col in columns}
+        elif (kinds <= {dict, list}):
+            rows = []
+            for number, record in enumerate(records, 1):
+                if (isinstance(record, dict)):
+                    if (not record.keys() <= known):
+                        raise LoadError(f"unknown column '{sorted(set(record) - known)[0]}'", number)
+                    rows.append([record.get(col) for col in columns])
+                elif (len(record) != width):
+                    raise LoadError(f"row has {len(record)} value(s), expected {width}", number)
+                else:
+                    rows.append(record)
+            chunk_values = dict(zip(columns, map(list, zip(*rows))))
+        else:
+            number = next(number for number, record in enumerate(records, 1) if not isinstance(record, (dict, list)))
+            raise LoadError("line is not a JSON object or array", number)
+        # Nested objects and arrays are stored as JSON text
+        for col, values in chunk_values.items():
+            if (not _SCALAR_TYPES.issuperset(map(type, values))):
+                chunk_values[col] = [json.dumps(value) if isinstance(value, (dict, list)) else value for value in values]
+        yield len(records), chunk_values
+
+
+def load_file(sqlvm, table_name, file_path, columns=None, file_format=None, delimiter=None, header=False, skip_lines=0, chunk_rows=None):
+    """
+    Stream rows from a CSV or NDJSON file into a table (COPY / LOAD DATA).
+
+    The file is read in chunks of `chunk_rows` rows; each chunk goes through
+    SQLVM.insert_columns, which converts its values a column at a time, checks
+    the PRIMARY KEY/UNIQUE indexes and appends the rows directly to the table
+    storage. Only one chunk is held in memory. If a chunk fails, the rows
+    loaded by the earlier chunks are removed again, so a load is all or nothing.
+
+    Args:
+        sqlvm: The SQLVM instance
+        table_name: Target table in the current database
+        file_path: Path of the file to read
+        columns: Columns the file values are given for (None: the header, or all table columns)
+        file_format: "CSV" or "NDJSON" (None: guessed from the file extension)
+        delimiter: CSV field delimiter (None: tab for .tsv files, comma otherwise)
+        header: True if the first CSV line holds column names
+        skip_lines: Number of lines to skip at the start of the file
+        chunk_rows: Rows per chunk (None: CHUNK_ROWS)
+
+    Returns:
+        Summary message, or an error message
+    """
+    if (sqlvm.current_db is None):
+        return "Error: No database selected. Use USE database_name;"
+    if (table_name not in sqlvm.tables):
+        return f"Error: Table {table_name} does not exist."
+    file_format = (file_format or detect_format(file_path) or "CSV").upper()
+    if (file_format == "JSON"):
+        file_format = "NDJSON"
+    if (file_format not in FORMATS):
+        return f"Error: Unsupported file format '{file_format}'. Use CSV or NDJSON."
+    if (not os.path.isfile(file_path)):
+        return f"Error: File '{file_path}' not found."
+    table = sqlvm.tables[table_name]
+    if (delimiter is None):
+        delimiter = "\t" if file_path.lower().endswith(".tsv") else ","
+    if (len(delimiter) != 1):
+        return "Error: The field delimiter must be a single character."
+    chunk_rows = chunk_rows or CHUNK_ROWS
+
+    start = len(table["rows"])
+    loaded = 0
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as file:
+        for _ in range(skip_lines):
+            file.readline()
+        if (file_format == "CSV" and header):
+            names = next(csv.reader([file.readline()], delimiter=delimiter), [])
+            if (not columns):
+                columns = [name.strip() for name in names]
+        columns = list(columns or table["columns"])
+        for col in columns:
+            if (col not in table["columns"]):
+                return f"Error: Unknown column '{col}' in field list"
+        if (file_format == "CSV"):
+            chunks = _csv_chunks(file, columns, table.get("types", {}), delimiter, chunk_rows)
+        else:
+            chunks = _ndjson_chunks(file, columns, chunk_rows)
+        try:
+            for count, chunk_values in chunks:
+                result = sqlvm.insert_columns(table_name, chunk_values)
+                if (result.startswith("Error")):
+                    raise ValueError(f"{result.rstrip('.')} (rows {loaded + 1}-{loaded + count}).")
+                loaded += count
+        except LoadError as e:
+            sqlvm._discard_rows(table_name, start)
+            return f"Error: Row {loaded + e.row}: {e}."
+        except (ValueError, csv.Error) as e:
+            sqlvm._discard_rows(table_name, start)
+            message = str(e)
+            return message if message.startswith("Error") else f"Error: {message}"
+    return f"Loaded {loaded} row/s into {table_name} from '{file_path}'."
@@ -0,0 +1,355 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import uuid
+from array import array
+
+from .storage import ColumnStore, DictionaryVector, NumericVector, ObjectVector, MMAP_ENGINE, _TYPECODES
+
+# Mapped table file layout:
+#   MAGIC, version (uint16), padding to 8 bytes
+#   column sections, each starting on an 8 byte boundary:
+#     INT/FLOAT/BOOL: null byte per row, then the raw int64/float64/int8 array
+#     TEXT: null byte per row, then int64 byte offsets (rows + 1) into one UTF-8 blob
+#     other values: a JSON list
+#   header: JSON with the row count, column order and section offsets
+#   header length (uint64), MAGIC
+# The file is mapped read-only; every process mapping it shares the same pages
+# of the page cache, and numeric columns are read in place as arrays.
+MAGIC = b"SQLVMMAP"
+VERSION = 1
+
+# Directory mapped table files are written to when SQLVM.mmap_dir is not set
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(), "sqlvm-mmap")
+
+_TRAILER = struct.Struct("<Q8s")
+_ALIGN = 8
+
+
+class MappedFileError(ValueError):
+    """The file is not a mapped table file this version can read"""
+
+
+class MappedNumericVector(NumericVector):
+    """
+    NumericVector whose values and null bytes are memoryviews of a mapped
+    file. The first write copies them into a private array, so the vector
+    then behaves like a NumericVector held in memory.
+    """
+
+    def __init__(self, base_type, data, nulls):
+        self.base_type = base_type
+        self.typecode = _TYPECODES[base_type]
+        self.data = data
+        self.nulls = nulls
+        self.mapped = True
+
+    def _own(self):
+        if (self.mapped):
+            data = array(self.typecode)
+            data.frombytes(self.data.tobytes())
+            self.data = data
+            self.nulls = bytearray(self.nulls)
+            self.mapped = False
+
+    def append(self, value):
+        self._own()
+        super().append(value)
+
+    def extend(self, values):
+        self._own()
+        super().extend(values)
+
+    def set(self, pos, value):
+        self._own()
+        super().set(pos, value)
+
+    def keep(self, kept):
+        self._own()
+        super().keep(kept)
+
+
+class MappedTextVector(ObjectVector):
+    """
+    TEXT column read from a mapped file: a null byte per row and int64
+    offsets into a UTF-8 blob. Values are decoded when read; the first write
+    decodes the whole column into a list, after which the vector behaves
+    like an ObjectVector.
+    """
+
+    def __init__(self, base_type, nulls, offsets, blob):
+        self.base_type = base_type
+        self.nulls = nulls
+        self.offsets = offsets
+        self.blob = blob
+        self.data = None
+        self.mapped = True
+
+    def get(self, pos):
+        if (not self.mapped):
+            return self.data[pos]
+        if (self.nulls[pos]):
+            return None
+        return str(self.blob[self.offsets[pos]:self.offsets[pos + 1]], "utf-8", "surrogatepass")
+
+    def values(self, start=None, stop=None):
+        if (not self.mapped):
+            return self.data[start:stop]
+        start, stop, _ = slice(start, stop).indices(len(self.nulls))
+        stop = max(start, stop)
+        blob = self.blob
+        offsets = self.offsets[start:stop + 1].tolist()
+        values = [str(blob[begin:end], "utf-8", "surrogatepass") for begin, end in zip(offsets, offsets[1:])]
+        nulls = self.nulls[start:stop]
+        if (any(nulls)):
+            return [None if null else value for value, null in zip(values, nulls)]
+        return values
+
+    def _own(self):
+        if (self.mapped):
+            self.data = self.values()
+            self.mapped = False
+            self.nulls = self.offsets = self.blob = None
+
+    def append(self, value):
+        self._own()
+        super().append(value)
+
+    def extend(self, values):
+        self._own()
+        super().extend(values)
+
+    def set(self, pos, value):
+        self._own()
+        super().set(pos, value)
+
+    def keep(self, kept):
+        self._own()
+        super().keep(kept)
+
+
+def _pad(file, offset):
+    """Write zero bytes up to the next aligned offset and return it"""
+    padding = -offset % _ALIGN
+    file.write(bytes(padding))
+    return offset + padding
+
+
+def _text_section(vector, count):
+    """Return (null bytes, offsets array, blob) of a TEXT column, or None if it holds other values"""
+    if (isinstance(vector, MappedTextVector) and vector.mapped):
+        return vector.nulls, vector.offsets, vector.blob
+    if (isinstance(vector, DictionaryVector)):
+        encoded = [value.encode("utf-8", "surrogatepass") for value in vector.dictionary]
+        nulls = vector.nulls
+        parts = [b"" if null else encoded[code] for code, null in zip(vector.codes, nulls)]
+    else:
+        values = vector.values()
+        if (not all(value is None or type(value) is str for value in values)):
+            return None
+        nulls = bytes(value is None for value in values)
+        parts = [b"" if value is None else value.encode("utf-8", "surrogatepass") for value in values]
+    offsets = array("q", [0])
+    total = 0
+    for part in parts:
+        total += len(part)
+        offsets.append(total)
+    return nulls, offsets, b"".join(parts)
+
+
+def write_mapped_file(path, store):
+    """
+    Write the rows of a ColumnStore to a mapped table file.
+
+    The file is written next to its final path and moved over it, so
+    processes that have the previous version mapped keep reading it.
+
+    Args:
+        path: Path of the file
+        store: ColumnStore (or MappedStore) holding the rows
+
+    Returns:
+        The identifier stored in the new file
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    count = len(store)
+    columns = []
+    token = uuid.uuid4().hex
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(MAGIC + struct.pack("<H", VERSION))
+        offset = _pad(file, len(MAGIC) + 2)
+        for column, vector in store.vectors.items():
+            section = {"name": column, "type": vector.base_type, "offset": offset}
+            text = None
+            if (isinstance(vector, NumericVector)):
+                section["kind"] = "numeric"
+                file.write(vector.nulls)
+                offset = _pad(file, offset + count)
+                section["data"] = offset
+                file.write(vector.data)
+                offset += count * vector.data.itemsize
+            elif (vector.base_type in ("TEXT", "CHAR", "VARCHAR")):
+                text = _text_section(vector, count)
+            if (text is not None):
+                nulls, offsets, blob = text
+                section["kind"] = "text"
+                file.write(nulls)
+                offset = _pad(file, offset + count)
+                section["offsets"] = offset
+                file.write(offsets)
+                offset += (count + 1) * 8
+                section["blob"] = offset
+                section["blob_length"] = len(blob)
+                file.write(blob)
+                offset += len(blob)
+            elif ("kind" not in section):
+                payload = json.dumps(vector.values()).encode("utf-8")
+                section["kind"] = "json"
+                section["length"] = len(payload)
+                file.write(payload)
+                offset += len(payload)
+            offset = _pad(file, offset)
+            columns.append(section)
+        header = json.dumps({"version": VERSION, "byteorder": sys.byteorder, "rows": count,
+                             "id": token, "columns": columns}).encode("utf-8")
+        file.write(header)
+        file.write(_TRAILER.pack(len(header), MAGIC))
+    os.replace(temp_path, path)
+    return token
+
+
+class MappedStore(ColumnStore):
+    """
+    Read-mostly columnar storage used by tables created with ENGINE=MMAP.
+
+    The rows live in a memory-mapped file: numeric columns are read in place
+    as typed arrays and TEXT columns as offsets into a UTF-8 blob, so opening
+    a large reference table costs no parsing, scans read the mapped pages
+    without building row dicts, and several SQLVM processes mapping the same
+    file share one copy through the operating system page cache.
+
+    Writes are allowed but leave the mapping: the changed columns are copied
+    into memory until flush() writes a new file and maps it again.
+
+    Args:
+        path: Path of the mapped table file
+    """
+
+    engine = MMAP_ENGINE
+
+    def __init__(self, path):
+        self.path = path
+        self._map()
+
+    @classmethod
+    def create(cls, path, columns, types, rows=()):
+        """
+        Write rows to a new mapped table file and open it.
+
+        Args:
+            path: Path of the file
+            columns: Column names in table order
+            types: Dict mapping column names to SQL types
+            rows: Row dicts or a ColumnStore holding the rows
+        """
+        source = rows
+        if (not isinstance(rows, ColumnStore)):
+            source = ColumnStore(columns, types)
+            source.extend(rows)
+        write_mapped_file(path, source)
+        return cls(path)
+
+    def _map(self):
+        with open(self.path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(buffer)
+        if (len(view) < len(MAGIC) + _TRAILER.size or view[:len(MAGIC)] != MAGIC):
+            raise MappedFileError(f"'{self.path}' is not a mapped table file.")
+        version, = struct.unpack("<H", view[len(MAGIC):len(MAGIC) + 2])
+        length, magic = _TRAILER.unpack(view[-_TRAILER.size:])
+        if (version > VERSION or magic != MAGIC):
+            raise MappedFileError(f"Mapped table file '{self.path}' is truncated or too new.")
+        header = json.loads(bytes(view[-_TRAILER.size - length:-_TRAILER.size]))
+        if (header["byteorder"] != sys.byteorder):
+            raise MappedFileError(f"Mapped table file '{self.path}' was written on a machine of another byte order.")
+
+        count = header["rows"]
+        vectors = {}
+        for section in header["columns"]:
+            offset = section["offset"]
+            base_type = section["type"]
+            if (section["kind"] == "numeric"):
+                typecode = _TYPECODES[base_type]
+                data = view[section["data"]:section["data"] + count * array(typecode).itemsize].cast(typecode)
+                vectors[section["name"]] = MappedNumericVector(base_type, data, view[offset:offset + count])
+            elif (section["kind"] == "text"):
+                offsets = view[section["offsets"]:section["offsets"] + (count + 1) * 8].cast("q")
+                blob = view[section["blob"]:section["blob"] + section["blob_length"]]
+                vectors[section["name"]] = MappedTextVector(base_type, view[offset:offset + count], offsets, blob)
+            else:
+                values = json.loads(bytes(view[offset:offset + section["length"]]))
+                vectors[section["name"]] = ObjectVector(base_type, values)
+        self.vectors = vectors
+        self.length = count
+        self.token = header["id"]
+        self.changed = False
+
+    def flush(self):
+        """Write the rows to a new file and map it, if they changed since the file was mapped"""
+        if (self.changed):
+            write_mapped_file(self.path, self)
+            self._map()
+
+    def discard(self):
+        """Remove the file; the rows stay readable until the store is dropped"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def append(self, row):
+        self.changed = True
+        super().append(row)
+
+    def extend_columns(self, column_values, count):
+        self.changed = True
+        super().extend_columns(column_values, count)
+
+    def set(self, pos, column, value):
+        self.changed = True
+        super().set(pos, column, value)
+
+    def delete_positions(self, positions):
+        self.changed = True
+        super().delete_positions(positions)
+
+    def add_column(self, column, typ):
+        self.changed = True
+        super().add_column(column, typ)
+
+    def drop_column(self, column):
+        self.changed = True
+        super().drop_column(column)
+
+    def retype(self, column, typ):
+        self.changed = True
+        super().retype(column, typ)
+
+
+def open_mapped(path, token=None):
+    """
+    Open a mapped table file, or return None if it is missing, unreadable or
+    is not the version identified by `token`
+    """
+    try:
+        store = MappedStore(path)
+    except (OSError, ValueError):
+        return None
+    if (token is not None and store.token != token):
+        return None
+    return store
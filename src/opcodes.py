@@ -12,5 +12,40 @@ OPCODES = {
     "ALTER_TABLE": 11,
     "EXPORT_TO_JSON": 12,
     "EXPORT_TO_SQL": 13,
+    "SET_TRACE": 14,
+    "CREATE_INDEX": 15,
+    "DROP_INDEX": 16,
+    "INSERT_ROWS": 17,
+    "COPY_FROM": 18,
+    "SELECT_JOIN": 19,
+    "ANALYZE_TABLE": 20,
+    "EXPLAIN": 21,
     "INVALID_COMMAND": 99,
-}
\ No newline at end of file
+}
+# Instructions of the register-based virtual machine single-table SELECTs are
+# compiled into (see vdbe.py). An instruction is a tuple (opcode, p1, p2, p3, p4)
+# of integer operands p1-p3 (cursor, register, jump address or flag) and an
+# operand p4 of any type.
+VDBE_OPCODES = {
+    "Init": 0,
+    "Goto": 1,
+    "Halt": 2,
+    "OpenRead": 3,
+    "Rewind": 4,
+    "SeekIndex": 5,
+    "Next": 6,
+    "Column": 7,
+    "Constant": 8,
+    "Eq": 9,
+    "Ne": 10,
+    "Lt": 11,
+    "Le": 12,
+    "Gt": 13,
+    "Ge": 14,
+    "IsNull": 15,
+    "NotNull": 16,
+    "Function": 17,
+    "IfPos": 18,
+    "DecrJumpZero": 19,
+    "ResultRow": 20,
+}
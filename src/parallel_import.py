@@ -0,0 +1,313 @@
+import os
+import re
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .parser import SQLParser
+from .storage import _base_type
+
+# Bytes of INSERT statements (or JSON records) of one table sent to a worker at a time
+BATCH_BYTES = 4 * 1024 * 1024
+# Records of a JSON table sent to a worker at a time
+BATCH_RECORDS = 50000
+
+# Table of a DDL statement that works on that one table only; any other
+# statement (UPDATE, DELETE, CREATE TABLE ... AS SELECT, ...) may read
+# other tables and runs once all earlier rows are in
+_TABLE_RE = re.compile(r"""
+    (?:CREATE|ALTER)\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?[`"']?(\w+)(?!.*\b(?:SELECT|LIKE)\b)
+  | DROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?[`"']?(\w+)[`"']?\s*$
+  | (?:CREATE|DROP)\s+INDEX\s+[`"']?\w+[`"']?\s+ON\s+[`"']?(\w+)
+""", re.IGNORECASE | re.VERBOSE | re.DOTALL)
+_INSERT_RE = re.compile(r"""INSERT\s+INTO\s+[`"']?(\w+)""", re.IGNORECASE)
+
+# array typecodes used to send converted columns back from the workers
+_COMPACT_TYPECODES = {"INT": "q", "FLOAT": "d"}
+
+
+def _compact(values, typ):
+    """Pack a converted column into an array if it has no NULLs and fits one"""
+    typecode = _COMPACT_TYPECODES.get(_base_type(typ))
+    if (typecode is None or None in values):
+        return values
+    try:
+        return array(typecode, values)
+    except (TypeError, OverflowError):
+        return values
+
+
+def _convert_batch(columns, types, parts):
+    """
+    Convert the value lists of several statements (or records) of one table.
+
+    Args:
+        columns: Table columns
+        types: Dict of column types
+        parts: List of (label, column value dict) pairs, one per statement
+
+    Returns:
+        Tuple of ((label, row count) pairs of the converted parts, column batch, error messages)
+    """
+    from .sqlvm import _convert_column
+    counts = []
+    errors = []
+    batch = {col: [] for col in columns}
+    for label, column_values in parts:
+        try:
+            converted = {col: _convert_column(values, types.get(col, "TEXT")) for col, values in column_values.items()}
+        except ValueError as e:
+            errors.append(f"Error executing: {label}\nError: {e}")
+            continue
+        length = len(next(iter(converted.values())))
+        for col in columns:
+            values = converted.get(col)
+            batch[col].extend(values if values is not None else [None] * length)
+        counts.append((label, length))
+    return counts, {col: _compact(values, types.get(col, "TEXT")) for col, values in batch.items()}, errors
+
+
+def convert_insert_statements(columns, types, auto_increment, statements):
+    """
+    Worker job: parse INSERT statements of one table and convert their values.
+
+    Returns:
+        Tuple of ((statement, row count) pairs of the statements that parsed and converted,
+        column batch, error messages)
+    """
+    from .importer import SQLVMImporter
+    from .sqlvm import _rows_to_columns
+    parts = []
+    errors = []
+    for statement in statements:
+        standardized = SQLVMImporter._standardize_identifiers(statement)
+        label = standardized.split("\n")[0][:80]
+        instruction = SQLParser._parse(standardized)[0]
+        if (instruction[0] == "INSERT_ROW"):
+            rows = [instruction[2]]
+            specified_columns = instruction[3] if len(instruction) == 4 else None
+        elif (instruction[0] == "INSERT_ROWS"):
+            rows = instruction[2]
+            specified_columns = instruction[3]
+        else:
+            errors.append(f"Error executing: {label}\nError: Invalid command '{standardized[:80]}'")
+            continue
+        try:
+            for col in specified_columns or ():
+                if (col not in columns):
+                    raise ValueError(f"Unknown column '{col}' in field list")
+            parts.append((label, _rows_to_columns(rows, specified_columns, columns, auto_increment)))
+        except ValueError as e:
+            errors.append(f"Error executing: {label}\nError: {e}")
+    counts, batch, convert_errors = _convert_batch(columns, types, parts)
+    return counts, batch, errors + convert_errors
+
+
+def convert_records(columns, types, records, first=1):
+    """
+    Worker job: convert the records (row dicts) of a JSON table export.
+
+    Records are converted in one batch; if a value does not fit its column,
+    each record is converted on its own so only the bad ones are dropped.
+
+    Args:
+        columns: Table columns
+        types: Dict of column types
+        records: List of row dicts
+        first: Number of the first record within its table, for error messages
+
+    Returns:
+        Tuple of ((record, 1) pairs, column batch, error messages)
+    """
+    column_values = {col: [record.get(col) for record in records] for col in columns}
+    counts, batch, errors = _convert_batch(columns, types, [(f"{len(records)} records", column_values)])
+    if (not errors):
+        return [(f"record {number}", 1) for number in range(first, first + len(records))], batch, errors
+    parts = [(f"record {number}: {record}", {col: [record.get(col)] for col in columns})
+             for number, record in enumerate(records, first)]
+    return _convert_batch(columns, types, parts)
+
+
+class ParallelImporter:
+    """
+    Import SQL dumps and JSON exports with the row parsing and type
+    conversion spread over worker processes.
+
+    The main process reads the input and runs all DDL itself, in file order.
+    INSERT statements (or JSON records) are grouped per table into batches of
+    about BATCH_BYTES and handed to a ProcessPoolExecutor; workers parse and
+    convert them and send back one compact column batch per job (arrays for
+    INT/FLOAT columns). The main process appends the batches with
+    SQLVM.insert_columns in submission order, so the rows of a table keep the
+    order of the file. Before a statement other than INSERT runs, the pending
+    batches are applied first: those of its table for DDL on one table, and
+    those of every table for statements that may read others (UPDATE,
+    DELETE, subqueries).
+
+    Args:
+        vm: The SQLVM instance
+        workers: Number of worker processes (None for the number of CPUs)
+    """
+
+    def __init__(self, vm, workers=None):
+        self.vm = vm
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = None
+        self.pending = deque()  # (table name, future) in submission order
+        self.success_count = 0
+        self.error_count = 0
+        self.errors = []  # Details of the first errors only
+
+    def _error(self, message):
+        self.error_count += 1
+        if (len(self.errors) < 3):
+            self.errors.append(message)
+
+    def _submit(self, table_name, function, *args):
+        self.pending.append((table_name, self.executor.submit(function, *args)))
+        # Bound the memory held by finished batches that wait to be applied
+        while (len(self.pending) > self.workers * 2):
+            self._apply_next()
+
+    def _apply_next(self):
+        table_name, future = self.pending.popleft()
+        counts, batch, errors = future.result()
+        for error in errors:
+            self._error(error)
+        if (not counts):
+            return
+        result = self.vm.insert_columns(table_name, batch)
+        if (not result.startswith("Error")):
+            self.success_count += len(counts)
+            return
+        # A key clashed: insert the statements one by one, as a serial import would
+        start = 0
+        for label, count in counts:
+            part = {col: values[start:start + count] for col, values in batch.items()}
+            start += count
+            result = self.vm.insert_columns(table_name, part)
+            if (result.startswith("Error")):
+                self._error(f"Error executing: {label}\n{result}")
+            else:
+                self.success_count += 1
+
+    def _drain(self, table_name=None):
+        """Apply the pending batches of a table, or all of them"""
+        while (self.pending and (table_name is None or any(name == table_name for name, _ in self.pending))):
+            self._apply_next()
+
+    def _schema(self, table_name):
+        table = self.vm.tables[table_name]
+        columns = list(table["columns"])
+        types = dict(table.get("types", {}))
+        return columns, types, list(table.get("auto_increment", {}))
+
+    def _result(self, success_message, failure_message):
+        if (self.error_count):
+            message = failure_message
+            if (self.error_count <= 3):
+                message += "\n\nErrors:\n" + "\n".join(self.errors)
+            return message, self.error_count, self.success_count
+        return success_message, 0, self.success_count
+
+    def import_sql(self, db_name, file_path, progress=None, chunk_size=None, backslash_escapes=False):
+        """
+        Import an SQL dump; see SQLVMImporter.import_from_sql for the arguments.
+
+        Returns:
+            Tuple of (message, error_count, success_count)
+        """
+        from .importer import SQLStatementReader, SQLVMImporter
+        vm = self.vm
+        total_bytes = os.path.getsize(file_path)
+        batches = {}  # table name -> [statements, size]
+        statements = 0
+        reported = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as self.executor, open(file_path, "rb") as sql_file:
+            reader = SQLStatementReader(sql_file, chunk_size, backslash_escapes)
+            for cmd in reader:
+                statements += 1
+                if (SQLVMImporter._skip_statement(cmd, db_name)):
+                    continue
+                insert = _INSERT_RE.match(cmd)
+                if (insert and insert.group(1) in vm.tables):
+                    table_name = insert.group(1)
+                    batch = batches.setdefault(table_name, [[], 0])
+                    batch[0].append(cmd)
+                    batch[1] += len(cmd)
+                    if (batch[1] >= BATCH_BYTES):
+                        self._submit(table_name, convert_insert_statements, *self._schema(table_name), batch[0])
+                        del batches[table_name]
+                else:
+                    # Other statements run here once the earlier rows of their table are in,
+                    # or the earlier rows of every table if they may read more than one
+                    match = _TABLE_RE.match(cmd)
+                    table_name = next((name for name in match.groups() if name), None) if match else None
+                    for name in ([table_name] if table_name else list(batches)):
+                        if (name in batches):
+                            self._submit(name, convert_insert_statements, *self._schema(name), batches.pop(name)[0])
+                    self._drain(table_name)
+                    self._execute(SQLVMImporter._standardize_identifiers(cmd))
+                if (progress and reader.bytes_read != reported):
+                    reported = reader.bytes_read
+                    progress(reported, total_bytes, statements)
+            for name, batch in list(batches.items()):
+                self._submit(name, convert_insert_statements, *self._schema(name), batch[0])
+            self._drain()
+        self.executor = None
+        if (progress):
+            progress(reader.bytes_read, total_bytes, statements)
+        return self._result(f"Successfully imported {self.success_count} SQL commands into {db_name}.",
+                            f"Imported with {self.error_count} errors. {self.success_count} commands succeeded.")
+
+    def _execute(self, cmd):
+        from .importer import SQLVMImporter
+        try:
+            results = self.vm._run_bytecode(SQLParser.parse_to_bytecode(cmd))
+        except Exception as e:
+            self._error(f"Exception executing: {cmd[:50]}{'...' if len(cmd) > 50 else ''}\n{str(e)}")
+            return
+        failed = [r for r in results if isinstance(r, str) and r.startswith("Error")]
+        if (failed):
+            self._error(SQLVMImporter._get_detailed_error(cmd, failed[0]))
+        else:
+            self.success_count += 1
+
+    def import_tables(self, tables_data):
+        """
+        Import a JSON export's dict of tables ({name: {columns, types, rows, ...}}).
+
+        Returns:
+            Tuple of (message, error_count, success_count), success_count counting records
+        """
+        from .importer import SQLVMImporter
+        vm = self.vm
+        success_tables = 0
+        created = []
+        with ProcessPoolExecutor(max_workers=self.workers) as self.executor:
+            for table_name, table_info in tables_data.items():
+                if ("columns" not in table_info):
+                    self._error(f"Table {table_name} is missing columns definition")
+                    continue
+                result = vm.execute_command(SQLVMImporter._create_table_command(table_name, table_info))
+                if ("Error" in result and "already exists" not in result):
+                    self._error(f"Error creating table {table_name}: {result}")
+                    continue
+                success_tables += 1
+                created.append((table_name, table_info))
+                table_columns, table_types, _ = self._schema(table_name)
+                rows = table_info.get("rows", [])
+                for start in range(0, len(rows), BATCH_RECORDS):
+                    self._submit(table_name, convert_records, table_columns, table_types, rows[start:start + BATCH_RECORDS], start + 1)
+            self._drain()
+        self.executor = None
+
+        # Continue the auto-increment counters and build the secondary indexes once the rows are in
+        for table_name, table_info in created:
+            SQLVMImporter._restore_auto_increment(vm, table_name, table_info)
+            for index_name, index_columns in table_info.get("secondary_indexes", {}).items():
+                result = vm.execute_command(f"CREATE INDEX {index_name} ON {table_name} ({', '.join(index_columns)})")
+                if ("Error" in result):
+                    self._error(f"Error creating index {index_name} on {table_name}: {result}")
+        return self._result(f"Successfully imported {success_tables} tables with {self.success_count} records.",
+                            f"Imported {success_tables} tables with {self.success_count} records. {self.error_count} errors occurred.")
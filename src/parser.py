@@ -1,35 +1,246 @@
 import re
+from functools import lru_cache
 from .opcodes import OPCODES
 import os
 
+# Number of distinct statements whose bytecode is kept by the parse cache
+PARSE_CACHE_SIZE = 1024
+# Longer statements (e.g. extended INSERTs of a dump) are parsed without caching
+PARSE_CACHE_MAX_LENGTH = 4096
+
+# Pieces of INSERT value lists: a value is a quoted string or bare text up to the next comma/parenthesis
+_VALUES_OPEN_RE = re.compile(r"\s*\(")
+_VALUE_RE = re.compile(r"""\s*(?:'(?P<squote>(?:[^']|'')*)'|"(?P<dquote>(?:[^"]|"")*)"|(?P<bare>[^,()'"]*))""", re.S)
+_VALUES_SEPARATOR_RE = re.compile(r"\s*([,)])")
+_VALUES_NEXT_RE = re.compile(r"\s*(,|;?\s*$)")
+
+# File path of COPY/LOAD DATA, quoted with single or double quotes
+_FILE_PATH = r"""(?:'((?:[^']|'')*)'|"([^"]*)")"""
+# One COPY option: a name followed by an optional (quoted) value
+_COPY_OPTION_RE = re.compile(r"""(\w+)(?:\s+('(?:[^']|'')*'|"[^"]*"|(?!(?:HEADER|FORMAT|DELIMITER)\b)\w+))?\s*,?\s*""", re.I)
+_LOAD_DATA_RE = re.compile(r"""
+    (?:FORMAT\s+(?P<format>\w+)\s*)?
+    (?:(?:FIELDS|COLUMNS)\s+TERMINATED\s+BY\s+(?P<delimiter>'(?:[^']|'')*'|"[^"]*")\s*)?
+    (?:IGNORE\s+(?P<ignore>\d+)\s+(?:LINES|ROWS)\s*)?
+    (?:\((?P<columns>[^)]*)\)\s*)?$
+""", re.I | re.X)
+
+# Quoted strings and identifiers, parentheses and the clause keywords that end a
+# SELECT statement; keywords only count outside quotes and parentheses
+_SELECT_TAIL_RE = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|(?P<paren>[()])|\b(?P<keyword>GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT|OFFSET)\b""", re.I)
+_LIMIT_RE = re.compile(r"(\w+)(?:\s*,\s*(\w+))?\s*$")
+_OFFSET_RE = re.compile(r"(\w+)\s*$")
+_ORDER_ITEM_RE = re.compile(r"`?(\w+(?:\.\w+|\s*\(\s*(?:\*|`?\w+`?)\s*\))?)`?(?:\s+(ASC|DESC))?(?:\s+NULLS\s+(FIRST|LAST))?\s*$", re.I)
+_GROUP_ITEM_RE = re.compile(r"`?(\w+(?:\.\w+)?)`?")
+# Clauses after WHERE in the order they must appear; LIMIT and OFFSET may come in either order
+_CLAUSE_RANKS = {"GROUP BY": 0, "HAVING": 1, "ORDER BY": 2, "LIMIT": 3, "OFFSET": 3}
+
+# Quoted strings, parentheses and the JOIN/WHERE keywords of a FROM clause;
+# keywords only count outside quotes and parentheses
+_FROM_CLAUSE_RE = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|(?P<paren>[()])|\b(?P<keyword>(?:(?:INNER|CROSS|(?:LEFT|RIGHT)(?:\s+OUTER)?)\s+)?JOIN|WHERE)\b""", re.I)
+_JOIN_SOURCE_RE = re.compile(r"`?(\w+)`?(?:\s+(?:AS\s+)?(?!ON\b)`?(\w+)`?)?(?:\s+ON\s+(.+))?", re.I | re.S)
+
+
+def _limit_value(text):
+    """LIMIT/OFFSET counts are integers; anything else (e.g. a parameter marker) is checked at execution"""
+    return int(text) if text.isdigit() else text
+
+
+def _order_items(text):
+    """
+    Parse the column list of an ORDER BY clause.
+
+    Returns:
+        Tuple of (column, descending, nulls_first) triples, nulls_first being
+        None when NULLS FIRST/LAST is not given; or None if the list is malformed
+    """
+    items = []
+    for item in text.split(","):
+        match = _ORDER_ITEM_RE.fullmatch(item.strip())
+        if (not match):
+            return None
+        nulls = match.group(3)
+        items.append((match.group(1), (match.group(2) or "").upper() == "DESC",
+                      None if nulls is None else nulls.upper() == "FIRST"))
+    return tuple(items)
+
+
+def _group_items(text):
+    """Parse the column list of a GROUP BY clause; None if it is malformed"""
+    items = []
+    for item in text.split(","):
+        match = _GROUP_ITEM_RE.fullmatch(item.strip())
+        if (not match):
+            return None
+        items.append(match.group(1))
+    return tuple(items)
+
+
+def _split_select_tail(command):
+    """
+    Split the trailing GROUP BY, HAVING, ORDER BY, LIMIT and OFFSET clauses
+    off a SELECT statement.
+
+    LIMIT count [OFFSET skip], LIMIT skip, count and OFFSET skip are accepted.
+
+    Returns:
+        Tuple of (statement without the clauses, tuple of (option, value) pairs),
+        or None if a clause is malformed
+    """
+    depth = 0
+    clauses = []
+    for match in _SELECT_TAIL_RE.finditer(command):
+        if (match.group("paren")):
+            depth += 1 if match.group("paren") == "(" else -1
+        elif (match.group("keyword") and depth == 0):
+            clauses.append((" ".join(match.group("keyword").upper().split()), match.start(), match.end()))
+    if (not clauses):
+        return command, ()
+    options = {}
+    rank = 0
+    for number, (keyword, _, end) in enumerate(clauses):
+        stop = clauses[number + 1][1] if number + 1 < len(clauses) else len(command)
+        text = command[end:stop].strip().rstrip(";").strip()
+        if (_CLAUSE_RANKS[keyword] < rank):
+            return None
+        rank = _CLAUSE_RANKS[keyword]
+        option = keyword.lower().replace(" ", "_")
+        if (option in options):
+            return None
+        if (keyword in ("GROUP BY", "ORDER BY")):
+            items = (_group_items if keyword == "GROUP BY" else _order_items)(text)
+            if (items is None):
+                return None
+            options[option] = items
+            continue
+        if (keyword == "HAVING"):
+            if (not text):
+                return None
+            options["having"] = text
+            continue
+        match = (_LIMIT_RE if keyword == "LIMIT" else _OFFSET_RE).fullmatch(text)
+        if (not match):
+            return None
+        if (keyword == "LIMIT"):
+            if (match.group(2)):
+                options["offset"] = _limit_value(match.group(1))
+                options["limit"] = _limit_value(match.group(2))
+            else:
+                options["limit"] = _limit_value(match.group(1))
+        else:
+            options["offset"] = _limit_value(match.group(1))
+    return command[:clauses[0][1]].rstrip(), tuple(options.items())
+
+
+def _parse_join(command):
+    """
+    Parse a SELECT statement whose FROM clause joins several tables.
+
+    Sources are given as (table, alias, kind, ON clause) with kind INNER,
+    LEFT, RIGHT or CROSS; the first source has no kind and no ON clause.
+
+    Returns:
+        The SELECT_JOIN instruction, None if the statement has no JOIN, or an
+        INVALID_COMMAND instruction if the FROM clause is malformed
+    """
+    match = re.match(r"SELECT\s+(.+?)\s+FROM\s+(.+)", command, re.I | re.S)
+    if (not match):
+        return None
+    from_clause = match.group(2)
+    depth = 0
+    keywords = []
+    for found in _FROM_CLAUSE_RE.finditer(from_clause):
+        if (found.group("paren")):
+            depth += 1 if found.group("paren") == "(" else -1
+        elif (found.group("keyword") and depth == 0):
+            keywords.append((found.group("keyword").upper().split()[0], found.start(), found.end()))
+            if (keywords[-1][0] == "WHERE"):
+                break
+    if (not keywords or keywords[0][0] == "WHERE"):
+        return None
+    sources = []
+    first = _JOIN_SOURCE_RE.fullmatch(from_clause[:keywords[0][1]].strip())
+    if (not first or first.group(3)):
+        return ("INVALID_COMMAND", command)
+    sources.append((first.group(1), first.group(2) or first.group(1), None, None))
+    where = None
+    for number, (keyword, _, end) in enumerate(keywords):
+        stop = keywords[number + 1][1] if number + 1 < len(keywords) else len(from_clause)
+        text = from_clause[end:stop].strip().rstrip(";").strip()
+        if (keyword == "WHERE"):
+            where = text
+            break
+        kind = "INNER" if keyword == "JOIN" else keyword
+        source = _JOIN_SOURCE_RE.fullmatch(text)
+        if (not source or (source.group(3) is None) != (kind == "CROSS")):
+            return ("INVALID_COMMAND", command)
+        sources.append((source.group(1), source.group(2) or source.group(1), kind, source.group(3)))
+    if (where == ""):
+        return ("INVALID_COMMAND", command)
+    return ("SELECT_JOIN", tuple(sources), match.group(1), where)
+
+
 class SQLParser:
     @staticmethod
     def parse_to_bytecode(command):
+        """
+        Parse a statement into bytecode. Statements are cached by their text
+        (without surrounding whitespace) in an LRU cache, so repeated statements
+        skip the regex matching. The bytecode is shared between callers and must
+        not be modified; its lists are turned into tuples for that reason.
+        Statements longer than PARSE_CACHE_MAX_LENGTH are not cached.
+        """
+        command = command.strip()
+        if len(command) > PARSE_CACHE_MAX_LENGTH:
+            return SQLParser._freeze(SQLParser._parse(command))
+        return SQLParser._parse_cached(command)
+
+    @staticmethod
+    @lru_cache(maxsize=PARSE_CACHE_SIZE)
+    def _parse_cached(command):
+        return SQLParser._freeze(SQLParser._parse(command))
+
+    @staticmethod
+    def _freeze(bytecode):
+        return [tuple(tuple(part) if isinstance(part, list) else part for part in instruction)
+                for instruction in bytecode]
+
+    @staticmethod
+    def cache_info():
+        """Return the hit/miss statistics of the parse cache"""
+        return SQLParser._parse_cached.cache_info()
+
+    @staticmethod
+    def clear_cache():
+        SQLParser._parse_cached.cache_clear()
+
+    @staticmethod
+    def _parse(command):
         # Preserve the original command for values but normalize keywords
         original_command = command.strip()
         command = original_command.upper()
 
         if command.startswith("SELECT"):
-            # Match SELECT queries with nested subqueries in the IN condition
-            match_nested_subquery = re.match(r"SELECT (.+) FROM (\w+) WHERE (.+) IN \((SELECT .+ IN \(.+\))\)", original_command, re.I)
-            if match_nested_subquery:
-                columns = match_nested_subquery.group(1)
-                table_name = match_nested_subquery.group(2)
-                condition_column = match_nested_subquery.group(3)
-                nested_subquery = match_nested_subquery.group(4)
-                return [("SELECT_ROWS", table_name, columns, f"{condition_column} IN ({nested_subquery})")]
-
-            # Match SELECT queries with single-level subqueries in the IN condition
-            match_where_in = re.match(r"SELECT (.+) FROM (\w+) WHERE (.+) IN \((SELECT .+)\)", original_command, re.I)
-            if match_where_in:
-                columns = match_where_in.group(1)
-                table_name = match_where_in.group(2)
-                condition_column = match_where_in.group(3)
-                subquery = match_where_in.group(4)
-                return [("SELECT_ROWS", table_name, columns, f"{condition_column} IN ({subquery})")]
-            
-            # Match SELECT queries with a WHERE clause
-            match_where = re.match(r"SELECT (.+) FROM (\w+) WHERE (.+)", original_command, re.I)
+            # GROUP BY, HAVING, ORDER BY, LIMIT and OFFSET are passed on as options of the instruction
+            split = _split_select_tail(original_command)
+            if split is None:
+                return [("INVALID_COMMAND", original_command)]
+            original_command, options = split
+            if options:
+                instructions = SQLParser._parse(original_command)
+                if instructions and instructions[0][0] in ("SELECT_ROWS", "SELECT_JOIN"):
+                    instruction = instructions[0] + (None,) * (4 - len(instructions[0]))
+                    return [instruction + (options,)]
+                return instructions
+
+            # Match SELECT queries joining several tables
+            join = _parse_join(original_command)
+            if join:
+                return [join]
+
+            # Match SELECT queries with a WHERE clause; IN (SELECT ...) subqueries are
+            # left in the clause and planned by the expression compiler
+            match_where = re.match(r"SELECT (.+?) FROM (\w+) WHERE (.+)", original_command, re.I)
             if match_where:
                 columns = match_where.group(1)
                 table_name = match_where.group(2)
@@ -85,11 +296,45 @@ class SQLParser:
                 db_name = match.group(1)
                 if_exists = "IF EXISTS" in command
                 return [("DROP_DATABASE", db_name, if_exists)]
+        elif command.startswith("DROP TABLE"):
+            match = re.match(r"DROP TABLE(?: IF EXISTS)? (\w+)", original_command, re.I)
+            if match:
+                table_name = match.group(1)
+                if_exists = "IF EXISTS" in command
+                return [("DROP_TABLE", table_name, if_exists)]
+        elif command.startswith("CREATE INDEX"):
+            match = re.match(r"CREATE INDEX (\w+) ON (\w+)\s*\(([^)]+)\)", original_command, re.I)
+            if match:
+                index_name = match.group(1)
+                table_name = match.group(2)
+                columns = [col.strip() for col in match.group(3).split(",")]
+                return [("CREATE_INDEX", index_name, table_name, columns)]
+        elif command.startswith("DROP INDEX"):
+            match = re.match(r"DROP INDEX (\w+)(?: ON (\w+))?", original_command, re.I)
+            if match:
+                index_name = match.group(1)
+                table_name = match.group(2)
+                return [("DROP_INDEX", index_name, table_name)]
+        elif command.startswith("ANALYZE"):
+            match = re.match(r"ANALYZE(?: TABLE)? (\w+(?:\s*,\s*\w+)*)\s*;?$", original_command, re.I)
+            if match:
+                return [("ANALYZE_TABLE", [name.strip() for name in match.group(1).split(",")])]
+        elif command.startswith("EXPLAIN"):
+            # EXPLAIN [ANALYZE] wraps the instruction of the statement it shows the plan of
+            match = re.match(r"EXPLAIN(\s+ANALYZE)?\s+(.+)$", original_command, re.I | re.S)
+            if match:
+                bytecode = SQLParser._parse(match.group(2))
+                if (len(bytecode) == 1 and bytecode[0][0] != "INVALID_COMMAND"):
+                    return [("EXPLAIN", match.group(1) is not None, SQLParser._freeze(bytecode)[0])]
         elif command.startswith("USE"):
             match = re.match(r"USE (\w+)", original_command, re.I)
             if match:
                 db_name = match.group(1)
                 return [("USE_DATABASE", db_name)]
+        elif command.startswith("SET TRACE"):
+            match = re.match(r"SET TRACE\s*=?\s*['\"]?(\w+)['\"]?", original_command, re.I)
+            if match:
+                return [("SET_TRACE", match.group(1))]
         elif command.startswith("SHOW DATABASES"):
             return [("SHOW_DATABASES",)]
         elif command.startswith("CREATE TABLE"):
@@ -97,22 +342,31 @@ class SQLParser:
             if match:
                 table_name = match.group(1)
                 columns_def = match.group(2)
+                # Optional storage engine after the column list: ENGINE=COLUMNAR
+                match_engine = re.search(r"\)\s*ENGINE\s*=\s*(\w+)\s*;?\s*$", original_command, re.I)
+                if match_engine:
+                    return [("CREATE_TABLE", table_name, columns_def, match_engine.group(1))]
                 return [("CREATE_TABLE", table_name, columns_def)]
         elif command.startswith("INSERT INTO"):
-            # Match INSERT INTO table VALUES (...)
-            match = re.match(r"INSERT INTO (\w+) VALUES \((.+)\)", original_command, re.I)
+            # Match INSERT INTO table [(columns)] VALUES (...)[, (...)]
+            match = re.match(r"INSERT INTO (\w+)\s*(?:\(([^)]*)\))?\s*VALUES\s*(\(.*)", original_command, re.I | re.S)
             if match:
                 table_name = match.group(1)
-                values = [v.strip().strip('"').strip("'") for v in match.group(2).split(",")]
-                return [("INSERT_ROW", table_name, values)]
-            # Match INSERT INTO table (columns) VALUES (...)
-            match = re.match(r"INSERT INTO (\w+) \((.+)\) VALUES \((.+)\)", original_command, re.I)
-            if match:
-                table_name = match.group(1)
-                columns = [col.strip() for col in match.group(2).split(",")]
-                values = [v.strip().strip('"').strip("'") for v in match.group(3).split(",")]
-                return [("INSERT_ROW", table_name, values, columns)]
+                columns = [col.strip() for col in match.group(2).split(",")] if match.group(2) else None
+                rows = SQLParser.parse_values_lists(match.group(3))
+                if rows:
+                    if len(rows) > 1:
+                        # Multi-row INSERT goes through the bulk insert path
+                        return [("INSERT_ROWS", table_name, rows, columns)]
+                    if columns:
+                        return [("INSERT_ROW", table_name, rows[0], columns)]
+                    return [("INSERT_ROW", table_name, rows[0])]
         elif command.startswith("ALTER TABLE"):
+            match_engine = re.match(r"ALTER TABLE (\w+) ENGINE\s*=\s*(\w+)", original_command, re.I)
+            if match_engine:
+                table_name = match_engine.group(1)
+                engine = match_engine.group(2)
+                return [("ALTER_TABLE", table_name, "ENGINE", engine)]
             match_add = re.match(r"ALTER TABLE (\w+) ADD (.+)", original_command, re.I)
             if match_add:
                 table_name = match_add.group(1)
@@ -128,6 +382,24 @@ class SQLParser:
                 table_name = match_modify.group(1)
                 column_def = match_modify.group(2)
                 return [("ALTER_TABLE", table_name, "MODIFY", column_def)]
+        elif command.startswith("COPY"):
+            match = re.match(r"COPY (\w+)\s*(?:\(([^)]*)\))?\s*FROM\s+" + _FILE_PATH + r"\s*(.*)", original_command, re.I | re.S)
+            if match:
+                table_name = match.group(1)
+                columns = [col.strip() for col in match.group(2).split(",")] if match.group(2) else None
+                file_path = SQLParser._file_path(match.group(3), match.group(4))
+                options = SQLParser.parse_copy_options(match.group(5))
+                if options is not None:
+                    return [("COPY_FROM", table_name, file_path, columns, options)]
+        elif command.startswith("LOAD DATA"):
+            match = re.match(r"LOAD DATA(?: LOCAL)? INFILE\s+" + _FILE_PATH + r"\s+INTO TABLE (\w+)\s*(.*)", original_command, re.I | re.S)
+            if match:
+                file_path = SQLParser._file_path(match.group(1), match.group(2))
+                table_name = match.group(3)
+                parsed = SQLParser.parse_load_data_options(match.group(4))
+                if parsed is not None:
+                    columns, options = parsed
+                    return [("COPY_FROM", table_name, file_path, columns, options)]
         elif command.startswith("DELETE"):
             match = re.match(r"DELETE FROM (\w+) WHERE (.+)", original_command, re.I)
             if match:
@@ -141,4 +413,119 @@ class SQLParser:
                 set_values = match.group(2)
                 condition = match.group(3)
                 return [("UPDATE_ROWS", table_name, set_values, condition)]
-        return [("INVALID_COMMAND", original_command)]
\ No newline at end of file
+        return [("INVALID_COMMAND", original_command)]
+
+    @staticmethod
+    def _file_path(single_quoted, double_quoted):
+        if single_quoted is not None:
+            return single_quoted.replace("''", "'")
+        return double_quoted
+
+    @staticmethod
+    def _option_value(value):
+        """Unquote an option value; '\\t' stands for a tab"""
+        if value[:1] in ("'", '"'):
+            value = value[1:-1].replace(value[0] * 2, value[0])
+        return value.replace("\\t", "\t")
+
+    @staticmethod
+    def parse_copy_options(text):
+        """
+        Parse the options of COPY ... FROM 'file': [WITH] [(] FORMAT CSV|NDJSON,
+        HEADER [TRUE|FALSE], DELIMITER 'c' [)]
+
+        Returns:
+            Tuple of (option, value) pairs for SQLVM.copy_from, or None if an option is unknown
+        """
+        text = re.sub(r"^WITH\b", "", text.strip().rstrip(";").strip(), flags=re.I).strip()
+        if text.startswith("(") and text.endswith(")"):
+            text = text[1:-1]
+        options = []
+        for match in _COPY_OPTION_RE.finditer(text):
+            name, value = match.group(1).upper(), match.group(2)
+            if name == "FORMAT" and value:
+                options.append(("file_format", SQLParser._option_value(value).upper()))
+            elif name == "HEADER" and value and value.upper() == "CSV":
+                options.extend([("header", True), ("file_format", "CSV")])
+            elif name == "HEADER":
+                options.append(("header", value is None or value.upper() in ("TRUE", "ON", "1")))
+            elif name == "DELIMITER" and value:
+                options.append(("delimiter", SQLParser._option_value(value)))
+            elif name == "CSV":
+                options.append(("file_format", "CSV"))
+            else:
+                return None
+        return tuple(options)
+
+    @staticmethod
+    def parse_load_data_options(text):
+        """
+        Parse the clauses after LOAD DATA INFILE 'file' INTO TABLE t:
+        [FORMAT CSV|NDJSON] [FIELDS TERMINATED BY 'c'] [IGNORE n LINES|ROWS] [(columns)]
+
+        Returns:
+            Tuple of (column list or None, (option, value) pairs), or None if the clauses are not understood
+        """
+        match = _LOAD_DATA_RE.match(text.strip().rstrip(";").strip())
+        if not match:
+            return None
+        options = []
+        if match.group("format"):
+            options.append(("file_format", match.group("format").upper()))
+        if match.group("delimiter"):
+            options.append(("delimiter", SQLParser._option_value(match.group("delimiter"))))
+        if match.group("ignore"):
+            options.append(("skip_lines", int(match.group("ignore"))))
+        columns = [col.strip() for col in match.group("columns").split(",")] if match.group("columns") else None
+        return columns, tuple(options)
+
+    @staticmethod
+    def parse_values_lists(text):
+        """
+        Parse the value lists of an INSERT statement: (1, 'a'), (2, 'b');
+
+        Quoted values may contain commas and parentheses; a doubled quote
+        stands for the quote character and backslashes are kept as written
+        (standard SQL strings). Unquoted values are kept as text
+        for the column type conversion, except NULL, which becomes None.
+
+        Returns:
+            List of value lists, or None if the text is not well formed
+        """
+        rows = []
+        pos = 0
+        length = len(text)
+        while True:
+            match = _VALUES_OPEN_RE.match(text, pos)
+            if not match:
+                return None
+            pos = match.end()
+            row = []
+            while True:
+                match = _VALUE_RE.match(text, pos)
+                if not match:
+                    return None
+                pos = match.end()
+                if match.group("squote") is not None or match.group("dquote") is not None:
+                    quote = "'" if match.group("squote") is not None else '"'
+                    value = match.group("squote") if quote == "'" else match.group("dquote")
+                    value = value.replace(quote * 2, quote)
+                else:
+                    value = match.group("bare").strip()
+                    if value.upper() == "NULL":
+                        value = None
+                row.append(value)
+                match = _VALUES_SEPARATOR_RE.match(text, pos)
+                if not match:
+                    return None
+                pos = match.end()
+                if match.group(1) == ")":
+                    break
+            rows.append(tuple(row))
+            # Another value list, or the end of the statement
+            match = _VALUES_NEXT_RE.match(text, pos)
+            if not match:
+                return None
+            pos = match.end()
+            if match.group(1) != ",":
+                return rows if pos == length else None
@@ -0,0 +1,603 @@
+import heapq
+import pickle
+import sys
+import tempfile
+from itertools import islice
+from operator import itemgetter
+
+from .storage import ColumnStore
+
+# Positions a Project operator reads from a columnar table at a time
+PROJECT_CHUNK_ROWS = 4096
+
+# Estimated memory a Sort may hold before spilling sorted runs to temporary files
+SORT_MEMORY_BYTES = 64 * 1024 * 1024
+# Rows written to or read from a spill file at a time
+SORT_RUN_BLOCK_ROWS = 4096
+
+
+class Operator:
+    """
+    Base of the pull-based operators a SELECT statement is executed as.
+
+    Operators form a tree; iterating one pulls rows from its child only as
+    they are needed, so an operator that stops early (Limit) also stops the
+    scan below it. close() releases the child iterators of an operator that
+    was not iterated to the end.
+
+    For EXPLAIN the planner sets estimated_rows and detail (what the
+    operator works on, e.g. its sort keys); EXPLAIN ANALYZE sets stats, an
+    explain.OperatorStats measuring the rows the operator produces.
+    Operators buffering rows report their estimated size in memory_bytes.
+
+    Args:
+        child: Operator rows are pulled from (None for a leaf)
+    """
+
+    estimated_rows = None
+    detail = None
+    stats = None
+    memory_bytes = None
+
+    def __init__(self, child=None):
+        self.child = child
+
+    def __iter__(self):
+        if (self.stats is None):
+            return self.rows()
+        return self.stats.measure(self.rows())
+
+    def rows(self):
+        raise NotImplementedError
+
+    def close(self):
+        if (self.child is not None):
+            self.child.close()
+
+    def children(self):
+        """Operators this one reads from, for EXPLAIN"""
+        return [] if self.child is None else [self.child]
+
+    def describe(self):
+        """One-line description for EXPLAIN"""
+        return type(self).__name__ + (f" ({self.detail})" if self.detail else "")
+
+    def estimate(self):
+        """Estimated number of rows produced (None if unknown)"""
+        if (self.estimated_rows is not None or self.child is None):
+            return self.estimated_rows
+        return self.child.estimate()
+
+
+class Scan(Operator):
+    """
+    Leaf operator producing the positions of the rows of a table that match
+    the WHERE clause, from the lazy iterator of SQLVM._scan_iter.
+
+    Args:
+        table_name: Table being scanned
+        positions: Iterator of matching row positions
+        access: Access path description (e.g. "full scan")
+    """
+
+    def __init__(self, table_name, positions, access):
+        super().__init__()
+        self.table_name = table_name
+        self.positions = positions
+        self.access = access
+
+    def rows(self):
+        return iter(self.positions)
+
+    def close(self):
+        close = getattr(self.positions, "close", None)
+        if (close is not None):
+            close()
+
+    def describe(self):
+        parts = [part for part in (self.access, self.detail) if part]
+        return f"Scan {self.table_name}" + (f" ({'; '.join(parts)})" if parts else "")
+
+
+class Limit(Operator):
+    """
+    Skip the first `offset` rows of the child and stop after `limit` rows,
+    closing the child as soon as it has produced them.
+
+    Args:
+        child: Operator to read from
+        limit: Maximum number of rows (None for no maximum)
+        offset: Number of rows to skip first
+    """
+
+    def __init__(self, child, limit=None, offset=0):
+        super().__init__(child)
+        self.limit = limit
+        self.offset = offset
+
+    def rows(self):
+        stop = None if self.limit is None else self.offset + self.limit
+        try:
+            if (stop is None or stop > self.offset):
+                yield from islice(self.child, self.offset, stop)
+        finally:
+            self.child.close()
+
+    def describe(self):
+        parts = ([] if self.limit is None else [f"limit {self.limit}"]) + ([f"offset {self.offset}"] if self.offset else [])
+        return f"Limit ({', '.join(parts)})"
+
+    def estimate(self):
+        rows = self.child.estimate()
+        if (rows is None):
+            return self.limit
+        rows = max(0, rows - self.offset)
+        return rows if self.limit is None else min(rows, self.limit)
+
+
+class Filter(Operator):
+    """
+    Pass on the rows of the child a predicate accepts.
+
+    Args:
+        child: Operator to read from
+        predicate: Function row -> bool
+    """
+
+    def __init__(self, child, predicate):
+        super().__init__(child)
+        self.predicate = predicate
+
+    def rows(self):
+        predicate = self.predicate
+        for row in self.child:
+            if (predicate(row)):
+                yield row
+
+
+class Map(Operator):
+    """
+    Turn every row of the child into function(row). EXPLAIN shows the
+    detail of a Map as its line, and leaves out Maps without one.
+
+    Args:
+        child: Operator to read from
+        function: Function row -> output row
+    """
+
+    def __init__(self, child, function):
+        super().__init__(child)
+        self.function = function
+
+    def describe(self):
+        return self.detail
+
+    def rows(self):
+        return map(self.function, self.child)
+
+
+class Materialize(Operator):
+    """
+    Read all rows of the child once and keep them, for an input whose size
+    decides how the next operator runs (e.g. the algorithm of the next join).
+
+    Args:
+        child: Operator to read from
+    """
+
+    def __init__(self, child):
+        super().__init__(child)
+        self.buffer = None
+
+    def materialize(self):
+        """Read the child if not done yet and return its rows"""
+        if (self.buffer is None):
+            self.buffer = list(self.child)
+            if (self.stats is not None and self.buffer):
+                self.memory_bytes = len(self.buffer) * _estimate_row_bytes(self.buffer[:1024])
+        return self.buffer
+
+    def rows(self):
+        return iter(self.materialize())
+
+
+class _Descending:
+    """Sort key part ordering its value in reverse"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _type_rank(value):
+    """Numbers sort before strings and strings before other values, so mixed columns always compare"""
+    if (isinstance(value, (int, float))):
+        return 0
+    if (isinstance(value, str)):
+        return 1
+    return 2
+
+
+def sort_key(order):
+    """
+    Build the sort key function for rows whose leading values are the ORDER BY
+    columns and whose last value is the row position. NULLs sort first in
+    ascending and last in descending order unless the order item says
+    otherwise; rows with equal values are ordered by position.
+
+    Args:
+        order: List of (descending, nulls_first) pairs, one per leading value
+    """
+    parts = []
+    for descending, nulls_first in order:
+        if (nulls_first is None):
+            nulls_first = not descending
+        # Descending parts are compared reversed, so their NULL marker is flipped too
+        null = (0,) if nulls_first != descending else (2,)
+        parts.append((descending, null))
+
+    def key(row):
+        values = []
+        for value, (descending, null) in zip(row, parts):
+            if (value is None):
+                part = null
+            else:
+                rank = _type_rank(value)
+                part = (1, rank, value if rank < 2 else str(value))
+            values.append(_Descending(part) if descending else part)
+        values.append(row[-1])
+        return tuple(values)
+    return key
+
+
+def _sort_passes(order):
+    """
+    (key, reverse) passes of list.sort comparing the ORDER BY values
+    directly: one pass when every column is sorted the same way, else one
+    stable pass per column from the last to the first. They raise TypeError
+    on NULLs and mixed types, after which sort_key is used, so NULLS
+    FIRST/LAST only matter to sort_key.
+    """
+    directions = [descending for descending, _ in order]
+    if (len(set(directions)) == 1):
+        key = itemgetter(*range(len(order))) if len(order) > 1 else itemgetter(0)
+        return [(key, directions[0])]
+    return [(itemgetter(i), directions[i]) for i in reversed(range(len(order)))]
+
+
+def _directed_key(order):
+    """
+    Key comparing the ORDER BY values directly, each in its own direction,
+    for columns sorted different ways. Like _sort_passes it raises TypeError
+    on NULLs and mixed types.
+    """
+    directions = [descending for descending, _ in order]
+
+    def key(row):
+        return tuple(_Descending(value) if descending else value for value, descending in zip(row, directions))
+    return key
+
+
+class SpillFile:
+    """
+    Rows spilled to a temporary file in pickled blocks, read back block by
+    block; a sorted run of Sort or a partition of HashAggregate
+    """
+
+    def __init__(self, rows=()):
+        self.file = tempfile.TemporaryFile()
+        self.write(rows)
+
+    def write(self, rows):
+        rows = list(rows)
+        for start in range(0, len(rows), SORT_RUN_BLOCK_ROWS):
+            pickle.dump(rows[start:start + SORT_RUN_BLOCK_ROWS], self.file, pickle.HIGHEST_PROTOCOL)
+
+    def __iter__(self):
+        self.file.seek(0)
+        try:
+            while True:
+                try:
+                    block = pickle.load(self.file)
+                except EOFError:
+                    return
+                yield from block
+        finally:
+            self.file.close()
+
+
+class Sort(Operator):
+    """
+    Order the rows of the child by their leading ORDER BY values and yield
+    their positions, which the child gives as the last value of each row.
+
+    With a limit only the first `limit` rows are kept, in a bounded heap.
+    Otherwise rows are sorted in memory until their estimated size passes
+    memory_limit; past it, the buffer is sorted and spilled to a temporary
+    file as a run, and the runs are merged at the end (external merge sort).
+    The sort is stable: rows with equal keys keep the order of the child.
+
+    Args:
+        child: Operator producing (order values..., position) tuples
+        order: List of (descending, nulls_first) pairs, one per order value
+        limit: Optional number of leading rows needed
+        memory_limit: Estimated bytes held before spilling (None for SORT_MEMORY_BYTES)
+    """
+
+    def __init__(self, child, order, limit=None, memory_limit=None):
+        super().__init__(child)
+        self.order = order
+        self.limit = limit
+        self.memory_limit = SORT_MEMORY_BYTES if memory_limit is None else memory_limit
+        self.runs = 0
+        self.buffered = 0
+        self.passes = _sort_passes(order)
+
+    def _key(self):
+        """Return (key function, reverse) ordering rows in a single comparison"""
+        if (self.passes is not None and len(self.passes) == 1):
+            return self.passes[0]
+        return sort_key(self.order), False
+
+    def _sorted(self, rows):
+        if (self.passes is not None):
+            try:
+                for key, reverse in self.passes:
+                    rows.sort(key=key, reverse=reverse)
+                return rows
+            except TypeError:
+                # NULLs or values of different types: compare through the general key,
+                # whose position tie-break restores the order a failed sort left behind
+                self.passes = None
+        rows.sort(key=sort_key(self.order))
+        return rows
+
+    def _top(self, rows):
+        """
+        First `limit` rows, streamed through a heap of the best rows seen so
+        far, so at most `limit` rows are held. The heap's first entry is the
+        worst row held, which a better row replaces; rows are numbered so
+        that equal keys keep the order of the child. Columns sorted
+        different ways are compared through _directed_key; NULLs and mixed
+        types use the general key, which the held rows are moved to when a
+        comparison fails.
+        """
+        if (self.passes is not None and len(self.passes) > 1):
+            key, reverse = _directed_key(self.order), False
+        else:
+            key, reverse = self._key()
+        first_descending = self.order[0][0]
+        heap = []
+        for number, row in enumerate(rows):
+            evicted = None
+            try:
+                if (len(heap) == self.limit):
+                    # A row whose first value is past that of the worst row held cannot make it
+                    if (self.passes is not None):
+                        bound = heap[0][2][0]
+                        if (row[0] < bound if first_descending else bound < row[0]):
+                            continue
+                    evicted = heap[0]
+                self._keep(heap, key, reverse, number, row)
+            except TypeError:
+                if (self.passes is None):
+                    raise
+                # A failed heap operation may have left the new row in or dropped the evicted one
+                held = [entry[1:] for entry in heap]
+                if (evicted is not None):
+                    held.append(evicted[1:])
+                heap = self._rekey(held + [(number, row)])
+                key, reverse = self._key()
+            self.buffered = max(self.buffered, len(heap))
+        self._measure([row for _, _, row in heap])
+        try:
+            heap.sort(reverse=True)
+        except TypeError:
+            if (self.passes is None):
+                raise
+            heap = self._rekey([entry[1:] for entry in heap])
+            heap.sort(reverse=True)
+        return [row for _, _, row in heap]
+
+    def _rekey(self, held):
+        """Heap of _top rebuilt over the general key from (number, row) pairs, after a comparison failed"""
+        self.passes = None
+        key, reverse = self._key()
+        heap = []
+        for number, row in sorted(dict(held).items()):
+            self._keep(heap, key, reverse, number, row)
+        return heap
+
+    def _keep(self, heap, key, reverse, number, row):
+        """Add a row to the heap of _top if it is among the first `limit` rows seen"""
+        value = key(row)
+        entry = ((value, -number) if reverse else _Descending((value, number)), number, row)
+        if (len(heap) < self.limit):
+            heapq.heappush(heap, entry)
+        elif (heap[0][0] < entry[0]):
+            heapq.heapreplace(heap, entry)
+
+    def describe(self):
+        parts = [self.detail] if self.detail else []
+        if (self.limit is not None):
+            parts.append(f"top {self.limit}")
+        if (self.runs):
+            parts.append(f"external merge of {self.runs} runs")
+        return "Sort" + (f" ({', '.join(parts)})" if parts else "")
+
+    def estimate(self):
+        rows = self.child.estimate()
+        if (self.limit is None or rows is None):
+            return rows
+        return min(rows, self.limit)
+
+    def _measure(self, buffer):
+        """Record the size of the rows held in memory, under EXPLAIN ANALYZE"""
+        if (self.stats is not None and buffer):
+            self.memory_bytes = max(self.memory_bytes or 0, len(buffer) * _estimate_row_bytes(buffer[:1024]))
+
+    def rows(self):
+        if (self.limit == 0):
+            self.child.close()
+            return
+        if (self.limit is not None):
+            for row in self._top(self.child):
+                yield row[-1]
+            return
+
+        runs = []
+        buffer = []
+        row_bytes = None
+        per_block = 1024
+        for row in self.child:
+            buffer.append(row)
+            if (len(buffer) % per_block == 0):
+                if (row_bytes is None):
+                    row_bytes = _estimate_row_bytes(buffer[:per_block])
+                if (len(buffer) * row_bytes > self.memory_limit):
+                    self._measure(buffer)
+                    runs.append(SpillFile(self._sorted(buffer)))
+                    buffer = []
+        self._measure(buffer)
+        if (not runs):
+            for row in self._sorted(buffer):
+                yield row[-1]
+            return
+        runs.append(SpillFile(self._sorted(buffer)))
+        self.runs = len(runs)
+        # Runs sorted before a NULL turned up are also in the order of the general key
+        key, reverse = self._key()
+        for row in heapq.merge(*runs, key=key, reverse=reverse):
+            yield row[-1]
+
+
+def _estimate_row_bytes(rows):
+    """Average memory taken by a row tuple and its values"""
+    total = sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row)) for row in rows)
+    return max(1, total // len(rows))
+
+
+def null_positions(store, column):
+    """Positions of the rows holding NULL in a column, which an ordered index leaves out"""
+    if (isinstance(store, ColumnStore)):
+        return [pos for pos, value in enumerate(store.column(column)) if value is None]
+    return [pos for pos, row in enumerate(store) if row.get(column) is None]
+
+
+class IndexOrderScan(Operator):
+    """
+    Leaf operator producing row positions in the order of an ordered index,
+    so ORDER BY needs no sort and a LIMIT stops it after the first rows.
+
+    Rows with a NULL key are not in the index; they are found by reading the
+    column, before or after the indexed rows as NULLS FIRST/LAST asks, and
+    only when the index covers fewer rows than the table. Rows with equal
+    keys are ordered by the remaining ORDER BY columns with tie_key.
+
+    Args:
+        index: OrderedIndex on the first ORDER BY column
+        store: The rows of the table
+        column: The indexed column
+        descending: Walk the index from the largest key
+        nulls_first: Produce the NULL rows first
+        predicate: Optional WHERE predicate row -> bool
+        tie_key: Optional function position -> sort key for rows with equal keys
+    """
+
+    def __init__(self, index, store, column, descending, nulls_first, predicate=None, tie_key=None):
+        super().__init__()
+        self.index = index
+        self.store = store
+        self.column = column
+        self.descending = descending
+        self.nulls_first = nulls_first
+        self.predicate = predicate
+        self.tie_key = tie_key
+
+    def describe(self):
+        order = " DESC" if self.descending else ""
+        return f"Index order scan {self.index.name} ({self.column}{order})" + (f" ({self.detail})" if self.detail else "")
+
+    def _null_groups(self):
+        if (self.index.size != len(self.store)):
+            yield null_positions(self.store, self.column)
+
+    def _groups(self):
+        if (self.nulls_first):
+            yield from self._null_groups()
+        yield from self.index.ordered_groups(self.descending)
+        if (not self.nulls_first):
+            yield from self._null_groups()
+
+    def rows(self):
+        store = self.store
+        predicate = self.predicate
+        for group in self._groups():
+            if (predicate is not None):
+                group = [pos for pos in group if predicate(store[pos])]
+            if (self.tie_key is not None and len(group) > 1):
+                group = sorted(group, key=self.tie_key)
+            yield from group
+
+
+class Project(Operator):
+    """
+    Turn row positions into tuples of the selected columns.
+
+    Row tables read each row dict. Columnar tables read a chunk of positions
+    at a time: positions close together are read as one slice of each column
+    vector, scattered ones value by value, so no column is decoded further
+    than the rows pulled so far.
+
+    Args:
+        child: Operator producing row positions
+        store: The rows of the table (list of dicts or ColumnStore)
+        columns: Column names to project
+        keep_position: Append the row position to each tuple (input of Sort)
+        ordered: Whether the child produces ascending positions (False after a Sort)
+    """
+
+    def __init__(self, child, store, columns, keep_position=False, ordered=True):
+        super().__init__(child)
+        self.store = store
+        self.columns = columns
+        self.keep_position = keep_position
+        self.ordered = ordered
+
+    def describe(self):
+        return f"Project ({', '.join(self.columns)})" if self.columns else "Project"
+
+    def rows(self):
+        positions = iter(self.child)
+        while True:
+            chunk = list(islice(positions, PROJECT_CHUNK_ROWS))
+            if (not chunk):
+                return
+            values = self._chunk_values(chunk)
+            if (self.keep_position):
+                yield from (row + (pos,) for row, pos in zip(values, chunk))
+            else:
+                yield from values
+
+    def _chunk_values(self, chunk):
+        """Return an iterable of the value tuples of a chunk of positions"""
+        store = self.store
+        columns = self.columns
+        if (not columns):
+            return [()] * len(chunk)
+        if (isinstance(store, ColumnStore)):
+            first, last = min(chunk), max(chunk)
+            if (last - first + 1 <= len(chunk) * 16):
+                vectors = [store.column(col, first, last + 1) for col in columns]
+                if (self.ordered and last - first + 1 == len(chunk)):
+                    return zip(*vectors)
+                return [tuple(vector[pos - first] for vector in vectors) for pos in chunk]
+        rows = [store[pos] for pos in chunk]
+        return [tuple(row.get(col) for col in columns) for row in rows]
@@ -0,0 +1,190 @@
+from .expression import conjuncts
+from .stats import Estimator, range_fraction, DEFAULT_RANGE_SELECTIVITY
+
+# Relative costs the planner compares once a table has statistics: evaluating
+# the WHERE clause on a row of a scan is SCAN_ROW_COST (VECTORIZED_ROW_COST in
+# NumPy batches), and reading a row an index points to, then evaluating the
+# clause on it, INDEX_ROW_COST
+SCAN_ROW_COST = 1.0
+VECTORIZED_ROW_COST = 0.5
+INDEX_ROW_COST = 2.0
+
+# Bound operators of a column compared with a literal, after normalizing
+# literal-op-column to column-op-literal
+_LOWER = {">": False, ">=": True}
+_UPPER = {"<": False, "<=": True}
+_SWAPPED = {"=": "=", "!=": "!=", "<": ">", ">": "<", "<=": ">=", ">=": "<="}
+
+
+class IndexPlan:
+    """
+    Index access chosen for a WHERE clause.
+
+    Args:
+        access: Description shown in plan traces (e.g. "index range scan (idx_price)")
+        positions: Sorted candidate row positions; the full predicate still has
+            to be evaluated on them
+    """
+
+    def __init__(self, access, positions):
+        self.access = access
+        self.positions = positions
+
+
+def plan_index_access(compiler, node, unique_indexes, ordered_indexes, statistics=None, row_count=0, scan_cost=None):
+    """
+    Pick an index for a WHERE AST, if one applies.
+
+    Only top-level AND terms are considered: equality or IN on a column with a
+    single-column PRIMARY KEY/UNIQUE hash index, and equality, IN or range
+    conditions (<, <=, >, >=, BETWEEN) on the leading column of an ordered
+    index. Several range terms on the same column are combined into one scan.
+
+    Without statistics, point lookups are preferred over IN lists, and those
+    over range scans. With the statistics of ANALYZE the index expected to
+    return the fewest rows is used, and none if reading its rows is expected
+    to cost more than scan_cost. Only the chosen index is read.
+
+    Args:
+        compiler: PredicateCompiler of the table, used to resolve and coerce literals
+        node: WHERE clause AST
+        unique_indexes: Dict of the table's HashIndex objects
+        ordered_indexes: Dict of the table's OrderedIndex objects
+        statistics: Optional table["statistics"] dict
+        row_count: Number of rows of the table, for the estimates
+        scan_cost: Estimated cost of scanning the table instead (None for no limit)
+
+    Returns:
+        IndexPlan, or None if the clause needs a full scan
+    """
+    hashed = {index.columns[0]: index for index in unique_indexes.values() if len(index.columns) == 1}
+    ordered = {}
+    for index in ordered_indexes.values():
+        # Prefer single-column indexes over composite ones with the same leading column
+        if (index.valid and (index.columns[0] not in ordered or len(index.columns) == 1)):
+            ordered[index.columns[0]] = index
+
+    estimator = Estimator(statistics, compiler) if statistics is not None else None
+    # (rank, estimated rows, function reading the index) per usable index
+    candidates = []
+
+    def add(rank, term, read):
+        estimate = estimator.rows(term, row_count) if estimator is not None else 0
+        candidates.append((rank, estimate, read))
+
+    bounds = {}
+    for term in conjuncts(node):
+        kind = term[0]
+        if (kind == "cmp"):
+            op, column, value = _column_comparison(compiler, term)
+            if (column is None or value is None):
+                continue
+            if ((column in hashed or column in ordered) and op == "="):
+                add(0, term, lambda column=column, value=value: _point_lookup(hashed, ordered, column, [value]))
+            elif (op in _LOWER or op in _UPPER):
+                bounds.setdefault(column, []).append((op, value))
+        elif (kind == "between" and not term[4]):
+            expr = compiler._resolve(term[1])
+            low = compiler._resolve(term[2])
+            high = compiler._resolve(term[3])
+            if (expr[0] == "col" and low[0] == "lit" and high[0] == "lit"):
+                low_value = compiler._coerce(expr, low[1])
+                high_value = compiler._coerce(expr, high[1])
+                if (low_value is not None and high_value is not None):
+                    bounds.setdefault(expr[1], []).extend([(">=", low_value), ("<=", high_value)])
+        elif (kind == "in" and not term[3]):
+            expr = compiler._resolve(term[1])
+            values = [compiler._resolve(value) for value in term[2]]
+            if (expr[0] == "col" and all(value[0] == "lit" for value in values) and (expr[1] in hashed or expr[1] in ordered)):
+                literals = [compiler._coerce(expr, value[1]) for value in values]
+                literals = [value for value in literals if value is not None]
+                add(0 if len(literals) == 1 else 1, term, lambda column=expr[1], literals=literals: _point_lookup(hashed, ordered, column, literals))
+
+    for column, column_bounds in bounds.items():
+        index = ordered.get(column)
+        if (index is None):
+            continue
+        estimate = 0
+        if (estimator is not None):
+            fraction = None
+            if (column in estimator.columns):
+                try:
+                    fraction = range_fraction(estimator.columns[column], *_tightest_bounds(column_bounds))
+                except TypeError:
+                    pass
+            estimate = row_count * (DEFAULT_RANGE_SELECTIVITY if fraction is None else fraction)
+        candidates.append((2, estimate, lambda index=index, column_bounds=column_bounds: _range_scan(index, column_bounds)))
+
+    if (estimator is None):
+        candidates.sort(key=lambda candidate: candidate[0])
+    else:
+        candidates.sort(key=lambda candidate: (candidate[1], candidate[0]))
+    for rank, estimate, read in candidates:
+        if (scan_cost is not None and estimator is not None and estimate * INDEX_ROW_COST >= scan_cost):
+            return None
+        candidate = read()
+        if (candidate is not None):
+            return candidate[1]
+    return None
+
+
+def _column_comparison(compiler, term):
+    """Return (op, column key, coerced literal) for a column-op-literal term"""
+    op, left, right = term[1], compiler._resolve(term[2]), compiler._resolve(term[3])
+    if (left[0] == "lit" and right[0] == "col"):
+        left, right, op = right, left, _SWAPPED[op]
+    if (left[0] != "col" or right[0] != "lit"):
+        return None, None, None
+    return op, left[1], compiler._coerce(left, right[1])
+
+
+def _point_lookup(hashed, ordered, column, values):
+    """Candidate (rank, plan) for equality/IN on an indexed column"""
+    rank = 0 if len(values) == 1 else 1
+    try:
+        if (column in hashed):
+            index = hashed[column]
+            positions = {index.lookup(value) for value in values}
+            positions.discard(None)
+        elif (column in ordered):
+            index = ordered[column]
+            positions = set()
+            for value in values:
+                if (len(index.columns) == 1):
+                    positions.update(index.lookup(value))
+                else:
+                    positions.update(index.range(value, value))
+        else:
+            return None
+    except TypeError:
+        # Unhashable or incomparable literal: leave it to the full scan
+        return None
+    access = f"index lookup ({index.name})" if rank == 0 else f"index IN lookup ({index.name})"
+    return rank, IndexPlan(access, sorted(positions))
+
+
+def _tightest_bounds(column_bounds):
+    """
+    (low, high, include_low, include_high) of a list of (op, value) range
+    conditions on one column; raises TypeError if the values do not compare
+    """
+    low = high = None
+    include_low = include_high = True
+    for op, value in column_bounds:
+        if (op in _LOWER):
+            # Keep the tightest lower bound; an exclusive bound wins a tie
+            if (low is None or value > low or (value == low and not _LOWER[op])):
+                low, include_low = value, _LOWER[op]
+        else:
+            if (high is None or value < high or (value == high and not _UPPER[op])):
+                high, include_high = value, _UPPER[op]
+    return low, high, include_low, include_high
+
+
+def _range_scan(index, column_bounds):
+    """Candidate (rank, plan) for range conditions on the leading column of an ordered index"""
+    try:
+        positions = index.range(*_tightest_bounds(column_bounds))
+    except TypeError:
+        return None
+    return 2, IndexPlan(f"index range scan ({index.name})", sorted(positions))
@@ -0,0 +1,197 @@
+import re
+
+# Quoted strings and identifiers are skipped; ? and :name outside them are placeholders
+_PLACEHOLDER_RE = re.compile(r"""
+    '(?:[^']|'')*'
+  | "(?:[^"]|"")*"
+  | `[^`]*`
+  | (?P<positional>\?)
+  | (?<![:\w]):(?P<named>[A-Za-z_]\w*)
+""", re.VERBOSE)
+
+# Instructions whose WHERE clause is parsed when the statement is prepared,
+# mapped to the position of the clause in the instruction
+_WHERE_POSITIONS = {"SELECT_ROWS": 3, "SELECT_JOIN": 3, "UPDATE_ROWS": 3, "DELETE_ROWS": 2}
+
+
+def _marker(number):
+    """Identifier standing in for a placeholder while the statement is parsed"""
+    return f"__sqlvm_param_{number}__"
+
+
+class PreparedStatement:
+    """
+    A statement parsed once and executed many times with bound parameters.
+
+    Placeholders are written as ? (bound by position) or :name (bound by name,
+    a name may appear several times). While the statement is prepared, each
+    placeholder is replaced by a marker identifier and the statement goes
+    through the parser as usual; WHERE clauses are parsed into ASTs and SET
+    clauses into dicts of column values. Executing only walks the bytecode and
+    swaps the markers for the parameter values, so values are never formatted
+    into SQL text and need no quoting or escaping.
+
+    Args:
+        sql: Statement text with placeholders
+        bytecode: Bytecode of the statement with markers in place of the placeholders
+        names: Placeholder names in marker order (None for positional placeholders)
+    """
+
+    def __init__(self, sql, bytecode, names):
+        self.sql = sql
+        self.bytecode = bytecode
+        self.names = names
+        self.markers = [_marker(number) for number in range(len(names))]
+        self.binders = [self._binder(instruction) for instruction in bytecode]
+
+    @staticmethod
+    def substitute_placeholders(sql):
+        """
+        Replace the placeholders of a statement by marker identifiers.
+
+        Returns:
+            Tuple of (statement text, placeholder names in marker order)
+        """
+        names = []
+        named = {}
+
+        def replace(match):
+            if (match.group("positional")):
+                names.append(None)
+                return _marker(len(names) - 1)
+            name = match.group("named")
+            if (name is None):
+                return match.group(0)
+            if (name not in named):
+                named[name] = len(names)
+                names.append(name)
+            return _marker(named[name])
+
+        return _PLACEHOLDER_RE.sub(replace, sql), names
+
+    @property
+    def param_count(self):
+        return len(self.names)
+
+    def bind(self, params=None):
+        """
+        Return the bytecode with the parameter values in place of the placeholders.
+
+        Args:
+            params: Sequence of values for ? placeholders, or dict for :name placeholders
+
+        Returns:
+            Bytecode ready for SQLVMInterpreter.execute_bytecode
+        Raises:
+            ValueError: If the parameters do not match the placeholders
+        """
+        values = self._values(params)
+        return [instruction if binder is None else binder(values)
+                for instruction, binder in zip(self.bytecode, self.binders)]
+
+    def _values(self, params):
+        if (params is None):
+            params = ()
+        if (any(name is not None for name in self.names)):
+            if (not isinstance(params, dict)):
+                raise ValueError("Error: Named parameters must be given as a dict.")
+            values = {}
+            for marker, name in zip(self.markers, self.names):
+                if (name not in params):
+                    raise ValueError(f"Error: Missing value for parameter ':{name}'.")
+                values[marker] = params[name]
+            return values
+        if (isinstance(params, dict)):
+            raise ValueError("Error: Positional parameters must be given as a sequence.")
+        if (len(params) != len(self.names)):
+            raise ValueError(f"Error: Statement expects {len(self.names)} parameter(s), got {len(params)}.")
+        return dict(zip(self.markers, params))
+
+    def _binder(self, part):
+        """
+        Build a function values -> part with the markers of part replaced by their
+        values, or None if part holds no marker. Only the containers on the way
+        to a marker are copied when binding.
+        """
+        if (isinstance(part, str)):
+            if (part in self.markers):
+                return lambda values: values[part]
+            return None
+        if (isinstance(part, tuple) and len(part) == 2 and part[0] == "col" and part[1] in self.markers):
+            # A marker in a WHERE clause is parsed as a column reference
+            marker = part[1]
+            return lambda values: ("lit", values[marker])
+        if (isinstance(part, dict)):
+            binders = [(key, self._binder(item)) for key, item in part.items()]
+            binders = [(key, binder) for key, binder in binders if binder is not None]
+            if (not binders):
+                return None
+
+            def bind_dict(values):
+                bound = dict(part)
+                for key, binder in binders:
+                    bound[key] = binder(values)
+                return bound
+            return bind_dict
+        if (isinstance(part, (tuple, list))):
+            binders = [(i, self._binder(item)) for i, item in enumerate(part)]
+            binders = [(i, binder) for i, binder in binders if binder is not None]
+            if (not binders):
+                return None
+            container = type(part)
+
+            def bind_sequence(values):
+                bound = list(part)
+                for i, binder in binders:
+                    bound[i] = binder(values)
+                return container(bound)
+            return bind_sequence
+        return None
+
+    def unbound_markers(self):
+        """Return True if a marker ended up inside text that is parsed later (e.g. a subquery)"""
+        def search(part):
+            if (isinstance(part, str)):
+                return part not in self.markers and any(marker in part for marker in self.markers)
+            if (isinstance(part, dict)):
+                return any(search(item) for item in part.values())
+            if (isinstance(part, (tuple, list))):
+                return any(search(item) for item in part)
+            return False
+        return any(search(instruction) for instruction in self.bytecode)
+
+    @classmethod
+    def prepare(cls, sql, parse, parse_where, parse_set):
+        """
+        Prepare a statement.
+
+        Args:
+            sql: Statement text with placeholders
+            parse: Function text -> bytecode
+            parse_where: Function text -> WHERE AST
+            parse_set: Function text -> tuple of (column, value text) pairs
+
+        Returns:
+            PreparedStatement
+        Raises:
+            ValueError: If the statement cannot be prepared
+        """
+        text, names = cls.substitute_placeholders(sql)
+        bytecode = []
+        for instruction in parse(text):
+            if (instruction[0] == "INVALID_COMMAND"):
+                raise ValueError(f"Error: Invalid command '{sql}'")
+            instruction = list(instruction)
+            position = _WHERE_POSITIONS.get(instruction[0])
+            if (position is not None and len(instruction) > position and isinstance(instruction[position], str)):
+                instruction[position] = parse_where(instruction[position])
+            if (instruction[0] == "UPDATE_ROWS"):
+                instruction[2] = dict(parse_set(instruction[2]))
+            bytecode.append(tuple(instruction))
+        statement = cls(sql, bytecode, names)
+        if (statement.unbound_markers()):
+            raise ValueError("Error: Parameters are not supported inside subqueries.")
+        return statement
+
+    def __repr__(self):
+        return f"PreparedStatement({self.sql!r}, params={self.param_count})"
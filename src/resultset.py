@@ -0,0 +1,90 @@
+class ResultSet:
+    """
+    Result of a SELECT statement.
+
+    Holds the column names, their SQL types and the rows as tuples of typed
+    values in column order. The engine and its consumers (subqueries, GUI tabs)
+    work with the rows directly; the ASCII table shown in the console is only
+    built when the result set is formatted with str() or format_table().
+    """
+
+    def __init__(self, columns, types=None, rows=None):
+        self.columns = list(columns)
+        self.types = list(types) if types is not None else ["TEXT"] * len(self.columns)
+        self.rows = rows if rows is not None else []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __bool__(self):
+        # An empty result set is still a successful result
+        return True
+
+    def column_index(self, column):
+        """Return the position of a column given by name or index"""
+        if (isinstance(column, int)):
+            return column
+        try:
+            return self.columns.index(column)
+        except ValueError:
+            raise ValueError(f"Error: Unknown column '{column}' in result set")
+
+    def column_values(self, column=0):
+        """
+        Return the values of one column.
+
+        Args:
+            column: Column name or position (defaults to the first column)
+
+        Returns:
+            List of typed values
+        """
+        position = self.column_index(column)
+        return [row[position] for row in self.rows]
+
+    def as_dicts(self):
+        """Return the rows as dicts keyed by column name"""
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+    @staticmethod
+    def format_value(value):
+        """Format a single value the way the console displays it"""
+        if (value is None):
+            return "NULL"
+        return str(value)
+
+    def format_table(self):
+        """
+        Format the result set as an ASCII table with column boundaries.
+
+        Returns:
+            The formatted table as a string
+        """
+        # Calculate the maximum width for each column
+        formatted = [[self.format_value(value) for value in row] for row in self.rows]
+        widths = [len(col) for col in self.columns]
+        for row in formatted:
+            for i, value in enumerate(row):
+                widths[i] = max(widths[i], len(value))
+
+        header = "| " + " | ".join(col.ljust(widths[i]) for i, col in enumerate(self.columns)) + " |"
+        separator = "+" + "+".join("-" * (width + 2) for width in widths) + "+"
+        formatted_rows = ["| " + " | ".join(value.ljust(widths[i]) for i, value in enumerate(row)) + " |"
+                          for row in formatted]
+
+        # Combine everything with clear boundaries
+        result = separator + "\n" + header + "\n" + separator + "\n"
+        if formatted_rows:
+            result += "\n".join(formatted_rows) + "\n" + separator
+        else:
+            result += separator  # Bottom line for empty result set
+        return result
+
+    def __str__(self):
+        return self.format_table()
+
+    def __repr__(self):
+        return f"ResultSet(columns={self.columns}, rows={len(self.rows)})"
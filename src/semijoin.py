@@ -0,0 +1,156 @@
+import re
+
+from .expression import _negate
+
+# Marker for subquery values that cannot be converted to the outer column type
+_NO_MATCH = object()
+
+_NUMERIC_TYPES = ("INT", "FLOAT")
+
+
+def _base_type(typ):
+    match = re.match(r'(\w+)', typ or "")
+    return match.group(1).upper() if match else None
+
+
+def _always_true(row):
+    return True
+
+
+def _always_false(row):
+    return False
+
+
+class SemiJoin:
+    """
+    Materialized inner side of an IN (SELECT ...) subquery.
+
+    The subquery is run once and kept as rows of (value, correlation values...).
+    When the outer predicate is compiled the rows are turned into a hash set
+    typed like the outer columns, so IN becomes a hash semi-join and NOT IN a
+    hash anti-join with one set lookup per outer row.
+
+    A correlated subquery whose correlation is a conjunction of equalities
+    (inner_col = outer_col) is decorrelated: the inner rows are materialized
+    without the correlation, and the correlation values become part of the
+    hash key.
+
+    Args:
+        table_name: Table the subquery reads
+        types: SQL types of the value column followed by the correlation columns
+        correlation: Outer column references, in the order of the correlation values
+        rows: List of (value, correlation values...) tuples
+    """
+
+    def __init__(self, table_name, types, correlation, rows):
+        self.table_name = table_name
+        self.types = list(types)
+        self.correlation = list(correlation)
+        self.rows = rows
+
+    def compile(self, compiler, expr, negated):
+        """
+        Build the per-row predicate for `expr [NOT] IN (subquery)`.
+
+        Args:
+            compiler: PredicateCompiler of the outer query
+            expr: Resolved outer expression node
+            negated: True for NOT IN
+
+        Returns:
+            Function row -> True, False or None (unknown, e.g. for a NULL value)
+        """
+        outer_nodes = [expr] + [compiler._resolve(("col", ref)) for ref in self.correlation]
+        coercers = [self._coercer(compiler, node, typ) for node, typ in zip(outer_nodes, self.types)]
+        getter = compiler.compile_value(expr)
+
+        if (not self.correlation):
+            return self._compile_uncorrelated(getter, coercers[0], negated)
+        group_getters = [compiler.compile_value(node) for node in outer_nodes[1:]]
+        return self._compile_correlated(getter, group_getters, coercers, negated)
+
+    def _compile_uncorrelated(self, getter, coerce, negated):
+        keys = set()
+        has_null = False
+        for row in self.rows:
+            value = coerce(row[0])
+            if (value is None):
+                has_null = True
+            elif (value is not _NO_MATCH):
+                keys.add(value)
+        keys = frozenset(keys)
+
+        # x IN (empty) is false for every row, also for a NULL x
+        if (not self.rows):
+            return _always_true if negated else _always_false
+        # A NULL in the subquery makes a value that is not found unknown
+        missing = None if has_null else False
+
+        def semi_join(row):
+            value = getter(row)
+            if (value is None):
+                return None
+            return True if value in keys else missing
+        return _negate(semi_join) if negated else semi_join
+
+    def _compile_correlated(self, getter, group_getters, coercers, negated):
+        keys = set()
+        groups = set()
+        null_groups = set()
+        for row in self.rows:
+            group = tuple(coerce(value) for coerce, value in zip(coercers[1:], row[1:]))
+            # inner_col = outer_col never holds for NULL or unconvertible values
+            if (None in group or _NO_MATCH in group):
+                continue
+            groups.add(group)
+            value = coercers[0](row[0])
+            if (value is None):
+                null_groups.add(group)
+            elif (value is not _NO_MATCH):
+                keys.add((value,) + group)
+        keys = frozenset(keys)
+
+        if (len(group_getters) == 1):
+            group_getter = group_getters[0]
+
+            def group_of(row):
+                return (group_getter(row),)
+        else:
+            def group_of(row):
+                return tuple(g(row) for g in group_getters)
+
+        def semi_join(row):
+            group = group_of(row)
+            # No inner rows for this outer row: IN (empty) is false
+            if (group not in groups):
+                return False
+            value = getter(row)
+            if (value is None):
+                return None
+            if ((value,) + group in keys):
+                return True
+            return None if group in null_groups else False
+        return _negate(semi_join) if negated else semi_join
+
+    @staticmethod
+    def _coercer(compiler, node, inner_type):
+        """
+        Return a function converting subquery values to the type of an outer
+        expression, so keys hash equal to the values read from outer rows.
+        """
+        outer_type = compiler.types.get(node[1]) if node[0] == "col" else None
+        outer_base = _base_type(outer_type)
+        if (outer_base is None or outer_base == _base_type(inner_type)):
+            return lambda value: value
+
+        def coerce(value):
+            if (value is None):
+                return None
+            # 1 and 1.0 already hash equal; converting would truncate 1.5 to 1
+            if (outer_base in _NUMERIC_TYPES and isinstance(value, (int, float)) and not isinstance(value, bool)):
+                return value
+            try:
+                return compiler.convert(value, outer_type)
+            except Exception:
+                return _NO_MATCH
+        return coerce
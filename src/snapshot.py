@@ -0,0 +1,580 @@
+import json
+import os
+import pickle
+import struct
+import sys
+import zlib
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from itertools import accumulate
+
+from .storage import ColumnStore, COLUMNAR_ENGINE, MMAP_ENGINE, DictionaryVector, NumericVector, table_engine, _base_type
+from .mapped import MappedStore, open_mapped
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+# Snapshot file layout:
+#   MAGIC, version (uint16)
+#   column payloads: one per column and chunk of CHUNK_ROWS rows, each compressed on its own
+#   table directory: JSON with the schema, row count and payload offsets of every table
+#   directory length (uint64), MAGIC
+# The directory is written last so tables can be streamed out; readers find it
+# from the end of the file and then read only the payloads of the tables they load.
+MAGIC = b"SQLVMSNP"
+VERSION = 1
+CHUNK_ROWS = 65536
+
+COMPRESSIONS = ("zstd", "zlib", "none")
+DEFAULT_COMPRESSION = "zstd" if zstandard is not None else "zlib"
+
+# Table dictionary keys rebuilt on load instead of stored
+_DERIVED_KEYS = ("rows", "unique_indexes", "ordered_indexes")
+
+# Estimated bytes per row of each index, for the memory budget of paged-in tables
+_INDEX_ENTRY_BYTES = 100
+
+_TRAILER = struct.Struct("<Q8s")
+_NUMERIC_TYPES = {"INT": (int, "q"), "FLOAT": (float, "d"), "BOOL": (bool, "b")}
+
+
+class SnapshotError(ValueError):
+    """The file is not a snapshot this version can read"""
+
+
+def is_snapshot(path):
+    """Return True if the file starts like a binary snapshot"""
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def _compress(data, compression):
+    if (compression == "zstd"):
+        return zstandard.ZstdCompressor().compress(data)
+    if (compression == "zlib"):
+        return zlib.compress(data, 1)
+    return data
+
+
+def _decompress(data, compression):
+    if (compression == "zstd"):
+        if (zstandard is None):
+            raise SnapshotError("The snapshot is zstd-compressed but the zstandard module is not installed.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if (compression == "zlib"):
+        return zlib.decompress(data)
+    return data
+
+
+def _encode_column(values, typ):
+    """
+    Encode a chunk of column values.
+
+    INT/FLOAT/BOOL columns are stored as a null byte per row followed by the
+    raw array, TEXT columns as null bytes, character lengths and one UTF-8
+    blob. Columns holding values of other types fall back to JSON.
+
+    Returns:
+        Tuple of (encoding name, payload bytes)
+    """
+    base_type = _base_type(typ)
+    present = [value for value in values if value is not None]
+    nulls = bytes(value is None for value in values) if len(present) != len(values) else bytes(len(values))
+    if (base_type in _NUMERIC_TYPES):
+        kind, typecode = _NUMERIC_TYPES[base_type]
+        if (all(type(value) is kind for value in present)):
+            data = array(typecode, [0 if value is None else value for value in values] if nulls.count(1) else values)
+            return base_type.lower(), nulls + data.tobytes()
+    elif (all(type(value) is str for value in present)):
+        lengths = array("I", map(len, present))
+        return "text", nulls + lengths.tobytes() + "".join(present).encode("utf-8", "surrogatepass")
+    return "json", json.dumps(values).encode("utf-8")
+
+
+def _decode_column(encoding, payload, count, swap):
+    """Decode a chunk of column values written by _encode_column"""
+    if (encoding == "json"):
+        return json.loads(payload)
+    nulls = payload[:count]
+    has_nulls = nulls.count(1)
+    if (encoding == "text"):
+        lengths = array("I")
+        lengths.frombytes(payload[count:count + 4 * (count - has_nulls)])
+        if (swap):
+            lengths.byteswap()
+        text = payload[count + 4 * len(lengths):].decode("utf-8", "surrogatepass")
+        offsets = list(accumulate(lengths, initial=0))
+        present = [text[offsets[i]:offsets[i + 1]] for i in range(len(lengths))]
+        if (not has_nulls):
+            return present
+        present = iter(present)
+        return [None if null else next(present) for null in nulls]
+    kind, typecode = _NUMERIC_TYPES[encoding.upper()]
+    data = array(typecode)
+    data.frombytes(payload[count:])
+    if (swap):
+        data.byteswap()
+    values = [bool(value) for value in data] if kind is bool else data.tolist()
+    if (has_nulls):
+        return [None if null else value for value, null in zip(values, nulls)]
+    return values
+
+
+def _table_schema(table):
+    """Return the JSON-serializable parts of a table dictionary, without rows and indexes"""
+    schema = {key: value for key, value in table.items() if key not in _DERIVED_KEYS}
+    schema["engine"] = table_engine(table)
+    if (schema["engine"] == MMAP_ENGINE):
+        # The mapped file is opened again on load when it still holds these rows
+        schema["mmap_path"] = table["rows"].path
+        schema["mmap_id"] = table["rows"].token
+    return schema
+
+
+def _column_chunks(table, chunk_rows):
+    """Yield (row count, {column: values}) chunks of a table"""
+    rows = table.get("rows", [])
+    columns = table["columns"]
+    for start in range(0, len(rows), chunk_rows):
+        if (isinstance(rows, ColumnStore)):
+            chunk = {col: rows.column(col, start, start + chunk_rows) for col in columns}
+        else:
+            chunk = {col: [row.get(col) for row in rows[start:start + chunk_rows]] for col in columns}
+        yield min(chunk_rows, len(rows) - start), chunk
+
+
+def write_snapshot(file, databases, lsn=0, compression=None, chunk_rows=None):
+    """
+    Write all databases to a binary file object as a snapshot.
+
+    Args:
+        file: Binary file object opened for writing
+        databases: The SQLVM databases dict
+        lsn: Write-ahead log sequence number the snapshot covers
+        compression: "zstd", "zlib" or "none" (None for DEFAULT_COMPRESSION)
+        chunk_rows: Rows per column payload (None for CHUNK_ROWS)
+    """
+    compression = (compression or DEFAULT_COMPRESSION).lower()
+    if (compression not in COMPRESSIONS):
+        raise ValueError(f"Unknown compression '{compression}'. Use one of: {', '.join(COMPRESSIONS)}.")
+    if (compression == "zstd" and zstandard is None):
+        raise ValueError("zstd compression needs the zstandard module.")
+    chunk_rows = chunk_rows or CHUNK_ROWS
+
+    file.write(MAGIC + struct.pack("<H", VERSION))
+    offset = len(MAGIC) + 2
+    directory = {}
+    for db_name, tables in databases.items():
+        directory[db_name] = {}
+        for table_name in tables:
+            if (isinstance(tables, LazyTables) and not tables.is_loaded(table_name)
+                    and tables.pager.reader.compression == compression):
+                # A table that was never paged in is copied over from the snapshot it is in
+                directory[db_name][table_name], offset = tables.pager.reader.copy_table(db_name, table_name, file, offset)
+                continue
+            table = tables[table_name]
+            if (isinstance(table["rows"], MappedStore)):
+                table["rows"].flush()
+            types = table.get("types", {})
+            chunks = []
+            row_count = 0
+            for count, chunk in _column_chunks(table, chunk_rows):
+                payloads = {}
+                for col, values in chunk.items():
+                    encoding, payload = _encode_column(values, types.get(col))
+                    payload = _compress(payload, compression)
+                    file.write(payload)
+                    payloads[col] = [offset, len(payload), encoding]
+                    offset += len(payload)
+                chunks.append({"rows": count, "columns": payloads})
+                row_count += count
+            directory[db_name][table_name] = {"schema": _table_schema(table), "rows": row_count, "chunks": chunks}
+
+    footer = json.dumps({"version": VERSION, "lsn": lsn, "compression": compression,
+                         "byteorder": sys.byteorder, "databases": directory}, default=str).encode("utf-8")
+    file.write(footer)
+    file.write(_TRAILER.pack(len(footer), MAGIC))
+
+
+class SnapshotReader:
+    """
+    Random access to the tables of a snapshot file.
+
+    Opening a snapshot only reads its table directory; the column payloads of
+    a table are read and decoded when the table is loaded.
+
+    Args:
+        path: Path of the snapshot file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self._read_directory()
+        except Exception:
+            self.file.close()
+            raise
+
+    def _read_directory(self):
+        if (self.file.read(len(MAGIC)) != MAGIC):
+            raise SnapshotError(f"'{self.path}' is not a snapshot file.")
+        version, = struct.unpack("<H", self.file.read(2))
+        if (version > VERSION):
+            raise SnapshotError(f"Snapshot version {version} is newer than this version of SQLVM supports.")
+        self.file.seek(-_TRAILER.size, os.SEEK_END)
+        length, magic = _TRAILER.unpack(self.file.read(_TRAILER.size))
+        if (magic != MAGIC):
+            raise SnapshotError(f"Snapshot '{self.path}' is truncated.")
+        self.file.seek(-_TRAILER.size - length, os.SEEK_END)
+        footer = json.loads(self.file.read(length))
+        self.lsn = footer["lsn"]
+        self.compression = footer["compression"]
+        self.swap = footer["byteorder"] != sys.byteorder
+        self.directory = footer["databases"]
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def table_names(self, db_name):
+        """Return the names of the tables of a database"""
+        return list(self.directory[db_name])
+
+    def row_count(self, db_name, table_name):
+        return self.directory[db_name][table_name]["rows"]
+
+    def copy_table(self, db_name, table_name, file, offset):
+        """
+        Copy the compressed payloads of a table to a snapshot being written.
+
+        Args:
+            db_name: Database of the table
+            table_name: Table to copy
+            file: Binary file object of the new snapshot
+            offset: Position in the new snapshot the payloads start at
+
+        Returns:
+            Tuple of (directory entry for the new snapshot, offset after the payloads)
+        """
+        entry = self.directory[db_name][table_name]
+        chunks = []
+        for chunk in entry["chunks"]:
+            payloads = {}
+            for col, (source_offset, length, encoding) in chunk["columns"].items():
+                self.file.seek(source_offset)
+                file.write(self.file.read(length))
+                payloads[col] = [offset, length, encoding]
+                offset += length
+            chunks.append({"rows": chunk["rows"], "columns": payloads})
+        return dict(entry, chunks=chunks), offset
+
+    def load_table(self, sqlvm, db_name, table_name):
+        """
+        Read one table and return its table dictionary, with indexes built.
+
+        Args:
+            sqlvm: The SQLVM instance (used to rebuild the indexes)
+            db_name: Database of the table
+            table_name: Table to read
+        """
+        entry = self.directory[db_name][table_name]
+        table = dict(entry["schema"])
+        engine = table.pop("engine", None)
+        mmap_path = table.pop("mmap_path", None)
+        mmap_id = table.pop("mmap_id", None)
+        columns = table["columns"]
+        if (engine == MMAP_ENGINE):
+            rows = open_mapped(mmap_path, mmap_id) if mmap_path else None
+            if (rows is not None and len(rows) == entry["rows"] and list(rows.vectors) == columns):
+                table["rows"] = rows
+                sqlvm._rebuild_indexes(table)
+                return table
+        if (engine in (COLUMNAR_ENGINE, MMAP_ENGINE)):
+            rows = ColumnStore(columns, table.get("types", {}))
+        else:
+            rows = []
+        for chunk in entry["chunks"]:
+            count = chunk["rows"]
+            column_values = {}
+            for col, (offset, length, encoding) in chunk["columns"].items():
+                self.file.seek(offset)
+                payload = _decompress(self.file.read(length), self.compression)
+                column_values[col] = _decode_column(encoding, payload, count, self.swap)
+            if (isinstance(rows, ColumnStore)):
+                rows.extend_columns(column_values, count)
+            elif (columns):
+                rows.extend(dict(zip(columns, values)) for values in zip(*(column_values[col] for col in columns)))
+            else:
+                rows.extend({} for _ in range(count))
+        if (engine == MMAP_ENGINE):
+            # The mapped file is gone or was rewritten since; write it again from the snapshot
+            rows = MappedStore.create(mmap_path or sqlvm._mapped_path(db_name, table_name), columns, table.get("types", {}), rows)
+        table["rows"] = rows
+        sqlvm._rebuild_indexes(table)
+        return table
+
+    def load_databases(self, sqlvm):
+        """Read every table and return the databases dict"""
+        return {db_name: {table_name: self.load_table(sqlvm, db_name, table_name) for table_name in tables}
+                for db_name, tables in self.directory.items()}
+
+
+def _estimate_table_bytes(table):
+    """Rough estimate of the memory taken by the rows and indexes of a table"""
+    rows = table["rows"]
+    count = len(rows)
+    if (not count):
+        return 1024
+    positions = range(0, count, max(1, count // 64))
+    if (isinstance(rows, ColumnStore)):
+        row_bytes = 0
+        for vector in rows.vectors.values():
+            if (getattr(vector, "mapped", False)):
+                continue  # Read from the page cache, not held by this process
+            if (isinstance(vector, NumericVector)):
+                row_bytes += vector.data.itemsize + 1
+            elif (isinstance(vector, DictionaryVector)):
+                row_bytes += 5 + sum(map(sys.getsizeof, vector.dictionary)) / count
+            else:
+                row_bytes += 8 + sum(sys.getsizeof(vector.get(pos)) for pos in positions) / len(positions)
+    else:
+        row_bytes = sum(sys.getsizeof(rows[pos]) + sum(map(sys.getsizeof, rows[pos].values())) for pos in positions) / len(positions)
+    index_count = len(table.get("unique_indexes", ())) + len(table.get("ordered_indexes", ()))
+    return int(count * (row_bytes + 8 + index_count * _INDEX_ENTRY_BYTES))
+
+
+class LazyTables(MutableMapping):
+    """
+    The tables of one database, read from a snapshot when first accessed.
+
+    Stands in for the plain dict of tables of a database. The table names are
+    known from the snapshot's table directory, so listing tables or checking
+    `name in tables` reads nothing; `tables[name]` pages the table in through
+    the TablePager. Tables created later are stored as usual.
+
+    Args:
+        pager: The TablePager reading the snapshot
+        db_name: Name of the database
+        names: Names of the tables in the snapshot
+    """
+
+    def __init__(self, pager, db_name, names):
+        self.pager = pager
+        self.db_name = db_name
+        self.tables = dict.fromkeys(names)  # None for tables not in memory
+
+    def __getitem__(self, table_name):
+        table = self.tables[table_name]
+        if (table is None):
+            table = self.tables[table_name] = self.pager.page_in(self.db_name, table_name)
+        else:
+            self.pager.touch(self.db_name, table_name)
+        return table
+
+    def __setitem__(self, table_name, table):
+        self.tables[table_name] = table
+
+    def __delitem__(self, table_name):
+        del self.tables[table_name]
+        self.pager.forget(self.db_name, table_name)
+
+    def __contains__(self, table_name):
+        return table_name in self.tables
+
+    def __iter__(self):
+        return iter(self.tables)
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __repr__(self):
+        return f"LazyTables({self.db_name!r}, {list(self.tables)})"
+
+    def is_loaded(self, table_name):
+        return self.tables.get(table_name) is not None
+
+    def row_count(self, table_name):
+        """Number of rows of a table; read from the table directory if the table is not in memory"""
+        table = self.tables[table_name]
+        if (table is None):
+            return self.pager.reader.row_count(self.db_name, table_name)
+        return len(table["rows"])
+
+    def evict(self, table_name):
+        """Drop a table from memory; it is read from the snapshot again on next access"""
+        self.tables[table_name] = None
+
+
+class TablePager:
+    """
+    Pages tables in from a snapshot on first access and evicts cold ones
+    again under a memory budget.
+
+    Paged-in tables are kept in least-recently-used order with an estimate of
+    their size. Only tables that are unchanged since the snapshot was written
+    are evicted, since the snapshot does not hold the rows of the others; they
+    become evictable after the next checkpoint (see reopen). Eviction happens
+    between statements only, so a statement never loses a table it uses.
+
+    Args:
+        sqlvm: The SQLVM instance the tables belong to
+        path: Path of the snapshot file
+        memory_budget: Estimated bytes of paged-in tables to keep (None for no limit)
+    """
+
+    def __init__(self, sqlvm, path, memory_budget=None):
+        self.sqlvm = sqlvm
+        self.reader = SnapshotReader(path)
+        self.memory_budget = memory_budget
+        self.resident = OrderedDict()  # (db, table) -> estimated bytes, least recently used first
+        self.dirty = set()  # (db, table) changed since the snapshot
+        self.depth = 0
+        self.page_ins = 0
+        self.evictions = 0
+
+    def databases(self):
+        """Return a databases dict with a LazyTables mapping per database of the snapshot"""
+        return {db_name: LazyTables(self, db_name, self.reader.table_names(db_name)) for db_name in self.reader.directory}
+
+    def page_in(self, db_name, table_name):
+        table = self.reader.load_table(self.sqlvm, db_name, table_name)
+        self.resident[(db_name, table_name)] = _estimate_table_bytes(table)
+        self.page_ins += 1
+        return table
+
+    def touch(self, db_name, table_name):
+        key = (db_name, table_name)
+        if (key in self.resident):
+            self.resident.move_to_end(key)
+
+    def mark_dirty(self, db_name, table_name):
+        if (table_name is not None):
+            self.dirty.add((db_name, table_name))
+
+    def forget(self, db_name, table_name):
+        self.resident.pop((db_name, table_name), None)
+        self.dirty.discard((db_name, table_name))
+
+    def resident_bytes(self):
+        return sum(self.resident.values())
+
+    def begin(self):
+        """Start a statement; nested statements end with the outermost one"""
+        self.depth += 1
+
+    def end(self):
+        """Finish a statement, evicting tables if the budget is exceeded"""
+        self.depth = max(self.depth - 1, 0)
+        if (self.depth == 0):
+            self.evict()
+
+    def evict(self):
+        """
+        Evict the least recently used unchanged tables until the paged-in
+        tables fit the memory budget.
+
+        Returns:
+            Number of tables evicted
+        """
+        if (self.memory_budget is None or self.depth):
+            return 0
+        total = sum(self.resident.values())
+        evicted = 0
+        for key in list(self.resident):
+            if (total <= self.memory_budget):
+                break
+            if (key in self.dirty):
+                continue
+            total -= self.resident.pop(key)
+            db_name, table_name = key
+            tables = self.sqlvm.databases.get(db_name)
+            if (isinstance(tables, LazyTables) and table_name in tables):
+                tables.evict(table_name)
+                evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def reopen(self, path):
+        """
+        Switch to the snapshot written by a checkpoint. The tables in memory
+        match it, so all of them become evictable.
+        """
+        self.reader.close()
+        self.reader = SnapshotReader(path)
+        self.dirty.clear()
+        sqlvm = self.sqlvm
+        for db_name, tables in list(sqlvm.databases.items()):
+            if (not isinstance(tables, LazyTables)):
+                # Databases created since the last snapshot are in it now
+                lazy = LazyTables(self, db_name, ())
+                lazy.tables.update(tables)
+                sqlvm.databases[db_name] = lazy
+                if (sqlvm.tables is tables):
+                    sqlvm.tables = lazy
+                tables = lazy
+            for table_name, table in tables.tables.items():
+                if (table is not None and (db_name, table_name) not in self.resident):
+                    self.resident[(db_name, table_name)] = _estimate_table_bytes(table)
+
+    def close(self):
+        self.reader.close()
+
+
+def read_database_file(sqlvm, path):
+    """
+    Load a database file written by a checkpoint: a binary snapshot, or a
+    pickle file from versions before snapshots existed.
+
+    Returns:
+        Tuple of (databases dict, log sequence number the file covers)
+    """
+    if (is_snapshot(path)):
+        with SnapshotReader(path) as reader:
+            return reader.load_databases(sqlvm), reader.lsn
+    return _read_pickle(path)
+
+
+def _read_pickle(path):
+    # Only for files this application wrote itself; pickle must never be used on untrusted files
+    with open(path, "rb") as pickle_file:
+        data = pickle.load(pickle_file)
+    # Files written before the write-ahead log existed hold the databases dict itself
+    if (isinstance(data, dict) and data.get("format") == "sqlvm-snapshot"):
+        return data["databases"], data["lsn"]
+    return data, 0
+
+
+def convert_pickle(pickle_path, snapshot_path=None, compression=None):
+    """
+    Convert a pickled database file to the binary snapshot format.
+
+    Args:
+        pickle_path: Path of the pickle file
+        snapshot_path: Path of the snapshot to write (None to replace the pickle file)
+        compression: Compression of the snapshot (None for DEFAULT_COMPRESSION)
+
+    Returns:
+        Path of the snapshot written
+    """
+    from .sqlvm import SQLVM
+    databases, lsn = _read_pickle(pickle_path)
+    snapshot_path = snapshot_path or pickle_path
+    temp_path = f"{snapshot_path}.tmp"
+    with open(temp_path, "wb") as snapshot_file:
+        write_snapshot(snapshot_file, databases, lsn, compression)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    # Check that the snapshot reads back before it replaces anything
+    with SnapshotReader(temp_path) as reader:
+        reader.load_databases(SQLVM())
+    os.replace(temp_path, snapshot_path)
+    return snapshot_path
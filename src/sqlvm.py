@@ -1,20 +1,182 @@
+import os
+import itertools
 import re
 import time  # Import the time module
+from functools import lru_cache
+from operator import itemgetter
 from .parser import SQLParser
 from .vm import SQLVMInterpreter
+from .index import HashIndex, OrderedIndex
+from .planner import plan_index_access, _column_comparison, SCAN_ROW_COST, VECTORIZED_ROW_COST
+from .resultset import ResultSet
+from .prepared import PreparedStatement
+from .expression import ExpressionParser, PredicateCompiler, format_node, conjuncts, column_refs, rename_columns
+from .semijoin import SemiJoin
+from .storage import ColumnStore, ENGINES, ROW_ENGINE, COLUMNAR_ENGINE, MMAP_ENGINE, table_engine, convert_storage, delete_rows, add_column, drop_column
+from .trace import Tracer, TRACE_STATEMENT, TRACE_PLAN, TRACE_ROW
+from .explain import Explain
+from .vdbe import VDBE
+from . import vectorized
+from . import loader
+from . import mapped
+from . import pipeline
+from . import aggregate
+from . import join
+from . import stats
+from . import vdbe
 import ast
 
+# Compiled SELECT programs kept per SQLVM, the oldest dropped first
+PROGRAM_CACHE_SIZE = 256
+# Most values (rows read times selected columns) a compiled program reads:
+# interpreting its instructions costs less per statement than the operator
+# pipeline but more per value, so larger reads run as a pipeline
+PROGRAM_MAX_VALUES = 16
+
+# One item of the SELECT list of a join: [alias.]column with an optional alias
+_JOIN_ITEM_RE = re.compile(r"`?(\w+)`?(?:\.`?(\w+)`?)?(?:\s+(?:AS\s+)?`?(\w+)`?)?", re.I)
+_JOIN_STAR_RE = re.compile(r"(?:`?(\w+)`?\.)?\*")
+
+
+def _and_node(terms):
+    """AST of the AND of a list of terms, or None for no terms"""
+    if (not terms):
+        return None
+    return terms[0] if len(terms) == 1 else ("and", tuple(terms))
+
+
+def _order_detail(order):
+    """ORDER BY items as EXPLAIN shows them, e.g. 'amount DESC, id'"""
+    return ", ".join(f"{column}{' DESC' if descending else ''}" for column, descending, _ in order)
+
+
+def _lookup_estimate(estimate, access):
+    """
+    Estimated rows of a scan as EXPLAIN shows them: index lookups are
+    estimated at one row or more, since statistics cannot tell that the
+    looked-up value is missing
+    """
+    if (estimate is not None and " lookup (" in access):
+        return max(estimate, 1)
+    return estimate
+
+
+def _contains_subquery(node):
+    """Return True if a predicate AST holds an IN (SELECT ...) subquery"""
+    if (not isinstance(node, (tuple, list)) or not node):
+        return False
+    if (node[0] == "in_select"):
+        return True
+    return any(_contains_subquery(child) for child in node if isinstance(child, (tuple, list)))
+
+
+@lru_cache(maxsize=None)
+def _base_type(typ):
+    """Return the base type of a column type without its size parameter (VARCHAR(20) -> VARCHAR)"""
+    return re.match(r'(\w+)(?:\(\d+\))?', typ).group(1).upper()
+
+
+def _convert_int(value):
+    try:
+        return int(value)
+    except Exception:
+        raise ValueError(f"Invalid INT value: {value}")
+
+
+def _convert_float(value):
+    try:
+        return float(value)
+    except Exception:
+        raise ValueError(f"Invalid FLOAT value: {value}")
+
+
+def _convert_bool(value):
+    if (str(value).lower() in ("1", "true", "yes", "on")):
+        return True
+    elif (str(value).lower() in ("0", "false", "no", "off")):
+        return False
+    else:
+        raise ValueError(f"Invalid BOOL value: {value}")
+
+
+# Value conversion per base type; other types are stored as text
+_CONVERTERS = {"TEXT": str, "CHAR": str, "VARCHAR": str, "INT": _convert_int, "FLOAT": _convert_float, "BOOL": _convert_bool}
+
+
+def _column_converter(typ):
+    """Return the function converting values to a column type"""
+    return _CONVERTERS.get(_base_type(typ), str)
+
+
+# Builtins that convert valid values the same way as the converters above, but
+# without the Python-level wrapper; used for columns without NULL values
+_FAST_CONVERTERS = {"TEXT": str, "CHAR": str, "VARCHAR": str, "INT": int, "FLOAT": float}
+
+
+def _convert_column(values, typ):
+    """
+    Convert a list of values to a column type, keeping None as NULL.
+
+    Raises:
+        ValueError: If a value does not fit the type
+    """
+    base_type = _base_type(typ)
+    fast = _FAST_CONVERTERS.get(base_type)
+    if (fast is not None and None not in values):
+        try:
+            return list(map(fast, values))
+        except (TypeError, ValueError):
+            pass  # Convert again below for the error message of the column type
+    convert = _CONVERTERS.get(base_type, str)
+    return [None if value is None else convert(value) for value in values]
+
+
+def _rows_to_columns(rows, specified_columns, columns, auto_increment):
+    """
+    Turn the value lists of a multi-row INSERT into a dict of column value lists.
+
+    Args:
+        rows: Non-empty list of value lists
+        specified_columns: Columns the values are given for, or None for the table columns
+            (without the auto-increment columns if the rows are that much shorter)
+        columns: Table columns
+        auto_increment: Auto-increment columns of the table
+
+    Raises:
+        ValueError: If a row has the wrong number of values
+    """
+    if (specified_columns):
+        given = list(specified_columns)
+    elif (len(rows[0]) != len(columns) and len(rows[0]) == len([c for c in columns if c not in auto_increment])):
+        # The auto-increment columns are omitted
+        given = [col for col in columns if col not in auto_increment]
+    else:
+        given = columns
+    if (len(set(map(len, rows))) != 1 or len(rows[0]) != len(given)):
+        number = next(number for number, row in enumerate(rows, 1) if len(row) != len(given))
+        raise ValueError(f"Number of values doesn't match columns in row {number}.")
+    return dict(zip(given, map(list, zip(*rows))))
+
+
 class SQLVM:
     def __init__(self):
         self.databases = {}  # { db_name: {table_name: ...} }
         self.current_db = None
         self.tables = {}  # For backward compatibility, but now always points to current db's tables
         self.vm = SQLVMInterpreter(self)
+        self.tracer = Tracer()  # Statement tracing, enabled with SET TRACE = 'plan'
+        self.explaining = None  # Explain request for the next SELECT, see explain()
+        self.machine = VDBE()  # Runs the compiled programs of simple SELECTs, see _select_program()
+        self.programs = {}  # { (db, table, columns, where, limit, offset): (depends, Program or None) }
+        self.journal = None  # Write-ahead log receiving every change, see wal.py
+        self.pager = None  # TablePager when tables are paged in from a snapshot, see snapshot.py
+        self.mmap_dir = None  # Directory of the files of ENGINE=MMAP tables (None for mapped.DEFAULT_DIRECTORY)
 
     def create_database(self, db_name):
         if (db_name in self.databases):
             return f"Error: Database {db_name} already exists."
         self.databases[db_name] = {}
+        self._log({"op": "create_database", "db": db_name})
         return f"Database {db_name} created."
 
     def drop_database(self, db_name, if_exists=False):
@@ -26,8 +188,49 @@ class SQLVM:
         if (self.current_db == db_name):
             self.current_db = None
             self.tables = {}
+        self._log({"op": "drop_database", "db": db_name})
         return f"Database {db_name} dropped."
 
+    def drop_table(self, table_name, if_exists=False):
+        if (self.current_db is None):
+            return "Error: No database selected. Use USE database_name;"
+        if (table_name not in self.tables):
+            if (if_exists):
+                return f"Table {table_name} does not exist. Skipped."
+            return f"Error: Table {table_name} does not exist."
+        # Tables the pager has not read yet are dropped without reading them
+        if (not hasattr(self.tables, "is_loaded") or self.tables.is_loaded(table_name)):
+            rows = self.tables[table_name]["rows"]
+            if (isinstance(rows, mapped.MappedStore)):
+                rows.discard()
+        del self.tables[table_name]
+        self._log({"op": "drop_table", "db": self.current_db, "table": table_name})
+        return f"Table {table_name} dropped."
+
+    def _mapped_path(self, db_name, table_name):
+        """Return the path of the mapped file of an ENGINE=MMAP table"""
+        return os.path.join(self.mmap_dir or mapped.DEFAULT_DIRECTORY, db_name, f"{table_name}.map")
+
+    def _flush_mapped(self, db_name):
+        """Write the changed rows of the ENGINE=MMAP tables of a database to their files"""
+        tables = self.databases.get(db_name, {})
+        for table_name in list(tables):
+            if (hasattr(tables, "is_loaded") and not tables.is_loaded(table_name)):
+                continue
+            rows = tables[table_name]["rows"]
+            if (isinstance(rows, mapped.MappedStore)):
+                rows.flush()
+
+    def _log(self, record):
+        """
+        Hand a change record to the write-ahead log, if one is attached, and
+        keep the changed table from being evicted by the table pager
+        """
+        if (self.pager is not None):
+            self.pager.mark_dirty(record["db"], record.get("table"))
+        if (self.journal is not None):
+            self.journal.append(record)
+
     def use_database(self, db_name):
         if (db_name not in self.databases):
             return f"Error: Database {db_name} does not exist."
@@ -169,38 +372,19 @@ class SQLVM:
         """
         Convert string value to the given SQL type.
         """
-        # Extract base type without size parameter
-        base_type = re.match(r'(\w+)(?:\(\d+\))?', typ).group(1).upper()
-        
-        if (base_type in ("TEXT", "CHAR", "VARCHAR")):
-            return str(value)
-        elif (base_type == "INT"):
-            try:
-                return int(value)
-            except Exception:
-                raise ValueError(f"Invalid INT value: {value}")
-        elif (base_type == "FLOAT"):
-            try:
-                return float(value)
-            except Exception:
-                raise ValueError(f"Invalid FLOAT value: {value}")
-        elif (base_type == "BOOL"):
-            if (str(value).lower() in ("1", "true", "yes", "on")):
-                return True
-            elif (str(value).lower() in ("0", "false", "no", "off")):
-                return False
-            else:
-                raise ValueError(f"Invalid BOOL value: {value}")
-        else:
-            return str(value)
+        return _column_converter(typ)(value)
 
-    def create_table(self, table_name, columns_def):
+    def create_table(self, table_name, columns_def, engine=None):
         if (self.current_db is None):
             return "Error: No database selected. Use USE database_name;"
         if (table_name in self.tables):
             return f"Error: Table {table_name} already exists."
+        engine = (engine or ROW_ENGINE).upper()
+        if (engine not in ENGINES):
+            return f"Error: Unknown storage engine '{engine}'. Use one of: {', '.join(ENGINES)}."
         
-        columns, types, auto_increment_cols, indexes = self._parse_column_definitions(", ".join(columns_def) if isinstance(columns_def, list) else columns_def)
+        columns_def = ", ".join(columns_def) if isinstance(columns_def, list) else columns_def
+        columns, types, auto_increment_cols, indexes = self._parse_column_definitions(columns_def)
         
         # Check that there's only one AUTO_INCREMENT column
         if (len(auto_increment_cols) > 1):
@@ -212,7 +396,8 @@ class SQLVM:
             
         # Validate indexes - A table can have only one primary key, but it can be a composite key
         primary_keys = [col for col, idx_type in indexes.items() if idx_type == "PRIMARY KEY"]
-        if (len(primary_keys) > 1):
+        composite_key = re.search(r'PRIMARY\s+KEY\s*\(', columns_def, re.I)
+        if (len(primary_keys) > 1 and not composite_key):
             return f"Error: Multiple PRIMARY KEY definitions. A table can have only one primary key."
         
         self.tables[table_name] = {
@@ -223,6 +408,14 @@ class SQLVM:
             "indexes": indexes,
             "primary_key": primary_keys if primary_keys else None
         }
+        if (engine == COLUMNAR_ENGINE):
+            self.tables[table_name]["rows"] = ColumnStore(columns, types)
+        elif (engine == MMAP_ENGINE):
+            self.tables[table_name]["rows"] = mapped.MappedStore.create(
+                self._mapped_path(self.current_db, table_name), columns, types)
+        self._rebuild_indexes(self.tables[table_name])
+        self._log({"op": "create_table", "db": self.current_db, "table": table_name,
+                   "columns_def": columns_def, "engine": engine})
         
         # Format the column definitions for display
         col_defs = []
@@ -242,7 +435,9 @@ class SQLVM:
             else:
                 pk_def = f"PRIMARY KEY ({primary_keys[0]})"
             col_defs.append(pk_def)
-            
+        
+        if (engine != ROW_ENGINE):
+            return f"Table {table_name} created with columns: {', '.join(col_defs)} (engine {engine})."
         return f"Table {table_name} created with columns: {', '.join(col_defs)}."
 
     def insert(self, table_name, values, specified_columns=None):
@@ -304,6 +499,10 @@ class SQLVM:
                 auto_value = table["auto_increment"][col]
                 new_row[col] = auto_value
                 display_values.append(auto_value)
+            elif (val is None):
+                # NULL values, omitted columns and NULL parameters of prepared statements
+                new_row[col] = None
+                display_values.append(None)
             else:
                 try:
                     converted_val = self._convert_value(val, types.get(col, "TEXT"))
@@ -312,101 +511,1294 @@ class SQLVM:
                 except Exception as e:
                     return f"Error: {e}"
         
-        # Second pass: check index constraints
-        for col, index_type in indexes.items():
-            if (index_type in ["PRIMARY KEY", "UNIQUE"]):
-                value = new_row.get(col)
-                # Check for duplicates in existing rows
-                for row in table["rows"]:
-                    if (row.get(col) == value):
-                        if (index_type == "PRIMARY KEY"):
-                            return f"Error: Duplicate entry '{value}' for key 'PRIMARY KEY'"
-                        else:
-                            return f"Error: Duplicate entry '{value}' for key '{col}'"
-        
-        # All checks passed, add the row
+        # Second pass: check index constraints with the hash indexes
+        unique_indexes = self._unique_indexes(table)
+        new_keys = []
+        for index in unique_indexes.values():
+            key = index.key_for(new_row)
+            if (index.lookup(key) is not None):
+                return self._duplicate_entry_error(index, key)
+            new_keys.append((index, key))
+        
+        # All checks passed, add the row and register it in the indexes
         table["rows"].append(new_row)
+        position = len(table["rows"]) - 1
+        for index, key in new_keys:
+            index.add(key, position)
+        for index in self._ordered_indexes(table).values():
+            index.add(index.key_for(new_row), position)
+        if (self.journal is not None or self.pager is not None):
+            record = {"op": "insert", "db": self.current_db, "table": table_name, "row": new_row}
+            if (auto_increment):
+                record["auto_increment"] = dict(auto_increment)
+            self._log(record)
         return f"Inserted {display_values} into {table_name}."
 
-    def select(self, table_name, columns="*", where=None):
-        print(f"DEBUG: select called with table_name={table_name}, columns={columns}, where={where}")
+    def insert_many(self, table_name, rows, specified_columns=None):
+        """
+        Insert several rows at once (INSERT ... VALUES (...), (...)).
+
+        The rows are turned into column lists and handed to insert_columns.
+        Either all rows are inserted or none.
+
+        Args:
+            table_name: Target table
+            rows: List of value lists, in table column order or in the order of specified_columns
+            specified_columns: Optional list of the columns the values are given for
+
+        Returns:
+            Summary message, or an error message
+        """
+        if (self.current_db is None):
+            return "Error: No database selected. Use USE database_name;"
+        if (table_name not in self.tables):
+            return f"Error: Table {table_name} does not exist."
+        table = self.tables[table_name]
+        columns = table["columns"]
+        auto_increment = table.get("auto_increment", {})
+        if (not rows):
+            return f"Inserted 0 row/s into {table_name}."
+
+        try:
+            column_values = _rows_to_columns(rows, specified_columns, columns, auto_increment)
+        except ValueError as e:
+            return f"Error: {e}"
+        return self.insert_columns(table_name, column_values)
+
+    def insert_columns(self, table_name, column_values):
+        """
+        Insert a batch of rows given as one list of values per column.
+
+        Values are converted a column at a time, PRIMARY KEY/UNIQUE keys are
+        checked against the indexes and within the batch before anything is
+        written, and the rows are appended together. Columns left out are NULL
+        or take the next auto-increment value.
+
+        Args:
+            table_name: Target table
+            column_values: Dict mapping column names to equally long lists of values
+
+        Returns:
+            Summary message, or an error message
+        """
+        if (self.current_db is None):
+            return "Error: No database selected. Use USE database_name;"
+        if (table_name not in self.tables):
+            return f"Error: Table {table_name} does not exist."
+        table = self.tables[table_name]
+        columns = table["columns"]
+        types = table.get("types", {c: "TEXT" for c in columns})
+        auto_increment = table.get("auto_increment", {})
+        for col in column_values:
+            if (col not in columns):
+                return f"Error: Unknown column '{col}' in field list"
+        length = len(next(iter(column_values.values()), ()))
+        if (not length):
+            return f"Inserted 0 row/s into {table_name}."
+
+        # Convert the values one column at a time
+        counters = dict(auto_increment)
+        converted = {}
+        for col in columns:
+            values = column_values.get(col)
+            if (values is None):
+                values = [None] * length
+            if (col in counters and (None in values or "NULL" in values)):
+                values = list(values)
+                for i, value in enumerate(values):
+                    if (value is None or value == "NULL"):
+                        counters[col] += 1
+                        values[i] = counters[col]
+            try:
+                converted[col] = _convert_column(values, types.get(col, "TEXT"))
+            except Exception as e:
+                return f"Error: {e}"
+
+        # Check the PRIMARY KEY/UNIQUE indexes once for the whole batch
+        new_keys = []
+        for index in self._unique_indexes(table).values():
+            keys = index.keys_for_columns(converted, length)
+            duplicate = index.find_duplicate(keys)
+            if (duplicate is not None):
+                return self._duplicate_entry_error(index, duplicate)
+            new_keys.append((index, keys))
+
+        # All checks passed: append the rows and register them in the indexes
+        stored = table["rows"]
+        start = len(stored)
+        new_rows = None
+        if (isinstance(stored, ColumnStore)):
+            # Columnar tables take the column lists as they are
+            stored.extend_columns(converted, length)
+        else:
+            new_rows = [dict(zip(columns, values)) for values in zip(*converted.values())]
+            stored.extend(new_rows)
+        for index, keys in new_keys:
+            index.add_many(keys, start)
+        for index in self._ordered_indexes(table).values():
+            for position, key in enumerate(index.keys_for_columns(converted, length), start):
+                index.add(key, position)
+        auto_increment.update(counters)
+        if (self.journal is not None):
+            if (new_rows is None):
+                new_rows = [dict(zip(columns, values)) for values in zip(*converted.values())]
+            record = {"op": "insert_many", "db": self.current_db, "table": table_name, "rows": new_rows}
+            if (auto_increment):
+                record["auto_increment"] = dict(auto_increment)
+            self._log(record)
+        elif (self.pager is not None):
+            self.pager.mark_dirty(self.current_db, table_name)
+        return f"Inserted {length} row/s into {table_name}."
+
+    def copy_from(self, table_name, file_path, columns=None, **options):
+        """
+        Load a CSV or NDJSON file into a table (COPY ... FROM / LOAD DATA INFILE).
+
+        Args:
+            table_name: Target table
+            file_path: Path of the file to read
+            columns: Optional list of the columns the file values are given for
+            options: file_format, delimiter, header, skip_lines (see loader.load_file)
+
+        Returns:
+            Summary message, or an error message
+        """
+        result = loader.load_file(self, table_name, file_path, columns, **options)
+        rows = self.tables[table_name]["rows"] if table_name in self.tables else None
+        if (isinstance(rows, mapped.MappedStore)):
+            # A bulk load is how mapped tables are filled; map the new rows right away
+            rows.flush()
+        return result
+
+    def _discard_rows(self, table_name, start):
+        """
+        Remove the rows from position `start` on, undoing an interrupted bulk
+        load. Auto-increment values the rows used are not handed out again.
+        """
+        table = self.tables[table_name]
+        positions = list(range(start, len(table["rows"])))
+        if (positions):
+            delete_rows(table, positions)
+            for index in list(self._unique_indexes(table).values()) + list(self._ordered_indexes(table).values()):
+                index.remove_positions(positions)
+            self._log({"op": "delete", "db": self.current_db, "table": table_name, "positions": positions})
+
+    def _unique_indexes(self, table):
+        """
+        Return the hash indexes backing the PRIMARY KEY/UNIQUE constraints of a table,
+        building them first if the table predates them (e.g. loaded from an older file)
+        """
+        if ("unique_indexes" not in table):
+            self._rebuild_unique_indexes(table)
+        return table["unique_indexes"]
+
+    def _rebuild_unique_indexes(self, table):
+        """
+        (Re)create the PRIMARY KEY and UNIQUE hash indexes of a table from its schema.
+        A composite primary key gets a single index over all of its columns.
+        """
+        columns = table["columns"]
+        indexes = table.get("indexes", {})
+        unique_indexes = {}
+        
+        primary_key = table.get("primary_key") or [col for col, idx_type in indexes.items() if idx_type == "PRIMARY KEY"]
+        primary_key = [col for col in primary_key if col in columns]
+        if (primary_key):
+            unique_indexes["PRIMARY KEY"] = HashIndex("PRIMARY KEY", primary_key, "PRIMARY KEY")
+        
+        for col, idx_type in indexes.items():
+            if (idx_type in ("UNIQUE", "UNIQUE KEY") and col in columns):
+                unique_indexes[col] = HashIndex(col, [col], "UNIQUE")
+        
+        for index in unique_indexes.values():
+            index.build(table["rows"])
+        table["unique_indexes"] = unique_indexes
+        return unique_indexes
+
+    def _ordered_indexes(self, table):
+        """
+        Return the ordered (B-tree) secondary indexes of a table, building them
+        first if the table predates them
+        """
+        if ("ordered_indexes" not in table):
+            self._rebuild_ordered_indexes(table)
+        return table["ordered_indexes"]
+
+    def _rebuild_ordered_indexes(self, table):
+        """
+        (Re)create the ordered indexes of a table: one per INDEX/KEY column
+        modifier, named after the column, and one per CREATE INDEX statement.
+        """
+        columns = table["columns"]
+        ordered_indexes = {}
+        for col, idx_type in table.get("indexes", {}).items():
+            if (idx_type in ("INDEX", "KEY") and col in columns):
+                ordered_indexes[col] = OrderedIndex(col, [col])
+        for name, index_columns in table.get("secondary_indexes", {}).items():
+            ordered_indexes[name] = OrderedIndex(name, index_columns)
+
+        for index in ordered_indexes.values():
+            index.build(table["rows"])
+        table["ordered_indexes"] = ordered_indexes
+        return ordered_indexes
+
+    def _rebuild_indexes(self, table):
+        """Rebuild all hash and ordered indexes of a table"""
+        self._rebuild_unique_indexes(table)
+        self._rebuild_ordered_indexes(table)
+
+    def create_index(self, index_name, table_name, columns):
+        """
+        Create an ordered secondary index (CREATE INDEX name ON table (columns)).
+
+        Args:
+            index_name: Name of the index, unique within the table
+            table_name: Table to index
+            columns: List of column names; range scans use the first one
+
+        Returns:
+            Success or error message
+        """
+        if (self.current_db is None):
+            return "Error: No database selected. Use USE database_name;"
+        if (table_name not in self.tables):
+            return f"Error: Table {table_name} does not exist."
+        table = self.tables[table_name]
+        for col in columns:
+            if (col not in table["columns"]):
+                return f"Error: Key column '{col}' doesn't exist in table '{table_name}'."
+        if (index_name in self._ordered_indexes(table) or index_name in self._unique_indexes(table)):
+            return f"Error: Duplicate key name '{index_name}'."
+
+        table.setdefault("secondary_indexes", {})[index_name] = list(columns)
+        index = OrderedIndex(index_name, columns)
+        index.build(table["rows"])
+        table["ordered_indexes"][index_name] = index
+        self._log({"op": "create_index", "db": self.current_db, "table": table_name,
+                   "index": index_name, "columns": list(columns)})
+        return f"Index {index_name} created on {table_name} ({', '.join(columns)})."
+
+    def drop_index(self, index_name, table_name=None):
+        """
+        Drop an ordered secondary index (DROP INDEX name [ON table]). Without a
+        table name, the index is looked up in every table of the database.
+        Indexes created by INDEX/KEY column modifiers can be dropped by their column name.
+        """
+        if (self.current_db is None):
+            return "Error: No database selected. Use USE database_name;"
+        if (table_name is None):
+            table_name = next((name for name, table in self.tables.items()
+                               if index_name in self._ordered_indexes(table)), None)
+        elif (table_name not in self.tables):
+            return f"Error: Table {table_name} does not exist."
+        if (table_name is None or index_name not in self._ordered_indexes(self.tables[table_name])):
+            return f"Error: Can't DROP '{index_name}'; check that it exists."
+
+        table = self.tables[table_name]
+        del table["ordered_indexes"][index_name]
+        if (index_name in table.get("secondary_indexes", {})):
+            del table["secondary_indexes"][index_name]
+        else:
+            table["indexes"].pop(index_name, None)
+        self._log({"op": "drop_index", "db": self.current_db, "table": table_name, "index": index_name})
+        return f"Index {index_name} dropped from {table_name}."
+
+    def analyze(self, table_names):
+        """
+        Collect the statistics of tables for the query planner (ANALYZE table, ...):
+        the row count and, per column, the fraction of NULLs, a HyperLogLog
+        estimate of the distinct values, the minimum and maximum and an
+        equi-depth histogram. They are kept in table["statistics"] until the
+        next ANALYZE; estimates scale with the current row count.
+
+        Args:
+            table_names: List of table names
+
+        Returns:
+            Success or error message
+        """
+        if (self.current_db is None):
+            return "Error: No database selected. Use USE database_name;"
+        for table_name in table_names:
+            if (table_name not in self.tables):
+                return f"Error: Table {table_name} does not exist."
+        messages = []
+        for table_name in table_names:
+            table = self.tables[table_name]
+            table["statistics"] = stats.analyze_table(table["rows"], table["columns"])
+            self._log({"op": "analyze", "db": self.current_db, "table": table_name})
+            messages.append(f"Table {table_name} analyzed: {len(table['rows'])} row/s.")
+        return "\n".join(messages)
+
+    def explain(self, instruction, analyze=False):
+        """
+        Show the operator tree a SELECT runs as (EXPLAIN), with the access
+        path of every scan and the estimated rows of every operator. EXPLAIN
+        ANALYZE also runs the statement, discarding its rows, and adds the
+        rows each operator produced, how many times it was iterated, the time
+        spent in it and its inputs and, for operators buffering rows (sorts,
+        hash tables, aggregates), their estimated memory.
+
+        Args:
+            instruction: SELECT_ROWS or SELECT_JOIN instruction
+            analyze: Whether to run the statement and measure its operators
+
+        Returns:
+            ResultSet with one QUERY PLAN line per operator, or an error message
+        """
+        if (instruction[0] not in ("SELECT_ROWS", "SELECT_JOIN")):
+            return "Error: EXPLAIN supports SELECT statements only."
+        request = self.explaining = Explain(analyze)
+        start = time.perf_counter()
+        try:
+            result = self.vm.execute_bytecode([instruction])[0]
+        finally:
+            self.explaining = None
+        if (isinstance(result, str)):
+            return result
+        if (analyze):
+            request.time = time.perf_counter() - start
+        return ResultSet(["QUERY PLAN"], ["TEXT"], [(line,) for line in request.lines()])
+
+    def _take_explain(self):
+        """
+        Return the Explain request of the statement starting to run (None if
+        none), leaving none for the subqueries it runs
+        """
+        request, self.explaining = self.explaining, None
+        return request
+
+    @staticmethod
+    def _run_plan(plan, request=None):
+        """
+        Run the operator tree of a SELECT and return its rows. Under EXPLAIN
+        the tree is kept for the request and only run for EXPLAIN ANALYZE,
+        with every operator measured.
+        """
+        if (request is None):
+            return list(plan)
+        request.root = plan
+        if (not request.analyze):
+            return []
+        request.instrument(plan)
+        return list(plan)
+
+    def _estimate_rows(self, table_name, where):
+        """Estimated number of rows of a table a WHERE clause keeps, for EXPLAIN"""
+        table = self.tables[table_name]
+        count = len(table["rows"])
+        if (where is None):
+            return count
+        estimator = stats.Estimator(table.get("statistics"), self._where_compiler(table_name))
+        return estimator.rows(self._parse_where(where), count)
+
+    def _duplicate_entry_error(self, index, key):
+        if (index.index_type == "PRIMARY KEY"):
+            return f"Error: Duplicate entry '{index.format_key(key)}' for key 'PRIMARY KEY'"
+        return f"Error: Duplicate entry '{index.format_key(key)}' for key '{index.name}'"
+
+    def select(self, table_name, columns="*", where=None, limit=None, offset=None, order_by=None,
+               group_by=None, having=None):
+        """
+        Select rows from a table.
+
+        The statement runs as a pipeline of pull-based operators (see
+        pipeline.py): the scan produces matching positions lazily and
+        Limit stops pulling once it has its rows, so a LIMIT ends the scan
+        early and only the returned rows are projected and formatted.
+        Statements reading only a few rows, such as primary key lookups,
+        run as a compiled VDBE program instead (see _select_program).
+
+        ORDER BY reads the rows in the order of an ordered index on the first
+        order column when that saves a sort (no WHERE clause, or a LIMIT that
+        stops the walk early). Otherwise Sort orders the matching rows: a
+        bounded heap keeps the first offset + limit rows under a LIMIT, and
+        larger results are sorted in runs spilled to disk and merged.
+
+        Args:
+            table_name: Table to read
+            columns: "*" or comma-separated column names
+            where: Optional WHERE clause (text or AST)
+            limit: Optional maximum number of rows
+            offset: Optional number of matching rows to skip
+            order_by: Optional tuple of (column, descending, nulls_first) items;
+                a column may be the 1-based number of a selected column and
+                nulls_first is None for the default (NULLs sort lowest)
+            group_by: Optional tuple of column names to group the rows by
+            having: Optional HAVING clause over the groups
+
+        Returns:
+            ResultSet with the selected columns, or an error message
+        """
         if self.current_db is None:
             return "Error: No database selected. Use USE database_name;"
         if table_name not in self.tables:
             return f"Error: Table {table_name} does not exist."
+        request = self._take_explain()
+        call = aggregate.unsupported_call(columns) if columns != "*" else None
+        if (call is not None):
+            return f"Error: Unsupported function '{call}' in field list."
+        if (group_by or having or (columns != "*" and aggregate.has_aggregate(columns))):
+            return self._select_aggregate(table_name, columns, where or None, group_by or (), having,
+                                          order_by, limit, offset, request)
+        if (request is None and not order_by and self.tracer.level < TRACE_PLAN):
+            program = self._select_program(table_name, columns, where or None, limit, offset)
+            if (program is not None):
+                return ResultSet(program.columns, program.types, self.machine.run(program))
         table = self.tables[table_name]
         if columns == "*":
             columns = table["columns"]
         else:
             columns = [col.strip() for col in columns.split(",")]
 
-        # Calculate the maximum width for each column
-        widths = {col: len(col) for col in columns}
-        filtered_rows = table["rows"]
-
-        # Handle WHERE clause
-        if where:
-            print(f"DEBUG: WHERE clause detected: {where}")
-            if "IN" in where.upper():
-                # Split the condition into column and values
-                col, values_str = where.split("IN", 1)
-                col = col.strip()
-                values_str = values_str.strip().rstrip(";")  # Remove trailing semicolon
-
-                # Check if it's a subquery
-                if values_str.startswith("(") and values_str.endswith(")"):
-                    subquery = values_str[1:-1].strip()
-                    if (subquery.upper().startswith("SELECT")):
-                        # Execute the subquery and get the result
-                        subquery_result = self.execute_command(subquery)
-                        print(f"DEBUG: Subquery result: {subquery_result}")
-                        # Extract the values from the subquery result
-                        values = [row.split("|")[1].strip() for row in subquery_result.split("\n")[3:-2]]
-                        # Convert numeric values to integers where applicable
-                        values = [int(v) if v.isdigit() else v for v in values]
-                    else:
-                        # Parse the values directly
-                        values_str = values_str[1:-1].strip()
-                        values = [v.strip().strip("'").strip('"') for v in values_str.split(",") if v.strip()]
-                        values = [int(v) if v.isdigit() else v for v in values]
+        # Handle WHERE clause: compile it once, then evaluate the predicate per row
+        try:
+            limit = self._row_count_option("LIMIT", limit)
+            offset = self._row_count_option("OFFSET", offset) or 0
+            order = self._order_by_items(table, columns, order_by)
+            plan, access = self._ordered_scan(table_name, where or None, order, limit, offset, request is not None)
+        except ValueError as e:
+            return str(e)
+
+        # Project the matching rows into typed tuples; formatting happens at the edge
+        if (limit is not None or offset):
+            plan = pipeline.Limit(plan, limit, offset)
+        rows = self._run_plan(pipeline.Project(plan, table["rows"], columns, ordered=not order), request)
+
+        if (self.tracer.level >= TRACE_PLAN):
+            self.tracer.emit(TRACE_PLAN, "select", table=table_name, columns=", ".join(columns),
+                             access=access, scanned=len(table["rows"]), matched=len(rows))
+        types = table.get("types", {})
+        return ResultSet(columns, [types.get(col, "TEXT") for col in columns], rows)
+
+    def _select_program(self, table_name, columns, where, limit, offset):
+        """
+        Return the VDBE program of a single-table SELECT (see vdbe.py),
+        compiling it on first use. Programs are cached by statement and
+        reused while the table, its rows, columns, types, indexes and
+        statistics are the ones they were compiled against.
+
+        Only statements the program runs as well as the operator pipeline
+        are compiled: a full scan, or an equality on an indexed column the
+        planner picks for an index lookup, without subqueries. Range scans,
+        IN lists and vectorized scans of columnar tables keep the pipeline.
+        A program only runs when it reads at most PROGRAM_MAX_VALUES values:
+        a unique key, a rare indexed value, a short LIMIT or a small table.
+
+        Returns:
+            Program, or None if the statement runs as a pipeline
+        """
+        table = self.tables[table_name]
+        unique_indexes = self._unique_indexes(table)
+        ordered_indexes = self._ordered_indexes(table)
+        depends = ((table, table["rows"], table.get("statistics"), *unique_indexes.values(), *ordered_indexes.values()),
+                   (tuple(table["columns"]), tuple(table.get("types", {}).items()),
+                    tuple(index.valid for index in ordered_indexes.values())))
+        key = (self.current_db, table_name, columns, where, limit, offset)
+        try:
+            cached = self.programs.get(key)
+        except TypeError:
+            # WHERE AST with an unhashable literal
+            return None
+        if (cached is not None and cached[0][1] == depends[1] and len(cached[0][0]) == len(depends[0])
+                and all(old is new for old, new in zip(cached[0][0], depends[0]))):
+            program = cached[1]
+        else:
+            program = self._compile_program(table_name, table, columns, where, limit, offset)
+            if (len(self.programs) >= PROGRAM_CACHE_SIZE):
+                del self.programs[next(iter(self.programs))]
+            self.programs[key] = (depends, program)
+        if (program is None or program.reads() * len(program.columns) > PROGRAM_MAX_VALUES):
+            return None
+        return program
+
+    def _compile_program(self, table_name, table, columns, where, limit, offset):
+        """Compile a single-table SELECT into a VDBE program, or return None (see _select_program)"""
+        try:
+            limit = self._row_count_option("LIMIT", limit)
+            offset = self._row_count_option("OFFSET", offset) or 0
+            node = self._parse_where(where) if where is not None else None
+            seek = None
+            if (node is not None):
+                if (_contains_subquery(node)):
+                    return None
+                positions, access = self._scan_iter(table_name, node)
+                positions.close()
+                if (access.startswith("index lookup (")):
+                    seek = self._program_seek(table_name, table, node, access[len("index lookup ("):-1])
+                    if (seek is None):
+                        return None
+                elif (access != "full scan"):
+                    return None
+        except ValueError:
+            return None
+        names = list(table["columns"]) if columns == "*" else [column.strip() for column in columns.split(",")]
+        if (not all(name in table["columns"] for name in names)):
+            return None
+        instructions, registers, comments = vdbe.compile_select(table_name, table["rows"], names, node,
+                                                                self._where_compiler(table_name), limit, offset, seek)
+        store = table["rows"]
+        if (seek is not None):
+            reads = seek.count
+        elif (node is None and limit is not None):
+            reads = lambda: min(len(store), limit + offset)
+        else:
+            reads = lambda: len(store)
+        types = table.get("types", {})
+        return vdbe.Program(instructions, registers, names, [types.get(name, "TEXT") for name in names],
+                            reads, comments)
+
+    def _program_seek(self, table_name, table, node, index_name):
+        """Seek function of the index the planner looks a WHERE equality up in, or None"""
+        indexes = list(self._unique_indexes(table).values()) + list(self._ordered_indexes(table).values())
+        indexes = [index for index in indexes if len(index.columns) == 1]
+        index = next((index for index in indexes if index.name == index_name), None)
+        if (index is None):
+            return None
+        compiler = self._where_compiler(table_name)
+        for term in conjuncts(node):
+            if (term[0] == "cmp"):
+                op, column, value = _column_comparison(compiler, term)
+                if (op == "=" and column == index.columns[0] and value is not None):
+                    try:
+                        return vdbe.index_seek(index, value)
+                    except TypeError:
+                        return None
+        return None
+
+    def _select_aggregate(self, table_name, columns, where, group_by, having, order_by, limit, offset, request=None):
+        """
+        Run a SELECT with aggregate functions or GROUP BY.
+
+        The matching rows go through a HashAggregate: columnar tables feed it
+        partial aggregates computed a batch at a time with NumPy, other tables
+        their rows. COUNT(*) alone without WHERE or GROUP BY is answered from
+        the row count of the table, which a table not yet paged in from the
+        database file reads from its table directory. HAVING is evaluated on
+        the groups, ORDER BY on the result columns.
+
+        Returns:
+            ResultSet with the selected columns, or an error message
+        """
+        items = aggregate.parse_select_list(columns) if columns != "*" else None
+        if (items is None):
+            return f"Error: Invalid column list '{columns}'."
+        aggregates = list(dict.fromkeys(item for item, _ in items if isinstance(item, aggregate.Aggregate)))
+        try:
+            limit = self._row_count_option("LIMIT", limit)
+            offset = self._row_count_option("OFFSET", offset) or 0
+        except ValueError as e:
+            return str(e)
+
+        if (where is None and not group_by and having is None and all(item == aggregate.Aggregate("COUNT", None) for item, _ in items)):
+            count = self._row_count(table_name)
+            plan = pipeline.Scan(table_name, [tuple(count for _ in items)], "row count")
+            plan.estimated_rows = 1
+            if (limit is not None or offset):
+                plan = pipeline.Limit(plan, limit, offset)
+            rows = self._run_plan(plan, request)
+            if (self.tracer.level >= TRACE_PLAN):
+                self.tracer.emit(TRACE_PLAN, "select", table=table_name, columns=", ".join(label for _, label in items),
+                                 access="row count", scanned=0, matched=count)
+            return ResultSet([label for _, label in items], ["INT"] * len(items), rows)
+
+        table = self.tables[table_name]
+        rows = table["rows"]
+        types = table.get("types", {})
+        group_by = list(group_by)
+        for column in group_by:
+            if (column not in table["columns"]):
+                return f"Error: Unknown column '{column}' in GROUP BY."
+        for item, _ in items:
+            column = item.column if isinstance(item, aggregate.Aggregate) else item
+            if (column is not None and column not in table["columns"]):
+                return f"Error: Unknown column '{column}' in field list."
+            if (isinstance(item, str) and item not in group_by):
+                return f"Error: Column '{item}' must appear in GROUP BY or be used in an aggregate function."
+
+        try:
+            having_predicate = None
+            if (having is not None):
+                # Aggregate calls become keys of the result rows; the rest parses as a WHERE clause
+                node = ExpressionParser.parse(aggregate.rewrite_having(having.strip().rstrip(";"), aggregates))
+                scope = {column: column for column in group_by}
+                scope.update({aggregate.result_key(number): aggregate.result_key(number) for number in range(len(aggregates))})
+                for item, label in items:
+                    scope.setdefault(label, item if isinstance(item, str) else aggregate.result_key(aggregates.index(item)))
+                having_types = {column: types.get(column, "TEXT") for column in group_by}
+                having_types.update({aggregate.result_key(number): found.result_type(types) for number, found in enumerate(aggregates)})
+                having_predicate = PredicateCompiler(scope, having_types, self._convert_value).compile(node)
+
+            compiler = self._where_compiler(table_name)
+            vectorize = (isinstance(rows, ColumnStore) and vectorized.available() and self.tracer.level < TRACE_ROW
+                         and vectorized.aggregatable(rows, group_by, aggregates))
+            if (vectorize and where is not None):
+                # Keep an index lookup on the WHERE clause when it is selective
+                positions, access = self._scan_iter(table_name, where)
+                positions.close()
+                vectorize = access == "vectorized scan"
+            if (vectorize):
+                node = self._parse_where(where) if where is not None else None
+                partials = vectorized.iter_aggregate_partials(compiler, rows, node, group_by, aggregates)
+                access = "vectorized aggregate"
+                scan = pipeline.Scan(table_name, partials, access)
+                plan = aggregate.HashAggregate(scan, len(group_by), aggregates, partial=True)
+            else:
+                positions, access = self._scan_iter(table_name, where)
+                arguments = list(dict.fromkeys(found.column for found in aggregates if found.column is not None))
+                inputs = [None if found.column is None else len(group_by) + arguments.index(found.column) for found in aggregates]
+                scan = pipeline.Scan(table_name, positions, access)
+                plan = aggregate.HashAggregate(pipeline.Project(scan, rows, group_by + arguments), len(group_by), aggregates, inputs)
+            access += ", hash aggregate"
+            grouping = plan
+            if (request is not None):
+                scan.detail = None if where is None else format_node(self._parse_where(where))
+                scan.estimated_rows = _lookup_estimate(self._estimate_rows(table_name, where), access)
+                plan.detail = ", ".join(group_by) if group_by else None
+                plan.estimated_rows = self._estimate_groups(table, group_by, scan.estimated_rows)
+
+            width = len(group_by)
+            if (having_predicate is not None):
+                def having_filter(group):
+                    values = dict(zip(group_by, group))
+                    values.update((aggregate.result_key(number), value) for number, value in enumerate(group[width:]))
+                    return having_predicate(values)
+                plan = pipeline.Filter(plan, having_filter)
+                plan.detail = having.strip().rstrip(";")
+            getters = [itemgetter(group_by.index(item)) if isinstance(item, str) else itemgetter(width + aggregates.index(item))
+                       for item, _ in items]
+            plan = pipeline.Map(plan, lambda group: tuple(get(group) for get in getters))
+            labels = [label for _, label in items]
+            # ORDER BY names result columns; an aggregate call also names the column it is aliased as
+            aliases = {item.label: label for item, label in items if isinstance(item, aggregate.Aggregate)}
+            order_by = [(aliases.get(aggregate.aggregate_label(column), column), descending, nulls_first)
+                        for column, descending, nulls_first in order_by or ()]
+            order = self._order_by_items({"columns": labels}, labels, order_by)
+        except ValueError as e:
+            return str(e)
+
+        if (order):
+            top = None if limit is None else offset + limit
+            plan = self._sort_rows(plan, [itemgetter(labels.index(column)) for column, _, _ in order], order, top)
+        if (limit is not None or offset):
+            plan = pipeline.Limit(plan, limit, offset)
+        try:
+            results = self._run_plan(plan, request)
+        except ValueError as e:
+            return str(e)
+
+        if (self.tracer.level >= TRACE_PLAN):
+            self.tracer.emit(TRACE_PLAN, "select", table=table_name, columns=", ".join(labels), access=access,
+                             scanned=len(rows), groups=grouping.groups, spills=grouping.spills, matched=len(results))
+        result_types = [types.get(item, "TEXT") if isinstance(item, str) else item.result_type(types) for item, _ in items]
+        return ResultSet(labels, result_types, results)
+
+    @staticmethod
+    def _estimate_groups(table, group_by, input_rows):
+        """Estimated number of groups of a GROUP BY, from the distinct values ANALYZE counted"""
+        if (not group_by):
+            return 1
+        columns = table.get("statistics", {}).get("columns", {})
+        groups = 1
+        for column in group_by:
+            if (column not in columns):
+                return input_rows
+            groups *= max(1, columns[column]["distinct"])
+        return min(groups, input_rows)
+
+    @staticmethod
+    def _sort_rows(child, getters, order, top):
+        """
+        Sort the rows of an operator by ORDER BY values computed from each
+        row. Rows pass through Sort numbered in arrival order after their
+        values, which keeps equal rows in order without comparing the rows.
+
+        Args:
+            child: Operator producing the rows
+            getters: Functions row -> value, one per ORDER BY item
+            order: List of (column, descending, nulls_first) items
+            top: Optional number of leading rows needed
+
+        Returns:
+            Operator producing the rows of child in order
+        """
+        counter = itertools.count()
+        keys = pipeline.Map(child, lambda row: tuple(get(row) for get in getters) + ((next(counter), row),))
+        plan = pipeline.Sort(keys, [(descending, nulls_first) for _, descending, nulls_first in order], limit=top)
+        plan.detail = _order_detail(order)
+        return pipeline.Map(plan, itemgetter(1))
+
+    def select_join(self, sources, columns="*", where=None, limit=None, offset=None, order_by=None,
+                    group_by=None, having=None):
+        """
+        Select rows from several tables joined with INNER, LEFT, RIGHT or CROSS JOIN.
+
+        Rows travel through the joins as tuples of row positions, one per
+        table, and the selected columns are only read at the end. WHERE terms
+        on one table, and ON terms on the inner table of an INNER/LEFT join,
+        filter that table while it is scanned (using its indexes), unless an
+        outer join pads the table with NULLs. Each join then runs as the
+        cheapest of a hash join built on the smaller input, a merge join
+        walking ordered indexes on both join columns and an index nested-loop
+        join probing an index of the inner table (see join.plan_join).
+
+        Args:
+            sources: Tuple of (table, alias, kind, ON clause) per table, in FROM order
+            columns: "*", or comma-separated alias.column, alias.* or unambiguous
+                column names, each with an optional alias
+            where: Optional WHERE clause (text or AST)
+            limit: Optional maximum number of rows
+            offset: Optional number of rows to skip
+            order_by: Optional tuple of (column, descending, nulls_first) items
+
+        Returns:
+            ResultSet with the selected columns, or an error message
+        """
+        if (self.current_db is None):
+            return "Error: No database selected. Use USE database_name;"
+        request = self._take_explain()
+        if (group_by or having or aggregate.has_aggregate(columns)):
+            return "Error: GROUP BY and aggregate functions are not supported with JOIN."
+        aliases = [alias for _, alias, _, _ in sources]
+        for table_name, alias, _, _ in sources:
+            if (table_name not in self.tables):
+                return f"Error: Table {table_name} does not exist."
+            if (aliases.count(alias) > 1):
+                return f"Error: Not unique table/alias: '{alias}'"
+        tables = [self.tables[table_name] for table_name, _, _, _ in sources]
+        scope, slots, ambiguous = self._join_scope(sources, tables)
+        types = {key: tables[slot].get("types", {}).get(column, "TEXT") for key, (slot, column) in slots.items()}
+
+        try:
+            limit = self._row_count_option("LIMIT", limit)
+            offset = self._row_count_option("OFFSET", offset) or 0
+            items = self._join_select_list(columns, sources, tables, scope, ambiguous)
+            where_node = self._parse_where(where) if where is not None else None
+            on_nodes = [self._parse_where(on) if on is not None else None for _, _, _, on in sources]
+            for node, clause in [(where_node, "WHERE")] + [(node, "ON") for node in on_nodes]:
+                for ref in (column_refs(node) if node is not None else ()):
+                    if (ref in ambiguous):
+                        raise ValueError(f"Error: Column '{ref}' in {clause} clause is ambiguous.")
+            if (all(kind in ("INNER", "CROSS") for _, _, kind, _ in sources[1:])
+                    and any("statistics" in table for table in tables)):
+                sources, tables, where_node, on_nodes = self._join_order(sources, tables, scope, slots, where_node, on_nodes)
+                scope, slots, _ = self._join_scope(sources, tables)
+            plan, steps = self._join_plan(sources, tables, scope, slots, types, where_node, on_nodes, request)
+
+            labels = [label for _, label in items]
+            order = []
+            for column, descending, nulls_first in order_by or ():
+                if (column.isdigit()):
+                    if (not 1 <= int(column) <= len(items)):
+                        raise ValueError(f"Error: ORDER BY position {column} is not in the select list.")
+                    key = items[int(column) - 1][0]
+                elif (column in labels):
+                    key = items[labels.index(column)][0]
+                elif (column in scope):
+                    key = scope[column]
+                elif (column in ambiguous):
+                    raise ValueError(f"Error: Column '{column}' in ORDER BY is ambiguous.")
                 else:
-                    return f"Error: Invalid IN condition format '{values_str}'."
+                    raise ValueError(f"Error: Unknown column '{column}' in ORDER BY.")
+                order.append((key, descending, not descending if nulls_first is None else nulls_first))
+        except ValueError as e:
+            return str(e)
+
+        if (order):
+            top = None if limit is None else offset + limit
+            plan = self._sort_rows(plan, [self._join_value(tables, slots, key) for key, _, _ in order], order, top)
+        if (limit is not None or offset):
+            plan = pipeline.Limit(plan, limit, offset)
+        getters = [self._join_value(tables, slots, key) for key, _ in items]
+        plan = pipeline.Map(plan, lambda row: tuple(get(row) for get in getters))
+        plan.detail = f"Project ({', '.join(labels)})"
+        rows = self._run_plan(plan, request)
+
+        if (self.tracer.level >= TRACE_PLAN):
+            self.tracer.emit(TRACE_PLAN, "select", table=", ".join(aliases), columns=", ".join(labels),
+                             access="; ".join(steps), matched=len(rows))
+        return ResultSet(labels, [types[key] for key, _ in items], rows)
+
+    @staticmethod
+    def _join_scope(sources, tables):
+        """
+        Column references of a join: alias.column (and table.column) for every
+        column, and the plain column name where only one table has it.
 
-                # Debug: Print the parsed column and values
-                print(f"DEBUG: Parsed column: {col}, Parsed values: {values}")
+        Returns:
+            Tuple of (scope dict reference -> key, dict key -> (slot, column),
+            set of ambiguous plain column names); keys are alias.column
+        """
+        scope = {}
+        slots = {}
+        keys_of = {}
+        for slot, ((table_name, alias, _, _), table) in enumerate(zip(sources, tables)):
+            for column in table["columns"]:
+                key = f"{alias}.{column}"
+                slots[key] = (slot, column)
+                scope[key] = key
+                scope.setdefault(f"{table_name}.{column}", key)
+                keys_of.setdefault(column, []).append(key)
+        ambiguous = set()
+        for column, keys in keys_of.items():
+            if (len(keys) == 1):
+                scope.setdefault(column, keys[0])
+            else:
+                ambiguous.add(column)
+        return scope, slots, ambiguous
 
-                # Use the in_condition method
-                try:
-                    filtered_rows = self.in_condition(table_name, col, values)
-                except ValueError as e:
-                    return str(e)
+    @staticmethod
+    def _join_select_list(columns, sources, tables, scope, ambiguous):
+        """
+        Resolve the SELECT list of a join; raises ValueError with an "Error: ..." message.
+
+        Returns:
+            List of (key, label) pairs
+        """
+        items = []
+        for part in columns.split(","):
+            part = part.strip()
+            star = _JOIN_STAR_RE.fullmatch(part)
+            if (star):
+                selected = [slot for slot, (_, alias, _, _) in enumerate(sources) if star.group(1) in (None, alias)]
+                if (not selected):
+                    raise ValueError(f"Error: Unknown table '{star.group(1)}' in field list.")
+                for slot in selected:
+                    alias = sources[slot][1]
+                    items.extend((f"{alias}.{column}", f"{alias}.{column}" if column in ambiguous else column)
+                                 for column in tables[slot]["columns"])
+                continue
+            match = _JOIN_ITEM_RE.fullmatch(part)
+            if (not match):
+                raise ValueError(f"Error: Invalid column list '{columns}'.")
+            ref = match.group(1) if match.group(2) is None else f"{match.group(1)}.{match.group(2)}"
+            if (ref in ambiguous):
+                raise ValueError(f"Error: Column '{ref}' in field list is ambiguous.")
+            if (ref not in scope):
+                raise ValueError(f"Error: Unknown column '{ref}' in field list.")
+            items.append((scope[ref], match.group(3) or ref))
+        return items
+
+    @staticmethod
+    def _join_value(tables, slots, key):
+        """Function position tuple -> value of the column `key` (None in a padded row)"""
+        slot, column = slots[key]
+        get = join.value_getter(tables[slot]["rows"], column)
+        return lambda row: None if row[slot] is None else get(row[slot])
+
+    def _join_predicate(self, terms, scope, slots, tables, types):
+        """Compile AND terms over the tables of a join into a function position tuple -> bool"""
+        node = _and_node(terms)
+        compiled = PredicateCompiler(scope, types, self._convert_value, self._plan_subquery).compile(node)
+        # A correlated subquery reads outer columns that are not among the references of the terms
+        keys = slots if _contains_subquery(node) else dict.fromkeys(scope[ref] for ref in column_refs(node) if ref in scope)
+        getters = [(key, self._join_value(tables, slots, key)) for key in keys]
+
+        def predicate(row):
+            return compiled({key: get(row) for key, get in getters})
+        return predicate
+
+    def _join_order(self, sources, tables, scope, slots, where_node, on_nodes):
+        """
+        Reorder the tables of an inner join from their statistics: start with
+        the table expected to keep the fewest rows after its own conditions,
+        then add the table joined by an equality whose result is expected to
+        be smallest (tables without one last). The ON and WHERE terms of inner
+        joins are interchangeable, so they are redistributed: terms on several
+        tables go to the ON clause of the last of them to be joined.
+
+        Returns:
+            Tuple of (sources, tables, WHERE AST, ON ASTs) in the new order
+        """
+        count = len(sources)
+        terms = [term for node in [where_node] + list(on_nodes) if node is not None for term in conjuncts(node)]
+        term_slots = [{slots[scope[ref]][0] for ref in column_refs(term) if ref in scope} for term in terms]
+        names = {ref: slots[key][1] for ref, key in scope.items()}
+        estimates = []
+        for slot, (table_name, _, _, _) in enumerate(sources):
+            own = [term for term, used in zip(terms, term_slots) if used == {slot} and not _contains_subquery(term)]
+            estimator = stats.Estimator(tables[slot].get("statistics"), self._where_compiler(table_name))
+            fraction = estimator.selectivity(rename_columns(("and", tuple(own)), names)) if own else 1.0
+            estimates.append(len(tables[slot]["rows"]) * fraction)
+
+        def distinct(slot, column):
+            column_stats = (tables[slot].get("statistics") or {}).get("columns", {}).get(column)
+            # Without statistics a join column is taken to be a key of its table
+            return column_stats["distinct"] if column_stats else len(tables[slot]["rows"])
+
+        order = [min(range(count), key=estimates.__getitem__)]
+        rows = estimates[order[0]]
+        while (len(order) < count):
+            best = None
+            for slot in range(count):
+                if (slot in order):
+                    continue
+                size = rows * estimates[slot]
+                connected = False
+                for term, used in zip(terms, term_slots):
+                    if (slot in used and len(used) == 2 and used - {slot} <= set(order) and term[0] == "cmp"
+                            and term[1] == "=" and term[2][0] == "col" and term[3][0] == "col"):
+                        left, right = slots[scope[term[2][1]]], slots[scope[term[3][1]]]
+                        size /= max(distinct(*left), distinct(*right), 1)
+                        connected = True
+                if (best is None or (not connected, size) < best[0]):
+                    best = ((not connected, size), slot, size)
+            order.append(best[1])
+            rows = best[2]
+        if (order == list(range(count))):
+            return sources, tables, where_node, on_nodes
+
+        position = {slot: number for number, slot in enumerate(order)}
+        where_terms = []
+        on_terms = [[] for _ in sources]
+        for term, used in zip(terms, term_slots):
+            if (len(used) < 2):
+                where_terms.append(term)
             else:
-                # Handle other conditions
-                filtered_rows = [row for row in table["rows"] if self._evaluate_condition(row, where)]
+                on_terms[max(position[slot] for slot in used)].append(term)
+        sources = [(table_name, alias, None if number == 0 else "INNER", None)
+                   for number, (table_name, alias, _, _) in enumerate(sources[slot] for slot in order)]
+        tables = [tables[slot] for slot in order]
+        return (sources, tables, _and_node(where_terms),
+                [_and_node(terms) for terms in on_terms])
+
+    def _join_plan(self, sources, tables, scope, slots, types, where_node, on_nodes, request=None):
+        """
+        Build the operators of a join. Under EXPLAIN the operators get their
+        estimated rows, and without ANALYZE the algorithm of a join after the
+        first is chosen from the estimated rows of its outer input instead of
+        the rows read.
 
-        # Adjust column widths based on the filtered rows
-        for row in filtered_rows:
-            for col in columns:
-                value_width = len(str(row.get(col, 'NULL')))
-                if col in widths:
-                    widths[col] = max(widths[col], value_width)
-
-        # Format with clear column boundaries using vertical bars
-        header = "| " + " | ".join(col.ljust(widths[col]) for col in columns) + " |"
-        separator = "+" + "+".join("-" * (widths[col] + 2) for col in columns) + "+"
-        formatted_rows = []
-        for row in filtered_rows:
-            formatted_row = "| " + " | ".join(str(row.get(col, 'NULL')).ljust(widths[col]) for col in columns) + " |"
-            formatted_rows.append(formatted_row)
-
-        # Combine everything with clear boundaries
-        result = separator + "\n" + header + "\n" + separator + "\n"
-        if formatted_rows:
-            result += "\n".join(formatted_rows) + "\n" + separator
-        else:
-            result += separator  # Bottom line for empty result set
+        Returns:
+            Tuple of (operator producing position tuples, list of step descriptions)
+        """
+        count = len(sources)
+        # Tables an outer join pads with NULLs cannot have WHERE terms applied before the join
+        padded = [(slot > 0 and sources[slot][2] == "LEFT") or any(kind == "RIGHT" for _, _, kind, _ in sources[slot + 1:])
+                  for slot in range(count)]
+        filters = [[] for _ in sources]
+        post = []
+        for term in (conjuncts(where_node) if where_node is not None else []):
+            term_slots = {slots[scope[ref]][0] for ref in column_refs(term) if ref in scope}
+            if (len(term_slots) == 1 and not padded[min(term_slots)] and not _contains_subquery(term)):
+                filters[term_slots.pop()].append(term)
+            else:
+                post.append(term)
+        joins = [None]
+        for slot in range(1, count):
+            kind = sources[slot][2]
+            pairs = []
+            residual = []
+            for term in (conjuncts(on_nodes[slot]) if on_nodes[slot] is not None else []):
+                refs = [scope[ref] for ref in column_refs(term) if ref in scope]
+                term_slots = {slots[key][0] for key in refs}
+                if (term_slots and max(term_slots) > slot):
+                    raise ValueError(f"Error: The ON clause of '{sources[slot][1]}' uses a table joined after it.")
+                sides = [scope.get(side[1]) if side[0] == "col" else None for side in term[2:4]] if term[0] == "cmp" else []
+                if (term[0] == "cmp" and term[1] == "=" and None not in sides and len(term_slots) == 2 and slot in term_slots):
+                    left, right = sides if slots[sides[1]][0] == slot else sides[::-1]
+                    pairs.append((slots[left], slots[right][1], term))
+                elif (term_slots == {slot} and kind in ("INNER", "LEFT") and not _contains_subquery(term)):
+                    filters[slot].append(term)
+                else:
+                    residual.append(term)
+            joins.append((pairs, residual))
+
+        names = {ref: column for ref, key in scope.items() for column in [slots[key][1]]}
+        filter_nodes = [None if not terms else rename_columns(_and_node(terms), names)
+                        for terms in filters]
+
+        filtered = []
+        for slot, (table_name, _, _, _) in enumerate(sources):
+            table = tables[slot]
+            if (filter_nodes[slot] is None):
+                filtered.append(len(table["rows"]))
+            elif ("statistics" in table):
+                estimator = stats.Estimator(table["statistics"], self._where_compiler(table_name))
+                filtered.append(estimator.rows(filter_nodes[slot], len(table["rows"])))
+            else:
+                filtered.append(len(table["rows"]) * join.FILTER_SELECTIVITY)
+
+        def scan(slot):
+            table_name, alias = sources[slot][0], sources[slot][1]
+            positions, access = self._scan_iter(table_name, filter_nodes[slot])
+            plan = pipeline.Scan(table_name if alias == table_name else f"{table_name} {alias}", positions, access)
+            if (request is not None):
+                plan.detail = None if filter_nodes[slot] is None else format_node(filter_nodes[slot])
+                plan.estimated_rows = _lookup_estimate(filtered[slot], access)
+            return plan
+
+        def row_filter(slot):
+            if (filter_nodes[slot] is None):
+                return None
+            predicate = self._compile_where(sources[slot][0], filter_nodes[slot])
+            rows = tables[slot]["rows"]
+            return lambda pos: predicate(rows[pos])
+
+        def input_rows(plan):
+            # Rows of the outer input of the next join, which decide its algorithm
+            if (request is not None and not request.analyze):
+                return plan.estimate()
+            if (request is not None):
+                request.instrument(plan)
+            return len(plan.materialize())
+
+        plan = scan(0)
+        steps = [f"{sources[0][1]}: {plan.access}"]
+        plan = pipeline.Materialize(pipeline.Map(plan, lambda pos: (pos,)))
+        left_count = input_rows(plan)
+        for slot in range(1, count):
+            table_name, alias, kind, _ = sources[slot]
+            table = tables[slot]
+            rows = table["rows"]
+            pairs, residual = joins[slot]
+            right_count = len(rows)
+            right_filtered = filtered[slot]
+            estimated = self._join_estimate(tables, slot, kind, pairs, residual, left_count, right_filtered)
+
+            if (not pairs):
+                inner = scan(slot)
+                predicate = self._join_predicate(residual, scope, slots, tables, types) if residual else None
+                plan = join.NestedLoopJoin(plan, slot, kind, inner, predicate)
+                plan.detail = " AND ".join(format_node(term) for term in residual) or None
+                steps.append(f"{alias}: nested loop join ({inner.access})")
+            else:
+                probe = self._join_index(table, pairs)
+                merge = self._merge_indexes(tables, pairs) if slot == 1 else None
+                algorithm, _ = join.plan_join(left_count, right_count, right_filtered, probe is not None, merge is not None)
+                if (algorithm == "index"):
+                    index, used, lookup = probe
+                elif (algorithm == "merge"):
+                    left_index, right_index, used = merge
+                else:
+                    used = pairs
+                residual = residual + [term for pair in pairs if pair not in used for term in [pair[2]]]
+                predicate = self._join_predicate(residual, scope, slots, tables, types) if residual else None
+                left_key = self._join_key(tables, [left for left, _, _ in used])
+                condition = " AND ".join(format_node(term) for term in [pair[2] for pair in used] + residual)
+                if (algorithm == "index"):
+                    plan = join.IndexNestedLoopJoin(plan, slot, kind, left_key, lookup, row_filter(slot),
+                                                    lambda slot=slot: scan(slot), predicate, index.name)
+                    plan.detail = f"{table_name if alias == table_name else f'{table_name} {alias}'} using {index.name}; {condition}"
+                    steps.append(f"{alias}: index nested loop join ({index.name})")
+                elif (algorithm == "merge"):
+                    plan = join.MergeJoin((left_index, tables[0]["rows"], used[0][0][1]), (right_index, rows, used[0][1]), kind,
+                                          row_filter(0), row_filter(slot), predicate)
+                    plan.detail = f"{left_index.name}, {right_index.name}; {condition}"
+                    steps.append(f"{alias}: merge join ({left_index.name}, {right_index.name})")
+                else:
+                    inner = scan(slot)
+                    right_key = self._join_key([table], [(0, column) for _, column, _ in used], single=True)
+                    build_right = right_filtered <= left_count
+                    plan = join.HashJoin(plan, slot, kind, left_key, inner, right_key, predicate, build_right)
+                    plan.detail = f"{condition}; build {'inner' if build_right else 'outer'} side"
+                    steps.append(f"{alias}: hash join ({inner.access}, build {'inner' if build_right else 'outer'} side)")
+            if (request is not None):
+                plan.estimated_rows = estimated
+            if (slot < count - 1):
+                plan = pipeline.Materialize(plan)
+                left_count = input_rows(plan)
+
+        if (post):
+            predicate = self._join_predicate(post, scope, slots, tables, types)
+            estimated = plan.estimate()
+            plan = pipeline.Filter(plan, predicate)
+            plan.detail = " AND ".join(format_node(term) for term in post)
+            if (request is not None and estimated is not None):
+                plan.estimated_rows = estimated * join.FILTER_SELECTIVITY
+            steps.append("filter: " + plan.detail)
+        return plan, steps
+
+    @staticmethod
+    def _join_estimate(tables, slot, kind, pairs, residual, left_rows, right_rows):
+        """
+        Estimated rows of a join: every pair of rows, over the distinct values
+        of the join columns (ANALYZE counts them; without statistics the
+        smaller input is taken to have one row per key). Outer joins keep at
+        least every row of their preserved side.
+        """
+        rows = left_rows * right_rows
+        if (pairs):
+            distinct = 1
+            for (left_slot, left_column), right_column, _ in pairs:
+                for table, column in ((tables[left_slot], left_column), (tables[slot], right_column)):
+                    found = table.get("statistics", {}).get("columns", {}).get(column)
+                    distinct = max(distinct, found["distinct"] if found else min(left_rows, right_rows))
+            rows /= distinct
+        if (residual):
+            rows *= join.FILTER_SELECTIVITY
+        if (kind == "LEFT"):
+            rows = max(rows, left_rows)
+        elif (kind == "RIGHT"):
+            rows = max(rows, right_rows)
+        return rows
+
+    @staticmethod
+    def _join_key(tables, columns, single=False):
+        """
+        Function producing the join key of a row: the value of one column, or
+        a tuple of several; None if a part is NULL or the row is padded.
 
-        return result
+        Args:
+            tables: Table dicts by slot
+            columns: List of (slot, column) pairs making up the key
+            single: The rows are positions of one table rather than position tuples
+        """
+        getters = [(slot, join.value_getter(tables[slot]["rows"], column)) for slot, column in columns]
+        if (len(getters) == 1):
+            slot, get = getters[0]
+            if (single):
+                return get
+            return lambda row: None if row[slot] is None else get(row[slot])
+
+        def key(row):
+            values = []
+            for slot, get in getters:
+                pos = row if single else row[slot]
+                value = None if pos is None else get(pos)
+                if (value is None):
+                    return None
+                values.append(value)
+            return tuple(values)
+        return key
+
+    def _join_index(self, table, pairs):
+        """
+        Find an index of the inner table to probe with the join keys: a
+        PRIMARY KEY/UNIQUE hash index over join columns, else a single-column
+        ordered index.
+
+        Returns:
+            Tuple of (index, join pairs it covers, function key -> positions), or None
+        """
+        columns = {column: pair for pair in pairs for column in [pair[1]]}
+        for index in self._unique_indexes(table).values():
+            if (set(index.columns) <= set(columns)):
+                lookup = index.lookup
+                return index, [columns[column] for column in index.columns], lambda key: () if (pos := lookup(key)) is None else (pos,)
+        for index in self._ordered_indexes(table).values():
+            if (len(index.columns) == 1 and index.valid and index.columns[0] in columns):
+                return index, [columns[index.columns[0]]], index.lookup
+        return None
+
+    def _merge_indexes(self, tables, pairs):
+        """
+        Find single-column ordered indexes on both sides of a join pair between
+        the first two tables, whose keys compare with each other.
+
+        Returns:
+            Tuple of (left index, right index, [join pair]), or None
+        """
+        for pair in pairs:
+            (slot, left_column), right_column, _ = pair
+            if (slot != 0):
+                continue
+            left_types = tables[0].get("types", {})
+            right_types = tables[1].get("types", {})
+            numeric = ("INT", "FLOAT", "BOOL")
+            left_type = re.match(r"\w*", left_types.get(left_column, "TEXT")).group(0).upper()
+            right_type = re.match(r"\w*", right_types.get(right_column, "TEXT")).group(0).upper()
+            if (left_type != right_type and not (left_type in numeric and right_type in numeric)):
+                continue
+            left = [index for index in self._ordered_indexes(tables[0]).values()
+                    if index.columns == [left_column] and index.valid]
+            right = [index for index in self._ordered_indexes(tables[1]).values()
+                     if index.columns == [right_column] and index.valid]
+            if (left and right):
+                return left[0], right[0], [pair]
+        return None
+
+    def _row_count(self, table_name):
+        """Number of rows of a table of the current database, without paging it in"""
+        tables = self.tables
+        if (hasattr(tables, "row_count")):
+            return tables.row_count(table_name)
+        return len(tables[table_name]["rows"])
+
+    @staticmethod
+    def _order_by_items(table, columns, order_by):
+        """
+        Resolve ORDER BY items to (column, descending, nulls_first) with table
+        column names; raises ValueError with an "Error: ..." message
+        """
+        order = []
+        for column, descending, nulls_first in order_by or ():
+            if (column.isdigit()):
+                number = int(column)
+                if (not 1 <= number <= len(columns)):
+                    raise ValueError(f"Error: ORDER BY position {number} is not in the select list.")
+                column = columns[number - 1]
+            if (column not in table["columns"]):
+                raise ValueError(f"Error: Unknown column '{column}' in ORDER BY.")
+            if (nulls_first is None):
+                nulls_first = not descending
+            order.append((column, descending, nulls_first))
+        return order
+
+    def _ordered_scan(self, table_name, where, order, limit, offset, estimate=False):
+        """
+        Build the operators producing the positions of the matching rows in
+        ORDER BY order (or table order without one). With estimate the scan
+        gets its estimated rows, for EXPLAIN.
+
+        Returns:
+            Tuple of (operator, access path description)
+        """
+        table = self.tables[table_name]
+        rows = table["rows"]
+        index = None
+        if (order):
+            column, descending, nulls_first = order[0]
+            index = next((index for index in self._ordered_indexes(table).values()
+                          if index.columns == [column] and index.valid), None)
+        if (index is not None and where is not None and limit is None):
+            index = None
+        if (index is not None and where is not None):
+            # Keep an index lookup on the WHERE clause when it is selective; walk the index otherwise
+            positions, access = self._scan_iter(table_name, where)
+            if (access in ("full scan", "vectorized scan")):
+                positions.close()
+            else:
+                index = None
+        if (index is not None):
+            predicate = self._compile_where(table_name, where) if where is not None else None
+            tie_key = None
+            if (len(order) > 1):
+                key = pipeline.sort_key([(desc, first) for _, desc, first in order[1:]])
+                tie_columns = [col for col, _, _ in order[1:]]
+
+                def tie_key(pos):
+                    row = rows[pos]
+                    return key(tuple(row.get(col) for col in tie_columns) + (pos,))
+            plan = pipeline.IndexOrderScan(index, rows, column, descending, nulls_first, predicate, tie_key)
+            if (estimate):
+                plan.detail = None if where is None else format_node(self._parse_where(where))
+                plan.estimated_rows = self._estimate_rows(table_name, where)
+            return plan, f"index order ({index.name})"
+
+        positions, access = self._scan_iter(table_name, where)
+        plan = pipeline.Scan(table_name, positions, access)
+        if (estimate):
+            plan.detail = None if where is None else format_node(self._parse_where(where))
+            plan.estimated_rows = _lookup_estimate(self._estimate_rows(table_name, where), access)
+        if (order):
+            keys = pipeline.Project(plan, rows, [col for col, _, _ in order], keep_position=True)
+            top = None if limit is None else offset + limit
+            plan = pipeline.Sort(keys, [(desc, first) for _, desc, first in order], limit=top)
+            plan.detail = _order_detail(order)
+            access += ", top-k sort" if top is not None else ", sort"
+        return plan, access
+
+    @staticmethod
+    def _row_count_option(name, value):
+        """Validate a LIMIT/OFFSET count; raises ValueError with an "Error: ..." message"""
+        if (value is None):
+            return None
+        if (isinstance(value, str) and value.isdigit()):
+            value = int(value)
+        if (isinstance(value, bool) or not isinstance(value, int) or value < 0):
+            raise ValueError(f"Error: {name} must be a non-negative integer, got '{value}'.")
+        return value
 
     def update(self, table_name, set_values, where=None):
         if (self.current_db is None):
@@ -416,201 +1808,309 @@ class SQLVM:
         table = self.tables[table_name]
         types = table.get("types", {c: "TEXT" for c in table["columns"]})
         set_dict = {}
-        set_pairs = re.findall(r'(\w+)\s*=\s*(?:"([^"]*)"|([^",\s]+))', set_values)
-        for col, val1, val2 in set_pairs:
-            value = val1 if val1 else val2
+        # The SET clause comes as text, or as a dict of column values from a prepared statement
+        set_pairs = self._parse_set_clause(set_values) if isinstance(set_values, str) else set_values.items()
+        for col, value in set_pairs:
             try:
-                set_dict[col] = self._convert_value(value, types.get(col, "TEXT"))
+                set_dict[col] = None if value is None else self._convert_value(value, types.get(col, "TEXT"))
             except Exception as e:
                 return f"Error: {e}"
 
-        updated_count = 0
-        for row in table["rows"]:
-            if (where is None or self._evaluate_condition(row, where)):
-                for column, value in set_dict.items():
-                    if (column in row):
-                        row[column] = value
-                updated_count += 1
+        rows = table["rows"]
+        unique_indexes = self._unique_indexes(table)
+        try:
+            matched, access = self._scan(table_name, where)
+        except ValueError as e:
+            return str(e)
+        if (self.tracer.level >= TRACE_PLAN):
+            self.tracer.emit(TRACE_PLAN, "update", table=table_name, access=access,
+                             scanned=len(rows), matched=len(matched))
+        
+        # Check the PRIMARY KEY/UNIQUE indexes touched by the SET clause before changing any row
+        key_changes = []
+        matched_set = set(matched)
+        for index in unique_indexes.values():
+            if (not any(col in set_dict for col in index.columns)):
+                continue
+            new_keys = {}
+            for pos in matched:
+                row = rows[pos]
+                new_row = dict(row)
+                new_row.update({column: value for column, value in set_dict.items() if column in row})
+                new_key = index.key_for(new_row)
+                if (new_key is not None):
+                    existing = index.lookup(new_key)
+                    if ((existing is not None and existing not in matched_set) or new_key in new_keys):
+                        return self._duplicate_entry_error(index, new_key)
+                    new_keys[new_key] = pos
+            key_changes.append((index, new_keys))
+        
+        # Move the touched index entries from the old keys to the new ones
+        for index, new_keys in key_changes:
+            for pos in matched:
+                index.remove(index.key_for(rows[pos]))
+            for new_key, pos in new_keys.items():
+                index.add(new_key, pos)
+        
+        # Ordered indexes over the SET columns drop the old keys now and get the new ones after the update
+        ordered_changes = [index for index in self._ordered_indexes(table).values()
+                           if any(col in set_dict for col in index.columns)]
+        for index in ordered_changes:
+            for pos in matched:
+                index.remove(index.key_for(rows[pos]), pos)
+
+        for pos in matched:
+            row = rows[pos]
+            for column, value in set_dict.items():
+                if (column in row):
+                    row[column] = value
+        for index in ordered_changes:
+            for pos in matched:
+                index.add(index.key_for(rows[pos]), pos)
+        if (matched):
+            self._log({"op": "update", "db": self.current_db, "table": table_name,
+                       "positions": matched, "values": set_dict})
+        updated_count = len(matched)
         return f"Updated {updated_count} row/s in {table_name}."
 
+    @staticmethod
+    def _parse_set_clause(set_values):
+        """Split a SET clause like: a = 1, b = 'x' into a tuple of (column, value text) pairs"""
+        set_pairs = re.findall(r'(\w+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^",\s]+))', set_values)
+        return tuple((col, val1 or val2 or val3) for col, val1, val2, val3 in set_pairs)
+
     def delete(self, table_name, where=None):
         if (self.current_db is None):
             return "Error: No database selected. Use USE database_name;"
         if (table_name not in self.tables):
             return f"Error: Table {table_name} does not exist."
         table = self.tables[table_name]
-        initial_row_count = len(table["rows"])
-        table["rows"] = [row for row in table["rows"] if (where is None or not self._evaluate_condition(row, where))]
-        deleted_count = initial_row_count - len(table["rows"])
+        unique_indexes = self._unique_indexes(table)
+        try:
+            deleted_positions, access = self._scan(table_name, where)
+        except ValueError as e:
+            return str(e)
+        scanned = len(table["rows"])
+        delete_rows(table, deleted_positions)
+        
+        # Drop the deleted rows from the indexes and shift the remaining positions
+        for index in list(unique_indexes.values()) + list(self._ordered_indexes(table).values()):
+            index.remove_positions(deleted_positions)
+        if (deleted_positions):
+            self._log({"op": "delete", "db": self.current_db, "table": table_name, "positions": deleted_positions})
+        deleted_count = len(deleted_positions)
+        if (self.tracer.level >= TRACE_PLAN):
+            self.tracer.emit(TRACE_PLAN, "delete", table=table_name, access=access,
+                             scanned=scanned, matched=deleted_count)
         return f"Deleted {deleted_count} row/s from {table_name}."
 
-    def _evaluate_condition(self, row, condition):
-        """
-        Evaluate a WHERE condition against a row.
-        Now supports complex conditions with AND/OR operators and nested parentheses.
-        """
-        # Strip any trailing semicolons
-        condition = condition.strip(";").strip()
-        print(f"DEBUG: Evaluating condition: {condition}")
-
-        # Handle parenthesized expressions first
-        while "(" in condition and ")" in condition:
-            # Find the innermost parentheses
-            start = condition.rfind("(")
-            end = condition.find(")", start)
-            if start == -1 or end == -1:
-                raise ValueError("Unbalanced parentheses in condition.")
-
-            # Extract the inner condition
-            inner_condition = condition[start + 1:end]
-            print(f"DEBUG: Found inner condition: {inner_condition}")
-
-            # Evaluate the inner condition
-            inner_result = self._evaluate_condition(row, inner_condition)
-            print(f"DEBUG: Result of inner condition '{inner_condition}': {inner_result}")
-
-            # Replace the parenthesized expression with its boolean result
-            condition = condition[:start] + str(inner_result) + condition[end + 1:]
-            print(f"DEBUG: Updated condition after resolving parentheses: {condition}")
-
-        # Handle complex conditions with AND
-        if " AND " in condition.upper():
-            parts = condition.split(" AND ", 1)  # Split at first AND
-            left_result = self._evaluate_condition(row, parts[0].strip())
-            right_result = self._evaluate_condition(row, parts[1].strip())
-            print(f"DEBUG: AND condition - Left: {parts[0].strip()} = {left_result}, Right: {parts[1].strip()} = {right_result}")
-            return left_result and right_result
-
-        # Handle complex conditions with OR
-        if " OR " in condition.upper():
-            parts = condition.split(" OR ", 1)  # Split at first OR
-            left_result = self._evaluate_condition(row, parts[0].strip())
-            right_result = self._evaluate_condition(row, parts[1].strip())
-            print(f"DEBUG: OR condition - Left: {parts[0].strip()} = {left_result}, Right: {parts[1].strip()} = {right_result}")
-            return left_result or right_result
-
-        # Handle standard comparison operators
-        for operator in ["!=", "<=", ">=", "=", "<", ">"]:
-            if operator in condition:
-                parts = condition.split(operator, 1)
-                col = parts[0].strip()
-                value_str = parts[1].strip()
-
-                # Remove quotes from string literals
-                if value_str.startswith("'") and value_str.endswith("'"):
-                    value_str = value_str[1:-1]
-                elif value_str.startswith('"') and value_str.endswith('"'):
-                    value_str = value_str[1:-1]
-
-                # Get column type and convert value accordingly
-                value = value_str
-                typ = None
-                for table in self.tables.values():
-                    if "types" in table and col in table["types"]:
-                        typ = table["types"][col]
-                        break
-
-                if typ:
-                    try:
-                        value = self._convert_value(value_str, typ)
-                    except Exception:
-                        pass
-
-                # Get row value
-                row_value = row.get(col)
-                print(f"DEBUG: Comparing column '{col}' with value '{value}' using operator '{operator}'. Row value: {row_value}")
-
-                # Handle None values
-                if row_value is None:
-                    return False
-
-                # Compare based on operator
-                if operator == "=":
-                    return row_value == value
-                elif operator == "!=":
-                    return row_value != value
-                elif operator == "<":
-                    return row_value < value
-                elif operator == ">":
-                    return row_value > value
-                elif operator == "<=":
-                    return row_value <= value
-                elif operator == ">=":
-                    return row_value >= value
-
-        # Handle LIKE operator
-        if " LIKE " in condition.upper():
-            parts = condition.split(" LIKE ", 1)
-            col = parts[0].strip()
-            pattern = parts[1].strip()
-
-            # Remove quotes from pattern
-            if pattern.startswith("'") and pattern.endswith("'"):
-                pattern = pattern[1:-1]
-            elif pattern.startswith('"') and pattern.endswith('"'):
-                pattern = pattern[1:-1]
-
-            # Convert SQL LIKE pattern to regex pattern
-            try:
-                pattern = pattern.replace("%", ".*").replace("_", ".")
-                pattern = f"^{pattern}$"
-                row_value = str(row.get(col, ""))
-                if row_value is None:
-                    return False
-                match_result = bool(re.match(pattern, row_value, re.IGNORECASE))
-                print(f"DEBUG: LIKE operator - column: {col}, pattern: {pattern}, row_value: {row_value}, match_result: {match_result}")
-                return match_result
-            except re.error as e:
-                print(f"DEBUG: Invalid regex pattern '{pattern}' - {e}")
-                return False
-
-        # Handle IN operator
-        if " IN " in condition.upper():
-            parts = condition.split(" IN ", 1)
-            col = parts[0].strip()
-            values_str = parts[1].strip()
-
-            # Parse values in parentheses
-            if values_str.startswith("(") and values_str.endswith(")"):
-                values_str = values_str[1:-1]
-
-                # Split by comma and handle quoted values
-                values = []
-                for val in re.findall(r'(?:[^,"]|"(?:\\.|[^"])*")+', values_str):
-                    val = val.strip()
-                    if val.startswith("'") and val.endswith("'"):
-                        val = val[1:-1]
-                    elif val.startswith('"') and val.endswith('"'):
-                        val = val[1:-1]
-                    values.append(val)
-
-                row_value = row.get(col)
-                print(f"DEBUG: IN operator - column: {col}, values: {values}, row_value: {row_value}")
-                return row_value in values
-
-        # Fallback to simple equality check for backward compatibility
-        if "=" in condition:
-            col, value = condition.split("=", 1)
-            col = col.strip()
-            value = value.strip().strip('"').strip("'")
-            print(f"DEBUG: Fallback equality check - column: {col}, value: {value}, row_value: {row.get(col)}")
-            return row.get(col) == value
+    def _scan(self, table_name, where):
+        """
+        Find the rows matching a WHERE clause, or all rows if there is none.
+        Raises ValueError for invalid clauses.
 
-        return False
+        Returns:
+            Tuple of (sorted row positions, access path description)
+        """
+        positions, access = self._scan_iter(table_name, where)
+        return list(positions), access
 
-    def export_to_sql(self, db_name=None, file_path=None):
+    def _scan_iter(self, table_name, where):
+        """
+        Like _scan, but produce the matching positions lazily, so a consumer
+        that stops early (LIMIT) also stops the scan. The WHERE clause is
+        parsed and compiled before returning, so invalid clauses still raise
+        ValueError here.
+
+        Equality, IN and range conditions on indexed columns read their
+        candidate rows from an index; otherwise columnar tables are scanned in
+        vectorized batches (when NumPy is available and rows are not traced one
+        by one) and row tables row by row.
+
+        Returns:
+            Tuple of (iterator of sorted row positions, access path description)
+        """
+        table = self.tables[table_name]
+        rows = table["rows"]
+        if (where is None):
+            return iter(range(len(rows))), "full scan"
+        node = self._parse_where(where)
+        compiler = self._where_compiler(table_name)
+        vectorize = isinstance(rows, ColumnStore) and vectorized.available() and self.tracer.level < TRACE_ROW
+
+        scan_cost = len(rows) * (VECTORIZED_ROW_COST if vectorize else SCAN_ROW_COST)
+        plan = plan_index_access(compiler, node, self._unique_indexes(table), self._ordered_indexes(table),
+                                 table.get("statistics"), len(rows), scan_cost)
+        # A vectorized scan beats probing row by row once the index matches a large part of the table
+        if (plan is not None and not (vectorize and len(plan.positions) > len(rows) // 4)):
+            predicate = self._compile_where(table_name, node)
+            return (pos for pos in plan.positions if predicate(rows[pos])), plan.access
+
+        if (vectorize):
+            # Columnar tables evaluate the predicate a batch at a time into selection masks
+            batches = vectorized.iter_positions(compiler, rows, node)
+
+            def positions():
+                count = 0
+                try:
+                    for found in batches:
+                        count += 1
+                        yield from found.tolist()
+                finally:
+                    if (self.tracer.level >= TRACE_PLAN):
+                        self.tracer.emit(TRACE_PLAN, "where", table=table_name, predicate=format_node(node),
+                                         batches=count, batch_size=vectorized.BATCH_SIZE)
+            return positions(), "vectorized scan"
+        predicate = self._compile_where(table_name, node)
+        if (isinstance(rows, ColumnStore)):
+            # Evaluate the predicate over small dicts of the referenced columns only
+            scope = compiler.scope
+            columns = list(dict.fromkeys(scope[ref] for ref in column_refs(node) if ref in scope))
+            return (pos for pos, row in enumerate(rows.scan(columns)) if predicate(row)), "full scan"
+        return (pos for pos, row in enumerate(rows) if predicate(row)), "full scan"
+
+    @staticmethod
+    def _parse_where(where):
+        """Parse a WHERE clause given as text; ASTs are passed through"""
+        if (isinstance(where, str)):
+            return ExpressionParser.parse(where.strip().rstrip(";").strip())
+        return where
+
+    def _compile_where(self, table_name, where):
+        """
+        Parse a WHERE clause into an AST once and compile it into a predicate
+        function row -> bool for the given table. The AND/OR terms of a table
+        with statistics are evaluated in the order Estimator.order picks.
+        Raises ValueError with an "Error: ..." message for invalid clauses.
+        """
+        node = self._parse_where(where)
+        compiler = self._where_compiler(table_name)
+        statistics = self.tables[table_name].get("statistics")
+        if (statistics is not None):
+            # Cheap, selective terms first: AND/OR stop at the first term deciding the result
+            node = stats.Estimator(statistics, compiler).order(node)
+        predicate = compiler.compile(node)
+        if (self.tracer.level >= TRACE_PLAN):
+            self.tracer.emit(TRACE_PLAN, "where", table=table_name, predicate=format_node(node))
+
+        # Row tracing wraps the compiled predicate only while it is enabled
+        if (self.tracer.level >= TRACE_ROW):
+            compiled = predicate
+
+            def predicate(row):
+                result = compiled(row)
+                self.tracer.emit(TRACE_ROW, "row", table=table_name, row=row, match=result)
+                return result
+        return predicate
+
+    def _where_compiler(self, table_name):
+        """Return the PredicateCompiler for WHERE clauses over a table"""
+        table = self.tables[table_name]
+        return PredicateCompiler(
+            PredicateCompiler.table_scope(table_name, table["columns"]),
+            table.get("types", {}),
+            self._convert_value,
+            self._plan_subquery,
+        )
+
+    def _plan_subquery(self, sql, outer):
+        """
+        Plan an IN (SELECT ...) subquery as a hash semi-join.
+
+        The inner SELECT is run once. Conditions of the form inner_col = outer_col
+        in its WHERE clause are pulled out of the subquery (decorrelated) and
+        become part of the hash key, so a correlated subquery is not re-run per
+        outer row.
+
+        Args:
+            sql: The subquery SQL text
+            outer: PredicateCompiler of the enclosing query
+
+        Returns:
+            SemiJoin holding the materialized subquery rows
+        """
+        bytecode = SQLParser.parse_to_bytecode(sql)
+        if (not bytecode or bytecode[0][0] != "SELECT_ROWS"):
+            raise ValueError(f"Error: Invalid subquery '{sql}'")
+        instruction = bytecode[0]
+        table_name = instruction[1]
+        where = instruction[3] if len(instruction) >= 4 else None
+        # ORDER BY does not change the set of values IN tests, so only the other clauses are refused
+        options = set(dict(instruction[4])) if len(instruction) == 5 else set()
+        if (options & {"limit", "offset"}):
+            raise ValueError("Error: LIMIT and OFFSET are not supported in subqueries.")
+        if (options & {"group_by", "having"} or aggregate.has_aggregate(instruction[2])):
+            raise ValueError("Error: GROUP BY, HAVING and aggregate functions are not supported in subqueries.")
+        if (table_name not in self.tables):
+            raise ValueError(f"Error: Table {table_name} does not exist.")
+        table = self.tables[table_name]
+        types = table.get("types", {})
+        scope = PredicateCompiler.table_scope(table_name, table["columns"])
+
+        columns = [col.strip() for col in instruction[2].split(",")]
+        if (columns == ["*"]):
+            columns = table["columns"]
+        if (len(columns) != 1):
+            raise ValueError("Error: Operand should contain 1 column(s)")
+        if (columns[0] not in scope):
+            raise ValueError(f"Error: Unknown column '{columns[0]}' in subquery")
+        column = scope[columns[0]]
+
+        # Split the WHERE clause into correlation equalities and local conditions
+        correlation = []
+        local = []
+        if (where):
+            node = ExpressionParser.parse(where.strip().rstrip(";").strip())
+            for term in conjuncts(node):
+                outer_refs = [ref for ref in column_refs(term) if ref not in scope and ref in outer.scope]
+                if (not outer_refs):
+                    local.append(term)
+                    continue
+                pair = self._correlation_pair(term, scope, outer.scope)
+                if (pair is None):
+                    raise ValueError("Error: Correlated subqueries are only supported with "
+                                     "equality conditions (inner_column = outer_column).")
+                correlation.append(pair)
+
+        rows = table["rows"]
+        if (local):
+            predicate = self._compile_where(table_name, local[0] if len(local) == 1 else ("and", tuple(local)))
+            rows = [row for row in rows if predicate(row)]
+        inner_keys = [column] + [inner for inner, _ in correlation]
+        materialized = [tuple(row.get(key) for key in inner_keys) for row in rows]
+
+        if (self.tracer.level >= TRACE_PLAN):
+            self.tracer.emit(TRACE_PLAN, "subquery", table=table_name, access="hash semi-join",
+                             rows=len(materialized),
+                             correlated=", ".join(f"{inner} = {ref}" for inner, ref in correlation) or "no")
+        return SemiJoin(table_name, [types.get(key, "TEXT") for key in inner_keys],
+                        [ref for _, ref in correlation], materialized)
+
+    def _correlation_pair(self, term, scope, outer_scope):
+        """Return (inner row key, outer column reference) for inner_col = outer_col, else None"""
+        if (term[0] != "cmp" or term[1] != "=" or term[2][0] != "col" or term[3][0] != "col"):
+            return None
+        left, right = term[2][1], term[3][1]
+        if (left in scope and right not in scope and right in outer_scope):
+            return (scope[left], right)
+        if (right in scope and left not in scope and left in outer_scope):
+            return (scope[right], left)
+        return None
+
+    def export_to_sql(self, db_name=None, file_path=None, batch_rows=None):
         """
         Export database(s) to SQL format
         
         Args:
             db_name: Specific database to export (None for all)
             file_path: Path to save the SQL file (None for auto-generated)
+            batch_rows: Rows per INSERT statement (None for the default)
             
         Returns:
             Success message
         """
         from .export import SQLVMExporter
-        message, _ = SQLVMExporter.export_to_sql(self, db_name, file_path)
+        message, _ = SQLVMExporter.export_to_sql(self, db_name, file_path, batch_rows)
         return message
     
     def export_to_json(self, db_name=None, file_path=None):
@@ -628,34 +2128,55 @@ class SQLVM:
         message, _ = SQLVMExporter.export_to_json(self, db_name, file_path)
         return message
 
-    def import_from_sql(self, db_name, file_path):
+    def export_table_to_ndjson(self, table_name, file_path=None):
+        """
+        Export the rows of a table in the current database as newline-delimited JSON
+        
+        Args:
+            table_name: Table to export
+            file_path: Path to save the NDJSON file (None for auto-generated)
+            
+        Returns:
+            Success message
+        """
+        from .export import SQLVMExporter
+        message, _ = SQLVMExporter.export_table_to_ndjson(self, table_name, file_path)
+        return message
+
+    def import_from_sql(self, db_name, file_path, workers=None, backslash_escapes=False):
         """
         Import SQL file into a database
         
         Args:
             db_name: Target database to import into
             file_path: Path to the SQL file
+            workers: Number of worker processes to spread the row conversion over (None for none)
+            backslash_escapes: Whether strings escape with backslashes, as in mysqldump's default output
             
         Returns:
             Success message
         """
         from .importer import SQLVMImporter
-        message, _, _ = SQLVMImporter.import_from_sql(self, db_name, file_path)
+        message, _, _ = SQLVMImporter.import_from_sql(self, db_name, file_path, workers=workers,
+                                                      backslash_escapes=backslash_escapes)
+        self._flush_mapped(db_name)
         return message
 
-    def import_from_json(self, db_name, file_path):
+    def import_from_json(self, db_name, file_path, workers=None):
         """
         Import JSON file into a database
         
         Args:
             db_name: Target database to import into
             file_path: Path to the JSON file
+            workers: Number of worker processes to spread the row conversion over (None for none)
             
         Returns:
             Success message
         """
         from .importer import SQLVMImporter
-        message, _, _ = SQLVMImporter.import_from_json(self, db_name, file_path)
+        message, _, _ = SQLVMImporter.import_from_json(self, db_name, file_path, workers=workers)
+        self._flush_mapped(db_name)
         return message
 
     def execute_command(self, command):
@@ -860,6 +2381,17 @@ class SQLVM:
             if (col_name in table["columns"]):
                 return f"Error: Column '{col_name}' already exists in table '{table_name}'."
 
+            # PRIMARY KEY/UNIQUE modifiers on the new column get a hash index
+            index_type = None
+            if ("PRIMARY" in modifiers):
+                if (table.get("primary_key")):
+                    return "Error: Multiple PRIMARY KEY definitions. A table can have only one primary key."
+                index_type = "PRIMARY KEY"
+            elif ("UNIQUE" in modifiers):
+                index_type = "UNIQUE"
+            elif (re.search(r'\b(INDEX|KEY)\b', modifiers)):
+                index_type = "INDEX"
+
             # Add the column to the table
             full_type = f"{col_type}({col_size})" if col_size else col_type
             table["columns"].append(col_name)
@@ -872,9 +2404,16 @@ class SQLVM:
                 table["auto_increment"][col_name] = 0
 
             # Add default values for the new column in existing rows
-            for row in table["rows"]:
-                row[col_name] = None
+            add_column(table, col_name, full_type)
 
+            if (index_type):
+                table.setdefault("indexes", {})[col_name] = index_type
+                if (index_type == "PRIMARY KEY"):
+                    table["primary_key"] = [col_name]
+                self._rebuild_indexes(table)
+
+            self._log({"op": "alter_table", "db": self.current_db, "table": table_name,
+                       "operation": operation.upper(), "column_def": column_def})
             return f"Column '{col_name}' added to table '{table_name}'."
 
         elif (operation.upper() == "DROP"):
@@ -889,9 +2428,21 @@ class SQLVM:
             table["indexes"].pop(column_def, None)
 
             # Remove the column from all rows
-            for row in table["rows"]:
-                row.pop(column_def, None)
-
+            drop_column(table, column_def)
+
+            # The column no longer takes part in the PRIMARY KEY/UNIQUE indexes
+            if (column_def in (table.get("primary_key") or [])):
+                table["primary_key"].remove(column_def)
+                if (not table["primary_key"]):
+                    table["primary_key"] = None
+            # Secondary indexes over the column are dropped with it
+            secondary_indexes = table.get("secondary_indexes", {})
+            for name in [name for name, cols in secondary_indexes.items() if column_def in cols]:
+                del secondary_indexes[name]
+            self._rebuild_indexes(table)
+
+            self._log({"op": "alter_table", "db": self.current_db, "table": table_name,
+                       "operation": operation.upper(), "column_def": column_def})
             return f"Column '{column_def}' dropped from table '{table_name}'."
 
         elif (operation.upper() == "MODIFY"):
@@ -912,14 +2463,29 @@ class SQLVM:
             # Update the column type
             full_type = f"{col_type}({col_size})" if col_size else col_type
             table["types"][col_name] = full_type
+            if (isinstance(table["rows"], ColumnStore)):
+                table["rows"].retype(col_name, full_type)
+            self._rebuild_ordered_indexes(table)
 
+            self._log({"op": "alter_table", "db": self.current_db, "table": table_name,
+                       "operation": operation.upper(), "column_def": column_def})
             return f"Column '{col_name}' modified in table '{table_name}'."
 
+        elif (operation.upper() == "ENGINE"):
+            # Move the rows to another storage engine
+            engine = column_def.strip().upper()
+            if (engine not in ENGINES):
+                return f"Error: Unknown storage engine '{column_def}'. Use one of: {', '.join(ENGINES)}."
+            convert_storage(table, engine, self._mapped_path(self.current_db, table_name))
+            self._rebuild_indexes(table)
+            self._log({"op": "alter_table", "db": self.current_db, "table": table_name,
+                       "operation": "ENGINE", "column_def": engine})
+            return f"Table '{table_name}' now uses the {engine} engine."
+
         else:
             return f"Error: Unsupported ALTER TABLE operation '{operation}'."
 
     def in_condition(self, table_name, column, values):
-        print(f"DEBUG: in_condition called with table_name={table_name}, column={column}, values={values}")
         if self.current_db is None:
             raise ValueError("Error: No database selected. Use USE database_name;")
         if table_name not in self.tables:
@@ -938,40 +2504,118 @@ class SQLVM:
         if not values:
             return []
 
-        # Get the column type
-        column_type = table["types"].get(column, "TEXT")
+        # Compile the IN list into a set-membership predicate
+        node = ("in", ("col", column), tuple(("lit", value) for value in values), False)
+
+        # Filter rows based on the IN condition
+        rows = table["rows"]
+        positions, access = self._scan(table_name, node)
+        filtered_rows = [rows[pos] for pos in positions]
+        if (self.tracer.level >= TRACE_PLAN):
+            self.tracer.emit(TRACE_PLAN, "in_condition", table=table_name, column=column,
+                             values=len(values), access=access, matched=len(filtered_rows))
+
+        return filtered_rows
+
+    def query(self, sql):
+        """
+        Run a SELECT statement and return its rows without formatting them.
+
+        Args:
+            sql: SELECT statement
+
+        Returns:
+            ResultSet, or an error message if the statement failed or is not a query
+        """
+        bytecode = SQLParser.parse_to_bytecode(sql)
+        if (not bytecode or bytecode[0][0] not in ("SELECT_ROWS", "SELECT_JOIN", "EXPLAIN")):
+            return "Error: Statement does not return rows."
+        return self.vm.execute_bytecode(bytecode)[0]
+
+    def prepare(self, sql):
+        """
+        Parse a statement with ? or :name placeholders once, for repeated execution.
+
+        Args:
+            sql: Statement text, e.g. INSERT INTO users VALUES (?, ?)
 
-        # Convert values to the column type
+        Returns:
+            PreparedStatement, or an error message if the statement cannot be parsed
+        """
         try:
-            converted_values = [self._convert_value(value, column_type) for value in values]
+            return PreparedStatement.prepare(sql, SQLParser.parse_to_bytecode, self._parse_where,
+                                             self._parse_set_clause)
         except ValueError as e:
-            raise ValueError(f"Error: {e}. Ensure the values in the IN condition match the column type '{column_type}'.")
+            return str(e)
 
-        # Debug: Print the converted values
-        print(f"DEBUG: Converted values for IN condition: {converted_values}")
+    def execute(self, statement, params=None):
+        """
+        Execute a prepared statement with bound parameters.
 
-        # Filter rows based on the IN condition
-        filtered_rows = [row for row in table["rows"] if row.get(column) in converted_values]
+        Args:
+            statement: PreparedStatement, or statement text to prepare first
+            params: Sequence of values for ? placeholders, or dict for :name placeholders.
+                Values are used as they are: strings need no quotes and None is NULL.
+
+        Returns:
+            The result of the statement: a ResultSet for SELECT, a message otherwise
+        """
+        if (isinstance(statement, str)):
+            statement = self.prepare(statement)
+            if (isinstance(statement, str)):
+                return statement
+        try:
+            bytecode = statement.bind(params)
+        except ValueError as e:
+            return str(e)
+        self.tracer.begin_statement()
+        results = self._run_bytecode(bytecode)
+        return results[0] if len(results) == 1 else results
 
-        # Debug: Print the filtered rows
-        print(f"DEBUG: Filtered rows: {filtered_rows}")
+    def _run_bytecode(self, bytecode):
+        """
+        Execute bytecode, committing its changes to the write-ahead log together.
+        Paged-in tables are only evicted between statements.
+        """
+        journal = self.journal
+        pager = self.pager
+        if (journal is not None):
+            journal.begin()
+        if (pager is not None):
+            pager.begin()
+        try:
+            return self.vm.execute_bytecode(bytecode)
+        finally:
+            if (journal is not None):
+                journal.end()
+            if (pager is not None):
+                pager.end()
 
-        return filtered_rows
+    def set_trace(self, level):
+        """Set the statement trace level (OFF, STATEMENT, PLAN or ROW)"""
+        return self.tracer.set_level(level)
 
     def execute_command(self, command):
-        print(f"DEBUG: execute_command called with command={command}")
-        import time  # Ensure the time module is imported
         start_time = time.time()  # Record the start time
+        self.tracer.begin_statement()
+        if (self.tracer.level >= TRACE_STATEMENT):
+            self.tracer.emit(TRACE_STATEMENT, "statement", command=command.strip())
 
         bytecode = SQLParser.parse_to_bytecode(command)
-        print(f"DEBUG: Parsed bytecode: {bytecode}")
-        results = self.vm.execute_bytecode(bytecode)
-        result_output = "\n".join(results)
+        if (self.tracer.level >= TRACE_PLAN):
+            self.tracer.emit(TRACE_PLAN, "bytecode", instructions=bytecode)
+
+        results = self._run_bytecode(bytecode)
+        result_output = "\n".join(str(result) for result in results)
 
         end_time = time.time()  # Record the end time
         elapsed_time = end_time - start_time  # Calculate elapsed time
 
+        # Append the trace of this statement, if tracing is on
+        if (self.tracer.level >= TRACE_STATEMENT and self.tracer.events):
+            self.tracer.emit(TRACE_STATEMENT, "finished", elapsed=f"{elapsed_time:.4f}s")
+            result_output += "\n" + self.tracer.format_events()
+
         # Append execution time to the result
         result_output += f"\n(Execution time: {elapsed_time:.4f} seconds)"
         return result_output
-
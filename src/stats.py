@@ -0,0 +1,377 @@
+import math
+import zlib
+from bisect import bisect_left, bisect_right
+
+from .storage import ColumnStore
+
+# Registers of a HyperLogLog sketch are 2 ** HLL_PRECISION (standard error about 1.6%)
+HLL_PRECISION = 12
+# Buckets of the equi-depth histogram of a column
+HISTOGRAM_BUCKETS = 64
+# Rows the histograms of a larger table are built from, spread evenly over the table
+SAMPLE_ROWS = 30000
+# Values hashed into a sketch at a time; repeated values of a chunk are hashed once
+_CHUNK_ROWS = 65536
+
+# Selectivities assumed for conditions the statistics cannot estimate
+DEFAULT_EQ_SELECTIVITY = 0.1
+DEFAULT_RANGE_SELECTIVITY = 1 / 3
+DEFAULT_LIKE_SELECTIVITY = 0.1
+DEFAULT_NULL_SELECTIVITY = 0.05
+DEFAULT_SUBQUERY_SELECTIVITY = 0.5
+
+# Relative cost of evaluating a condition on a row, for ordering AND/OR terms
+_COSTS = {"cmp": 1.0, "is_null": 0.5, "in": 1.5, "between": 1.5, "like": 4.0, "in_select": 8.0}
+_SWAPPED = {"=": "=", "!=": "!=", "<": ">", ">": "<", "<=": ">=", ">=": "<="}
+_MASK64 = (1 << 64) - 1
+
+
+def _hash64(value):
+    """64-bit hash of a column value that is the same in every process"""
+    h = zlib.crc32(repr(value).encode("utf-8", "surrogatepass"))
+    # splitmix64 finalizer: spread the checksum over all 64 bits
+    h = (h + 0x9E3779B97F4A7C15) & _MASK64
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return h ^ (h >> 31)
+
+
+class HyperLogLog:
+    """
+    Sketch estimating the number of distinct values added to it in a fixed
+    2 ** precision bytes: every value is hashed, the leading bits of the
+    hash pick a register and the register keeps the longest run of leading
+    zeros seen in the remaining bits.
+
+    Args:
+        precision: Number of hash bits selecting a register
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        h = _hash64(value)
+        bits = 64 - self.precision
+        index = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if (rank > self.registers[index]):
+            self.registers[index] = rank
+
+    def update(self, values):
+        """Add an iterable of values"""
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """Combine with a sketch of the same precision, as if its values had been added"""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        """Estimated number of distinct values added"""
+        m = len(self.registers)
+        zeros = self.registers.count(0)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -rank for rank in self.registers)
+        # Few values: linear counting of the empty registers is more accurate
+        if (raw <= 2.5 * m and zeros):
+            return m * math.log(m / zeros)
+        return raw
+
+
+def _column_values(store, column):
+    if (isinstance(store, ColumnStore)):
+        return store.column(column)
+    return [row.get(column) for row in store]
+
+
+def analyze_column(values):
+    """
+    Collect the statistics of one column.
+
+    Args:
+        values: List of the column values, NULLs included
+
+    Returns:
+        Dict with null_fraction, distinct (HyperLogLog estimate of the non-NULL
+        values), min, max and histogram (HISTOGRAM_BUCKETS + 1 bounds of
+        equi-depth buckets over an evenly spread sample; empty if the values
+        do not compare)
+    """
+    sketch = HyperLogLog()
+    nulls = 0
+    for start in range(0, len(values), _CHUNK_ROWS):
+        chunk = values[start:start + _CHUNK_ROWS]
+        distinct = set(chunk)
+        if (None in distinct):
+            nulls += chunk.count(None)
+            distinct.discard(None)
+        sketch.update(distinct)
+    present = len(values) - nulls
+    stats = {"null_fraction": nulls / len(values) if values else 0.0,
+             "distinct": min(present, max(1, round(sketch.estimate()))) if present else 0,
+             "min": None, "max": None, "histogram": []}
+
+    step = max(1, len(values) // SAMPLE_ROWS)
+    sample = [value for value in values[::step] if value is not None]
+    try:
+        sample.sort()
+        stats["min"] = min(value for value in values if value is not None) if present else None
+        stats["max"] = max(value for value in values if value is not None) if present else None
+    except TypeError:
+        return stats
+    if (sample):
+        buckets = min(HISTOGRAM_BUCKETS, len(sample))
+        stats["histogram"] = [sample[i * len(sample) // buckets] for i in range(buckets)] + [sample[-1]]
+    return stats
+
+
+def analyze_table(store, columns):
+    """
+    Collect the statistics ANALYZE stores in table["statistics"].
+
+    Args:
+        store: The rows of the table (list of dicts or ColumnStore)
+        columns: Column names
+
+    Returns:
+        Dict with row_count and a dict of analyze_column results per column
+    """
+    return {"row_count": len(store),
+            "columns": {column: analyze_column(_column_values(store, column)) for column in columns}}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _fraction_below(column, value, inclusive):
+    """Estimated fraction of the non-NULL values below (or at most) value, from the histogram"""
+    bounds = column.get("histogram")
+    if (not bounds):
+        return None
+    buckets = len(bounds) - 1
+    try:
+        position = (bisect_right if inclusive else bisect_left)(bounds, value)
+    except TypeError:
+        return None
+    if (position == 0):
+        return 0.0
+    if (position > buckets):
+        return 1.0
+    low, high = bounds[position - 1], bounds[position]
+    within = 0.5
+    if (_is_number(value) and _is_number(low) and _is_number(high) and high > low):
+        within = (value - low) / (high - low)
+    return min(1.0, (position - 1 + within) / buckets)
+
+
+def _equal_fraction(column, value):
+    """Estimated fraction of all rows equal to value"""
+    present = 1 - column["null_fraction"]
+    if (not column["distinct"]):
+        return 0.0
+    try:
+        if (column["min"] is not None and (value < column["min"] or value > column["max"])):
+            return 0.0
+    except TypeError:
+        return DEFAULT_EQ_SELECTIVITY
+    fraction = present / column["distinct"]
+    bounds = column.get("histogram")
+    if (bounds and len(bounds) > 2):
+        # A value filling several buckets of the equi-depth histogram is frequent
+        try:
+            frequent = (bisect_right(bounds, value) - bisect_left(bounds, value) - 1) / (len(bounds) - 1)
+        except TypeError:
+            frequent = 0
+        fraction = max(fraction, frequent * present)
+    return fraction
+
+
+def range_fraction(column, low=None, high=None, include_low=True, include_high=True):
+    """
+    Estimated fraction of all rows whose value lies between low and high (None
+    for an open bound), or None if the histogram cannot tell
+    """
+    above = 0.0 if low is None else _fraction_below(column, low, not include_low)
+    below = 1.0 if high is None else _fraction_below(column, high, include_high)
+    if (above is None or below is None):
+        return None
+    return max(0.0, below - above) * (1 - column["null_fraction"])
+
+
+class Estimator:
+    """
+    Estimate the fraction of the rows of a table a WHERE condition keeps,
+    from the statistics ANALYZE collected. Conditions on columns without
+    statistics, and every condition when the table was not analyzed, get the
+    DEFAULT_*_SELECTIVITY fractions. Terms of an AND are assumed independent,
+    except range conditions on the same column, which are combined into one
+    range.
+
+    Args:
+        statistics: table["statistics"] dict, or None
+        compiler: PredicateCompiler of the table, to resolve columns and coerce literals
+    """
+
+    def __init__(self, statistics, compiler):
+        self.columns = (statistics or {}).get("columns", {})
+        self.compiler = compiler
+
+    def _column(self, node):
+        """(column key, statistics dict or None) of a column operand, or (None, None)"""
+        node = self.compiler._resolve(node)
+        if (node[0] != "col"):
+            return None, None
+        return node[1], self.columns.get(node[1])
+
+    def _literal(self, column, node):
+        node = self.compiler._resolve(node)
+        if (node[0] != "lit"):
+            return None, False
+        return self.compiler._coerce(("col", column), node[1]), True
+
+    def _comparison(self, node):
+        """(op, column key, column statistics, literal) of a column-op-literal term, or None"""
+        op, left, right = node[1], node[2], node[3]
+        column, stats = self._column(left)
+        if (column is None):
+            column, stats = self._column(right)
+            left, right, op = right, left, _SWAPPED[op]
+        if (column is None):
+            return None
+        value, is_literal = self._literal(column, right)
+        if (not is_literal):
+            return None
+        return op, column, stats, value
+
+    def selectivity(self, node):
+        """Estimated fraction of the rows a condition keeps, between 0 and 1"""
+        kind = node[0]
+        if (kind == "and"):
+            return self._and_selectivity(node[1])
+        if (kind == "or"):
+            missed = 1.0
+            for child in node[1]:
+                missed *= 1 - self.selectivity(child)
+            return 1 - missed
+        if (kind == "not"):
+            return 1 - self.selectivity(node[1])
+        if (kind == "cmp"):
+            return self._cmp_selectivity(node)
+        if (kind == "in"):
+            column, stats = self._column(node[1])
+            if (stats is None):
+                fraction = min(1.0, DEFAULT_EQ_SELECTIVITY * len(node[2]))
+            else:
+                values = [self._literal(column, value) for value in node[2]]
+                fraction = min(1 - stats["null_fraction"],
+                               sum(_equal_fraction(stats, value) if is_literal else DEFAULT_EQ_SELECTIVITY
+                                   for value, is_literal in values))
+            return self._negate(stats, fraction) if node[3] else fraction
+        if (kind == "between"):
+            column, stats = self._column(node[1])
+            fraction = None
+            if (stats is not None):
+                low, low_literal = self._literal(column, node[2])
+                high, high_literal = self._literal(column, node[3])
+                if (low_literal and high_literal and low is not None and high is not None):
+                    fraction = range_fraction(stats, low, high)
+            if (fraction is None):
+                fraction = DEFAULT_RANGE_SELECTIVITY / 2
+            return self._negate(stats, fraction) if node[4] else fraction
+        if (kind == "is_null"):
+            _, stats = self._column(node[1])
+            fraction = DEFAULT_NULL_SELECTIVITY if stats is None else stats["null_fraction"]
+            return 1 - fraction if node[2] else fraction
+        if (kind == "like"):
+            return 1 - DEFAULT_LIKE_SELECTIVITY if node[3] else DEFAULT_LIKE_SELECTIVITY
+        if (kind == "in_select"):
+            return DEFAULT_SUBQUERY_SELECTIVITY
+        return 1.0
+
+    @staticmethod
+    def _negate(stats, fraction):
+        """NOT of a condition that never holds for NULLs"""
+        return max(0.0, (1 - (0 if stats is None else stats["null_fraction"])) - fraction)
+
+    def _cmp_selectivity(self, node):
+        comparison = self._comparison(node)
+        if (comparison is None):
+            # Two columns: equal about as often as one value in DEFAULT_EQ_SELECTIVITY
+            return DEFAULT_EQ_SELECTIVITY if node[1] == "=" else 1 - DEFAULT_EQ_SELECTIVITY if node[1] == "!=" else DEFAULT_RANGE_SELECTIVITY
+        op, _, stats, value = comparison
+        if (value is None):
+            return 0.0
+        if (op in ("=", "!=")):
+            fraction = DEFAULT_EQ_SELECTIVITY if stats is None else _equal_fraction(stats, value)
+            return fraction if op == "=" else self._negate(stats, fraction)
+        fraction = None
+        if (stats is not None):
+            if (op in ("<", "<=")):
+                fraction = range_fraction(stats, high=value, include_high=op == "<=")
+            else:
+                fraction = range_fraction(stats, low=value, include_low=op == ">=")
+        return DEFAULT_RANGE_SELECTIVITY if fraction is None else fraction
+
+    def _and_selectivity(self, children):
+        fraction = 1.0
+        ranges = {}
+        for child in children:
+            comparison = self._comparison(child) if child[0] == "cmp" and child[1] in ("<", "<=", ">", ">=") else None
+            if (comparison is not None and comparison[2] is not None and comparison[3] is not None):
+                ranges.setdefault(comparison[1], []).append(comparison)
+            else:
+                fraction *= self.selectivity(child)
+        for terms in ranges.values():
+            stats = terms[0][2]
+            low = high = None
+            include_low = include_high = True
+            try:
+                for op, _, _, value in terms:
+                    if (op in (">", ">=") and (low is None or value > low or (value == low and op == ">"))):
+                        low, include_low = value, op == ">="
+                    elif (op in ("<", "<=") and (high is None or value < high or (value == high and op == "<"))):
+                        high, include_high = value, op == "<="
+                combined = range_fraction(stats, low, high, include_low, include_high)
+            except TypeError:
+                combined = None
+            fraction *= DEFAULT_RANGE_SELECTIVITY if combined is None else combined
+        return fraction
+
+    def rows(self, node, row_count):
+        """Estimated number of rows of row_count a condition keeps"""
+        return row_count * self.selectivity(node)
+
+    def order(self, node):
+        """
+        Reorder the terms of the ANDs and ORs of a condition so the cheap
+        terms that decide the result most often run first: AND terms by
+        cost / (1 - selectivity), OR terms by cost / selectivity. Evaluation
+        stops at the first false AND term or true OR term, so the result is
+        the same.
+        """
+        kind = node[0]
+        if (kind in ("and", "or")):
+            children = [self.order(child) for child in node[1]]
+            ranks = []
+            for child in children:
+                selectivity = self.selectivity(child)
+                decides = 1 - selectivity if kind == "and" else selectivity
+                ranks.append(cost(child) / decides if decides > 0 else math.inf)
+            return (kind, tuple(child for _, child in sorted(zip(ranks, children), key=lambda item: item[0])))
+        if (kind == "not"):
+            return ("not", self.order(node[1]))
+        return node
+
+
+def cost(node):
+    """Relative cost of evaluating a condition on one row"""
+    kind = node[0]
+    if (kind in ("and", "or")):
+        return sum(cost(child) for child in node[1])
+    if (kind == "not"):
+        return cost(node[1])
+    if (kind == "in"):
+        return _COSTS["in"] + len(node[2]) / 100
+    return _COSTS.get(kind, 1.0)
@@ -0,0 +1,433 @@
+import re
+from array import array
+from collections.abc import Mapping
+
+# Storage engines a table can use. ROW tables keep table["rows"] as a list of
+# dicts; COLUMNAR tables keep a ColumnStore with one typed vector per column;
+# MMAP tables keep a MappedStore reading the columns from a memory-mapped file.
+ROW_ENGINE = "ROW"
+COLUMNAR_ENGINE = "COLUMNAR"
+MMAP_ENGINE = "MMAP"
+ENGINES = (ROW_ENGINE, COLUMNAR_ENGINE, MMAP_ENGINE)
+
+# array typecodes for the fixed-width column types
+_TYPECODES = {"INT": "q", "FLOAT": "d", "BOOL": "b"}
+
+
+def _base_type(typ):
+    match = re.match(r'(\w+)', typ or "")
+    return match.group(1).upper() if match else "TEXT"
+
+
+class NumericVector:
+    """INT/FLOAT/BOOL column stored in a typed array plus a null bitmap"""
+
+    def __init__(self, base_type):
+        self.base_type = base_type
+        self.typecode = _TYPECODES[base_type]
+        self.data = array(self.typecode)
+        self.nulls = bytearray()
+
+    def append(self, value):
+        if (value is None):
+            self.data.append(0)
+            self.nulls.append(1)
+        else:
+            self.data.append(value)
+            self.nulls.append(0)
+
+    def extend(self, values):
+        """Append a list of values; nothing is appended if one does not fit the array"""
+        if (None in values):
+            data = array(self.typecode, [0 if value is None else value for value in values])
+            nulls = bytes(value is None for value in values)
+        else:
+            data = array(self.typecode, values)
+            nulls = bytes(len(values))
+        self.data.extend(data)
+        self.nulls.extend(nulls)
+
+    def get(self, pos):
+        if (self.nulls[pos]):
+            return None
+        if (self.base_type == "BOOL"):
+            return bool(self.data[pos])
+        return self.data[pos]
+
+    def set(self, pos, value):
+        if (value is None):
+            self.data[pos] = 0
+            self.nulls[pos] = 1
+        else:
+            self.data[pos] = value
+            self.nulls[pos] = 0
+
+    def values(self, start=None, stop=None):
+        data = self.data[start:stop]
+        nulls = self.nulls[start:stop]
+        if (self.base_type == "BOOL"):
+            data = [bool(value) for value in data]
+        if (any(nulls)):
+            return [None if null else value for value, null in zip(data, nulls)]
+        return list(data)
+
+    def keep(self, kept):
+        """Keep only the given positions, in order"""
+        data = self.data
+        nulls = self.nulls
+        self.data = array(self.typecode, [data[pos] for pos in kept])
+        self.nulls = bytearray(nulls[pos] for pos in kept)
+
+
+class DictionaryVector:
+    """
+    TEXT/VARCHAR column stored as dictionary codes: each distinct value is
+    kept once and rows hold an int32 code into the dictionary.
+    """
+
+    def __init__(self, base_type):
+        self.base_type = base_type
+        self.codes = array("i")
+        self.nulls = bytearray()
+        self.dictionary = []
+        self.lookup = {}
+
+    def _code(self, value):
+        code = self.lookup.get(value)
+        if (code is None):
+            code = len(self.dictionary)
+            self.dictionary.append(value)
+            self.lookup[value] = code
+        return code
+
+    def append(self, value):
+        if (value is None):
+            self.codes.append(0)
+            self.nulls.append(1)
+        else:
+            self.codes.append(self._code(value))
+            self.nulls.append(0)
+
+    def extend(self, values):
+        lookup = self.lookup
+        codes = [0 if value is None else lookup.get(value) for value in values]
+        if (None in codes):
+            # Add the new values to the dictionary in order of first appearance
+            new_values = [value for value in dict.fromkeys(values) if value is not None and value not in lookup]
+            lookup.update(zip(new_values, range(len(self.dictionary), len(self.dictionary) + len(new_values))))
+            self.dictionary.extend(new_values)
+            codes = [0 if value is None else lookup[value] for value in values]
+        self.codes.extend(array("i", codes))
+        self.nulls.extend(bytes(value is None for value in values) if None in values else bytes(len(values)))
+
+    def get(self, pos):
+        if (self.nulls[pos]):
+            return None
+        return self.dictionary[self.codes[pos]]
+
+    def set(self, pos, value):
+        if (value is None):
+            self.codes[pos] = 0
+            self.nulls[pos] = 1
+        else:
+            self.codes[pos] = self._code(value)
+            self.nulls[pos] = 0
+
+    def values(self, start=None, stop=None):
+        dictionary = self.dictionary
+        codes = self.codes[start:stop]
+        nulls = self.nulls[start:stop]
+        if (any(nulls)):
+            return [None if null else dictionary[code] for code, null in zip(codes, nulls)]
+        return [dictionary[code] for code in codes]
+
+    def keep(self, kept):
+        """Keep only the given positions, in order, and drop unused dictionary entries"""
+        values = [None if self.nulls[pos] else self.dictionary[self.codes[pos]] for pos in kept]
+        self.codes = array("i")
+        self.nulls = bytearray()
+        self.dictionary = []
+        self.lookup = {}
+        for value in values:
+            self.append(value)
+
+
+class ObjectVector:
+    """Fallback column for values that do not fit the typed vectors"""
+
+    def __init__(self, base_type, values=()):
+        self.base_type = base_type
+        self.data = list(values)
+
+    def append(self, value):
+        self.data.append(value)
+
+    def extend(self, values):
+        self.data.extend(values)
+
+    def get(self, pos):
+        return self.data[pos]
+
+    def set(self, pos, value):
+        self.data[pos] = value
+
+    def values(self, start=None, stop=None):
+        return self.data[start:stop]
+
+    def keep(self, kept):
+        data = self.data
+        self.data = [data[pos] for pos in kept]
+
+
+def make_vector(typ):
+    """Create the vector used to store a column of the given SQL type"""
+    base_type = _base_type(typ)
+    if (base_type in _TYPECODES):
+        return NumericVector(base_type)
+    if (base_type in ("TEXT", "CHAR", "VARCHAR")):
+        return DictionaryVector(base_type)
+    return ObjectVector(base_type)
+
+
+class RowView(Mapping):
+    """
+    Dict-like view of one row of a ColumnStore, so code written against
+    row dicts (row.get(col), row[col] = value) works on columnar tables.
+    """
+
+    __slots__ = ("store", "pos")
+
+    def __init__(self, store, pos):
+        self.store = store
+        self.pos = pos
+
+    def get(self, column, default=None):
+        vector = self.store.vectors.get(column)
+        if (vector is None):
+            return default
+        return vector.get(self.pos)
+
+    def __getitem__(self, column):
+        vector = self.store.vectors.get(column)
+        if (vector is None):
+            raise KeyError(column)
+        return vector.get(self.pos)
+
+    def __setitem__(self, column, value):
+        self.store.set(self.pos, column, value)
+
+    def __contains__(self, column):
+        return column in self.store.vectors
+
+    def __iter__(self):
+        return iter(self.store.vectors)
+
+    def __len__(self):
+        return len(self.store.vectors)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ColumnStore:
+    """
+    Columnar row storage used by tables created with ENGINE=COLUMNAR.
+
+    INT/FLOAT/BOOL columns live in typed arrays and TEXT/VARCHAR columns in
+    dictionary-encoded arrays, each with a null bitmap. The store behaves like
+    the list of row dicts it replaces (len, iteration, indexing, append), with
+    rows exposed as RowView objects, so the rest of the engine works on it
+    unchanged. Scans that only need a few columns can read them whole with
+    column().
+
+    Args:
+        columns: Column names in table order
+        types: Dict mapping column names to SQL types
+        rows: Optional row dicts to load
+    """
+
+    engine = COLUMNAR_ENGINE
+
+    def __init__(self, columns, types, rows=()):
+        self.vectors = {col: make_vector(types.get(col)) for col in columns}
+        self.length = 0
+        for row in rows:
+            self.append(row)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for pos in range(self.length):
+            yield RowView(self, pos)
+
+    def __getitem__(self, pos):
+        if (pos < 0):
+            pos += self.length
+        if (not 0 <= pos < self.length):
+            raise IndexError("row position out of range")
+        return RowView(self, pos)
+
+    def append(self, row):
+        for column, vector in self.vectors.items():
+            value = row.get(column)
+            try:
+                vector.append(value)
+            except (TypeError, OverflowError):
+                self._widen(column).append(value)
+        self.length += 1
+
+    def extend(self, rows):
+        """Append several row dicts"""
+        rows = list(rows)
+        self.extend_columns({column: [row.get(column) for row in rows] for column in self.vectors}, len(rows))
+
+    def extend_columns(self, column_values, count):
+        """
+        Append `count` rows given as one list of values per column; columns
+        left out are NULL.
+        """
+        for column in list(self.vectors):
+            values = column_values.get(column)
+            if (values is None):
+                values = [None] * count
+            try:
+                self.vectors[column].extend(values)
+            except (TypeError, OverflowError):
+                self._widen(column).extend(values)
+        self.length += count
+
+    def set(self, pos, column, value):
+        vector = self.vectors.get(column)
+        if (vector is None):
+            raise KeyError(column)
+        try:
+            vector.set(pos, value)
+        except (TypeError, OverflowError):
+            self._widen(column).set(pos, value)
+
+    def _widen(self, column):
+        """Replace a typed vector by an ObjectVector when a value does not fit it"""
+        vector = self.vectors[column]
+        widened = ObjectVector(vector.base_type, vector.values())
+        self.vectors[column] = widened
+        return widened
+
+    def column(self, column, start=None, stop=None):
+        """Return the values of a column as a list, optionally only rows start to stop"""
+        vector = self.vectors.get(column)
+        if (vector is None):
+            return [None] * len(range(self.length)[start:stop])
+        return vector.values(start, stop)
+
+    def scan(self, columns):
+        """Yield one dict per row holding only the given columns"""
+        if (not columns):
+            for _ in range(self.length):
+                yield {}
+            return
+        vectors = [self.column(col) for col in columns]
+        for values in zip(*vectors):
+            yield dict(zip(columns, values))
+
+    def delete_positions(self, positions):
+        """Remove the rows at the given positions"""
+        deleted = set(positions)
+        kept = [pos for pos in range(self.length) if pos not in deleted]
+        for vector in self.vectors.values():
+            vector.keep(kept)
+        self.length = len(kept)
+
+    def add_column(self, column, typ):
+        vector = make_vector(typ)
+        for _ in range(self.length):
+            vector.append(None)
+        self.vectors[column] = vector
+
+    def drop_column(self, column):
+        self.vectors.pop(column, None)
+
+    def retype(self, column, typ):
+        """Store a column with the vector of a new type, keeping its values"""
+        values = self.vectors[column].values()
+        vector = make_vector(typ)
+        try:
+            for value in values:
+                vector.append(value)
+        except (TypeError, OverflowError):
+            vector = ObjectVector(_base_type(typ), values)
+        self.vectors[column] = vector
+
+    def to_rows(self):
+        """Return the rows as a list of dicts"""
+        columns = list(self.vectors)
+        return [dict(zip(columns, values)) for values in zip(*(self.column(col) for col in columns))] \
+            if columns else [{} for _ in range(self.length)]
+
+
+def table_engine(table):
+    """Return the storage engine name of a table"""
+    return getattr(table["rows"], "engine", ROW_ENGINE)
+
+
+def convert_storage(table, engine, path=None):
+    """
+    Move the rows of a table to the given storage engine.
+
+    Args:
+        table: Table dictionary
+        engine: Target engine name
+        path: File of the rows when the target engine is MMAP
+    """
+    from .mapped import MappedStore
+
+    rows = table["rows"]
+    current = table_engine(table)
+    if (engine == MMAP_ENGINE):
+        if (current == MMAP_ENGINE and rows.path == path):
+            rows.flush()
+        else:
+            table["rows"] = MappedStore.create(path, table["columns"], table.get("types", {}), rows)
+    elif (engine == current):
+        return
+    elif (engine == COLUMNAR_ENGINE):
+        store = ColumnStore(table["columns"], table.get("types", {}))
+        if (isinstance(rows, ColumnStore)):
+            store.extend_columns({col: rows.column(col) for col in rows.vectors}, len(rows))
+        else:
+            store.extend(rows)
+        table["rows"] = store
+    elif (engine == ROW_ENGINE):
+        table["rows"] = rows.to_rows()
+    if (current == MMAP_ENGINE and table["rows"] is not rows):
+        rows.discard()
+
+
+def delete_rows(table, positions):
+    """Remove the rows at the given positions from a table of any engine"""
+    rows = table["rows"]
+    if (isinstance(rows, ColumnStore)):
+        rows.delete_positions(positions)
+    else:
+        deleted = set(positions)
+        table["rows"] = [row for pos, row in enumerate(rows) if pos not in deleted]
+
+
+def add_column(table, column, typ):
+    """Add a column holding NULL in every existing row"""
+    rows = table["rows"]
+    if (isinstance(rows, ColumnStore)):
+        rows.add_column(column, typ)
+    else:
+        for row in rows:
+            row[column] = None
+
+
+def drop_column(table, column):
+    """Remove a column from every row"""
+    rows = table["rows"]
+    if (isinstance(rows, ColumnStore)):
+        rows.drop_column(column)
+    else:
+        for row in rows:
+            row.pop(column, None)
@@ -0,0 +1,70 @@
+import time
+
+# Trace levels, from least to most verbose
+TRACE_OFF = 0
+TRACE_STATEMENT = 1
+TRACE_PLAN = 2
+TRACE_ROW = 3
+
+TRACE_LEVELS = {
+    "OFF": TRACE_OFF,
+    "STATEMENT": TRACE_STATEMENT,
+    "PLAN": TRACE_PLAN,
+    "ROW": TRACE_ROW,
+}
+
+
+class Tracer:
+    """
+    Structured tracing for statement execution.
+
+    Events are collected per statement as (level, event, fields) records and
+    handed to any registered sinks. Call sites guard on `tracer.level` before
+    building an event, so a disabled tracer costs one integer comparison:
+
+        if (self.tracer.level >= TRACE_PLAN):
+            self.tracer.emit(TRACE_PLAN, "scan", table=table_name)
+    """
+
+    def __init__(self, level=TRACE_OFF):
+        self.level = level
+        self.events = []
+        self.sinks = []
+
+    def set_level(self, name):
+        """
+        Set the trace level by name (OFF, STATEMENT, PLAN or ROW).
+
+        Returns:
+            Status message
+        """
+        level_name = str(name).strip().strip("'\"").upper()
+        if (level_name not in TRACE_LEVELS):
+            return f"Error: Unknown trace level '{name}'. Use one of: {', '.join(TRACE_LEVELS)}."
+        self.level = TRACE_LEVELS[level_name]
+        return f"Trace level set to {level_name}."
+
+    def add_sink(self, sink):
+        """Register a callable receiving every event dict, e.g. to forward to logging"""
+        self.sinks.append(sink)
+
+    def begin_statement(self):
+        """Start collecting events for a new statement"""
+        self.events = []
+
+    def emit(self, level, event, **fields):
+        if (self.level < level):
+            return
+        record = {"level": level, "event": event, "time": time.time(), "fields": fields}
+        self.events.append(record)
+        for sink in self.sinks:
+            sink(record)
+
+    def format_events(self):
+        """Render the events of the current statement as console lines"""
+        names = {value: name for name, value in TRACE_LEVELS.items()}
+        lines = []
+        for record in self.events:
+            fields = ", ".join(f"{key}={value}" for key, value in record["fields"].items())
+            lines.append(f"[TRACE {names[record['level']].lower()}] {record['event']}: {fields}")
+        return "\n".join(lines)
@@ -0,0 +1,437 @@
+import re
+
+from .index import HashIndex
+from .opcodes import VDBE_OPCODES
+from .expression import _SWAPPED, format_node
+from .join import value_getter
+
+OP_INIT = VDBE_OPCODES["Init"]
+OP_GOTO = VDBE_OPCODES["Goto"]
+OP_HALT = VDBE_OPCODES["Halt"]
+OP_OPEN_READ = VDBE_OPCODES["OpenRead"]
+OP_REWIND = VDBE_OPCODES["Rewind"]
+OP_SEEK_INDEX = VDBE_OPCODES["SeekIndex"]
+OP_NEXT = VDBE_OPCODES["Next"]
+OP_COLUMN = VDBE_OPCODES["Column"]
+OP_CONSTANT = VDBE_OPCODES["Constant"]
+OP_EQ = VDBE_OPCODES["Eq"]
+OP_NE = VDBE_OPCODES["Ne"]
+OP_LT = VDBE_OPCODES["Lt"]
+OP_LE = VDBE_OPCODES["Le"]
+OP_GT = VDBE_OPCODES["Gt"]
+OP_GE = VDBE_OPCODES["Ge"]
+OP_IS_NULL = VDBE_OPCODES["IsNull"]
+OP_NOT_NULL = VDBE_OPCODES["NotNull"]
+OP_FUNCTION = VDBE_OPCODES["Function"]
+OP_IF_POS = VDBE_OPCODES["IfPos"]
+OP_DECR_JUMP_ZERO = VDBE_OPCODES["DecrJumpZero"]
+OP_RESULT_ROW = VDBE_OPCODES["ResultRow"]
+
+_OPCODE_NAMES = {code: name for name, code in VDBE_OPCODES.items()}
+# Comparison opcode of each operator, and of its negation (taken when the operands are not NULL)
+_COMPARE_OPCODES = {"=": OP_EQ, "!=": OP_NE, "<": OP_LT, "<=": OP_LE, ">": OP_GT, ">=": OP_GE}
+_NEGATED = {"=": "!=", "!=": "=", "<": ">=", ">=": "<", ">": "<=", "<=": ">"}
+# Flags of p3: compare opcodes jump when the register is NULL (JUMP_NULL) or
+# cannot be compared with the constant (JUMP_TYPE_ERROR); Function jumps when
+# the predicate is unknown (JUMP_NULL), and when it is true with JUMP_TRUE,
+# false otherwise
+JUMP_NULL = 1
+JUMP_TYPE_ERROR = 2
+JUMP_TRUE = 4
+
+
+def index_seek(index, key):
+    """
+    Function returning the ascending positions of the rows with a key in a
+    PRIMARY KEY/UNIQUE hash index or a single-column ordered index. Its
+    count attribute returns the number of rows it would return, without
+    reading them. Raises TypeError if the key cannot be looked up.
+    """
+    if (isinstance(index, HashIndex)):
+        lookup = index.lookup
+        hash(key)
+        seek = lambda: [] if (pos := lookup(key)) is None else [pos]
+        seek.count = lambda: 0 if lookup(key) is None else 1
+    else:
+        hash(key)
+        seek = lambda: sorted(index.postings.get(key, ()))
+        seek.count = lambda: len(index.postings.get(key, ()))
+    seek.index_name = index.name
+    return seek
+
+
+class Program:
+    """
+    A SELECT compiled into instructions of the register-based VDBE.
+
+    Programs are cached and run again for the same statement while the
+    table, its rows, columns, types, indexes and statistics are the ones
+    they were compiled against.
+
+    Args:
+        instructions: List of (opcode, p1, p2, p3, p4) tuples
+        registers: Number of registers the program uses
+        columns: Names of the result columns
+        types: SQL types of the result columns
+        reads: Function returning the most rows a run reads (see SQLVM._select_program)
+        comments: Optional note per instruction shown by listing() (e.g. the column read)
+    """
+
+    def __init__(self, instructions, registers, columns, types, reads=None, comments=None):
+        self.instructions = instructions
+        self.comments = comments or [""] * len(instructions)
+        self.registers = registers
+        self.columns = columns
+        self.types = types
+        self.reads = reads
+
+    def listing(self):
+        """The instructions as lines of address, opcode and operands, for debugging"""
+        lines = []
+        for address, ((opcode, p1, p2, p3, p4), comment) in enumerate(zip(self.instructions, self.comments)):
+            if (p4 is None or callable(p4)):
+                p4 = ""
+            elif (not isinstance(p4, (int, float, str))):
+                p4 = type(p4).__name__
+            else:
+                p4 = repr(p4)
+            lines.append(f"{address:<4} {_OPCODE_NAMES[opcode]:<13} {p1:<3} {p2:<4} {p3:<3} {p4:<12} {comment}".rstrip())
+        return lines
+
+
+class ProgramBuilder:
+    """
+    Emit instructions for a program. Forward jumps go to labels, negative
+    placeholders that are replaced by the address of the label once known.
+    """
+
+    def __init__(self):
+        self.instructions = []
+        self.comments = []
+        self.labels = []
+        self.registers = 0
+
+    def emit(self, opcode, p1=0, p2=0, p3=0, p4=None, comment=""):
+        self.instructions.append([opcode, p1, p2, p3, p4])
+        self.comments.append(comment)
+        return len(self.instructions) - 1
+
+    def label(self):
+        self.labels.append(None)
+        return -len(self.labels)
+
+    def place(self, label):
+        """Make a label point at the next instruction"""
+        self.labels[-label - 1] = len(self.instructions)
+
+    def register(self):
+        self.registers += 1
+        return self.registers - 1
+
+    def finish(self):
+        """Resolve the labels and return the instructions as tuples"""
+        for instruction in self.instructions:
+            if (instruction[2] < 0):
+                instruction[2] = self.labels[-instruction[2] - 1]
+        return [tuple(instruction) for instruction in self.instructions]
+
+
+def compile_select(table_name, store, columns, node, compiler, limit=None, offset=0, seek=None):
+    """
+    Compile a single-table SELECT into a program: walk the rows (or seek the
+    ones an index holds for a key), test the WHERE clause, skip OFFSET rows,
+    read the selected columns into registers and emit them, stopping after
+    LIMIT rows.
+
+    Comparisons of a column with a literal, IS [NOT] NULL, BETWEEN, AND, OR
+    and NOT become jumps over the rest of the loop body; other conditions
+    (IN, LIKE, comparisons of two columns) call the predicate the
+    PredicateCompiler builds for them.
+
+    Args:
+        table_name: Table being read
+        store: Rows of the table (list of dicts or ColumnStore)
+        columns: Names of the selected columns
+        node: WHERE clause AST, or None
+        compiler: PredicateCompiler of the table
+        limit: Optional maximum number of rows
+        offset: Number of matching rows to skip
+        seek: Optional function returning the positions to read, from index_seek
+
+    Returns:
+        Tuple of (instructions, number of registers, comments)
+    """
+    builder = ProgramBuilder()
+    getters = {}
+
+    def column(name):
+        if (name not in getters):
+            getters[name] = value_getter(store, name)
+        return getters[name]
+
+    start = builder.label()
+    halt = builder.label()
+    builder.emit(OP_INIT, 0, start)
+    builder.place(start)
+    if (limit == 0):
+        builder.emit(OP_GOTO, 0, halt)
+    scratch = builder.register()
+    first = builder.registers
+    for _ in columns:
+        builder.register()
+    builder.emit(OP_OPEN_READ, 0, 0, 0, store, table_name)
+    if (limit is not None):
+        limit_register = builder.register()
+        builder.emit(OP_CONSTANT, 0, limit_register, 0, limit)
+    if (offset):
+        offset_register = builder.register()
+        builder.emit(OP_CONSTANT, 0, offset_register, 0, offset)
+    if (seek is not None):
+        builder.emit(OP_SEEK_INDEX, 0, halt, 0, seek, getattr(seek, "index_name", ""))
+    else:
+        builder.emit(OP_REWIND, 0, halt)
+    loop = len(builder.instructions)
+    next_row = builder.label()
+    if (node is not None):
+        # Skip the row unless the condition is true: when it is false or unknown
+        _condition(builder, compiler, node, next_row, False, True, scratch, column)
+    if (offset):
+        builder.emit(OP_IF_POS, offset_register, next_row)
+    for register, name in enumerate(columns, first):
+        builder.emit(OP_COLUMN, 0, register, 0, column(name), name)
+    builder.emit(OP_RESULT_ROW, first, len(columns))
+    if (limit is not None):
+        builder.emit(OP_DECR_JUMP_ZERO, limit_register, halt)
+    builder.place(next_row)
+    builder.emit(OP_NEXT, 0, loop)
+    builder.place(halt)
+    builder.emit(OP_HALT)
+    return builder.finish(), builder.registers, builder.comments
+
+
+def _condition(builder, compiler, node, target, jump_if, jump_null, scratch, column):
+    """
+    Emit the code of a condition: jump to target when it evaluates to
+    jump_if, or is unknown (NULL) and jump_null is set; fall through
+    otherwise. Conditions are three-valued as in PredicateCompiler: a
+    comparison with NULL is unknown and NOT of it unknown too. column is a
+    function column name -> function position -> value.
+    """
+    kind = node[0]
+    if (kind in ("and", "or")):
+        # AND is false when a term is false and OR true when one is true; the
+        # other outcome needs every term, so the leading terms skip to done
+        # when they decide it cannot happen
+        if (jump_if == (kind == "or")):
+            for child in node[1]:
+                _condition(builder, compiler, child, target, jump_if, jump_null, scratch, column)
+        else:
+            done = builder.label()
+            for child in node[1][:-1]:
+                _condition(builder, compiler, child, done, not jump_if, not jump_null, scratch, column)
+            _condition(builder, compiler, node[1][-1], target, jump_if, jump_null, scratch, column)
+            builder.place(done)
+        return
+    if (kind == "not"):
+        _condition(builder, compiler, node[1], target, not jump_if, jump_null, scratch, column)
+        return
+    if (kind == "between"):
+        inner = ("and", (("cmp", ">=", node[1], node[2]), ("cmp", "<=", node[1], node[3])))
+        _condition(builder, compiler, ("not", inner) if node[4] else inner, target, jump_if, jump_null, scratch, column)
+        return
+    if (kind == "cmp"):
+        op, left, right = node[1], compiler._resolve(node[2]), compiler._resolve(node[3])
+        if (left[0] == "lit" and right[0] == "col"):
+            left, right, op = right, left, _SWAPPED[op]
+        if (left[0] == "col" and right[0] == "lit"):
+            value = compiler._coerce(left, right[1])
+            if (value is None):
+                # Comparing with NULL is unknown
+                if (jump_null):
+                    builder.emit(OP_GOTO, 0, target)
+                return
+            builder.emit(OP_COLUMN, 0, scratch, 0, column(left[1]), left[1])
+            flags = JUMP_NULL if jump_null else 0
+            if (jump_if):
+                builder.emit(_COMPARE_OPCODES[op], scratch, target, flags, value)
+            else:
+                # Values that cannot be compared make the comparison false
+                builder.emit(_COMPARE_OPCODES[_NEGATED[op]], scratch, target, flags | JUMP_TYPE_ERROR, value)
+            return
+    if (kind == "is_null"):
+        operand = compiler._resolve(node[1])
+        if (operand[0] == "col"):
+            builder.emit(OP_COLUMN, 0, scratch, 0, column(operand[1]), operand[1])
+            # node[2] is True for IS NOT NULL
+            builder.emit(OP_NOT_NULL if node[2] == jump_if else OP_IS_NULL, scratch, target)
+            return
+    predicate = compiler.compile(node)
+    flags = (JUMP_TRUE if jump_if else 0) | (JUMP_NULL if jump_null else 0)
+    builder.emit(OP_FUNCTION, 0, target, flags, predicate, format_node(node))
+
+
+class VDBE:
+    """
+    Register-based virtual machine running compiled programs.
+
+    The dispatch loop fetches an instruction, looks its handler up in a
+    jump table indexed by opcode and continues at the address the handler
+    returns, until Halt. Registers hold values; a cursor walks the
+    positions of the rows of a table, from a Rewind over the whole table or
+    a SeekIndex on a key.
+    """
+
+    def __init__(self):
+        handlers = [None] * len(VDBE_OPCODES)
+        for name, opcode in VDBE_OPCODES.items():
+            handlers[opcode] = getattr(self, "_op_" + re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower())
+        self.handlers = handlers
+
+    def run(self, program):
+        """
+        Run a program.
+
+        Returns:
+            List of the result rows, as tuples
+        """
+        self.registers = [None] * program.registers
+        self.cursors = {}
+        self.rows = []
+        instructions = program.instructions
+        handlers = self.handlers
+        pc = 0
+        while pc >= 0:
+            opcode, p1, p2, p3, p4 = instructions[pc]
+            pc = handlers[opcode](p1, p2, p3, p4, pc)
+        rows, self.rows = self.rows, None
+        self.cursors = None
+        return rows
+
+    # Control flow
+    def _op_init(self, p1, p2, p3, p4, pc):
+        return p2
+
+    def _op_goto(self, p1, p2, p3, p4, pc):
+        return p2
+
+    def _op_halt(self, p1, p2, p3, p4, pc):
+        return -1
+
+    # Cursors: [store, positions, index of the current position, current position]
+    def _op_open_read(self, p1, p2, p3, p4, pc):
+        self.cursors[p1] = [p4, None, 0, None]
+        return pc + 1
+
+    def _op_rewind(self, p1, p2, p3, p4, pc):
+        cursor = self.cursors[p1]
+        return self._start(cursor, range(len(cursor[0])), p2, pc)
+
+    def _op_seek_index(self, p1, p2, p3, p4, pc):
+        return self._start(self.cursors[p1], p4(), p2, pc)
+
+    @staticmethod
+    def _start(cursor, positions, empty, pc):
+        if (not positions):
+            return empty
+        cursor[1] = positions
+        cursor[2] = 0
+        cursor[3] = positions[0]
+        return pc + 1
+
+    def _op_next(self, p1, p2, p3, p4, pc):
+        cursor = self.cursors[p1]
+        number = cursor[2] + 1
+        positions = cursor[1]
+        if (number < len(positions)):
+            cursor[2] = number
+            cursor[3] = positions[number]
+            return p2
+        return pc + 1
+
+    def _op_column(self, p1, p2, p3, p4, pc):
+        self.registers[p2] = p4(self.cursors[p1][3])
+        return pc + 1
+
+    def _op_constant(self, p1, p2, p3, p4, pc):
+        self.registers[p2] = p4
+        return pc + 1
+
+    # Comparisons of a register with the constant p4: jump to p2 if true;
+    # a NULL or incomparable value jumps if the flag of p3 is set
+    def _op_eq(self, p1, p2, p3, p4, pc):
+        value = self.registers[p1]
+        if (value is None):
+            return p2 if p3 & JUMP_NULL else pc + 1
+        return p2 if value == p4 else pc + 1
+
+    def _op_ne(self, p1, p2, p3, p4, pc):
+        value = self.registers[p1]
+        if (value is None):
+            return p2 if p3 & JUMP_NULL else pc + 1
+        return p2 if value != p4 else pc + 1
+
+    def _op_lt(self, p1, p2, p3, p4, pc):
+        value = self.registers[p1]
+        if (value is None):
+            return p2 if p3 & JUMP_NULL else pc + 1
+        try:
+            return p2 if value < p4 else pc + 1
+        except TypeError:
+            return p2 if p3 & JUMP_TYPE_ERROR else pc + 1
+
+    def _op_le(self, p1, p2, p3, p4, pc):
+        value = self.registers[p1]
+        if (value is None):
+            return p2 if p3 & JUMP_NULL else pc + 1
+        try:
+            return p2 if value <= p4 else pc + 1
+        except TypeError:
+            return p2 if p3 & JUMP_TYPE_ERROR else pc + 1
+
+    def _op_gt(self, p1, p2, p3, p4, pc):
+        value = self.registers[p1]
+        if (value is None):
+            return p2 if p3 & JUMP_NULL else pc + 1
+        try:
+            return p2 if value > p4 else pc + 1
+        except TypeError:
+            return p2 if p3 & JUMP_TYPE_ERROR else pc + 1
+
+    def _op_ge(self, p1, p2, p3, p4, pc):
+        value = self.registers[p1]
+        if (value is None):
+            return p2 if p3 & JUMP_NULL else pc + 1
+        try:
+            return p2 if value >= p4 else pc + 1
+        except TypeError:
+            return p2 if p3 & JUMP_TYPE_ERROR else pc + 1
+
+    def _op_is_null(self, p1, p2, p3, p4, pc):
+        return p2 if self.registers[p1] is None else pc + 1
+
+    def _op_not_null(self, p1, p2, p3, p4, pc):
+        return p2 if self.registers[p1] is not None else pc + 1
+
+    def _op_function(self, p1, p2, p3, p4, pc):
+        cursor = self.cursors[p1]
+        value = p4(cursor[0][cursor[3]])
+        if (value is None):
+            return p2 if p3 & JUMP_NULL else pc + 1
+        return p2 if bool(value) == bool(p3 & JUMP_TRUE) else pc + 1
+
+    # LIMIT and OFFSET counters
+    def _op_if_pos(self, p1, p2, p3, p4, pc):
+        registers = self.registers
+        if (registers[p1] > 0):
+            registers[p1] -= 1
+            return p2
+        return pc + 1
+
+    def _op_decr_jump_zero(self, p1, p2, p3, p4, pc):
+        registers = self.registers
+        registers[p1] -= 1
+        return p2 if registers[p1] == 0 else pc + 1
+
+    def _op_result_row(self, p1, p2, p3, p4, pc):
+        self.rows.append(tuple(self.registers[p1:p1 + p2]))
+        return pc + 1
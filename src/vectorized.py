@@ -0,0 +1,469 @@
+import operator
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it scans evaluate predicates row by row
+    np = None
+
+from .expression import column_refs
+from .storage import NumericVector, DictionaryVector
+from .mapped import MappedTextVector
+
+# Rows evaluated per batch
+BATCH_SIZE = 65536
+
+_COMPARISONS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+}
+
+_SWAPPED = {"=": "=", "!=": "!=", "<": ">", ">": "<", "<=": ">=", ">=": "<="}
+
+# Largest magnitude an INT literal may have to be compared inside an int64 vector
+_INT64_LIMIT = 2 ** 63
+
+
+def available():
+    """Return True if vectorized execution is possible (NumPy is installed)"""
+    return np is not None
+
+
+class ColumnBatch:
+    """
+    A range of rows of a ColumnStore, exposed as NumPy arrays.
+
+    Numeric columns are zero-copy views of the typed arrays (or of the
+    mapped file of an MMAP table); dictionary encoded columns expose their
+    codes. Views are only held while a batch is evaluated, since the
+    underlying arrays cannot grow while exported.
+    """
+
+    def __init__(self, store, start, stop):
+        self.store = store
+        self.start = start
+        self.stop = stop
+        self.size = stop - start
+        self.arrays = {}
+
+    def vector(self, key):
+        return self.store.vectors.get(key)
+
+    def nulls(self, key):
+        vector = self.store.vectors[key]
+        return np.frombuffer(vector.nulls, dtype=np.bool_)[self.start:self.stop]
+
+    def data(self, key):
+        """Values of a numeric column, or codes of a dictionary column"""
+        if (key not in self.arrays):
+            vector = self.store.vectors[key]
+            if (isinstance(vector, NumericVector)):
+                values = np.frombuffer(vector.data, dtype=vector.typecode)
+            else:
+                values = np.frombuffer(vector.codes, dtype=np.int32)
+            self.arrays[key] = values[self.start:self.stop]
+        return self.arrays[key]
+
+    def text(self, key):
+        """Byte offsets (rows + 1) and UTF-8 blob of a mapped TEXT column, as uint8/int64 arrays"""
+        vector = self.store.vectors[key]
+        offsets = np.frombuffer(vector.offsets, dtype=np.int64)[self.start:self.stop + 1]
+        return offsets, np.frombuffer(vector.blob, dtype=np.uint8)
+
+    def rows(self, columns):
+        """Yield dicts of the given columns for the rows of the batch (row-wise fallback)"""
+        vectors = [self.store.vectors[col] for col in columns]
+        for pos in range(self.start, self.stop):
+            yield {col: vector.get(pos) for col, vector in zip(columns, vectors)}
+
+
+class BatchCompiler:
+    """
+    Compile a WHERE AST into a function batch -> boolean selection mask.
+
+    Comparisons, AND/OR/NOT, IN lists, LIKE, IS NULL and BETWEEN on numeric
+    and dictionary-encoded columns become NumPy array operations. Predicates
+    on dictionary columns are evaluated once per distinct value and gathered
+    through the codes; equality and IN on the TEXT columns of a mapped file
+    compare the UTF-8 bytes in place. Anything else (subqueries, expressions on object
+    columns) is evaluated row by row for the batch with the row compiler, so
+    results always match the row-at-a-time path, including its NULL handling.
+
+    Args:
+        compiler: PredicateCompiler for the table, used for name resolution,
+            literal conversion and the row-wise fallback
+        store: ColumnStore being scanned
+    """
+
+    def __init__(self, compiler, store):
+        self.compiler = compiler
+        self.store = store
+
+    def compile(self, node, negated=False):
+        """
+        Compile a node into a function batch -> mask of the rows where it is
+        True, or where it is False when negated. Conditions are three-valued
+        like the row predicates: rows where a condition is unknown (NULL)
+        are in neither mask, so NOT is pushed down to the leaves instead of
+        inverting a mask.
+        """
+        kind = node[0]
+        if (kind in ("and", "or")):
+            parts = [self.compile(child, negated) for child in node[1]]
+            # NOT (a AND b) is NOT a OR NOT b, and NOT (a OR b) is NOT a AND NOT b
+            combine = np.logical_and if (kind == "and") != negated else np.logical_or
+
+            def combined(batch):
+                mask = parts[0](batch)
+                for part in parts[1:]:
+                    mask = combine(mask, part(batch))
+                return mask
+            return combined
+        if (kind == "not"):
+            return self.compile(node[1], not negated)
+        if (kind == "between"):
+            inner = ("and", (("cmp", ">=", node[1], node[2]), ("cmp", "<=", node[1], node[3])))
+            return self.compile(inner, negated != node[4])
+        if (kind in ("in", "like") and node[3]):
+            # x NOT IN (...) and x NOT LIKE p are the negations of IN and LIKE
+            return self.compile(node[:3] + (False,), not negated)
+
+        compiled = None
+        if (kind == "cmp"):
+            compiled = self._compile_cmp(node[1], self.compiler._resolve(node[2]), self.compiler._resolve(node[3]))
+        elif (kind == "in"):
+            compiled = self._compile_in(node)
+        elif (kind == "like"):
+            compiled = self._compile_like(node)
+        elif (kind == "is_null"):
+            compiled = self._compile_is_null(node)
+        if (compiled is None):
+            return self._fallback(("not", node) if negated else node)
+        matched, unknown = compiled
+        if (not negated):
+            return matched
+        return lambda batch: ~(matched(batch) | unknown(batch))
+
+    def _column(self, node):
+        """Return the row key of a resolved node if it is a typed column, else None"""
+        if (node[0] != "col"):
+            return None
+        vector = self.store.vectors.get(node[1])
+        if (isinstance(vector, (NumericVector, DictionaryVector))):
+            return node[1]
+        if (isinstance(vector, MappedTextVector) and vector.mapped):
+            return node[1]
+        return None
+
+    def _fallback(self, node):
+        """Evaluate a node row by row over the batch with the row compiler, keeping the rows where it is True"""
+        predicate = self.compiler.compile(node)
+        scope = self.compiler.scope
+        columns = list(dict.fromkeys(scope[ref] for ref in column_refs(node) if ref in scope))
+
+        def row_wise(batch):
+            return np.fromiter((predicate(row) is True for row in batch.rows(columns)), dtype=np.bool_, count=batch.size)
+        return row_wise
+
+    def _dictionary_mask(self, key, test):
+        """Evaluate test(value) once per dictionary entry and gather it through the codes"""
+        cache = {}
+
+        def dictionary_mask(batch):
+            vector = batch.vector(key)
+            # The dictionary does not change during a scan; test each entry once
+            if (cache.get("size") != len(vector.dictionary)):
+                cache["entries"] = np.fromiter((bool(test(value)) for value in vector.dictionary),
+                                               dtype=np.bool_, count=len(vector.dictionary))
+                cache["size"] = len(vector.dictionary)
+            entries = cache["entries"]
+            if (not len(entries)):
+                return np.zeros(batch.size, dtype=np.bool_)
+            return entries[batch.data(key)] & ~batch.nulls(key)
+        return dictionary_mask
+
+    def _text_mask(self, key, values, negated=False):
+        """
+        Match the rows of a mapped TEXT column equal to one of the given
+        strings, comparing byte by byte the rows of the same encoded length
+        """
+        encoded = [np.frombuffer(value.encode("utf-8", "surrogatepass"), dtype=np.uint8) for value in values]
+
+        def text_mask(batch):
+            offsets, blob = batch.text(key)
+            starts = offsets[:-1]
+            lengths = offsets[1:] - starts
+            found = np.zeros(batch.size, dtype=np.bool_)
+            for value in encoded:
+                candidates = np.flatnonzero(lengths == len(value))
+                for pos, byte in enumerate(value):
+                    if (not len(candidates)):
+                        break
+                    candidates = candidates[blob[starts[candidates] + pos] == byte]
+                found[candidates] = True
+            if (negated):
+                found = ~found
+            return found & ~batch.nulls(key)
+        return text_mask
+
+    # The leaves below return a pair of functions batch -> mask: the rows
+    # where the condition is True and the rows where it is unknown (NULL)
+    @staticmethod
+    def _nulls(*keys):
+        if (len(keys) == 1):
+            key = keys[0]
+            return lambda batch: batch.nulls(key)
+        return lambda batch: np.logical_or.reduce([batch.nulls(key) for key in keys])
+
+    def _compile_cmp(self, op, left, right):
+        if (left[0] == "lit" and right[0] == "col"):
+            left, right, op = right, left, _SWAPPED[op]
+        compare = _COMPARISONS[op]
+
+        # Column compared with a literal
+        key = self._column(left)
+        if (key is not None and right[0] == "lit"):
+            value = self.compiler._coerce(left, right[1])
+            if (value is None):
+                # Comparing with NULL is unknown for every row
+                return (lambda batch: np.zeros(batch.size, dtype=np.bool_),
+                        lambda batch: np.ones(batch.size, dtype=np.bool_))
+            nulls = self._nulls(key)
+            vector = self.store.vectors[key]
+            if (isinstance(vector, DictionaryVector)):
+                def test(entry):
+                    try:
+                        return compare(entry, value)
+                    except TypeError:
+                        return False
+                return self._dictionary_mask(key, test), nulls
+            if (isinstance(vector, MappedTextVector)):
+                if (op not in ("=", "!=") or not isinstance(value, str)):
+                    return None
+                return self._text_mask(key, [value], op == "!="), nulls
+
+            if (not isinstance(value, (int, float))):
+                # Numbers never equal other types and cannot be ordered against them
+                constant = op == "!="
+                return lambda batch: np.full(batch.size, constant, dtype=np.bool_) & ~batch.nulls(key), nulls
+            if (isinstance(value, int) and abs(value) >= _INT64_LIMIT):
+                return None
+
+            def numeric_compare(batch):
+                return compare(batch.data(key), value) & ~batch.nulls(key)
+            return numeric_compare, nulls
+
+        # Two numeric columns
+        other = self._column(right)
+        if (key is not None and other is not None
+                and isinstance(self.store.vectors[key], NumericVector)
+                and isinstance(self.store.vectors[other], NumericVector)):
+            def columns_compare(batch):
+                return compare(batch.data(key), batch.data(other)) & ~batch.nulls(key) & ~batch.nulls(other)
+            return columns_compare, self._nulls(key, other)
+        return None
+
+    def _compile_in(self, node):
+        expr = self.compiler._resolve(node[1])
+        key = self._column(expr)
+        if (key is None or any(value[0] != "lit" for value in node[2])):
+            return None
+        # The row compiler validates and converts the list (raising the usual errors)
+        self.compiler.compile(node)
+        literals = [value[1] for value in node[2] if value[1] is not None]
+        column_type = self.compiler.types.get(key)
+        if (column_type is not None):
+            literals = [self.compiler.convert(value, column_type) for value in literals]
+        try:
+            members = frozenset(literals)
+        except TypeError:
+            return None
+        matched = self._compile_members(key, members, literals)
+        if (matched is None):
+            return None
+        if (len(literals) != len(node[2])):
+            # A NULL in the list makes every value that is not found unknown
+            return matched, lambda batch: ~matched(batch)
+        return matched, self._nulls(key)
+
+    def _compile_members(self, key, members, literals):
+        """Mask of the rows of a column whose value is one of the (non-NULL) literals of an IN list"""
+        vector = self.store.vectors[key]
+        if (isinstance(vector, DictionaryVector)):
+            return self._dictionary_mask(key, lambda value: value in members)
+        if (isinstance(vector, MappedTextVector)):
+            if (not all(isinstance(value, str) for value in members)):
+                return None
+            return self._text_mask(key, list(members))
+
+        numbers = [value for value in literals
+                   if isinstance(value, (int, float)) and not (isinstance(value, int) and abs(value) >= _INT64_LIMIT)]
+        if (len(numbers) != len(literals)):
+            return None
+        dtype = np.float64 if any(isinstance(value, float) for value in numbers) else np.int64
+        numbers = np.array(numbers or [0], dtype=dtype)
+        empty = not literals
+
+        def in_list(batch):
+            if (empty):
+                return np.zeros(batch.size, dtype=np.bool_)
+            return np.isin(batch.data(key), numbers) & ~batch.nulls(key)
+        return in_list
+
+    def _compile_like(self, node):
+        expr = self.compiler._resolve(node[1])
+        key = self._column(expr)
+        if (key is None or not isinstance(self.store.vectors[key], DictionaryVector)):
+            return None
+        if (node[2][0] != "lit" or not isinstance(node[2][1], str)):
+            return None
+        # Reuse the row predicate on each distinct value
+        predicate = self.compiler.compile(node)
+        return self._dictionary_mask(key, lambda value: predicate({key: value})), self._nulls(key)
+
+    def _compile_is_null(self, node):
+        expr = self.compiler._resolve(node[1])
+        key = self._column(expr)
+        if (key is None):
+            return None
+        known = lambda batch: np.zeros(batch.size, dtype=np.bool_)
+        if (node[2]):
+            return (lambda batch: ~batch.nulls(key)), known
+        return (lambda batch: batch.nulls(key).copy()), known
+
+
+def iter_positions(compiler, store, node, batch_size=None):
+    """
+    Compile a WHERE AST for a ColumnStore and return a generator yielding
+    the positions of the matching rows, one NumPy array per batch. Batches
+    are only evaluated as the generator is advanced.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    mask_of = BatchCompiler(compiler, store).compile(node)
+
+    def batches():
+        for start in range(0, len(store), batch_size):
+            batch = ColumnBatch(store, start, min(start + batch_size, len(store)))
+            yield np.flatnonzero(mask_of(batch)) + start
+    return batches()
+
+
+def scan_positions(compiler, store, node, batch_size=None):
+    """
+    Return the positions of the rows of a ColumnStore matching a WHERE AST,
+    evaluating the predicate batch by batch.
+
+    Returns:
+        Tuple of (positions, number of batches)
+    """
+    positions = []
+    batches = 0
+    for found in iter_positions(compiler, store, node, batch_size):
+        positions.extend(found.tolist())
+        batches += 1
+    return positions, batches
+
+
+def aggregatable(store, group_columns, aggregates):
+    """
+    Return True if the aggregates of a ColumnStore can be computed from
+    batch arrays: at most one group column, numeric or dictionary encoded,
+    and INT/FLOAT arguments (any column with NULL bytes for COUNT), without
+    DISTINCT
+    """
+    if (len(group_columns) > 1):
+        return False
+    for column in group_columns:
+        if (not isinstance(store.vectors.get(column), (NumericVector, DictionaryVector))):
+            return False
+    for aggregate in aggregates:
+        vector = store.vectors.get(aggregate.column)
+        if (aggregate.column is None):
+            continue
+        if (aggregate.distinct):
+            return False
+        if (aggregate.function == "COUNT"):
+            # TEXT columns only have NULL bytes while they are mapped
+            if (isinstance(vector, MappedTextVector)):
+                if (not vector.mapped):
+                    return False
+            elif (not isinstance(vector, (NumericVector, DictionaryVector))):
+                return False
+        elif (not isinstance(vector, NumericVector) or vector.base_type not in ("INT", "FLOAT")):
+            return False
+    return True
+
+
+def _segment_states(batch, aggregate, order, starts):
+    """Partial states of one aggregate for the segments of `order` beginning at `starts`"""
+    if (aggregate.column is None):
+        return np.diff(np.append(starts, len(order))).tolist()
+    present = ~batch.nulls(aggregate.column)[order]
+    counts = np.add.reduceat(present.astype(np.int64), starts)
+    if (aggregate.function == "COUNT"):
+        return counts.tolist()
+    data = batch.data(aggregate.column)[order]
+    if (aggregate.function in ("SUM", "AVG")):
+        if (data.dtype.kind == "i" and max(-float(data.min()), float(data.max())) * len(data) >= _INT64_LIMIT):
+            data = data.astype(object)  # Sums could overflow int64; add Python ints instead
+        sums = np.add.reduceat(np.where(present, data, 0), starts).tolist()
+        if (aggregate.function == "SUM"):
+            return [total if count else None for total, count in zip(sums, counts.tolist())]
+        return [(total, count) if count else None for total, count in zip(sums, counts.tolist())]
+    if (data.dtype.kind == "f"):
+        fill = np.inf if aggregate.function == "MIN" else -np.inf
+    else:
+        info = np.iinfo(data.dtype)
+        fill = info.max if aggregate.function == "MIN" else info.min
+    reduce = np.minimum if aggregate.function == "MIN" else np.maximum
+    values = reduce.reduceat(np.where(present, data, fill), starts).tolist()
+    return [value if count else None for value, count in zip(values, counts.tolist())]
+
+
+def iter_aggregate_partials(compiler, store, node, group_columns, aggregates, batch_size=None):
+    """
+    Compute partial aggregates of a ColumnStore a batch at a time, for
+    HashAggregate(partial=True). The rows of a batch matching the WHERE AST
+    (all rows for None) are ordered by their group value and each group is
+    reduced with NumPy ufunc.reduceat; rows with a NULL group value form
+    one more group.
+
+    Yields:
+        Tuples of (group values tuple, list of partial states), one per group per batch
+    """
+    batch_size = batch_size or BATCH_SIZE
+    mask_of = BatchCompiler(compiler, store).compile(node) if node is not None else None
+    group = group_columns[0] if group_columns else None
+    vector = store.vectors.get(group)
+    for start in range(0, len(store), batch_size):
+        batch = ColumnBatch(store, start, min(start + batch_size, len(store)))
+        selected = np.flatnonzero(mask_of(batch)) if mask_of is not None else np.arange(batch.size)
+        if (not len(selected)):
+            continue
+        if (group is None):
+            starts = np.zeros(1, dtype=np.intp)
+            keys = [()]
+            order = selected
+        else:
+            nulls = batch.nulls(group)[selected]
+            present = selected[~nulls]
+            values = batch.data(group)[present]
+            ranked = np.argsort(values, kind="stable")
+            order = np.concatenate((present[ranked], selected[nulls]))
+            values = values[ranked]
+            starts = np.flatnonzero(np.concatenate(([len(values) > 0], values[1:] != values[:-1])))
+            firsts = values[starts].tolist()
+            if (isinstance(vector, DictionaryVector)):
+                firsts = [vector.dictionary[code] for code in firsts]
+            elif (vector.base_type == "BOOL"):
+                firsts = [bool(value) for value in firsts]
+            keys = [(value,) for value in firsts]
+            if (nulls.any()):
+                starts = np.append(starts, len(values))
+                keys.append((None,))
+        states = [_segment_states(batch, aggregate, order, starts) for aggregate in aggregates]
+        for number, key in enumerate(keys):
+            yield key, [column[number] for column in states]
@@ -9,7 +9,6 @@ class SQLVMInterpreter:
 
     def execute_bytecode(self, bytecode):
         results = []
-        subquery_result = None  # Store the result of the last subquery
 
         for instruction in bytecode:
             opcode = instruction[0]
@@ -27,7 +26,21 @@ class SQLVMInterpreter:
                 results.append(self.sqlvm.show_databases())
             elif opcode == "CREATE_TABLE":
                 table_name, columns_def = instruction[1], instruction[2]
-                results.append(self.sqlvm.create_table(table_name, columns_def))
+                if len(instruction) == 4:  # With a storage engine
+                    results.append(self.sqlvm.create_table(table_name, columns_def, instruction[3]))
+                else:
+                    results.append(self.sqlvm.create_table(table_name, columns_def))
+            elif opcode == "DROP_TABLE":
+                table_name, if_exists = instruction[1], instruction[2]
+                results.append(self.sqlvm.drop_table(table_name, if_exists))
+            elif opcode == "CREATE_INDEX":
+                index_name, table_name, columns = instruction[1], instruction[2], instruction[3]
+                results.append(self.sqlvm.create_index(index_name, table_name, columns))
+            elif opcode == "DROP_INDEX":
+                index_name, table_name = instruction[1], instruction[2]
+                results.append(self.sqlvm.drop_index(index_name, table_name))
+            elif opcode == "ANALYZE_TABLE":
+                results.append(self.sqlvm.analyze(instruction[1]))
             elif opcode == "INSERT_ROW":
                 if len(instruction) == 4:  # With specific columns
                     table_name, values, columns = instruction[1], instruction[2], instruction[3]
@@ -35,33 +48,35 @@ class SQLVMInterpreter:
                 else:  # Without specific columns
                     table_name, values = instruction[1], instruction[2]
                     results.append(self.sqlvm.insert(table_name, values))
+            elif opcode == "INSERT_ROWS":
+                table_name, rows, columns = instruction[1], instruction[2], instruction[3]
+                results.append(self.sqlvm.insert_many(table_name, rows, columns))
+            elif opcode == "COPY_FROM":
+                table_name, file_path, columns, options = instruction[1], instruction[2], instruction[3], instruction[4]
+                results.append(self.sqlvm.copy_from(table_name, file_path, columns, **dict(options)))
             elif opcode == "SELECT_ROWS":
                 table_name = instruction[1]
                 columns = instruction[2]
 
-                # Handle WHERE clause
-                if len(instruction) == 4:
-                    where_clause = instruction[3]
-
-                    # Check for nested subquery in the IN condition
-                    while "IN (SELECT" in where_clause:
-                        subquery = re.search(r"IN \((SELECT .+)\)", where_clause, re.I).group(1)
-                        subquery_bytecode = SQLParser.parse_to_bytecode(subquery)
-                        subquery_results = self.execute_bytecode(subquery_bytecode)
-
-                        # Extract column values or handle empty subquery results
-                        if not subquery_results or subquery_results[0].strip() == "" or subquery_results[0] == "None":
-                            # Replace the subquery with an empty IN condition
-                            where_clause = where_clause.replace(f"IN ({subquery})", "IN ()")
-                        else:
-                            subquery_values = self._extract_column_values(subquery_results[0])
-                            where_clause = where_clause.replace(f"IN ({subquery})", f"IN ({', '.join(map(str, subquery_values))})")
-
-                    # Execute the parent query with the updated WHERE clause
-                    results.append(self.sqlvm.select(table_name, columns, where_clause))
+                # The WHERE clause, including IN (SELECT ...) subqueries, is compiled by select
+                if len(instruction) == 5:  # With LIMIT/OFFSET options
+                    results.append(self.sqlvm.select(table_name, columns, instruction[3], **dict(instruction[4])))
+                elif len(instruction) == 4:
+                    results.append(self.sqlvm.select(table_name, columns, instruction[3]))
                 else:
                     results.append(self.sqlvm.select(table_name, columns))
 
+            elif opcode == "SELECT_JOIN":
+                sources, columns, where = instruction[1], instruction[2], instruction[3]
+                if len(instruction) == 5:  # With ORDER BY/LIMIT/OFFSET options
+                    results.append(self.sqlvm.select_join(sources, columns, where, **dict(instruction[4])))
+                else:
+                    results.append(self.sqlvm.select_join(sources, columns, where))
+
+            elif opcode == "EXPLAIN":
+                analyze, statement = instruction[1], instruction[2]
+                results.append(self.sqlvm.explain(statement, analyze))
+
             elif opcode == "ALTER_TABLE":
                 table_name, operation, column_def = instruction[1], instruction[2], instruction[3]
                 results.append(self.sqlvm.alter_table(table_name, operation, column_def))
@@ -71,19 +86,9 @@ class SQLVMInterpreter:
             elif opcode == "UPDATE_ROWS":
                 table_name, set_values, condition = instruction[1], instruction[2], instruction[3]
                 results.append(self.sqlvm.update(table_name, set_values, condition))
+            elif opcode == "SET_TRACE":
+                results.append(self.sqlvm.set_trace(instruction[1]))
             elif opcode == "INVALID_COMMAND":
                 results.append(f"Error: Invalid command '{instruction[1]}'")
 
         return results
-
-    def _extract_column_values(self, result):
-        """
-        Extract column values from a SELECT result for use in subqueries.
-        Assumes the result is formatted as a table-like string.
-        """
-        rows = result.split("\n")[3:-1]  # Skip header and separators
-        values = []
-        for row in rows:
-            columns = row.split("|")[1:-1]  # Extract column values
-            values.append(columns[0].strip())  # Assume single-column subquery
-        return values
\ No newline at end of file
@@ -0,0 +1,301 @@
+import json
+import os
+import time
+
+from .snapshot import TablePager, is_snapshot, read_database_file, write_snapshot
+from .storage import delete_rows
+
+
+class WriteAheadLog:
+    """
+    Append-only log of logical changes with periodic checkpoints.
+
+    SQLVM hands every change to the log through its `journal` attribute:
+    row-level records for INSERT/UPDATE/DELETE and operation records for DDL.
+    Records are JSON lines tagged with an increasing log sequence number (LSN).
+    The records of one statement are followed by a commit marker; recovery
+    ignores records without one, so a torn statement is never half-applied.
+
+    Group commit: every commit is written to the file, but the fsync is shared
+    by all commits within `commit_interval` seconds. Once the log grows past
+    `checkpoint_bytes`, a checkpoint writes a full snapshot (see snapshot.py)
+    and truncates the log.
+
+    Args:
+        log_path: Path of the log file
+        snapshot_path: Path of the snapshot written by checkpoints
+        commit_interval: Seconds between fsyncs of committed records
+        checkpoint_bytes: Log size that triggers a checkpoint
+        compression: Compression of the snapshot payloads (None for the snapshot default)
+    """
+
+    def __init__(self, log_path, snapshot_path, commit_interval=0.05, checkpoint_bytes=16 * 1024 * 1024, compression=None):
+        self.log_path = log_path
+        self.snapshot_path = snapshot_path
+        self.compression = compression
+        self.commit_interval = commit_interval
+        self.checkpoint_bytes = checkpoint_bytes
+        self.sqlvm = None
+        self.lsn = 0
+        self.depth = 0
+        self.buffer = []
+        self.uncommitted = 0
+        self.unsynced = False
+        self.last_sync = time.time()
+        self.file = None
+
+    def attach(self, sqlvm):
+        """Start logging the changes made by an SQLVM instance"""
+        self.sqlvm = sqlvm
+        sqlvm.journal = self
+        if (self.file is None):
+            self.file = open(self.log_path, "a", encoding="utf-8")
+
+    # Logging
+    def append(self, record):
+        """Add a change record. Outside a statement it is committed right away."""
+        self.lsn += 1
+        record["lsn"] = self.lsn
+        self.buffer.append(json.dumps(record, default=str))
+        self.uncommitted += 1
+        if (self.depth == 0):
+            self.commit()
+        elif (len(self.buffer) >= 1024):
+            # Long statements (e.g. imports) spill to the file before their commit marker
+            self._write()
+
+    def begin(self):
+        """Start a statement; nested statements commit with the outermost one"""
+        self.depth += 1
+
+    def end(self):
+        """Finish a statement, committing its records and checkpointing if the log is large"""
+        self.depth = max(self.depth - 1, 0)
+        if (self.depth == 0):
+            self.commit()
+            if (self.file is not None and self.file.tell() >= self.checkpoint_bytes):
+                self.checkpoint()
+
+    def commit(self, sync=False):
+        """
+        Write a commit marker after the pending records. The fsync is skipped
+        if the previous one happened less than `commit_interval` seconds ago.
+        """
+        if (self.uncommitted):
+            self.buffer.append(json.dumps({"op": "commit", "lsn": self.lsn}))
+            self.uncommitted = 0
+            self._write()
+            self.unsynced = True
+        if (self.unsynced and (sync or time.time() - self.last_sync >= self.commit_interval)):
+            self.sync()
+
+    def sync(self):
+        """Force committed records to disk"""
+        if (self.file is None):
+            return
+        self._write()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = False
+        self.last_sync = time.time()
+
+    def _write(self):
+        if (self.buffer and self.file is not None):
+            self.file.write("\n".join(self.buffer) + "\n")
+            self.file.flush()
+            self.buffer = []
+
+    def close(self):
+        """Commit and sync pending records and close the log file"""
+        if (self.file is None):
+            return
+        self.commit(sync=True)
+        self.file.close()
+        self.file = None
+
+    # Checkpoints
+    def checkpoint(self):
+        """
+        Write a snapshot of all databases and truncate the log.
+
+        The snapshot is written to a temporary file and renamed over the old
+        one, so a crash leaves either the old or the new snapshot in place.
+        The snapshot records the LSN it covers; log records up to that LSN
+        are skipped on recovery if the truncation did not happen.
+        """
+        if (self.sqlvm is None or self.depth):
+            return False
+        self.commit(sync=True)
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, "wb") as snapshot_file:
+            write_snapshot(snapshot_file, self.sqlvm.databases, self.lsn, self.compression)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        if (self.sqlvm.pager is not None):
+            self.sqlvm.pager.reopen(self.snapshot_path)
+
+        if (self.file is not None):
+            self.file.close()
+        self.file = open(self.log_path, "w", encoding="utf-8")
+        return True
+
+    # Recovery
+    def recover(self, sqlvm, lazy=False, memory_budget=None):
+        """
+        Load the last snapshot and replay the committed log records after it.
+
+        Args:
+            sqlvm: The SQLVM instance to load into
+            lazy: Read tables from the snapshot on first access instead of all
+                at once (see TablePager); older pickle files are always read whole
+            memory_budget: Estimated bytes of paged-in tables to keep in memory when lazy
+                (None for no limit)
+
+        Returns:
+            Tuple of (snapshot loaded, number of records replayed)
+        """
+        loaded = False
+        snapshot_lsn = 0
+        if (lazy and os.path.exists(self.snapshot_path) and is_snapshot(self.snapshot_path)):
+            sqlvm.pager = TablePager(sqlvm, self.snapshot_path, memory_budget)
+            sqlvm.databases = sqlvm.pager.databases()
+            snapshot_lsn = sqlvm.pager.reader.lsn
+            loaded = True
+        elif (os.path.exists(self.snapshot_path)):
+            # Pickle files of older versions are still read; the next checkpoint rewrites them
+            sqlvm.databases, snapshot_lsn = read_database_file(sqlvm, self.snapshot_path)
+            loaded = True
+
+        committed, end = self._read_log(self.log_path)
+        records = [record for record in committed if record["lsn"] > snapshot_lsn]
+        replay(sqlvm, records)
+        self.lsn = max([snapshot_lsn] + [record["lsn"] for record in committed])
+        self._truncate(end)
+        return loaded, len(records)
+
+    def _truncate(self, end):
+        """
+        Cut the log after its last commit marker, dropping a torn tail and
+        the uncommitted records of a crashed session, so records appended
+        from now on follow a complete log and are read back on recovery.
+        """
+        if (os.path.exists(self.log_path) and os.path.getsize(self.log_path) > end):
+            with open(self.log_path, "r+b") as log_file:
+                log_file.truncate(end)
+                log_file.flush()
+                os.fsync(log_file.fileno())
+
+    @staticmethod
+    def read_committed(log_path):
+        """Return the records of the log that are followed by a commit marker"""
+        return WriteAheadLog._read_log(log_path)[0]
+
+    @staticmethod
+    def _read_log(log_path):
+        """
+        Read the committed records of the log.
+
+        Returns:
+            Tuple of (records followed by a commit marker, byte offset just
+            after the last commit marker)
+        """
+        committed = []
+        end = 0
+        if (not os.path.exists(log_path)):
+            return committed, end
+        pending = []
+        offset = 0
+        with open(log_path, "rb") as log_file:
+            for line in log_file:
+                offset += len(line)
+                if (not line.endswith(b"\n")):
+                    # A torn write at the end of the log
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if (record["op"] == "commit"):
+                    committed.extend(pending)
+                    pending = []
+                    end = offset
+                else:
+                    pending.append(record)
+        return committed, end
+
+
+def replay(sqlvm, records):
+    """
+    Apply log records to an SQLVM instance.
+
+    DDL records are replayed by calling the SQLVM method again; row-level
+    records are applied to the rows directly, and the indexes of the touched
+    tables are rebuilt once at the end.
+    """
+    journal, sqlvm.journal = sqlvm.journal, None
+    current_db = sqlvm.current_db
+    touched = {}
+    try:
+        for record in records:
+            op = record["op"]
+            db_name = record.get("db")
+            if (op == "create_database"):
+                sqlvm.create_database(db_name)
+                continue
+            if (op == "drop_database"):
+                sqlvm.drop_database(db_name, True)
+                continue
+            if (db_name not in sqlvm.databases):
+                continue
+            sqlvm.use_database(db_name)
+            table_name = record["table"]
+
+            if (op == "create_table"):
+                sqlvm.create_table(table_name, record["columns_def"], record.get("engine"))
+            elif (op == "drop_table"):
+                sqlvm.drop_table(table_name, True)
+                touched.pop((db_name, table_name), None)
+            elif (op == "alter_table"):
+                sqlvm.alter_table(table_name, record["operation"], record["column_def"])
+            elif (op == "create_index"):
+                sqlvm.create_index(record["index"], table_name, record["columns"])
+            elif (op == "drop_index"):
+                sqlvm.drop_index(record["index"], table_name)
+            elif (op == "analyze"):
+                sqlvm.analyze([table_name])
+            elif (table_name in sqlvm.tables):
+                table = sqlvm.tables[table_name]
+                touched[(db_name, table_name)] = table
+                _apply_row_change(table, record)
+    finally:
+        for (db_name, table_name), table in touched.items():
+            sqlvm._rebuild_indexes(table)
+            if (sqlvm.pager is not None):
+                sqlvm.pager.mark_dirty(db_name, table_name)
+        if (current_db in sqlvm.databases):
+            sqlvm.use_database(current_db)
+        else:
+            sqlvm.current_db = None
+            sqlvm.tables = {}
+        sqlvm.journal = journal
+
+
+def _apply_row_change(table, record):
+    op = record["op"]
+    rows = table["rows"]
+    if (op == "insert"):
+        rows.append(record["row"])
+        table["auto_increment"].update(record.get("auto_increment", {}))
+    elif (op == "insert_many"):
+        rows.extend(record["rows"])
+        table["auto_increment"].update(record.get("auto_increment", {}))
+    elif (op == "update"):
+        values = record["values"]
+        for pos in record["positions"]:
+            row = rows[pos]
+            for column, value in values.items():
+                if (column in row):
+                    row[column] = value
+    elif (op == "delete"):
+        delete_rows(table, record["positions"])
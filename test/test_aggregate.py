@@ -0,0 +1,160 @@
+import os
+import random
+import sys
+import tempfile
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.parser import SQLParser
+from src.wal import WriteAheadLog
+from src import aggregate
+
+vm = SQLVM()
+random.seed(11)
+
+# Set up test environment: the same rows in a row table and a columnar table, with NULLs
+print(vm.execute_command("CREATE DATABASE shop;"))
+print(vm.execute_command("USE shop;"))
+print(vm.execute_command("CREATE TABLE items (id INT PRIMARY KEY, grp INT, name TEXT, price FLOAT, stock INT);"))
+print(vm.execute_command("CREATE TABLE readings (id INT, grp INT, name TEXT, price FLOAT, stock INT) ENGINE=COLUMNAR;"))
+data = [[i, None if i % 9 == 0 else random.randint(0, 6), None if i % 13 == 0 else f"n{random.randint(0, 4)}",
+         None if i % 7 == 0 else round(random.uniform(0, 100), 2), random.randint(-50, 50)] for i in range(500)]
+vm.insert_many("items", data)
+vm.insert_many("readings", data)
+events = []
+vm.tracer.add_sink(events.append)
+
+# GROUP BY and HAVING are parsed outside quotes, before ORDER BY and LIMIT
+print("--- Parser Test ---")
+print(SQLParser.parse_to_bytecode("SELECT grp, COUNT(*) FROM items GROUP BY grp;"))
+print(SQLParser.parse_to_bytecode("SELECT name, SUM(price) AS total FROM items WHERE name != 'GROUP BY' GROUP BY name HAVING SUM(price) > 10 ORDER BY total DESC LIMIT 2;"))
+print(SQLParser.parse_to_bytecode("SELECT grp FROM items HAVING COUNT(*) > 1 GROUP BY grp"))
+print(SQLParser.parse_to_bytecode("SELECT grp FROM items GROUP BY"))
+
+
+def expected(rows, group, functions, where=lambda row: True, distinct=False):
+    """Aggregate row lists in plain Python, groups sorted with NULL first"""
+    groups = {}
+    for row in rows:
+        if (where(row)):
+            groups.setdefault(tuple(row[i] for i in group), []).append(row)
+    if (not group and not groups):
+        groups[()] = []
+    results = []
+    for key, members in groups.items():
+        values = list(key)
+        for function, column in functions:
+            present = members if column is None else [row[column] for row in members if row[column] is not None]
+            if (distinct):
+                present = list(set(present))
+            if (function == "COUNT"):
+                values.append(len(present))
+            elif (not present):
+                values.append(None)
+            else:
+                values.append({"SUM": sum, "MIN": min, "MAX": max, "AVG": lambda v: sum(v) / len(v)}[function](present))
+        results.append(values)
+    return sorted(results, key=lambda row: [(value is not None, value) for value in row[:len(group)]])
+
+
+def same(rows, other):
+    return len(rows) == len(other) and all(
+        (a is None and b is None) or (a is not None and b is not None and abs(a - b) < 1e-6 if isinstance(a, float) or isinstance(b, float) else a == b)
+        for row, expected_row in zip(rows, other) for a, b in zip(row, expected_row))
+
+
+# Results match plain Python on both engines; columnar tables aggregate in vectorized batches
+print("--- Aggregate Test ---")
+columns = {"id": 0, "grp": 1, "name": 2, "price": 3, "stock": 4}
+functions = [("COUNT", None), ("COUNT", 3), ("SUM", 4), ("AVG", 3), ("MIN", 3), ("MAX", 4)]
+select_list = "COUNT(*), COUNT(price), SUM(stock), AVG(price), MIN(price), MAX(stock)"
+vm.tracer.level = 2
+for table in ("items", "readings"):
+    for group in ("", "grp", "name"):
+        for where, test in (("", lambda row: True), (" WHERE stock > 10", lambda row: row[4] > 10), (" WHERE id < 3", lambda row: row[0] < 3)):
+            events.clear()
+            query = f"SELECT {group + ', ' if group else ''}{select_list} FROM {table}{where}"
+            query += f" GROUP BY {group} ORDER BY {group}" if group else ""
+            result = list(vm.query(query))
+            access = [event["fields"]["access"] for event in events if event["event"] == "select"][-1]
+            print(table, group or "(all)", where or "(all)", same(result, expected(data, [columns[group]] if group else [], functions, test)), access)
+vm.tracer.level = 0
+print(vm.execute_command("SELECT name, COUNT(*) AS n, MIN(name) FROM readings WHERE grp = 2 GROUP BY name HAVING n > 10 ORDER BY n DESC, 1;"))
+print(vm.execute_command("SELECT grp, MAX(price) FROM items GROUP BY grp HAVING MAX(price) > 95 AND COUNT(*) >= 60 ORDER BY MAX(price) LIMIT 2;"))
+
+# With DISTINCT each value of a group counts once; these run on the rows, not in batches
+print("--- Distinct Test ---")
+functions = [("COUNT", 1), ("COUNT", 2), ("SUM", 4), ("AVG", 4), ("MIN", 3)]
+select_list = "COUNT(DISTINCT grp), COUNT(DISTINCT name), SUM(DISTINCT stock), AVG(DISTINCT stock), MIN(DISTINCT price)"
+for table in ("items", "readings"):
+    for group in ("", "grp", "name"):
+        for where, test in (("", lambda row: True), (" WHERE id < 0", lambda row: row[0] < 0)):
+            query = f"SELECT {group + ', ' if group else ''}{select_list} FROM {table}{where}"
+            query += f" GROUP BY {group} ORDER BY {group}" if group else ""
+            result = list(vm.query(query))
+            print(table, group or "(all)", where or "(all)", same(result, expected(data, [columns[group]] if group else [], functions, test, True)))
+print(vm.execute_command("SELECT grp, count( distinct `name` ) AS names, COUNT(name) FROM items GROUP BY grp HAVING COUNT(DISTINCT name) >= 5 ORDER BY names, grp LIMIT 3;"))
+
+# Errors name the offending column
+print("--- Error Test ---")
+print(vm.execute_command("SELECT grp, name, COUNT(*) FROM items GROUP BY grp;"))
+print(vm.execute_command("SELECT SUM(missing) FROM items;"))
+print(vm.execute_command("SELECT COUNT(*) FROM items GROUP BY missing;"))
+print(vm.execute_command("SELECT grp, COUNT(*) FROM items GROUP BY grp ORDER BY price;"))
+print(vm.execute_command("SELECT * FROM items WHERE grp IN (SELECT MAX(grp) FROM readings);"))
+print(vm.execute_command("SELECT UPPER(name) FROM items;"))
+print(vm.execute_command("SELECT grp, COUNT(price + 1) FROM items GROUP BY grp;"))
+print(vm.execute_command("SELECT COUNT(DISTINCT *) FROM items;"))
+print(vm.execute_command("SELECT * FROM items WHERE grp IN (SELECT COUNT(DISTINCT grp) FROM readings);"))
+
+# Past the memory limit, partial groups are spilled to partitions and merged one partition at a time
+print("--- Spill Test ---")
+print(vm.execute_command("CREATE TABLE wide (id INT, label TEXT, amount INT) ENGINE=COLUMNAR;"))
+vm.insert_many("wide", [[i, f"label {i % 20000}", i % 7] for i in range(60000)])
+for query in ("SELECT label, COUNT(*), SUM(amount), MAX(id) FROM wide GROUP BY label ORDER BY label",
+              "SELECT label, COUNT(DISTINCT amount), SUM(DISTINCT amount) FROM wide GROUP BY label ORDER BY label"):
+    in_memory = list(vm.query(query))
+    aggregate.AGGREGATE_MEMORY_BYTES = 256 * 1024
+    events.clear()
+    vm.tracer.level = 2
+    spilled = list(vm.query(query))
+    vm.tracer.level = 0
+    aggregate.AGGREGATE_MEMORY_BYTES = 64 * 1024 * 1024
+    print(len(in_memory), spilled == in_memory, [event["fields"]["spills"] > 0 for event in events if event["event"] == "select"])
+
+# COUNT(*) without WHERE reads the row count, also of a table that is not paged in
+print("--- Row Count Test ---")
+temp_dir = tempfile.mkdtemp()
+wal = WriteAheadLog(os.path.join(temp_dir, "shop.wal"), os.path.join(temp_dir, "shop.db"))
+wal.attach(vm)
+print(wal.checkpoint())
+wal.close()
+lazy = SQLVM()
+WriteAheadLog(os.path.join(temp_dir, "shop.wal"), os.path.join(temp_dir, "shop.db")).recover(lazy, lazy=True)
+lazy.execute_command("USE shop;")
+print(lazy.execute_command("SELECT COUNT(*) FROM wide;"))
+print(lazy.databases["shop"].is_loaded("wide"), lazy.pager.page_ins)
+print(lazy.execute_command("SELECT COUNT(*) AS n FROM wide WHERE amount = 3;"))
+print(lazy.databases["shop"].is_loaded("wide"))
+
+# Counting and grouping against reading the rows out
+print("--- Timing Test ---")
+print(vm.execute_command("CREATE TABLE big (id INT, grp INT, amount FLOAT) ENGINE=COLUMNAR;"))
+vm.insert_many("big", [[i, i % 50, (i % 1000) * 0.5] for i in range(300000)])
+print(vm.execute_command("CREATE TABLE big_rows (id INT, grp INT, amount FLOAT);"))
+vm.insert_many("big_rows", [[i, i % 50, (i % 1000) * 0.5] for i in range(300000)])
+timings = {}
+for query in ("SELECT * FROM big", "SELECT COUNT(*) FROM big", "SELECT grp, COUNT(*), SUM(amount) FROM big GROUP BY grp",
+              "SELECT grp, COUNT(*), SUM(amount) FROM big_rows GROUP BY grp"):
+    elapsed = []
+    for _ in range(3):
+        start = time.perf_counter()
+        result = vm.query(query)
+        elapsed.append(time.perf_counter() - start)
+    timings[query] = min(elapsed)
+    print(query, len(result))
+scan, count, columnar, row = timings.values()
+print(count * 100 < scan, columnar * 3 < row)
+print(f"read rows: {scan:.4f}s, COUNT(*): {count:.6f}s, vectorized GROUP BY: {columnar:.4f}s, row GROUP BY: {row:.4f}s")
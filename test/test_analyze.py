@@ -0,0 +1,141 @@
+import os
+import sys
+import tempfile
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.parser import SQLParser
+from src.stats import HyperLogLog
+from src.wal import WriteAheadLog
+
+temp_dir = tempfile.mkdtemp()
+vm = SQLVM()
+wal = WriteAheadLog(os.path.join(temp_dir, "shop.wal"), os.path.join(temp_dir, "shop.db"))
+wal.attach(vm)
+
+# Set up test environment: tasks with a skewed status column, indexed columns
+# of very different selectivity, and the same rows in a columnar table
+print(vm.execute_command("CREATE DATABASE shop;"))
+print(vm.execute_command("USE shop;"))
+print(vm.execute_command("CREATE TABLE tasks (id INT PRIMARY KEY, status TEXT INDEX, bucket INT INDEX, price FLOAT INDEX, note TEXT);"))
+print(vm.execute_command("CREATE TABLE ctasks (id INT, status TEXT, bucket INT, price FLOAT, note TEXT) ENGINE=COLUMNAR;"))
+rows = [[i, "failed" if i % 50 == 0 else "done", i % 1000, None if i % 9 == 0 else round((i * 7919) % 10000 / 10, 1),
+         f"note {i % 317}"] for i in range(100000)]
+vm.insert_many("tasks", rows)
+vm.insert_many("ctasks", rows)
+print(vm.execute_command("CREATE TABLE buckets (bid INT PRIMARY KEY, label TEXT);"))
+print(vm.execute_command("CREATE TABLE owners (oid INT, bucket INT, name TEXT);"))
+vm.insert_many("buckets", [[b, f"bucket {b}"] for b in range(1000)])
+vm.insert_many("owners", [[o, o % 1000, f"owner {o}"] for o in range(3000)])
+join = ("SELECT t.id, b.label, o.name FROM tasks t JOIN owners o ON o.bucket = t.bucket "
+        "JOIN buckets b ON b.bid = t.bucket WHERE b.label = 'bucket 7' AND t.status = 'done'")
+
+print("--- Parser Test ---")
+print(SQLParser.parse_to_bytecode("ANALYZE tasks;"))
+print(SQLParser.parse_to_bytecode("ANALYZE TABLE tasks, ctasks"))
+print(SQLParser.parse_to_bytecode("ANALYZE"))
+
+# Distinct-value sketches stay within a few percent of the true count
+print("--- Sketch Test ---")
+for count in (5, 1000, 50000):
+    sketch = HyperLogLog()
+    sketch.update(range(count))
+    print(count, abs(sketch.estimate() - count) / count < 0.05)
+left, right = HyperLogLog(), HyperLogLog()
+left.update(range(0, 6000))
+right.update(range(4000, 10000))
+left.merge(right)
+print("merged", abs(left.estimate() - 10000) / 10000 < 0.05)
+
+
+def access_of(query):
+    """Run a query with plan tracing and return its access path"""
+    events = []
+    vm.tracer.sinks = [events.append]
+    vm.tracer.level = 2
+    try:
+        result = vm.query(query)
+    finally:
+        vm.tracer.level = 0
+        vm.tracer.sinks = []
+    return len(result), [event["fields"]["access"] for event in events if event["event"] == "select"][0]
+
+
+def where_order(query):
+    """Return the WHERE predicate in the order it is evaluated"""
+    events = []
+    vm.tracer.sinks = [events.append]
+    vm.tracer.level = 2
+    try:
+        vm.query(query)
+    finally:
+        vm.tracer.level = 0
+        vm.tracer.sinks = []
+    return [event["fields"]["predicate"] for event in events if event["event"] == "where" and event["fields"]["table"] == "tasks"][0]
+
+
+queries = ["SELECT id FROM tasks WHERE status = 'done' AND note = 'note 5'",
+           "SELECT id FROM tasks WHERE status = 'failed' AND bucket = 100",
+           "SELECT id FROM tasks WHERE status = 'done' AND bucket = 17",
+           "SELECT id FROM tasks WHERE price > 990",
+           "SELECT id FROM tasks WHERE price > 10 AND note = 'note 3'",
+           "SELECT id FROM tasks WHERE price BETWEEN 100 AND 101"]
+print("--- Before ANALYZE ---")
+before = {query: access_of(query) for query in queries}
+for query, (count, access) in before.items():
+    print(count, access)
+print(where_order("SELECT id FROM tasks WHERE note LIKE '%7%' AND price IS NULL AND id IN (SELECT id FROM ctasks WHERE bucket = 1)"))
+print(access_of(join))
+
+print("--- Statistics Test ---")
+print(vm.execute_command("ANALYZE TABLE tasks, ctasks, buckets, owners;"))
+statistics = vm.tables["tasks"]["statistics"]
+print(statistics["row_count"], sorted(statistics["columns"]))
+for column in ("id", "status", "bucket", "price", "note"):
+    column_stats = statistics["columns"][column]
+    print(column, round(column_stats["null_fraction"], 3), column_stats["distinct"], column_stats["min"], column_stats["max"],
+          len(column_stats["histogram"]))
+print(vm.tables["ctasks"]["statistics"]["columns"]["price"] == statistics["columns"]["price"])
+print(vm.execute_command("ANALYZE missing;"))
+
+# With statistics, the most selective index is used, and none when a scan is cheaper
+print("--- After ANALYZE ---")
+for query in queries:
+    count, access = access_of(query)
+    print(count, access, count == before[query][0])
+print(where_order("SELECT id FROM tasks WHERE note LIKE '%7%' AND price IS NULL AND id IN (SELECT id FROM ctasks WHERE bucket = 1)"))
+print(where_order("SELECT id FROM tasks WHERE note = 'note 1' OR status = 'done'"))
+print(vm.query("SELECT id FROM tasks WHERE note LIKE '%7%' AND price IS NULL AND id IN (SELECT id FROM ctasks WHERE bucket = 1)").rows[:3])
+
+# Inner joins start from the table with the fewest rows left after its conditions
+print("--- Join Order Test ---")
+print(access_of(join))
+print(sorted(vm.query(join).rows) == sorted((t[0], "bucket 7", f"owner {o}") for t in rows if t[2] == 7 and t[1] == "done"
+                                          for o in range(7, 3000, 1000)))
+
+# Statistics are kept by the write-ahead log and the database file
+print("--- Recovery Test ---")
+print(wal.checkpoint())
+print(vm.execute_command("ANALYZE owners;"))
+wal.close()
+recovered = SQLVM()
+print(WriteAheadLog(os.path.join(temp_dir, "shop.wal"), os.path.join(temp_dir, "shop.db")).recover(recovered))
+recovered.execute_command("USE shop;")
+print(sorted(name for name, table in recovered.tables.items() if "statistics" in table))
+print(recovered.tables["tasks"]["statistics"]["columns"]["price"] == statistics["columns"]["price"])
+
+# Picking the selective index against the first one found
+print("--- Timing Test ---")
+query = "SELECT id FROM tasks WHERE status = 'done' AND bucket = 17"
+statistics = vm.tables["tasks"].pop("statistics")
+start = time.perf_counter()
+unplanned = vm.query(query)
+unplanned_time = time.perf_counter() - start
+vm.tables["tasks"]["statistics"] = statistics
+start = time.perf_counter()
+planned = vm.query(query)
+planned_time = time.perf_counter() - start
+print(len(planned), list(planned) == list(unplanned), planned_time * 5 < unplanned_time)
+print(f"first index: {unplanned_time:.4f}s, cheapest index: {planned_time:.4f}s")
@@ -0,0 +1,58 @@
+import os
+import sys
+import tempfile
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+
+vm = SQLVM()
+
+# Set up test environment
+print(vm.execute_command("CREATE DATABASE test_db;"))
+print(vm.execute_command("USE test_db;"))
+print(vm.execute_command("CREATE TABLE products (id INT PRIMARY KEY, name TEXT, price FLOAT, in_stock BOOL) ENGINE=COLUMNAR;"))
+print(vm.execute_command("INSERT INTO products VALUES (1, 'Laptop', 999.99, true);"))
+print(vm.execute_command("INSERT INTO products VALUES (2, 'Mouse', 19.99, false);"))
+print(vm.execute_command("INSERT INTO products VALUES (3, 'Keyboard', 49.99, true);"))
+print(vm.execute_command("INSERT INTO products VALUES (4, 'Mouse', 24.99, true);"))
+
+# Rows are stored in typed vectors
+print("--- Storage Test ---")
+rows = vm.tables["products"]["rows"]
+print(type(rows).__name__, len(rows))
+print({col: type(vector).__name__ for col, vector in rows.vectors.items()})
+print(rows.vectors["name"].dictionary)
+
+# Queries and constraints work as on row tables
+print("--- Query Test ---")
+print(vm.execute_command("SELECT * FROM products;"))
+print(vm.execute_command("SELECT name, price FROM products WHERE price < 50 AND in_stock = true;"))
+print(vm.execute_command("INSERT INTO products VALUES (1, 'Monitor', 199.99, true);"))
+print(vm.execute_command("UPDATE products SET price = 17.5 WHERE name = 'Mouse';"))
+print(vm.execute_command("DELETE FROM products WHERE id = 3;"))
+print(vm.execute_command("SELECT * FROM products;"))
+
+# Schema changes
+print("--- Alter Table Test ---")
+print(vm.execute_command("ALTER TABLE products ADD category TEXT;"))
+print(vm.execute_command("UPDATE products SET category = 'Accessories' WHERE id = 2;"))
+print(vm.execute_command("ALTER TABLE products DROP in_stock;"))
+print(vm.execute_command("SELECT * FROM products;"))
+
+# Moving a table between engines keeps its rows
+print("--- Engine Conversion Test ---")
+print(vm.execute_command("ALTER TABLE products ENGINE=ROW;"))
+print(type(vm.tables["products"]["rows"]).__name__)
+print(vm.execute_command("ALTER TABLE products ENGINE=COLUMNAR;"))
+print(vm.execute_command("SELECT * FROM products WHERE category IS NULL;"))
+print(vm.execute_command("CREATE TABLE broken (id INT) ENGINE=UNKNOWN;"))
+
+# Export and import keep the engine
+print("--- Export/Import Test ---")
+export_path = os.path.join(tempfile.mkdtemp(), "columnar.sql")
+print(vm.export_to_sql("test_db", export_path).startswith("Successfully"))
+print(vm.execute_command("CREATE DATABASE copy_db;"))
+print(vm.import_from_sql("copy_db", export_path))
+print(type(vm.databases["copy_db"]["products"]["rows"]).__name__)
+print(vm.execute_command("SELECT * FROM products;"))
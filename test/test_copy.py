@@ -0,0 +1,91 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+
+vm = SQLVM()
+temp_dir = tempfile.mkdtemp()
+
+
+def write_file(name, text):
+    path = os.path.join(temp_dir, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+# Set up test environment
+print(vm.execute_command("CREATE DATABASE test_db;"))
+print(vm.execute_command("USE test_db;"))
+print(vm.execute_command("CREATE TABLE users (id INT AUTO_INCREMENT PRIMARY KEY, name TEXT, email TEXT UNIQUE, age INT, active BOOL);"))
+
+# CSV with a header naming the columns; empty numbers and \N are NULL
+print("--- CSV Test ---")
+csv_path = write_file("users.csv", 'name,email,age,active\nAlice,alice@example.com,30,true\n"Smith, Bob","bob ""b"" @example.com",,false\nCarol,\\N,41,1\n')
+print(vm.execute_command(f"COPY users FROM '{csv_path}' WITH (FORMAT CSV, HEADER);"))
+print(vm.execute_command("SELECT * FROM users;"))
+
+# LOAD DATA with a delimiter, skipped lines and a column list
+print("--- LOAD DATA Test ---")
+tsv_path = write_file("more.tsv", "# exported users\nname\tage\nDave\t19\nErin\t\n")
+print(vm.execute_command(f"LOAD DATA INFILE '{tsv_path}' INTO TABLE users FIELDS TERMINATED BY '\\t' IGNORE 2 LINES (name, age);"))
+print(vm.execute_command("SELECT id, name, age FROM users WHERE id >= 4;"))
+
+# Newline-delimited JSON: objects by column name or arrays in column order
+print("--- NDJSON Test ---")
+ndjson_path = write_file("users.ndjson", '{"name": "Frank", "age": 52, "active": true}\n\n{"name": "Grace", "email": null}\n[null, "Heidi", "heidi@example.com", 28, false]\n')
+print(vm.execute_command(f"COPY users FROM '{ndjson_path}';"))
+print(vm.execute_command("SELECT * FROM users WHERE id > 5;"))
+
+# A failing row rejects the whole file, across chunks
+print("--- Error Test ---")
+bad_path = write_file("bad.csv", "".join(f"user{i},user{i}@example.com,{i}\n" for i in range(25)) + "dup,alice@example.com,1\n")
+before = len(vm.tables["users"]["rows"])
+print(vm.copy_from("users", bad_path, ["name", "email", "age"], chunk_rows=10))
+print(len(vm.tables["users"]["rows"]) == before)
+print(vm.execute_command("SELECT id FROM users WHERE email = 'user3@example.com';"))
+short_path = write_file("short.csv", "a,1\nb\n")
+types_path = write_file("types.csv", "a,1\nb,old\n")
+unknown_path = write_file("unknown.ndjson", '{"name": "x"}\n{"name": "y", "nope": 1}\n')
+broken_path = write_file("broken.ndjson", '{"name": "x"}\n{"name": \n')
+print(vm.execute_command(f"COPY users (name, age) FROM '{short_path}';"))
+print(vm.execute_command(f"COPY users (name, age) FROM '{types_path}';"))
+print(vm.execute_command(f"COPY users FROM '{unknown_path}';"))
+print(vm.execute_command(f"COPY users FROM '{broken_path}';"))
+print(vm.execute_command(f"COPY users FROM '{os.path.join(temp_dir, 'missing.csv')}';").replace(temp_dir, "<tmp>"))
+print(vm.execute_command(f"COPY users (name, nope) FROM '{csv_path}';"))
+print(vm.execute_command(f"COPY users FROM '{csv_path}' WITH (FORMAT XML);"))
+print(vm.execute_command(f"COPY missing FROM '{csv_path}';"))
+
+# Columnar tables and indexes are filled the same way
+print("--- Columnar Test ---")
+print(vm.execute_command("CREATE TABLE readings (sensor INT, value FLOAT INDEX, unit TEXT) ENGINE=COLUMNAR;"))
+readings_path = write_file("readings.csv", "".join(f"{i % 4},{i * 0.5},{'C' if i % 2 else 'F'}\n" for i in range(1000)))
+print(vm.execute_command(f"COPY readings FROM '{readings_path}';").replace(temp_dir, "<tmp>"))
+print(vm.execute_command("SELECT * FROM readings WHERE value > 498;"))
+
+# Bulk loading against the SQL importer
+print("--- Timing Test ---")
+count = 20000
+sql_path = write_file("items.sql", "CREATE TABLE items (id INT PRIMARY KEY, name TEXT, price FLOAT);\n" +
+                      "".join(f"INSERT INTO items VALUES ({i}, 'item{i}', {i * 0.25});\n" for i in range(count)))
+items_path = write_file("items.csv", "".join(f"{i},item{i},{i * 0.25}\n" for i in range(count)))
+print(vm.execute_command("CREATE DATABASE import_db;"))
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    vm.import_from_sql("import_db", sql_path)
+import_time = time.perf_counter() - start
+print(vm.execute_command("CREATE DATABASE copy_db;"))
+print(vm.execute_command("USE copy_db;"))
+print(vm.execute_command("CREATE TABLE items (id INT PRIMARY KEY, name TEXT, price FLOAT);"))
+start = time.perf_counter()
+print(vm.execute_command(f"COPY items FROM '{items_path}';").replace(temp_dir, "<tmp>"))
+copy_time = time.perf_counter() - start
+print(vm.databases["copy_db"]["items"]["rows"] == vm.databases["import_db"]["items"]["rows"])
+print(f"importer: {import_time:.3f}s, COPY: {copy_time:.3f}s, {import_time / copy_time:.0f}x faster")
@@ -0,0 +1,117 @@
+import os
+import re
+import sys
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.parser import SQLParser
+
+vm = SQLVM()
+
+# Set up test environment: customers with an indexed region, orders as a row
+# table and as a columnar copy
+print(vm.execute_command("CREATE DATABASE shop;"))
+print(vm.execute_command("USE shop;"))
+print(vm.execute_command("CREATE TABLE customers (id INT PRIMARY KEY, name TEXT, region INT INDEX);"))
+print(vm.execute_command("CREATE TABLE orders (oid INT PRIMARY KEY, customer INT, amount FLOAT);"))
+print(vm.execute_command("CREATE TABLE corders (oid INT, customer INT, amount FLOAT) ENGINE=COLUMNAR;"))
+vm.insert_many("customers", [[i, f"customer {i}", i % 4] for i in range(1000)])
+orders = [[i, i % 1200, round(i * 1.5, 1)] for i in range(5000)]
+vm.insert_many("orders", orders)
+vm.insert_many("corders", orders)
+
+# EXPLAIN [ANALYZE] wraps the instruction of the statement
+print("--- Parser Test ---")
+print(SQLParser.parse_to_bytecode("EXPLAIN SELECT name FROM customers WHERE region = 2;"))
+print(SQLParser.parse_to_bytecode("explain analyze SELECT * FROM customers c JOIN orders o ON c.id = o.customer"))
+print(SQLParser.parse_to_bytecode("EXPLAIN"))
+
+
+def plan_of(query):
+    """Return the QUERY PLAN lines of an EXPLAIN statement"""
+    result = vm.query(query)
+    if (isinstance(result, str)):
+        return [result]
+    return [line for line, in result]
+
+
+def operators(lines):
+    """Operator of each plan line, indented by its depth"""
+    return [re.sub(r"  \((estimated|actual) rows=.*|  \(never executed\)", "", line) for line in lines
+            if not line.startswith("Execution time")]
+
+
+def actual_rows(line):
+    match = re.search(r"actual rows=(\d+) loops=(\d+)", line)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+# EXPLAIN shows the operator tree and estimated rows without running the statement
+print("--- Explain Test ---")
+for query in ("EXPLAIN SELECT name FROM customers WHERE region = 2 ORDER BY name LIMIT 5",
+              "EXPLAIN SELECT * FROM orders WHERE amount > 7000",
+              "EXPLAIN SELECT region, COUNT(*) FROM customers GROUP BY region HAVING COUNT(*) > 3 ORDER BY region DESC",
+              "EXPLAIN SELECT COUNT(*) FROM orders",
+              "EXPLAIN SELECT c.name, o.amount FROM customers c JOIN orders o ON c.id = o.customer "
+              "WHERE c.region = 1 AND o.amount > 100 ORDER BY o.amount DESC LIMIT 3",
+              "EXPLAIN SELECT c.name FROM customers c LEFT JOIN corders o ON c.id = o.customer "
+              "JOIN customers d ON d.id = o.oid WHERE o.amount > c.id"):
+    print("\n".join(plan_of(query)))
+events = []
+vm.tracer.add_sink(events.append)
+vm.tracer.level = 2
+plan_of("EXPLAIN SELECT * FROM orders WHERE amount > 7000")
+vm.tracer.level = 0
+print([event["fields"]["matched"] for event in events if event["event"] == "select"])
+
+# EXPLAIN ANALYZE runs the statement: every operator reports the rows it produced
+print("--- Analyze Test ---")
+for query in ("SELECT name FROM customers WHERE region = 2 ORDER BY name LIMIT 5",
+              "SELECT customer, SUM(amount) FROM corders WHERE amount > 10 GROUP BY customer",
+              "SELECT c.name, o.amount FROM customers c JOIN orders o ON c.id = o.customer WHERE c.region = 1 AND o.amount > 100",
+              "SELECT c.name, d.name FROM customers c JOIN customers d ON d.region = c.region WHERE c.id < 5",
+              "SELECT * FROM customers c CROSS JOIN customers d WHERE c.id < 2 AND d.id < 3"):
+    lines = plan_of("EXPLAIN ANALYZE " + query)
+    print("\n".join(operators(lines)))
+    print(actual_rows(lines[0]), len(vm.query(query)), lines[-1].startswith("Execution time:"))
+lines = plan_of("EXPLAIN ANALYZE SELECT c.name, o.amount FROM customers c JOIN orders o ON c.id = o.customer "
+                "ORDER BY o.amount DESC LIMIT 3")
+print([line.strip().split("  (")[0] for line in lines if "memory=" in line])
+lines = plan_of("EXPLAIN ANALYZE SELECT * FROM orders LIMIT 0")
+print(lines[-2].strip())
+
+# Statistics collected by ANALYZE make the estimates follow the data
+print("--- Estimate Test ---")
+query = "EXPLAIN SELECT id FROM customers WHERE region = 2"
+print(plan_of(query)[-1].strip())
+print(vm.execute_command("ANALYZE customers, orders;"))
+print(plan_of(query)[-1].strip())
+print(plan_of("EXPLAIN SELECT region, COUNT(*) FROM customers GROUP BY region")[0])
+print(plan_of("EXPLAIN SELECT * FROM customers c JOIN orders o ON c.id = o.customer")[1].strip())
+# Index lookups are estimated at one row or more, even for values outside the statistics
+for where in ("id = 7", "id = 99999", "region = 9", "id IN (5000, 6000)"):
+    print(plan_of(f"EXPLAIN SELECT name FROM customers WHERE {where}")[-1].strip())
+
+# Only SELECT statements can be explained; errors of the statement are returned
+print("--- Error Test ---")
+print(vm.execute_command("EXPLAIN DELETE FROM customers WHERE id = 1;"))
+print(vm.execute_command("EXPLAIN SELECT * FROM missing;"))
+print(vm.execute_command("EXPLAIN ANALYZE SELECT missing FROM customers c JOIN orders o ON c.id = o.customer;"))
+print(vm.execute_command("EXPLAIN SELECT * FROM orders LIMIT -1;"))
+print(len(vm.query("SELECT * FROM customers WHERE id = 1")))
+
+# Measuring every operator against running the statement
+print("--- Timing Test ---")
+query = "SELECT customer, SUM(amount) FROM orders WHERE amount > 10 GROUP BY customer ORDER BY customer"
+start = time.perf_counter()
+for _ in range(5):
+    vm.query(query)
+plain_time = time.perf_counter() - start
+start = time.perf_counter()
+for _ in range(5):
+    vm.query("EXPLAIN ANALYZE " + query)
+analyze_time = time.perf_counter() - start
+print(analyze_time < plain_time * 3)
+print(f"statement: {plain_time / 5:.4f}s, EXPLAIN ANALYZE: {analyze_time / 5:.4f}s")
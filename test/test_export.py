@@ -0,0 +1,107 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.export import SQLVMExporter
+
+vm = SQLVM()
+temp_dir = tempfile.mkdtemp()
+
+# Set up test environment: a row table, a columnar table and an empty table
+print(vm.execute_command("CREATE DATABASE shop;"))
+print(vm.execute_command("USE shop;"))
+print(vm.execute_command("CREATE TABLE users (id INT AUTO_INCREMENT PRIMARY KEY, name TEXT, email TEXT UNIQUE, score FLOAT, active BOOL);"))
+print(vm.execute_command("CREATE TABLE readings (sensor INT, value FLOAT, unit TEXT) ENGINE=COLUMNAR;"))
+print(vm.execute_command("CREATE TABLE empty (id INT);"))
+vm.insert_many("users", [[None, f"user {i}", f"user{i}@example.com", i * 0.5, i % 2 == 0] for i in range(250)])
+print(vm.execute_command("INSERT INTO users (name, email) VALUES ('O''Brien; \"quoted\"', NULL);"))
+vm.insert_many("readings", [[i % 3, i * 0.25, None if i % 5 == 0 else "C"] for i in range(2500)])
+print(vm.execute_command("CREATE INDEX idx_score ON users (score);"))
+
+
+def reimport(kind, path):
+    copy = SQLVM()
+    copy.execute_command("CREATE DATABASE shop;")
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = getattr(copy, f"import_from_{kind}")("shop", path)
+    print(result)
+    return all(list(copy.databases["shop"][t]["rows"]) == list(vm.databases["shop"][t]["rows"]) for t in vm.databases["shop"])
+
+
+# SQL export with multi-row INSERT statements
+print("--- SQL Export Test ---")
+sql_path = os.path.join(temp_dir, "shop.sql")
+print(vm.export_to_sql("shop", sql_path, batch_rows=100).replace(temp_dir, "<tmp>"))
+with open(sql_path) as f:
+    text = f.read()
+print(text.count("INSERT INTO `users`"), text.count("INSERT INTO `readings`"), text.count("INSERT INTO `empty`"))
+print(text[text.index("INSERT INTO `users`"):].splitlines()[:2])
+print(reimport("sql", sql_path))
+
+# JSON export keeps the document layout the importer reads
+print("--- JSON Export Test ---")
+json_path = os.path.join(temp_dir, "shop.json")
+print(vm.export_to_json("shop", json_path).replace(temp_dir, "<tmp>"))
+with open(json_path) as f:
+    data = json.load(f)
+print(sorted(data["shop"]), data["shop"]["readings"]["engine"], data["shop"]["users"]["secondary_indexes"])
+print(data["shop"]["users"]["rows"][250])
+print(reimport("json", json_path))
+all_path = os.path.join(temp_dir, "all.json")
+vm.execute_command("CREATE DATABASE nothing;")
+vm.export_to_json(None, all_path)
+with open(all_path) as f:
+    print(sorted(json.load(f)))
+vm.execute_command("USE shop;")
+
+# Newline-delimited JSON of one table, loaded back with COPY
+print("--- NDJSON Export Test ---")
+ndjson_path = os.path.join(temp_dir, "readings.ndjson")
+print(vm.export_table_to_ndjson("readings", ndjson_path).replace(temp_dir, "<tmp>"))
+with open(ndjson_path) as f:
+    print(f.readline().strip())
+print(vm.execute_command("CREATE TABLE readings2 (sensor INT, value FLOAT, unit TEXT);"))
+print(vm.execute_command(f"COPY readings2 FROM '{ndjson_path}';").replace(temp_dir, "<tmp>"))
+print(list(vm.tables["readings2"]["rows"]) == list(vm.tables["readings"]["rows"]))
+print(vm.export_table_to_ndjson("missing"))
+
+# Quotes are doubled and backslashes written as they are, which the importer reads back
+print("--- Quote Round Trip Test ---")
+print(vm.execute_command("CREATE TABLE quotes (id INT, text TEXT);"))
+texts = ["it's", 'say "hi"', "C:\\path\\", "\\", "\\'", "'\\", "a\\'; b", '"\\"', "''", "\\n", None]
+vm.insert_many("quotes", [[i, text] for i, text in enumerate(texts)])
+quotes_path = os.path.join(temp_dir, "quotes.sql")
+vm.export_to_sql("shop", quotes_path)
+with open(quotes_path) as f:
+    text = f.read()
+print(text[text.index("INSERT INTO `quotes`"):].splitlines()[3:5])
+for workers in (None, 2):
+    copy = SQLVM()
+    copy.execute_command("CREATE DATABASE shop;")
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = copy.import_from_sql("shop", quotes_path, workers=workers)
+    print(result, [row["text"] for row in copy.databases["shop"]["quotes"]["rows"]] == texts)
+print(vm.execute_command("DROP TABLE quotes;"))
+
+# Peak memory stays flat as the database grows
+print("--- Memory Test ---")
+print(vm.execute_command("CREATE DATABASE big;"))
+print(vm.execute_command("USE big;"))
+print(vm.execute_command("CREATE TABLE items (id INT PRIMARY KEY, name TEXT, price FLOAT);"))
+peaks = []
+for count in (20000, 80000):
+    vm.insert_many("items", [[i, f"item number {i}", i * 0.25] for i in range(len(vm.tables["items"]["rows"]), count)])
+    for export in (SQLVMExporter.export_to_sql, SQLVMExporter.export_to_json):
+        tracemalloc.start()
+        export(vm, "big", os.path.join(temp_dir, "big.out"))
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+print(os.path.getsize(os.path.join(temp_dir, "big.out")) > 4 * 1024 * 1024)
+print(peaks[2] < peaks[0] * 1.5, peaks[3] < peaks[1] * 1.5, max(peaks) < 1024 * 1024)
@@ -4,6 +4,7 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.sqlvm import SQLVM
+from src.expression import ExpressionParser
 
 vm = SQLVM()
 
@@ -20,4 +21,12 @@ print("--- IN Condition Test ---")
 print(vm.execute_command("SELECT * FROM users WHERE id IN (1, 3);"))
 print(vm.execute_command("SELECT * FROM users WHERE id IN (2)"))
 print(vm.execute_command("SELECT * FROM users WHERE id IN ()"))  # Empty list
-print(vm.execute_command("SELECT * FROM users WHERE id IN ('Alice', 'Bob')"))  # Invalid column
\ No newline at end of file
+print(vm.execute_command("SELECT * FROM users WHERE id IN ('Alice', 'Bob')"))  # Invalid column
+
+# Parsed clauses are cached and shared, so they are built of tuples only
+print("--- Cached Clause Test ---")
+clause = "id IN (1, 3) AND (name = 'Alice' OR NOT name LIKE 'C%')"
+node = ExpressionParser.parse(clause)
+print(node is ExpressionParser.parse(clause), hash(node) == hash(ExpressionParser.parse(clause)))
+print(node)
+print(vm.execute_command(f"SELECT * FROM users WHERE {clause};"))
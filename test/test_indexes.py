@@ -0,0 +1,38 @@
+import os
+import sys
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+
+vm = SQLVM()
+
+# Set up test environment
+print(vm.execute_command("CREATE DATABASE test_db;"))
+print(vm.execute_command("USE test_db;"))
+print(vm.execute_command("CREATE TABLE users (id INT PRIMARY KEY, email TEXT UNIQUE, name TEXT);"))
+print(vm.execute_command("INSERT INTO users VALUES (1, 'alice@example.com', 'Alice');"))
+print(vm.execute_command("INSERT INTO users VALUES (2, 'bob@example.com', 'Bob');"))
+
+# Duplicate keys are rejected on insert
+print("--- Duplicate Insert Test ---")
+print(vm.execute_command("INSERT INTO users VALUES (2, 'carol@example.com', 'Carol');"))
+print(vm.execute_command("INSERT INTO users VALUES (3, 'bob@example.com', 'Carol');"))
+
+# Duplicate keys are rejected on update
+print("--- Duplicate Update Test ---")
+print(vm.execute_command("UPDATE users SET email = 'alice@example.com' WHERE id = 2;"))
+print(vm.execute_command("UPDATE users SET id = 5 WHERE id = 2;"))
+
+# Deleted keys can be reused
+print("--- Delete And Reinsert Test ---")
+print(vm.execute_command("DELETE FROM users WHERE id = 1;"))
+print(vm.execute_command("INSERT INTO users VALUES (1, 'alice@example.com', 'Alice');"))
+print(vm.execute_command("SELECT * FROM users;"))
+
+# Composite primary keys are checked as a whole
+print("--- Composite Primary Key Test ---")
+print(vm.execute_command("CREATE TABLE enrollments (student_id INT, course_id INT, grade TEXT, PRIMARY KEY (student_id, course_id));"))
+print(vm.execute_command("INSERT INTO enrollments VALUES (1, 10, 'A');"))
+print(vm.execute_command("INSERT INTO enrollments VALUES (1, 20, 'B');"))
+print(vm.execute_command("INSERT INTO enrollments VALUES (1, 10, 'C');"))
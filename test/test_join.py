@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.parser import SQLParser
+
+vm = SQLVM()
+
+# Set up test environment: customers and orders as row tables, a columnar copy
+# of the orders and a small regions table; some join keys are NULL or unmatched
+print(vm.execute_command("CREATE DATABASE shop;"))
+print(vm.execute_command("USE shop;"))
+print(vm.execute_command("CREATE TABLE customers (id INT PRIMARY KEY, name TEXT, region INT);"))
+print(vm.execute_command("CREATE TABLE orders (oid INT PRIMARY KEY, customer INT, amount FLOAT);"))
+print(vm.execute_command("CREATE TABLE corders (oid INT, customer INT, amount FLOAT) ENGINE=COLUMNAR;"))
+print(vm.execute_command("CREATE TABLE regions (rid INT, label TEXT);"))
+customers = [[i, f"customer {i}", None if i % 7 == 0 else i % 4] for i in range(40)]
+orders = [[100 + i, None if i % 11 == 0 else (i * 3) % 50, round(i * 1.25, 2)] for i in range(120)]
+regions = [[0, "north"], [1, "south"], [2, "east"], [5, "nowhere"]]
+vm.insert_many("customers", customers)
+vm.insert_many("orders", orders)
+vm.insert_many("corders", orders)
+vm.insert_many("regions", regions)
+
+# The FROM clause becomes a SELECT_JOIN instruction listing every table with its alias and join
+print("--- Parser Test ---")
+print(SQLParser.parse_to_bytecode("SELECT c.name, o.amount FROM customers c JOIN orders o ON c.id = o.customer WHERE o.amount > 5;"))
+print(SQLParser.parse_to_bytecode("SELECT * FROM customers AS c LEFT OUTER JOIN orders o ON (c.id = o.customer) ORDER BY o.amount DESC LIMIT 2"))
+print(SQLParser.parse_to_bytecode("SELECT * FROM customers c RIGHT JOIN orders o ON c.id = o.customer INNER JOIN regions r ON r.rid = c.region"))
+print(SQLParser.parse_to_bytecode("SELECT * FROM customers CROSS JOIN regions"))
+print(SQLParser.parse_to_bytecode("SELECT * FROM customers c JOIN orders o WHERE c.id = 1"))
+print(SQLParser.parse_to_bytecode("SELECT * FROM customers WHERE name = 'a JOIN b ON c'"))
+
+
+def reference(left, right, kind, match):
+    """Nested-loop join of lists of tuples, padding with Nones for outer joins"""
+    width = len(left[0]) if left else 0
+    result = []
+    matched = set()
+    for row in left:
+        found = False
+        for number, other in enumerate(right):
+            if (match(row, other)):
+                found = True
+                matched.add(number)
+                result.append(row + other)
+        if (not found and kind == "LEFT"):
+            result.append(row + (None,) * len(right[0]))
+    if (kind == "RIGHT"):
+        result += [(None,) * width + other for number, other in enumerate(right) if number not in matched]
+    return result
+
+
+def rows_of(result):
+    return sorted(result, key=repr)
+
+
+# Results match a nested-loop reference for every join kind, on both engines
+print("--- Result Test ---")
+customer_rows = [tuple(row) for row in customers]
+order_rows = [tuple(row) for row in orders]
+region_rows = [tuple(row) for row in regions]
+on_customer = lambda c, o: c[0] is not None and c[0] == o[1]
+for table in ("orders", "corders"):
+    for kind in ("INNER", "LEFT", "RIGHT"):
+        result = vm.query(f"SELECT * FROM customers c {kind} JOIN {table} o ON c.id = o.customer")
+        print(table, kind, len(result), rows_of(result) == rows_of(reference(customer_rows, order_rows, kind, on_customer)))
+    result = vm.query(f"SELECT c.id, o.oid FROM customers c LEFT JOIN {table} o ON c.id = o.customer AND o.amount > 50 WHERE c.region = 1")
+    expected = reference([row for row in customer_rows if row[2] == 1], [row for row in order_rows if row[2] > 50], "LEFT", on_customer)
+    print(table, "LEFT ON filter", len(result), rows_of(result) == rows_of([(row[0], row[3]) for row in expected]))
+    result = vm.query(f"SELECT c.id, o.oid FROM customers c LEFT JOIN {table} o ON c.id = o.customer AND o.amount < 30 WHERE o.oid IS NULL")
+    expected = reference(customer_rows, [row for row in order_rows if row[2] < 30], "LEFT", on_customer)
+    expected = [row for row in expected if row[3] is None]
+    print(table, "LEFT anti join", len(result), rows_of(result) == rows_of([(row[0], row[3]) for row in expected]))
+result = vm.query("SELECT c.name, r.label, o.amount FROM customers c JOIN orders o ON o.customer = c.id JOIN regions r ON r.rid = c.region "
+                  "WHERE o.amount < 40 AND r.label != 'east'")
+expected = reference(reference(customer_rows, order_rows, "INNER", on_customer), region_rows, "INNER", lambda row, r: row[2] == r[0])
+expected = [(row[1], row[7], row[5]) for row in expected if row[5] < 40 and row[7] != "east"]
+print("three tables", len(result), rows_of(result) == rows_of(expected))
+result = vm.query("SELECT * FROM customers c RIGHT JOIN regions r ON r.rid = c.region AND c.id < 10")
+expected = reference([row for row in customer_rows if row[0] < 10], region_rows, "RIGHT", lambda c, r: c[2] == r[0])
+print("RIGHT ON filter", len(result), rows_of(result) == rows_of(expected))
+result = vm.query("SELECT * FROM regions CROSS JOIN regions AS other WHERE regions.rid < other.rid")
+print("self join", len(result), rows_of(result) == rows_of([a + b for a in region_rows for b in region_rows if a[0] < b[0]]))
+result = vm.query("SELECT c.id, o.oid FROM customers c JOIN orders o ON c.id = o.customer AND o.amount > c.id")
+print("residual ON", len(result), rows_of(result) == rows_of([(c[0], o[0]) for c in customer_rows for o in order_rows if c[0] == o[1] and o[2] > c[0]]))
+print(vm.execute_command("SELECT c.name, o.amount AS total FROM customers c JOIN orders o ON c.id = o.customer "
+                         "ORDER BY total DESC, 1 LIMIT 3 OFFSET 1;"))
+print(vm.execute_command("SELECT o.*, r.label FROM regions r JOIN corders o ON o.customer = r.rid ORDER BY oid LIMIT 4;"))
+
+# Each join picks its algorithm by estimated cost; the trace shows the choice
+print("--- Planner Test ---")
+print(vm.execute_command("CREATE INDEX idx_customer ON orders (customer);"))
+print(vm.execute_command("CREATE INDEX idx_region ON customers (region);"))
+print(vm.execute_command("CREATE INDEX idx_rid ON regions (rid);"))
+events = []
+vm.tracer.add_sink(events.append)
+vm.tracer.level = 2
+for query in ("SELECT * FROM customers c JOIN orders o ON c.id = o.customer WHERE c.id = 3",
+              "SELECT * FROM orders o JOIN customers c ON c.id = o.customer WHERE o.oid < 105",
+              "SELECT * FROM customers c JOIN orders o ON c.id = o.customer",
+              "SELECT * FROM regions r LEFT JOIN customers c ON c.region = r.rid",
+              "SELECT * FROM customers c JOIN customers d ON c.region = d.region",
+              "SELECT * FROM customers c JOIN corders o ON c.id = o.customer AND o.amount > 10",
+              "SELECT * FROM customers c JOIN regions r ON c.region > r.rid"):
+    events.clear()
+    result = vm.query(query)
+    access = [event["fields"]["access"] for event in events if event["event"] == "select"][0]
+    print(len(result), access)
+vm.tracer.level = 0
+result = vm.query("SELECT c.id, d.id FROM customers c LEFT JOIN customers d ON c.region = d.region AND d.id < 20")
+expected = reference(customer_rows, [row for row in customer_rows if row[0] < 20], "LEFT", lambda c, d: c[2] is not None and c[2] == d[2])
+print("merge LEFT", len(result), rows_of(result) == rows_of([(row[0], row[3]) for row in expected]))
+result = vm.query("SELECT c.id, d.id FROM customers c RIGHT JOIN customers d ON c.region = d.region AND c.id > 30")
+expected = reference([row for row in customer_rows if row[0] > 30], customer_rows, "RIGHT", lambda c, d: c[2] is not None and c[2] == d[2])
+print("merge RIGHT", len(result), rows_of(result) == rows_of([(row[0], row[3]) for row in expected]))
+result = vm.query("SELECT c.id, o.oid FROM customers c RIGHT JOIN orders o ON c.id = o.customer WHERE c.region = 2 OR c.id IS NULL")
+expected = [row for row in reference(customer_rows, order_rows, "RIGHT", on_customer) if row[2] == 2 or row[0] is None]
+print("index RIGHT", rows_of(result) == rows_of([(row[0], row[3]) for row in expected]))
+
+# Ambiguous and unknown columns and duplicate aliases are reported
+print("--- Error Test ---")
+print(vm.execute_command("SELECT amount FROM orders JOIN corders ON orders.oid = corders.oid;"))
+print(vm.execute_command("SELECT * FROM regions JOIN regions ON rid = rid;"))
+print(vm.execute_command("SELECT c.missing FROM customers c JOIN orders o ON c.id = o.customer;"))
+print(vm.execute_command("SELECT * FROM customers c JOIN orders o ON c.id = x.rid JOIN regions x ON x.rid = c.region;"))
+print(vm.execute_command("SELECT * FROM customers c JOIN nothing n ON c.id = n.id;"))
+print(vm.execute_command("SELECT COUNT(*) FROM customers c JOIN orders o ON c.id = o.customer;"))
+print(vm.execute_command("SELECT * FROM customers c JOIN orders o ON c.id = o.customer ORDER BY amount2;"))
+print(vm.execute_command("SELECT * FROM customers c JOIN orders ON;"))
+statement = vm.prepare("SELECT c.name FROM customers c JOIN orders o ON c.id = o.customer WHERE o.oid = ?")
+print(vm.execute(statement, [103]))
+
+# A hash join against comparing every pair of rows
+print("--- Timing Test ---")
+print(vm.execute_command("CREATE TABLE big (id INT, grp INT, label TEXT) ENGINE=COLUMNAR;"))
+print(vm.execute_command("CREATE TABLE groups (gid INT, name TEXT);"))
+vm.insert_many("big", [[i, i % 500, f"label {i % 100}"] for i in range(100000)])
+vm.insert_many("groups", [[g, f"group {g}"] for g in range(0, 500, 2)])
+start = time.perf_counter()
+result = vm.query("SELECT b.id, g.name FROM big b JOIN groups g ON b.grp = g.gid")
+hash_time = time.perf_counter() - start
+big_rows = vm.tables["big"]["rows"]
+group_rows = vm.tables["groups"]["rows"]
+start = time.perf_counter()
+naive = [(big_rows[pos]["id"], group["name"]) for pos in range(20000) for group in group_rows if big_rows[pos]["grp"] == group["gid"]]
+naive_time = (time.perf_counter() - start) * 5
+print(len(result), len(naive) * 5, hash_time * 10 < naive_time)
+print(f"hash join: {hash_time:.4f}s, nested loop (estimated): {naive_time:.4f}s")
@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.snapshot import LazyTables
+from src.wal import WriteAheadLog
+
+temp_dir = tempfile.mkdtemp()
+log_path = os.path.join(temp_dir, "test.wal")
+snapshot_path = os.path.join(temp_dir, "test.db")
+
+# Set up test environment: a database file with a few large tables
+vm = SQLVM()
+wal = WriteAheadLog(log_path, snapshot_path)
+wal.attach(vm)
+print(vm.execute_command("CREATE DATABASE shop;"))
+print(vm.execute_command("USE shop;"))
+for name in ("t1", "t2", "t3", "t4"):
+    print(vm.execute_command(f"CREATE TABLE {name} (id INT PRIMARY KEY, name TEXT, price FLOAT);"))
+    vm.insert_many(name, [[i, f"{name} item {i}", i * 0.5] for i in range(20000)])
+print(vm.execute_command("CREATE TABLE readings (sensor INT, value FLOAT INDEX) ENGINE=COLUMNAR;"))
+vm.insert_many("readings", [[i % 4, i * 0.25] for i in range(1000)])
+print(vm.execute_command("CREATE DATABASE other;"))
+print(wal.checkpoint())
+wal.close()
+
+
+def paged(vm):
+    return {db: sorted(name for name in tables if tables.is_loaded(name)) for db, tables in vm.databases.items()}
+
+
+# Opening the database file reads no table until one is used
+print("--- Lazy Load Test ---")
+lazy = SQLVM()
+wal = WriteAheadLog(log_path, snapshot_path)
+start = time.perf_counter()
+print(wal.recover(lazy, lazy=True, memory_budget=20 * 1024 * 1024))
+open_time = time.perf_counter() - start
+wal.attach(lazy)
+print(isinstance(lazy.databases["shop"], LazyTables), paged(lazy))
+print(lazy.execute_command("USE shop;"))
+print(sorted(lazy.tables))
+print(paged(lazy))
+print(lazy.execute_command("SELECT * FROM t2 WHERE id = 7;"))
+print(lazy.execute_command("SELECT * FROM readings WHERE value > 249;"))
+print(paged(lazy), lazy.pager.page_ins)
+
+# Past the memory budget, the least recently used unchanged tables are evicted between statements
+print("--- Eviction Test ---")
+print(lazy.execute_command("SELECT name FROM t3 WHERE id = 1;"))
+print(lazy.execute_command("SELECT name FROM t4 WHERE id = 1;"))
+print(paged(lazy), lazy.pager.evictions, lazy.pager.resident_bytes() <= lazy.pager.memory_budget)
+print(lazy.execute_command("SELECT name FROM t2 WHERE id = 19999;"))
+print(paged(lazy), lazy.pager.page_ins)
+
+# Changed tables stay in memory until a checkpoint has written them
+print("--- Dirty Table Test ---")
+print(lazy.execute_command("UPDATE t1 SET price = 0 WHERE id < 10;"))
+print(lazy.execute_command("INSERT INTO t1 VALUES (20000, 'new', 1);"))
+for name in ("t2", "t3", "t4", "t2", "t3"):
+    lazy.execute_command(f"SELECT name FROM {name} WHERE id = 2;")
+print(paged(lazy)["shop"], ("shop", "t1") in lazy.pager.dirty)
+print(lazy.execute_command("CREATE TABLE fresh (id INT);"))
+print(lazy.execute_command("INSERT INTO fresh VALUES (1);"))
+print(wal.checkpoint(), lazy.pager.dirty)
+for name in ("t2", "t3", "t4"):
+    lazy.execute_command(f"SELECT name FROM {name} WHERE id = 2;")
+print(paged(lazy)["shop"])
+print(lazy.execute_command("SELECT * FROM t1 WHERE id < 2 OR id = 20000;"))
+wal.close()
+
+# The checkpoint copied the tables that were never paged in
+print("--- Reopen Test ---")
+eager = SQLVM()
+print(WriteAheadLog(log_path, snapshot_path).recover(eager))
+print(len(eager.databases["shop"]["readings"]["rows"]), len(eager.databases["shop"]["t1"]["rows"]),
+      eager.databases["shop"]["t1"]["rows"][3], eager.databases["shop"]["fresh"]["rows"])
+lazy.execute_command("DROP TABLE t4;")
+print(("shop", "t4") in lazy.pager.resident, "t4" in lazy.tables)
+
+# Opening against loading every table
+print("--- Timing Test ---")
+start = time.perf_counter()
+WriteAheadLog(log_path, snapshot_path).recover(SQLVM())
+print(f"lazy open: {open_time:.4f}s, full load: {time.perf_counter() - start:.4f}s")
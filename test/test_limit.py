@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.parser import SQLParser
+from src import pipeline
+
+vm = SQLVM()
+
+# Set up test environment: the same rows in a row table and a columnar table
+print(vm.execute_command("CREATE DATABASE shop;"))
+print(vm.execute_command("USE shop;"))
+print(vm.execute_command("CREATE TABLE items (id INT PRIMARY KEY, name TEXT, price FLOAT);"))
+print(vm.execute_command("CREATE TABLE readings (id INT, sensor INT, unit TEXT) ENGINE=COLUMNAR;"))
+vm.insert_many("items", [[i, f"item {i}", i * 0.5] for i in range(50)])
+vm.insert_many("readings", [[i, i % 4, None if i % 5 == 0 else "C"] for i in range(50)])
+
+# LIMIT and OFFSET are parsed outside quotes and parentheses
+print("--- Parser Test ---")
+print(SQLParser.parse_to_bytecode("SELECT * FROM items LIMIT 5;"))
+print(SQLParser.parse_to_bytecode("SELECT name FROM items WHERE name = 'LIMIT 3' LIMIT 2 OFFSET 4;"))
+print(SQLParser.parse_to_bytecode("SELECT * FROM items WHERE id IN (SELECT id FROM readings) LIMIT 3, 2"))
+print(SQLParser.parse_to_bytecode("SELECT * FROM items OFFSET 48"))
+print(SQLParser.parse_to_bytecode("SELECT * FROM items LIMIT 1 2"))
+
+# Results match slicing the full result, on both engines
+print("--- Limit Test ---")
+for table in ("items", "readings"):
+    for where in ("", " WHERE id > 10", " WHERE id IN (3, 7, 9, 12)", " WHERE id > 100"):
+        full = list(vm.query(f"SELECT * FROM {table}{where}"))
+        checks = [list(vm.query(f"SELECT * FROM {table}{where} LIMIT {limit} OFFSET {offset}")) == full[offset:offset + limit]
+                  for limit in (0, 1, 3, 100) for offset in (0, 2, 60)]
+        print(table, where or "(all)", len(full), all(checks))
+print(vm.execute_command("SELECT id, unit FROM readings WHERE sensor = 1 LIMIT 2, 3;"))
+print(vm.execute_command("SELECT name FROM items OFFSET 48;"))
+
+# Invalid counts are reported; prepared statements bind them as parameters
+print("--- Error Test ---")
+print(vm.execute_command("SELECT * FROM items LIMIT 1 2;"))
+print(vm.select("items", limit=-1))
+print(vm.execute_command("SELECT * FROM items WHERE id IN (SELECT id FROM readings LIMIT 2);"))
+statement = vm.prepare("SELECT id FROM items WHERE price > ? LIMIT ? OFFSET ?")
+print(vm.execute(statement, [10, 2, 1]))
+print(vm.execute(statement, [10, "many", 0]))
+
+# The operators pull from the scan only as many rows as the limit needs
+print("--- Pipeline Test ---")
+pulled = []
+
+
+def counting(positions):
+    for pos in positions:
+        pulled.append(pos)
+        yield pos
+
+
+positions, access = vm._scan_iter("items", "price >= 5")
+plan = pipeline.Project(pipeline.Limit(pipeline.Scan("items", counting(positions), access), 3, 2), vm.tables["items"]["rows"], ["id"])
+print(list(plan), pulled, access)
+
+# A LIMIT ends the scan of a large table early
+print("--- Timing Test ---")
+print(vm.execute_command("CREATE TABLE big (id INT, grp INT, label TEXT) ENGINE=COLUMNAR;"))
+vm.insert_many("big", [[i, i % 100, f"label {i % 1000}"] for i in range(500000)])
+timings = {}
+for query in ("SELECT * FROM big WHERE grp = 7", "SELECT * FROM big WHERE grp = 7 LIMIT 100"):
+    start = time.perf_counter()
+    result = vm.query(query)
+    timings[query] = time.perf_counter() - start
+    print(query, len(result))
+print(timings["SELECT * FROM big WHERE grp = 7 LIMIT 100"] * 5 < timings["SELECT * FROM big WHERE grp = 7"])
+print(", ".join(f"{query[-9:] if 'LIMIT' in query else 'no limit'}: {elapsed:.4f}s" for query, elapsed in timings.items()))
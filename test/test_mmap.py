@@ -0,0 +1,114 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.mapped import MappedStore
+from src.wal import WriteAheadLog
+
+temp_dir = tempfile.mkdtemp()
+vm = SQLVM()
+vm.mmap_dir = os.path.join(temp_dir, "mmap")
+
+# Set up test environment: a reference table with NULLs, unicode and every column type
+print(vm.execute_command("CREATE DATABASE geo;"))
+print(vm.execute_command("USE geo;"))
+print(vm.execute_command("CREATE TABLE places (code TEXT PRIMARY KEY, name TEXT, population INT, area FLOAT, capital BOOL);"))
+vm.insert_many("places", [[f"P{i}", None if i % 7 == 0 else f"Ville {i % 50} é", i * 10, i * 0.5, i % 9 == 0]
+                          for i in range(20000)])
+reference = SQLVM()
+reference.databases = {"geo": {"places": dict(vm.tables["places"], rows=[dict(row) for row in vm.tables["places"]["rows"]])}}
+reference.execute_command("USE geo;")
+
+# Converting a table writes its mapped file; reads come from the mapping
+print("--- Convert Test ---")
+print(vm.execute_command("ALTER TABLE places ENGINE=MMAP;"))
+rows = vm.tables["places"]["rows"]
+path = vm._mapped_path("geo", "places")
+print(type(rows).__name__, os.path.exists(path), len(rows), rows[7], rows[9])
+print(all(vector.mapped for vector in rows.vectors.values()))
+
+# Queries match the same table stored as row dicts
+print("--- Query Test ---")
+queries = ["SELECT * FROM places WHERE code = 'P42';",
+           "SELECT code, area FROM places WHERE name = 'Ville 3 é' AND population < 2000;",
+           "SELECT code FROM places WHERE name IN ('Ville 1 é', 'nowhere') AND population < 1000;",
+           "SELECT code FROM places WHERE name != 'Ville 1 é' AND population < 100;",
+           "SELECT code FROM places WHERE name NOT IN ('Ville 2 é') AND area < 5;",
+           "SELECT code FROM places WHERE name LIKE '%4 é' AND capital = 1 AND population < 5000;",
+           "SELECT code FROM places WHERE name IS NULL AND area BETWEEN 10 AND 40;",
+           "SELECT code FROM places WHERE name = '' OR code = 'P0';"]
+for query in queries:
+    result = vm.execute_command(query)
+    print(result.splitlines()[-2] if result.count("\n") > 4 else result.splitlines()[0], end=" ")
+    print(str(result).split("(Execution")[0] == str(reference.execute_command(query)).split("(Execution")[0])
+print(vm.in_condition("places", "code", ["P1", "P5", "missing"]))
+print(vm.in_condition("places", "name", ["Ville 3 é"])[:2] == reference.in_condition("places", "name", ["Ville 3 é"])[:2])
+
+# Writes copy the changed columns into memory until the table is written again
+print("--- Write Test ---")
+print(vm.execute_command("UPDATE places SET population = 1 WHERE code = 'P3';"))
+print(vm.execute_command("INSERT INTO places VALUES ('ZZ', 'Nouvelle', 5, 1.0, 1);"))
+print(rows.changed, rows.vectors["population"].mapped, rows.vectors["area"].mapped)
+print(vm.execute_command("SELECT * FROM places WHERE code = 'ZZ' OR code = 'P3';"))
+print(vm.execute_command("ALTER TABLE places ENGINE=MMAP;"))
+print(rows.changed, all(vector.mapped for vector in rows.vectors.values()), len(rows))
+print(vm.execute_command("SELECT code FROM places WHERE name = 'Nouvelle';"))
+print(vm.execute_command("CREATE TABLE empty (id INT, label TEXT) ENGINE=MMAP;"))
+print(vm.execute_command("SELECT * FROM empty WHERE label = 'x';"))
+
+# Another process maps the same file and reads the same rows
+print("--- Shared File Test ---")
+script = ("import sys; sys.path.insert(0, sys.argv[2]); from src.mapped import MappedStore; "
+          "store = MappedStore(sys.argv[1]); print(len(store), store[3], store.column('code', 0, 3))")
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+print(subprocess.run([sys.executable, "-c", script, path, root], capture_output=True, text=True).stdout.strip())
+
+# A checkpoint keeps the mapped file; recovery maps it again instead of decoding the rows
+print("--- Checkpoint Test ---")
+wal = WriteAheadLog(os.path.join(temp_dir, "geo.wal"), os.path.join(temp_dir, "geo.db"))
+wal.attach(vm)
+print(wal.checkpoint())
+print(vm.execute_command("UPDATE places SET name = 'Changed' WHERE code = 'P1';"))
+print(wal.checkpoint(), rows.changed)
+wal.close()
+recovered = SQLVM()
+print(WriteAheadLog(os.path.join(temp_dir, "geo.wal"), os.path.join(temp_dir, "geo.db")).recover(recovered))
+table = recovered.databases["geo"]["places"]
+print(type(table["rows"]).__name__, table["rows"].path == path, table["rows"][1], sorted(table["unique_indexes"]))
+os.remove(path)
+rebuilt = SQLVM()
+rebuilt.mmap_dir = vm.mmap_dir
+WriteAheadLog(os.path.join(temp_dir, "geo.wal"), os.path.join(temp_dir, "geo.db")).recover(rebuilt)
+print(os.path.exists(path), list(rebuilt.databases["geo"]["places"]["rows"]) == list(rows))
+
+# Exports keep the engine; imports fill the table and map it
+print("--- Export Test ---")
+sql_path = os.path.join(temp_dir, "geo.sql")
+vm.export_to_sql("geo", sql_path)
+copy = SQLVM()
+copy.mmap_dir = os.path.join(temp_dir, "copy")
+copy.execute_command("CREATE DATABASE geo;")
+with contextlib.redirect_stdout(io.StringIO()):
+    copy.import_from_sql("geo", sql_path)
+copied = copy.databases["geo"]["places"]["rows"]
+print(type(copied).__name__, copied.changed, list(copied) == list(rows))
+print(vm.execute_command("ALTER TABLE places ENGINE=COLUMNAR;"), os.path.exists(path))
+print(vm.execute_command("DROP TABLE empty;"), os.path.exists(vm._mapped_path("geo", "empty")))
+
+# Opening a mapped table against loading the same rows
+print("--- Timing Test ---")
+big = os.path.join(temp_dir, "big.map")
+MappedStore.create(big, ["id", "name", "price"], {"id": "INT", "name": "TEXT", "price": "FLOAT"},
+                   [{"id": i, "name": f"item {i}", "price": i * 0.25} for i in range(200000)])
+start = time.perf_counter()
+store = MappedStore(big)
+open_time = time.perf_counter() - start
+print(len(store), store[199999])
+print(f"open: {open_time:.4f}s ({os.path.getsize(big) >> 10} KB)")
@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.wal import WriteAheadLog
+
+vm = SQLVM()
+
+# Set up test environment
+print(vm.execute_command("CREATE DATABASE test_db;"))
+print(vm.execute_command("USE test_db;"))
+print(vm.execute_command("CREATE TABLE users (id INT AUTO_INCREMENT PRIMARY KEY, name TEXT, email TEXT UNIQUE, age INT);"))
+
+# Several rows in one statement
+print("--- Multi-row Insert Test ---")
+print(vm.execute_command("INSERT INTO users VALUES (NULL, 'Alice', 'alice@example.com', 30), (NULL, 'Bob, Jr.', NULL, 25),\n  (NULL, 'O''Brien', 'ob@example.com', NULL);"))
+print(vm.execute_command("INSERT INTO users (name, age) VALUES ('Carol', 41), ('Dave', 19);"))
+print(vm.execute_command("INSERT INTO users (name) VALUES ('Single');"))
+print(vm.execute_command("SELECT * FROM users;"))
+
+# Backslashes are stored as written; only a doubled quote escapes
+print("--- Backslash Test ---")
+print(vm.execute_command("CREATE TABLE paths (id INT, path TEXT);"))
+print(vm.execute_command("INSERT INTO paths VALUES (1, 'C:\\path\\');"))
+print(vm.execute_command("INSERT INTO paths VALUES (2, 'x\\y'), (3, 'it''s \\n'), (4, \"a\\\"\"b\");"))
+print([path for path, in vm.query("SELECT path FROM paths")])
+print([path for path, in vm.query("SELECT path FROM paths WHERE path = 'C:\\path\\'")])
+print(vm.execute_command("DROP TABLE paths;"))
+
+# A failing row rejects the whole statement
+print("--- Atomicity Test ---")
+print(vm.execute_command("INSERT INTO users VALUES (NULL, 'Eve', 'eve@example.com', 22), (NULL, 'Mallory', 'alice@example.com', 40);"))
+print(vm.execute_command("INSERT INTO users VALUES (NULL, 'Eve', 'eve@example.com', 22), (NULL, 'Eve2', 'eve@example.com', 23);"))
+print(vm.execute_command("INSERT INTO users VALUES (NULL, 'Eve', 'eve@example.com', 22), (NULL, 'Trent', 'trent@example.com');"))
+print(vm.execute_command("INSERT INTO users VALUES (NULL, 'Eve', 'eve@example.com', 22), (NULL, 'Trent', 'trent@example.com', 'old');"))
+print(vm.execute_command("INSERT INTO users (name, nope) VALUES ('Eve', 1), ('Trent', 2);"))
+print(vm.execute_command("INSERT INTO users VALUES (NULL, 'Eve', 'eve@example.com', 22), (NULL, 'Trent', 'trent@example.com', 50);"))
+print(vm.execute_command("SELECT id, name FROM users WHERE id > 5;"))
+
+# Prepared statements bind every row
+print("--- Prepared Test ---")
+insert = vm.prepare("INSERT INTO users (name, age) VALUES (?, ?), (?, ?)")
+print(vm.execute(insert, ["Frank", 33, "Grace", None]))
+print(vm.execute_command("SELECT id, name, age FROM users WHERE id > 7;"))
+
+# Indexes and columnar tables
+print("--- Storage Test ---")
+print(vm.execute_command("CREATE TABLE metrics (id INT PRIMARY KEY, value FLOAT INDEX, label TEXT) ENGINE=COLUMNAR;"))
+print(vm.execute_command("INSERT INTO metrics VALUES (1, 0.5, 'a'), (2, 1.5, 'b'), (3, 2.5, 'a');"))
+print(vm.execute_command("SELECT * FROM metrics WHERE value > 1;"))
+print(vm.execute_command("SELECT * FROM metrics WHERE id = 3;"))
+
+# The write-ahead log records the statement as one change
+print("--- Recovery Test ---")
+temp_dir = tempfile.mkdtemp()
+log_path, snapshot_path = os.path.join(temp_dir, "multi.wal"), os.path.join(temp_dir, "multi.db")
+logged = SQLVM()
+wal = WriteAheadLog(log_path, snapshot_path)
+wal.attach(logged)
+print(logged.execute_command("CREATE DATABASE wal_db;"))
+print(logged.execute_command("USE wal_db;"))
+print(logged.execute_command("CREATE TABLE items (id INT AUTO_INCREMENT PRIMARY KEY, name TEXT);"))
+print(logged.execute_command("INSERT INTO items (name) VALUES ('pen'), ('ink'), ('pad');"))
+recovered = SQLVM()
+print(WriteAheadLog(log_path, snapshot_path).recover(recovered))
+print(recovered.execute_command("USE wal_db;"))
+print(recovered.execute_command("INSERT INTO items (name) VALUES ('cap'), ('pen');"))
+print(recovered.execute_command("SELECT * FROM items;"))
+wal.close()
+
+# One bulk statement against row-at-a-time inserts
+print("--- Timing Test ---")
+print(vm.execute_command("CREATE TABLE bulk (id INT PRIMARY KEY, name TEXT, price FLOAT);"))
+print(vm.execute_command("CREATE TABLE single (id INT PRIMARY KEY, name TEXT, price FLOAT);"))
+values = [f"({i}, 'item{i}', {i * 0.25})" for i in range(5000)]
+start = time.perf_counter()
+for value in values:
+    vm.execute_command(f"INSERT INTO single VALUES {value};")
+single_time = time.perf_counter() - start
+start = time.perf_counter()
+print(vm.execute_command(f"INSERT INTO bulk VALUES {', '.join(values)};").splitlines()[0])
+bulk_time = time.perf_counter() - start
+print(list(vm.query("SELECT * FROM bulk;")) == list(vm.query("SELECT * FROM single;")))
+print(f"row at a time: {single_time:.3f}s, one statement: {bulk_time:.3f}s")
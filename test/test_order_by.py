@@ -0,0 +1,124 @@
+import os
+import random
+import sys
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.parser import SQLParser
+from src import pipeline
+
+vm = SQLVM()
+random.seed(7)
+
+# Set up test environment: the same rows in a row table and a columnar table, with NULLs and ties
+print(vm.execute_command("CREATE DATABASE shop;"))
+print(vm.execute_command("USE shop;"))
+print(vm.execute_command("CREATE TABLE items (id INT PRIMARY KEY, grp INT, name TEXT, price FLOAT);"))
+print(vm.execute_command("CREATE TABLE readings (id INT, grp INT, name TEXT, price FLOAT) ENGINE=COLUMNAR;"))
+data = [[i, None if i % 7 == 0 else random.randint(0, 5), None if i % 11 == 0 else f"n{random.randint(0, 9)}",
+         random.choice([None, 1.5, 2.5, random.random()])] for i in range(300)]
+vm.insert_many("items", data)
+vm.insert_many("readings", data)
+
+# ORDER BY is parsed outside quotes, before LIMIT/OFFSET
+print("--- Parser Test ---")
+print(SQLParser.parse_to_bytecode("SELECT * FROM items ORDER BY grp DESC, name;"))
+print(SQLParser.parse_to_bytecode("SELECT name FROM items WHERE name = 'ORDER BY x' ORDER BY 1 ASC NULLS LAST LIMIT 2;"))
+print(SQLParser.parse_to_bytecode("SELECT * FROM items LIMIT 2 ORDER BY id"))
+print(SQLParser.parse_to_bytecode("SELECT * FROM items ORDER BY"))
+
+
+def expected(rows, order):
+    """Sort row lists with Python's stable sort, last key first; NULLs lowest unless told otherwise"""
+    rows = list(rows)
+    for column, descending, nulls_first in reversed(order):
+        if (nulls_first is None):
+            nulls_first = not descending
+        present = sorted((row for row in rows if row[column] is not None), key=lambda row: row[column], reverse=descending)
+        nulls = [row for row in rows if row[column] is None]
+        rows = nulls + present if nulls_first else present + nulls
+    return [tuple(row) for row in rows]
+
+
+# Results match Python's sort, on both engines, with and without LIMIT
+print("--- Sort Test ---")
+orders = {"grp": [(1, False, None)],
+          "grp DESC, name": [(1, True, None), (2, False, None)],
+          "name NULLS LAST, price DESC NULLS FIRST": [(2, False, False), (3, True, True)],
+          "price DESC, id DESC": [(3, True, None), (0, True, None)]}
+for table in ("items", "readings"):
+    for clause, order in orders.items():
+        full = expected(data, order)
+        checks = [list(vm.query(f"SELECT * FROM {table} ORDER BY {clause}")) == full]
+        checks += [list(vm.query(f"SELECT * FROM {table} ORDER BY {clause} LIMIT {limit} OFFSET {offset}")) == full[offset:offset + limit]
+                   for limit in (0, 1, 10, 500) for offset in (0, 7)]
+        filtered = expected([row for row in data if row[0] > 150], order)
+        checks.append(list(vm.query(f"SELECT * FROM {table} WHERE id > 150 ORDER BY {clause} LIMIT 20")) == filtered[:20])
+        print(table, clause, all(checks))
+print(vm.execute_command("SELECT id, name FROM items WHERE grp = 3 ORDER BY 2 DESC, id LIMIT 4;"))
+print(vm.execute_command("SELECT name FROM items ORDER BY missing;"))
+print(vm.execute_command("SELECT name FROM items ORDER BY 3;"))
+
+# An ordered index on the first column gives the order without sorting
+print("--- Index Order Test ---")
+print(vm.execute_command("CREATE INDEX idx_grp ON items (grp);"))
+for clause, order in orders.items():
+    full = expected(data, order)
+    checks = [list(vm.query(f"SELECT * FROM items ORDER BY {clause}")) == full,
+              list(vm.query(f"SELECT * FROM items ORDER BY {clause} LIMIT 5 OFFSET 3")) == full[3:8],
+              list(vm.query(f"SELECT * FROM items WHERE price > 0.5 ORDER BY {clause} LIMIT 5")) == expected([row for row in data if row[3] is not None and row[3] > 0.5], order)[:5]]
+    print(clause, all(checks))
+events = []
+vm.tracer.add_sink(events.append)
+vm.tracer.level = 2
+vm.select("items", "id", order_by=(("grp", True, None),), limit=3)
+vm.select("items", "id", where="id < 10", order_by=(("grp", True, None),), limit=3)
+vm.select("items", "id", order_by=(("name", False, None),), limit=3)
+print([event["fields"]["access"] for event in events if event["event"] == "select"])
+vm.tracer.level = 0
+
+# Top-k sort and index order against sorting the whole table
+print("--- Timing Test ---")
+print(vm.execute_command("CREATE TABLE big (id INT, score INT INDEX, label TEXT) ENGINE=COLUMNAR;"))
+vm.insert_many("big", [[i, random.randint(0, 1000000), f"label {i % 1000}"] for i in range(200000)])
+timings = {}
+for query in ("SELECT id, label FROM big ORDER BY label DESC, id", "SELECT id, label FROM big ORDER BY label DESC, id LIMIT 10",
+              "SELECT id, score FROM big ORDER BY score DESC LIMIT 10"):
+    start = time.perf_counter()
+    result = vm.query(query)
+    timings[query] = time.perf_counter() - start
+    print(query, len(result), list(result)[:2])
+full, top, index = timings.values()
+print(top * 2 < full, index * 20 < full)
+print(f"full sort: {full:.4f}s, top-k: {top:.4f}s, index order: {index:.4f}s")
+
+# With a LIMIT, only offset + limit rows are held while the child is read
+print("--- Top-k Memory Test ---")
+for order in ([(True, None)], [(True, None), (False, None)], [(False, True), (True, None)]):
+    positions, access = vm._scan_iter("big", None)
+    keys = pipeline.Project(pipeline.Scan("big", positions, access), vm.tables["big"]["rows"], ["label", "id"][:len(order)], keep_position=True)
+    sort = pipeline.Sort(keys, order, limit=25)
+    top = list(sort)
+    positions, access = vm._scan_iter("big", None)
+    keys = pipeline.Project(pipeline.Scan("big", positions, access), vm.tables["big"]["rows"], ["label", "id"][:len(order)], keep_position=True)
+    print(top == list(pipeline.Sort(keys, order))[:25], sort.buffered)
+for clause, order in orders.items():
+    print(clause, list(vm.query(f"SELECT * FROM items ORDER BY {clause} LIMIT 4 OFFSET 2")) == expected(data, order)[2:6])
+
+# Without a LIMIT, a sort past its memory limit spills sorted runs to disk and merges them
+print("--- External Sort Test ---")
+rows = vm.tables["big"]["rows"]
+for order in ([(True, None), (False, None)], [(False, False)]):
+    positions, access = vm._scan_iter("big", None)
+    keys = pipeline.Project(pipeline.Scan("big", positions, access), rows, ["label", "id"][:len(order)], keep_position=True)
+    sort = pipeline.Sort(keys, order, memory_limit=1024 * 1024)
+    external = list(sort)
+    positions, access = vm._scan_iter("big", None)
+    keys = pipeline.Project(pipeline.Scan("big", positions, access), rows, ["label", "id"][:len(order)], keep_position=True)
+    print(external == list(pipeline.Sort(keys, order)), sort.runs > 1)
+limit = pipeline.SORT_MEMORY_BYTES
+pipeline.SORT_MEMORY_BYTES = 1
+print(list(vm.query("SELECT * FROM items ORDER BY name NULLS LAST, price DESC NULLS FIRST")) == expected(data, orders["name NULLS LAST, price DESC NULLS FIRST"]))
+pipeline.SORT_MEMORY_BYTES = limit
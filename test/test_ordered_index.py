@@ -0,0 +1,104 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.index import OrderedIndex
+
+vm = SQLVM()
+
+# Set up test environment: the same rows with and without indexes
+print(vm.execute_command("CREATE DATABASE test_db;"))
+print(vm.execute_command("USE test_db;"))
+print(vm.execute_command("CREATE TABLE plain (id INT, name TEXT, price FLOAT, stock INT);"))
+print(vm.execute_command("CREATE TABLE indexed (id INT PRIMARY KEY, name TEXT, price FLOAT INDEX, stock INT);"))
+for table in ("plain", "indexed"):
+    for i in range(1, 301):
+        vm.execute_command(f"INSERT INTO {table} VALUES ({i}, 'item{i % 13}', {(i * 7) % 100 + 0.5}, {i % 5});")
+
+# CREATE INDEX / DROP INDEX
+print("--- DDL Test ---")
+print(vm.execute_command("CREATE INDEX idx_name ON indexed (name);"))
+print(vm.execute_command("CREATE INDEX idx_stock_price ON indexed (stock, price);"))
+print(vm.execute_command("CREATE INDEX idx_name ON indexed (price);"))
+print(vm.execute_command("CREATE INDEX idx_missing ON indexed (nope);"))
+print(vm.execute_command("CREATE INDEX idx_tmp ON indexed (id);"))
+print(vm.execute_command("DROP INDEX idx_tmp ON indexed;"))
+print(vm.execute_command("DROP INDEX idx_tmp;"))
+print(sorted(vm.tables["indexed"]["ordered_indexes"]))
+
+# B-tree structure: leaves split and stay sorted
+print("--- B-tree Test ---")
+index = OrderedIndex("numbers", ["n"])
+for i, n in enumerate([5, 3, 9, 1, 7] * 200 + list(range(1000, 0, -1))):
+    index.add(n, i)
+keys = [key for leaf in index.leaves for key in leaf]
+print(len(index.leaves) > 1, keys == sorted(set(keys)), index.maxes == [leaf[-1] for leaf in index.leaves])
+print(sorted(index.range(3, 5)) == sorted(index.lookup(3) + index.lookup(4) + index.lookup(5)))
+print(len(index.range(990, None, include_low=False)), len(index.range(None, 2, include_high=False)))
+
+# Queries return the same rows as a full scan, and the plan shows the index used
+print("--- Planner Test ---")
+conditions = [
+    "id = 42",
+    "id IN (3, 4, 500)",
+    "price > 90",
+    "price >= 20.5 AND price < 30",
+    "price BETWEEN 10 AND 12.5 AND stock = 2",
+    "40 > price AND price > 35",
+    "name = 'item4'",
+    "name IN ('item1', 'item2')",
+    "name > 'item8'",
+    "stock = 3",
+    "stock >= 4 OR price < 2",
+    "price = 'abc'",
+    "price < 5 AND name = 'item0'",
+]
+vm.execute_command("SET TRACE = 'plan';")
+for condition in conditions:
+    output = vm.execute_command(f"SELECT * FROM indexed WHERE {condition};")
+    access = [line.split("access=")[1].split(",")[0] for line in output.splitlines() if "select:" in line][0]
+    same = list(vm.query(f"SELECT * FROM plain WHERE {condition};")) == list(vm.query(f"SELECT * FROM indexed WHERE {condition};"))
+    print(condition, "->", access, "OK" if same else "MISMATCH")
+vm.execute_command("SET TRACE = 'off';")
+
+# Indexes follow INSERT, UPDATE and DELETE
+print("--- Maintenance Test ---")
+for table in ("plain", "indexed"):
+    print(vm.execute_command(f"UPDATE {table} SET price = 150.5 WHERE stock = 1;"))
+    print(vm.execute_command(f"DELETE FROM {table} WHERE price < 20;"))
+    print(vm.execute_command(f"INSERT INTO {table} VALUES (1000, 'new', 95.5, 9);"))
+for condition in ["price > 95", "price = 150.5", "stock = 9", "name = 'new'", "price < 25"]:
+    same = list(vm.query(f"SELECT * FROM plain WHERE {condition};")) == list(vm.query(f"SELECT * FROM indexed WHERE {condition};"))
+    print(condition, "OK" if same else "MISMATCH")
+print(vm.execute_command("SELECT id, price FROM indexed WHERE price > 96 AND price < 150;"))
+
+# Schema changes rebuild the indexes
+print("--- Alter Table Test ---")
+print(vm.execute_command("ALTER TABLE indexed ADD rating INT INDEX;"))
+print(vm.execute_command("UPDATE indexed SET rating = 5 WHERE id < 10;"))
+print(vm.execute_command("SELECT id, rating FROM indexed WHERE rating >= 5;"))
+print(vm.execute_command("ALTER TABLE indexed DROP stock;"))
+print(sorted(vm.tables["indexed"]["ordered_indexes"]))
+print(vm.execute_command("ALTER TABLE indexed ENGINE=COLUMNAR;"))
+print(vm.execute_command("SELECT id, name FROM indexed WHERE name = 'item5' AND id < 60;"))
+
+# Secondary indexes survive export and import
+print("--- Export/Import Test ---")
+print(vm.execute_command("CREATE DATABASE export_db;"))
+print(vm.execute_command("USE export_db;"))
+print(vm.execute_command("CREATE TABLE users (id INT, name TEXT, age INT);"))
+print(vm.execute_command("INSERT INTO users VALUES (1, 'Alice', 30);"))
+print(vm.execute_command("INSERT INTO users VALUES (2, 'Bob', 25);"))
+print(vm.execute_command("CREATE INDEX idx_age ON users (age);"))
+export_path = os.path.join(tempfile.mkdtemp(), "indexes.sql")
+print(vm.export_to_sql("export_db", export_path).startswith("Successfully"))
+print(vm.execute_command("CREATE DATABASE copy_db;"))
+with contextlib.redirect_stdout(io.StringIO()):
+    print(vm.import_from_sql("copy_db", export_path))
+print(sorted(vm.tables["users"]["ordered_indexes"]))
+print(vm.execute_command("SELECT * FROM users WHERE age < 28;"))
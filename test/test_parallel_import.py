@@ -0,0 +1,124 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import parallel_import
+from src.sqlvm import SQLVM
+from src.importer import SQLVMImporter
+
+temp_dir = tempfile.mkdtemp()
+
+
+def write_file(name, text):
+    path = os.path.join(temp_dir, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def import_sql(path, workers):
+    vm = SQLVM()
+    vm.execute_command("CREATE DATABASE shop;")
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = SQLVMImporter.import_from_sql(vm, "shop", path, workers=workers)
+    return vm, result, time.perf_counter() - start
+
+
+def same_tables(a, b):
+    return all(list(a.databases["shop"][t]["rows"]) == list(b.databases["shop"][t]["rows"]) for t in a.databases["shop"])
+
+
+if __name__ == "__main__":
+    # Small batches, so each table is spread over several worker jobs
+    parallel_import.BATCH_BYTES = 2000
+    parallel_import.BATCH_RECORDS = 50
+
+    # A dump with several tables, DDL between the INSERTs and a few bad rows
+    print("--- SQL Dump Test ---")
+    dump = ["CREATE TABLE users (id INT AUTO_INCREMENT PRIMARY KEY, name TEXT, email TEXT UNIQUE);",
+            "CREATE TABLE orders (id INT PRIMARY KEY, user_id INT, total FLOAT, paid BOOL);",
+            "CREATE TABLE notes (body TEXT);"]
+    for i in range(300):
+        dump.append(f"INSERT INTO users (name, email) VALUES ('user{i}', 'user{i}@example.com');")
+        dump.append(f"INSERT INTO `orders` VALUES ({i * 2}, {i}, {i * 1.25}, {i % 2}), ({i * 2 + 1}, {i}, NULL, 'true');")
+        if (i % 50 == 0):
+            dump.append(f"INSERT INTO notes VALUES ('note; {i}'), ('it''s {i}');")
+        if (i == 150):
+            dump.append("UPDATE orders SET paid = 0 WHERE user_id < 10;")
+            dump.append("CREATE INDEX idx_user ON orders (user_id);")
+    dump.append("INSERT INTO users (name, email) VALUES ('dup', 'user7@example.com');")
+    dump.append("INSERT INTO orders VALUES (9000, 'x', 1, 1);")
+    dump.append("INSERT INTO missing VALUES (1);")
+    dump_path = write_file("shop.sql", "\n".join(dump) + "\n")
+    serial_vm, serial_result, serial_time = import_sql(dump_path, None)
+    parallel_vm, parallel_result, parallel_time = import_sql(dump_path, 2)
+    print(serial_result[0].splitlines()[0], serial_result[1:])
+    print(parallel_result[0].splitlines()[0], parallel_result[1:])
+    print(same_tables(serial_vm, parallel_vm))
+    print(parallel_vm.execute_command("USE shop;"))
+    print(parallel_vm.execute_command("SELECT * FROM orders WHERE user_id = 3;"))
+    print(parallel_vm.execute_command("SELECT * FROM users WHERE id > 298;"))
+    print(sorted(parallel_vm.tables["orders"]["ordered_indexes"]))
+
+    # Statements reading other tables run after all earlier rows are in
+    print("--- Statement Order Test ---")
+    dump = ["CREATE TABLE a (y INT);", "CREATE TABLE b (x INT);", "INSERT INTO b VALUES (1), (2);", "INSERT INTO a VALUES (1);",
+            "DELETE FROM b WHERE x IN (SELECT y FROM a);", "INSERT INTO a VALUES (2);",
+            "UPDATE b SET x = 5 WHERE x IN (SELECT y FROM a);", "CREATE TABLE c (z INT);", "INSERT INTO c VALUES (3);",
+            "INSERT INTO b VALUES (3);", "DELETE FROM a WHERE y IN (SELECT x FROM b);"]
+    order_path = write_file("order.sql", "\n".join(dump) + "\n")
+    serial_vm, serial_result, _ = import_sql(order_path, None)
+    parallel_vm, parallel_result, _ = import_sql(order_path, 2)
+    print(serial_result == parallel_result, same_tables(serial_vm, parallel_vm))
+    print([list(parallel_vm.databases["shop"][t]["rows"]) for t in ("a", "b", "c")])
+
+    # An exported JSON database
+    print("--- JSON Test ---")
+    source = SQLVM()
+    source.execute_command("CREATE DATABASE shop;")
+    source.execute_command("USE shop;")
+    source.execute_command("CREATE TABLE items (id INT AUTO_INCREMENT PRIMARY KEY, name TEXT UNIQUE, price FLOAT);")
+    source.execute_command("CREATE TABLE tags (item_id INT, tag TEXT);")
+    source.insert_many("items", [[None, f"item{i}", i * 0.5] for i in range(500)])
+    source.insert_many("tags", [[i % 500, f"tag{i % 7}"] for i in range(1200)])
+    source.execute_command("CREATE INDEX idx_tag ON tags (tag);")
+    json_path = os.path.join(temp_dir, "shop.json")
+    source.export_to_json("shop", json_path)
+    results = []
+    for workers in (None, 3):
+        vm = SQLVM()
+        vm.execute_command("CREATE DATABASE shop;")
+        results.append((vm, SQLVMImporter.import_from_json(vm, "shop", json_path, workers=workers)))
+    print(results[0][1])
+    print(results[1][1])
+    print(same_tables(results[0][0], results[1][0]), same_tables(source, results[1][0]))
+    print(sorted(results[1][0].databases["shop"]["tags"]["ordered_indexes"]))
+    # Keys, unique columns and auto-increment counters are carried over
+    schema = ("indexes", "primary_key", "auto_increment")
+    for vm, _ in results:
+        vm.execute_command("USE shop;")
+        print([vm.tables["items"][key] == source.tables["items"][key] for key in schema], sorted(vm.tables["items"]["unique_indexes"]))
+        print(vm.execute_command("INSERT INTO items VALUES (7, 'new', 1.0);").splitlines()[0])
+        print(vm.execute_command("INSERT INTO items (name, price) VALUES ('item3', 1.0);").splitlines()[0])
+        print(vm.execute_command("INSERT INTO items (name, price) VALUES ('new', 1.0);").splitlines()[0])
+
+    # A larger dump with the default batch size
+    print("--- Timing Test ---")
+    parallel_import.BATCH_BYTES = 1 << 20
+    count = 20000
+    lines = [f"CREATE TABLE t{n} (id INT PRIMARY KEY, name TEXT, price FLOAT);" for n in range(4)]
+    for n in range(4):
+        lines += [f"INSERT INTO t{n} VALUES " + ", ".join(f"({i + j}, 'item {i + j}', {(i + j) * 0.25})" for j in range(10)) + ";"
+                  for i in range(0, count, 10)]
+    big_path = write_file("big.sql", "\n".join(lines) + "\n")
+    serial_vm, serial_result, serial_time = import_sql(big_path, None)
+    parallel_vm, parallel_result, parallel_time = import_sql(big_path, 4)
+    print(serial_result == parallel_result, same_tables(serial_vm, parallel_vm))
+    print(f"serial: {serial_time:.3f}s, 4 workers: {parallel_time:.3f}s ({os.cpu_count()} CPUs)")
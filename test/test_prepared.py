@@ -0,0 +1,61 @@
+import os
+import sys
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.parser import SQLParser
+
+vm = SQLVM()
+
+# Set up test environment
+print(vm.execute_command("CREATE DATABASE test_db;"))
+print(vm.execute_command("USE test_db;"))
+print(vm.execute_command("CREATE TABLE users (id INT AUTO_INCREMENT PRIMARY KEY, name TEXT, email TEXT, age INT);"))
+
+# Positional parameters need no quoting or escaping
+print("--- Positional Parameters Test ---")
+insert = vm.prepare("INSERT INTO users VALUES (NULL, ?, ?, ?)")
+print(insert)
+print(vm.execute(insert, ["O'Brien, Pat", 'say "hi"', 41]))
+print(vm.execute(insert, ["Bob", None, 30]))
+print(vm.execute(insert, ["Carol", "carol@example.com", "27"]))
+print(vm.execute(insert, ["Too few"]))
+print(vm.execute("SELECT * FROM users;"))
+
+# Named parameters, which may be used more than once
+print("--- Named Parameters Test ---")
+same_age = vm.prepare("SELECT name FROM users WHERE age >= :age AND age <= :age")
+print(same_age)
+print(vm.execute(same_age, {"age": 30}))
+lookup = vm.prepare("SELECT name, age FROM users WHERE name = :name OR age > :age")
+print(vm.execute(lookup, {"name": "O'Brien, Pat", "age": 28}))
+print(vm.execute(lookup, {"name": "Bob"}))
+print(vm.execute(lookup, ["Bob", 1]))
+
+# UPDATE and DELETE
+print("--- Update/Delete Test ---")
+print(vm.execute("UPDATE users SET email = ?, age = ? WHERE id = ?", ["bob@example.com, work", 31, 2]))
+print(vm.execute("SELECT * FROM users WHERE id = ?", [2]))
+print(vm.execute("UPDATE users SET age = :age WHERE name = :name", {"age": None, "name": "Carol"}))
+print(vm.execute("SELECT * FROM users WHERE age IS NULL"))
+print(vm.execute("DELETE FROM users WHERE name = ?", ["Bob"]))
+
+# Placeholders inside quotes are plain text
+print("--- Quoting Test ---")
+print(vm.execute("INSERT INTO users VALUES (NULL, '?', ':name', ?)", [50]))
+print(vm.execute("SELECT name, email FROM users WHERE name = '?'"))
+
+# Errors
+print("--- Error Test ---")
+print(vm.prepare("NOT A STATEMENT ?"))
+print(vm.prepare("SELECT * FROM users WHERE id IN (SELECT id FROM users WHERE age > ?)"))
+print(vm.execute("SELECT * FROM users WHERE id = ?", {"id": 1}))
+
+# Statements are parsed once and then served from the parse cache
+print("--- Parse Cache Test ---")
+SQLParser.clear_cache()
+for _ in range(3):
+    vm.execute_command("SELECT * FROM users WHERE id = 1;")
+info = SQLParser.cache_info()
+print(info.hits, info.misses)
@@ -0,0 +1,40 @@
+import os
+import sys
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+
+vm = SQLVM()
+
+# Set up test environment
+print(vm.execute_command("CREATE DATABASE test_db;"))
+print(vm.execute_command("USE test_db;"))
+print(vm.execute_command("CREATE TABLE products (id INT, name TEXT, price FLOAT, in_stock BOOL);"))
+print(vm.execute_command("INSERT INTO products VALUES (1, 'Laptop', 999.99, true);"))
+print(vm.execute_command("INSERT INTO products VALUES (2, 'Mouse', 19.99, false);"))
+print(vm.execute_command("ALTER TABLE products ADD note TEXT;"))
+
+# query() returns typed rows instead of a formatted table
+print("--- Typed Rows Test ---")
+result = vm.query("SELECT id, price, in_stock FROM products WHERE id < 3;")
+print(result.columns)
+print(result.types)
+print(result.rows)
+print(result.column_values("price"))
+print(result.as_dicts())
+
+# NULL values are formatted only when the result is shown
+print("--- Formatting Test ---")
+result = vm.query("SELECT id, name, note FROM products WHERE id = 2;")
+print(result.rows)
+print(result)
+
+# Empty results and errors
+print("--- Empty And Error Test ---")
+result = vm.query("SELECT * FROM products WHERE price > 5000;")
+print(len(result))
+print(result)
+print(vm.query("SELECT * FROM missing;"))
+print(vm.query("DELETE FROM products WHERE id = 2;"))
+print(len(vm.query("SELECT * FROM products;")))
@@ -0,0 +1,50 @@
+import os
+import sys
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+
+vm = SQLVM()
+
+# Set up test environment
+print(vm.execute_command("CREATE DATABASE test_db;"))
+print(vm.execute_command("USE test_db;"))
+print(vm.execute_command("CREATE TABLE users (id INT PRIMARY KEY, name TEXT);"))
+print(vm.execute_command("CREATE TABLE orders (id INT PRIMARY KEY, user_id INT, amount FLOAT, ref TEXT);"))
+print(vm.execute_command("INSERT INTO users VALUES (1, 'Alice');"))
+print(vm.execute_command("INSERT INTO users VALUES (2, 'Bob');"))
+print(vm.execute_command("INSERT INTO users VALUES (3, 'Charlie');"))
+print(vm.execute_command("INSERT INTO orders VALUES (1, 1, 50.0, '1');"))
+print(vm.execute_command("INSERT INTO orders VALUES (2, 1, 150.0, '2');"))
+print(vm.execute_command("INSERT INTO orders VALUES (3, 2, 20.0, 'x');"))
+
+# Conditions after the subquery are kept
+print("--- Semi-Join Test ---")
+print(vm.execute_command("SELECT name FROM users WHERE id IN (SELECT user_id FROM orders) AND name != 'Bob';"))
+
+# Anti-join
+print("--- Anti-Join Test ---")
+print(vm.execute_command("SELECT name FROM users WHERE id NOT IN (SELECT user_id FROM orders);"))
+
+# Subquery values are converted to the outer column type
+print("--- Type Conversion Test ---")
+print(vm.execute_command("SELECT name FROM users WHERE id IN (SELECT ref FROM orders);"))
+
+# A NULL in the subquery means NOT IN is never true
+print("--- NOT IN With NULL Test ---")
+print(vm.execute_command("ALTER TABLE orders ADD note TEXT;"))
+print(vm.execute_command("SELECT name FROM users WHERE name NOT IN (SELECT note FROM orders);"))
+# IN is unknown when the value is not found among values with a NULL, and NOT keeps it unknown
+print(vm.execute_command("SELECT name FROM users WHERE NOT (name IN (SELECT note FROM orders));"))
+print(vm.execute_command("SELECT name FROM users WHERE NOT (id IN (SELECT user_id FROM orders));"))
+
+# Correlated subqueries with equality conditions are decorrelated
+print("--- Correlated Subquery Test ---")
+print(vm.execute_command("SELECT name FROM users WHERE 2 IN (SELECT orders.id FROM orders WHERE orders.user_id = users.id AND amount > 100);"))
+print(vm.execute_command("SELECT name FROM users WHERE 1 NOT IN (SELECT id FROM orders WHERE user_id = users.id);"))
+print(vm.execute_command("SELECT name FROM users WHERE id NOT IN (SELECT user_id FROM orders WHERE amount > users.id);"))
+
+# Subqueries must return one column
+print("--- Invalid Subquery Test ---")
+print(vm.execute_command("SELECT name FROM users WHERE id IN (SELECT user_id, amount FROM orders);"))
@@ -0,0 +1,97 @@
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src import snapshot
+from src.snapshot import SnapshotReader, convert_pickle, is_snapshot, read_database_file, write_snapshot
+
+vm = SQLVM()
+temp_dir = tempfile.mkdtemp()
+
+
+def same_databases(a, b):
+    return sorted(a) == sorted(b) and all(
+        sorted(a[db]) == sorted(b[db]) and all(list(a[db][t]["rows"]) == list(b[db][t]["rows"]) for t in a[db]) for db in a)
+
+
+# Set up test environment: row and columnar tables with NULLs, unicode and mixed values
+print(vm.execute_command("CREATE DATABASE shop;"))
+print(vm.execute_command("USE shop;"))
+print(vm.execute_command("CREATE TABLE users (id INT AUTO_INCREMENT PRIMARY KEY, name TEXT, email TEXT UNIQUE, score FLOAT, active BOOL);"))
+print(vm.execute_command("CREATE TABLE readings (sensor INT, value FLOAT INDEX, unit TEXT) ENGINE=COLUMNAR;"))
+print(vm.execute_command("CREATE TABLE empty (id INT);"))
+vm.insert_many("users", [[None, f"user {i} é中", f"user{i}@example.com", i * 0.5, i % 2 == 0] for i in range(150)])
+print(vm.execute_command("INSERT INTO users (name, email) VALUES ('', NULL);"))
+vm.insert_many("readings", [[i % 3, i * 0.25, None if i % 5 == 0 else "C"] for i in range(300)])
+print(vm.execute_command("CREATE INDEX idx_score ON users (score);"))
+vm.tables["users"]["rows"][3]["score"] = "n/a"  # A value that does not fit the column type
+print(vm.execute_command("CREATE DATABASE nothing;"))
+
+# Round trip with each compression and a small chunk size
+print("--- Round Trip Test ---")
+for compression in ("zlib", "none"):
+    path = os.path.join(temp_dir, f"shop_{compression}.db")
+    with open(path, "wb") as f:
+        write_snapshot(f, vm.databases, lsn=7, compression=compression, chunk_rows=64)
+    loaded, lsn = read_database_file(SQLVM(), path)
+    print(compression, is_snapshot(path), lsn, same_databases(vm.databases, loaded))
+print(type(loaded["shop"]["readings"]["rows"]).__name__, loaded["shop"]["users"]["rows"][3], loaded["shop"]["users"]["rows"][150])
+print(sorted(loaded["shop"]["users"]["unique_indexes"]), sorted(loaded["shop"]["users"]["ordered_indexes"]))
+print(loaded["shop"]["users"]["auto_increment"], loaded["nothing"])
+
+# Tables are read on their own from the table directory
+print("--- Table Directory Test ---")
+with SnapshotReader(path) as reader:
+    print(reader.table_names("shop"), reader.row_count("shop", "readings"))
+    table = reader.load_table(SQLVM(), "shop", "readings")
+    print(len(table["rows"]), table["rows"][5], sorted(table["ordered_indexes"]))
+try:
+    write_snapshot(open(os.path.join(temp_dir, "bad.db"), "wb"), vm.databases, compression="lz4")
+except ValueError as e:
+    print(e)
+try:
+    SnapshotReader(os.path.join(temp_dir, "bad.db"))
+except snapshot.SnapshotError as e:
+    print(str(e).replace(temp_dir, "<tmp>"))
+
+# Pickle files of older versions are converted in place
+print("--- Pickle Conversion Test ---")
+pickle_path = os.path.join(temp_dir, "legacy.db")
+shutil.copy(os.path.join(os.path.dirname(__file__), "..", "db", "sqlvm_database.db"), pickle_path)
+legacy, _ = read_database_file(SQLVM(), pickle_path)
+print(is_snapshot(pickle_path), convert_pickle(pickle_path) == pickle_path, is_snapshot(pickle_path))
+converted, _ = read_database_file(SQLVM(), pickle_path)
+print(same_databases(legacy, converted), converted["db2"]["new"]["primary_key"])
+
+# Loading a snapshot against loading a pickle of the same data
+print("--- Timing Test ---")
+print(vm.execute_command("CREATE TABLE items (id INT PRIMARY KEY, name TEXT, price FLOAT) ENGINE=COLUMNAR;"))
+print(vm.execute_command("CREATE TABLE orders (id INT PRIMARY KEY, item INT, note TEXT);"))
+vm.insert_many("items", [[i, f"item number {i}", i * 0.25] for i in range(200000)])
+vm.insert_many("orders", [[i, i % 1000, None if i % 3 else "gift"] for i in range(200000)])
+big_pickle = os.path.join(temp_dir, "big.pickle")
+big_snapshot = os.path.join(temp_dir, "big.db")
+with open(big_pickle, "wb") as f:
+    pickle.dump(vm.databases, f)
+with open(big_snapshot, "wb") as f:
+    write_snapshot(f, vm.databases)
+start = time.perf_counter()
+with open(big_pickle, "rb") as f:
+    pickle.load(f)
+pickle_time = time.perf_counter() - start
+start = time.perf_counter()
+loaded, _ = read_database_file(SQLVM(), big_snapshot)
+snapshot_time = time.perf_counter() - start
+print(same_databases(vm.databases, loaded), os.path.getsize(big_snapshot) < os.path.getsize(big_pickle) / 3)
+start = time.perf_counter()
+with SnapshotReader(big_snapshot) as reader:
+    reader.load_table(SQLVM(), "shop", "users")
+table_time = time.perf_counter() - start
+print(f"pickle: {pickle_time:.3f}s ({os.path.getsize(big_pickle) >> 10} KB), "
+      f"snapshot: {snapshot_time:.3f}s ({os.path.getsize(big_snapshot) >> 10} KB), one table: {table_time:.4f}s")
@@ -0,0 +1,112 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.importer import SQLStatementReader, SQLVMImporter
+
+temp_dir = tempfile.mkdtemp()
+
+# A dump in the style of mysqldump: comments, session settings, table locks and extended INSERTs
+DUMP = r"""-- MySQL dump 10.13
+/*!40101 SET @OLD_CHARACTER_SET_CLIENT=@@CHARACTER_SET_CLIENT */;
+/*!40101 SET NAMES utf8mb4 */;
+SET FOREIGN_KEY_CHECKS=0;
+CREATE DATABASE IF NOT EXISTS `shop`;
+USE `shop`;
+
+--
+-- Table structure for table `products`
+--
+DROP TABLE IF EXISTS `products`;
+CREATE TABLE `products` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `name` varchar(100) DEFAULT NULL,
+  `note` varchar(255),
+  `price` float,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB AUTO_INCREMENT=5 DEFAULT CHARSET=utf8mb4;
+
+LOCK TABLES `products` WRITE;
+INSERT INTO `products` (`id`, `name`, `note`, `price`) VALUES (1,'Pen','semi; colon',1.5),(2,'Ink','it''s -- not a comment',3),
+(3,'Pad','back\slash /* no ''comment'' */',2.25),(4,'Cap',NULL,0.5);
+UNLOCK TABLES;
+INSERT INTO products VALUES (5, "Dq ""quoted"" C:\", '  two  spaces  ', 9);
+CREATE INDEX idx_price ON products (price);
+"""
+
+dump_path = os.path.join(temp_dir, "shop.sql")
+with open(dump_path, "w", encoding="utf-8") as f:
+    f.write(DUMP)
+
+# Statements are the same whatever the chunk size
+print("--- Tokenizer Test ---")
+statements = list(SQLStatementReader(io.StringIO(DUMP)))
+for statement in statements:
+    print(statement.splitlines()[0][:70])
+same = all(list(SQLStatementReader(io.BytesIO(DUMP.encode("utf-8")), size)) == statements for size in range(1, 40))
+print("chunk sizes agree:", same)
+
+# Import with a progress callback and no console output
+print("--- Import Test ---")
+vm = SQLVM()
+print(vm.execute_command("CREATE DATABASE shop;"))
+updates = []
+output = io.StringIO()
+with contextlib.redirect_stdout(output):
+    message, error_count, success_count = SQLVMImporter.import_from_sql(
+        vm, "shop", dump_path, progress=lambda done, total, count: updates.append((done, total, count)), chunk_size=64)
+print(message, error_count, success_count)
+print("printed:", repr(output.getvalue()))
+print(len(updates) > 5, updates[-1] == (len(DUMP.encode("utf-8")), len(DUMP.encode("utf-8")), len(statements)))
+print(vm.execute_command("SELECT * FROM products;"))
+print(sorted(vm.tables["products"]["ordered_indexes"]))
+
+# mysqldump escapes with backslashes by default: such dumps are read with backslash_escapes,
+# which rewrites their strings to the standard rule; without it they do not split as intended
+print("--- Backslash Escape Test ---")
+ESCAPED = r"""CREATE TABLE notes (id INT, body TEXT);
+INSERT INTO `notes` VALUES (1,'it\'s; \"fine\"'),(2,'C:\\path\\'),(3,'two\nlines\ttab'),(4,"dq \" and \' and ''"),(5,'100\% ok');
+INSERT INTO `notes` VALUES (6,'end\\');
+"""
+print([statement[-30:] for statement in SQLStatementReader(io.StringIO(ESCAPED), backslash_escapes=True)])
+same = all(list(SQLStatementReader(io.StringIO(ESCAPED), size, True)) == list(SQLStatementReader(io.StringIO(ESCAPED), None, True))
+           for size in range(1, 40))
+print("chunk sizes agree:", same)
+escaped_path = os.path.join(temp_dir, "escaped.sql")
+with open(escaped_path, "w", encoding="utf-8") as f:
+    f.write(ESCAPED)
+for backslash_escapes in (True, False):
+    vm.execute_command("DROP DATABASE notes_db;")
+    vm.execute_command("CREATE DATABASE notes_db;")
+    message, error_count, success_count = SQLVMImporter.import_from_sql(vm, "notes_db", escaped_path, backslash_escapes=backslash_escapes)
+    print(backslash_escapes, message.splitlines()[0], [row["body"] for row in vm.tables["notes"]["rows"]])
+
+# Errors are counted and the first ones reported
+print("--- Error Test ---")
+bad_path = os.path.join(temp_dir, "bad.sql")
+with open(bad_path, "w", encoding="utf-8") as f:
+    f.write("CREATE TABLE t (id INT PRIMARY KEY);\nINSERT INTO t VALUES (1);\nINSERT INTO t VALUES (1);\nINSERT INTO missing VALUES (2);\n")
+print(vm.execute_command("CREATE DATABASE bad_db;"))
+message, error_count, success_count = SQLVMImporter.import_from_sql(vm, "bad_db", bad_path)
+print(message)
+print(error_count, success_count)
+
+# The reader only holds the statement being read
+print("--- Memory Test ---")
+big_path = os.path.join(temp_dir, "big.sql")
+with open(big_path, "w", encoding="utf-8") as f:
+    for i in range(2000):
+        f.write(f"INSERT INTO products VALUES " + ", ".join(f"({i * 10 + j}, 'name {j}; x', 'note', 1.5)" for j in range(100)) + ";\n")
+size = os.path.getsize(big_path)
+tracemalloc.start()
+with open(big_path, "rb") as f:
+    count = sum(1 for _ in SQLStatementReader(f, 1 << 16))
+peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+print(count, size > 5 * 1024 * 1024, peak < size / 10)
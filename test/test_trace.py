@@ -0,0 +1,34 @@
+import os
+import sys
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+
+vm = SQLVM()
+
+# Set up test environment
+print(vm.execute_command("CREATE DATABASE test_db;"))
+print(vm.execute_command("USE test_db;"))
+print(vm.execute_command("CREATE TABLE products (id INT, name TEXT, price FLOAT);"))
+print(vm.execute_command("INSERT INTO products VALUES (1, 'Laptop', 999.99);"))
+print(vm.execute_command("INSERT INTO products VALUES (2, 'Mouse', 19.99);"))
+
+# Tracing is off by default
+print("--- Trace Off Test ---")
+print(vm.execute_command("SELECT name FROM products WHERE price > 100;"))
+
+# Plan level shows the predicate and access path
+print("--- Trace Plan Test ---")
+print(vm.execute_command("SET TRACE = 'plan';"))
+print(vm.execute_command("SELECT name FROM products WHERE price > 100 AND id = 1;"))
+
+# Row level shows every predicate evaluation
+print("--- Trace Row Test ---")
+print(vm.execute_command("SET TRACE = ROW;"))
+print(vm.execute_command("DELETE FROM products WHERE name = 'Mouse';"))
+
+# Unknown levels are rejected
+print("--- Trace Error Test ---")
+print(vm.execute_command("SET TRACE = 'verbose';"))
+print(vm.execute_command("SET TRACE = OFF;"))
@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import sqlvm
+from src.sqlvm import SQLVM
+
+vm = SQLVM()
+
+# Set up the same small tables as rows and columns, with NULLs, and a large
+# table for index lookups
+print(vm.execute_command("CREATE DATABASE test_db;"))
+print(vm.execute_command("USE test_db;"))
+for table, engine in (("row_items", "ROW"), ("col_items", "COLUMNAR")):
+    print(vm.execute_command(f"CREATE TABLE {table} (id INT, name TEXT, price FLOAT, note TEXT) ENGINE={engine};"))
+    vm.insert_many(table, [[i, f"item{i % 3}", i * 1.5, "sale" if i % 4 == 0 else None] for i in range(1, 9)])
+    print(vm.execute_command(f"INSERT INTO {table} (name) VALUES ('blank');"))
+print(vm.execute_command("CREATE TABLE people (id INT PRIMARY KEY, name TEXT, age INT, city TEXT INDEX);"))
+vm.insert_many("people", [[i, f"person{i}", i % 90, f"city{i % 50}"] for i in range(20000)])
+print(vm.execute_command("INSERT INTO people VALUES (20000, 'rare', 5, 'nowhere');"))
+
+
+def program_of(table, columns="*", where=None, limit=None, offset=None):
+    """Program a SELECT runs as, or None when it runs as a pipeline"""
+    return vm._select_program(table, columns, where, limit, offset)
+
+
+def pipeline(query):
+    """Result of a statement run as an operator pipeline"""
+    saved, sqlvm.PROGRAM_MAX_VALUES = sqlvm.PROGRAM_MAX_VALUES, -1
+    try:
+        return vm.query(query)
+    finally:
+        sqlvm.PROGRAM_MAX_VALUES = saved
+
+
+# A program walks the rows, jumps over the ones failing the WHERE clause and
+# emits the selected columns
+print("--- Listing Test ---")
+sqlvm.PROGRAM_MAX_VALUES = 1000
+print("\n".join(program_of("row_items", "id, name", "price > 3 AND note IS NULL", 2, 1).listing()))
+print("\n".join(program_of("people", "name", "id = 42").listing()))
+
+# Small statements run as programs and return what the pipeline returns
+print("--- Result Test ---")
+conditions = [
+    None,
+    "id = 4",
+    "id != 4",
+    "id > 3 AND price < 10",
+    "id < 2 OR id >= 7",
+    "NOT (id > 2)",
+    "5 < id",
+    "id = 'abc'",
+    "id != 'abc'",
+    "name > 3",
+    "id = 2.5",
+    "price >= 6.0",
+    "name = 'item1'",
+    "name IN ('item1', 'item2')",
+    "name LIKE 'item%'",
+    "note IS NULL",
+    "note IS NOT NULL AND id > 3",
+    "note = 'sale'",
+    "note != 'sale'",
+    "NOT (note = 'sale')",
+    "note = NULL",
+    "NOT (note = NULL)",
+    "id BETWEEN 2 AND 5",
+    "id NOT BETWEEN 2 AND 5",
+    "id = price",
+    "id > 2 AND (name = 'item0' OR note IS NOT NULL)",
+    "NOT (id > 2 OR name = 'item1')",
+    "NOT (note = 'sale' AND id > 2)",
+    "NOT (note != 'sale' OR id > 5)",
+    "NOT (NOT (note = 'sale'))",
+    "NOT (id > 2 AND note IS NULL)",
+    "NOT (id BETWEEN 2 AND 5)",
+    "NOT (id > 'abc')",
+    "note = NULL OR id = 1",
+    "NOT (note = NULL OR id = 1)",
+    "note NOT IN ('sale', NULL)",
+    "id NOT IN (1, NULL)",
+    "NOT (name LIKE 'item%')",
+]
+mismatches = 0
+for table in ("row_items", "col_items"):
+    for condition in conditions:
+        for options in ("", " LIMIT 2", " LIMIT 3 OFFSET 2", " LIMIT 0", " OFFSET 7"):
+            query = f"SELECT * FROM {table}" + (f" WHERE {condition}" if condition else "") + options
+            expected = pipeline(query)
+            actual = vm.query(query)
+            if (list(expected) != list(actual) or expected.columns != actual.columns):
+                mismatches += 1
+                print(query, "MISMATCH")
+print("Mismatches:", mismatches)
+# Conditions are three-valued: NOT keeps a comparison with NULL unknown
+for condition in ("NOT (id > 2)", "NOT (note = 'sale')", "NOT (note = 'sale' AND id > 2)", "id NOT IN (1, NULL)"):
+    print(condition, [len(vm.query(f"SELECT * FROM {table} WHERE {condition}")) for table in ("row_items", "col_items")])
+print(program_of("row_items", "*", "id > 3") is not None, program_of("col_items", "*", "id > 3") is not None)
+print(vm.execute_command("SELECT name, id FROM row_items WHERE note IS NOT NULL;"))
+print(vm.execute_command("SELECT missing FROM row_items WHERE id = 1;"))
+print(vm.execute_command("SELECT * FROM row_items LIMIT -1;"))
+print(vm.execute_command("SELECT * FROM row_items WHERE id = 1 AND;"))
+sqlvm.PROGRAM_MAX_VALUES = 16
+
+# Index lookups of a few rows run as programs, larger reads as pipelines
+print("--- Index Test ---")
+for where in ("id = 42", "id = '42'", "id = 99999", "city = 'nowhere'", "city = 'city7'", "age = 5", "id > 19990"):
+    program = program_of("people", "name", where)
+    query = f"SELECT name FROM people WHERE {where}"
+    print(where, "->", program is not None, len(vm.query(query)), list(vm.query(query)) == list(pipeline(query)))
+print(program_of("people", "id, name", None, 5) is not None, program_of("people", "id, name", None, 50) is not None)
+print(list(vm.query("SELECT id FROM people LIMIT 3 OFFSET 10")))
+
+# Cached programs are compiled again when the table changes under them
+print("--- Cache Test ---")
+first = program_of("people", "name", "city = 'nowhere'")
+print(first is program_of("people", "name", "city = 'nowhere'"))
+print(vm.execute_command("INSERT INTO people VALUES (20001, 'other', 6, 'nowhere');"))
+print(first is program_of("people", "name", "city = 'nowhere'"), vm.query("SELECT name FROM people WHERE city = 'nowhere'"))
+print(vm.execute_command("DROP INDEX city ON people;"))
+print(program_of("people", "name", "city = 'nowhere'"), len(vm.query("SELECT name FROM people WHERE city = 'nowhere'")))
+print(vm.execute_command("CREATE INDEX by_city ON people (city);"))
+second = program_of("people", "name", "city = 'nowhere'")
+print(second is not None, second is first, len(vm.query("SELECT name FROM people WHERE city = 'nowhere'")))
+print(vm.execute_command("ANALYZE people;"))
+print(second is program_of("people", "name", "city = 'nowhere'"))
+print(vm.execute_command("ALTER TABLE row_items ADD extra INT;"))
+print(vm.query("SELECT * FROM row_items WHERE id = 1").columns)
+print(vm.execute_command("UPDATE row_items SET extra = 7 WHERE id = 1;"))
+print(list(vm.query("SELECT id, extra FROM row_items WHERE id = 1")))
+print(vm.execute_command("ALTER TABLE row_items ENGINE=COLUMNAR;"))
+print(list(vm.query("SELECT id, extra FROM row_items WHERE id = 1")))
+print(vm.execute_command("DELETE FROM people WHERE id = 42;"))
+print(list(vm.query("SELECT name FROM people WHERE id = 42")), list(vm.query("SELECT name FROM people WHERE id = 43")))
+
+# Statements that need the pipeline: ORDER BY, tracing and EXPLAIN
+print("--- Pipeline Test ---")
+print(vm.execute_command("SELECT id FROM col_items WHERE id < 4 ORDER BY id DESC;"))
+print(vm.execute_command("SET TRACE = 'plan';"))
+print(vm.execute_command("SELECT name FROM people WHERE id = 7;"))
+print(vm.execute_command("SET TRACE = 'off';"))
+print(vm.execute_command("EXPLAIN SELECT name FROM people WHERE id = 7;"))
+
+# A compiled program skips parsing and planning the WHERE clause of a lookup
+print("--- Timing Test ---")
+query = "SELECT name, age FROM people WHERE id = 1234"
+vm.query(query)
+start = time.perf_counter()
+for _ in range(2000):
+    vm.query(query)
+program_time = time.perf_counter() - start
+sqlvm.PROGRAM_MAX_VALUES = -1
+start = time.perf_counter()
+for _ in range(2000):
+    vm.query(query)
+pipeline_time = time.perf_counter() - start
+sqlvm.PROGRAM_MAX_VALUES = 16
+print(program_time < pipeline_time)
+print(f"program: {program_time / 2000 * 1e6:.1f} us, pipeline: {pipeline_time / 2000 * 1e6:.1f} us")
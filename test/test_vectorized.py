@@ -0,0 +1,105 @@
+import os
+import sys
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src import vectorized
+
+vm = SQLVM()
+
+# Set up the same data in a row table and a columnar table
+print(vm.execute_command("CREATE DATABASE test_db;"))
+print(vm.execute_command("USE test_db;"))
+for table, engine in (("row_items", "ROW"), ("col_items", "COLUMNAR")):
+    print(vm.execute_command(f"CREATE TABLE {table} (id INT, name TEXT, price FLOAT, active BOOL) ENGINE={engine};"))
+    for i in range(1, 201):
+        vm.execute_command(
+            f"INSERT INTO {table} VALUES ({i}, 'item{i % 7}', {i * 1.5}, {'true' if i % 3 else 'false'});")
+    print(vm.execute_command(f"ALTER TABLE {table} ADD note TEXT;"))
+    print(vm.execute_command(f"UPDATE {table} SET note = 'sale' WHERE id < 20;"))
+print("NumPy available:", vectorized.available())
+
+# Small batches so the predicates run over several batches
+vectorized.BATCH_SIZE = 64
+
+print("--- Predicate Test ---")
+conditions = [
+    "id = 42",
+    "id != 42",
+    "id > 150 AND price < 240",
+    "id < 5 OR id >= 198",
+    "NOT (id > 10)",
+    "150 < id",
+    "id = 'abc'",
+    "id != 'abc'",
+    "price >= 100.5",
+    "id = 2.5",
+    "active = true",
+    "active = false AND id <= 12",
+    "name = 'item3'",
+    "name > 'item4'",
+    "name IN ('item1', 'item2')",
+    "name NOT IN ('item1', 'item2')",
+    "id IN (1, 2, 3, 500)",
+    "id NOT IN (1, 2, 3)",
+    "name LIKE 'item%'",
+    "name LIKE '%5'",
+    "name NOT LIKE 'item_'",
+    "note IS NULL",
+    "note IS NOT NULL AND id > 15",
+    "note = 'sale'",
+    "note != 'sale'",
+    "id BETWEEN 10 AND 20",
+    "id NOT BETWEEN 10 AND 190",
+    "id = price",
+    "price > id",
+    "id IN (SELECT id FROM row_items WHERE price > 280)",
+    "NOT (note = 'sale')",
+    "NOT (note = 'sale' AND id > 5)",
+    "NOT (note != 'sale' OR id > 10)",
+    "note NOT BETWEEN 'a' AND 'z'",
+    "NOT (note LIKE 's%')",
+    "note NOT IN ('sale', NULL)",
+    "id NOT IN (1, 2, NULL)",
+    "id IN (1, 2, NULL)",
+    "NOT (id IN (1, NULL)) OR id = 1",
+    "NOT (note IS NULL OR id > 3)",
+    "NOT (note = NULL)",
+]
+mismatches = 0
+for condition in conditions:
+    expected = vm.query(f"SELECT * FROM row_items WHERE {condition};")
+    actual = vm.query(f"SELECT * FROM col_items WHERE {condition};")
+    same = list(expected) == list(actual)
+    if (not same):
+        mismatches += 1
+    print(condition, "->", len(actual), "rows", "OK" if same else "MISMATCH")
+print("Mismatches:", mismatches)
+
+# Conditions are three-valued: NOT of an unknown (NULL) comparison stays unknown
+print("--- NULL Logic Test ---")
+for condition, expected in (("NOT (note = 'sale')", 0), ("NOT (note = 'sale' AND id > 5)", 5),
+                            ("note NOT IN ('other')", 19), ("id NOT IN (1, 2, NULL)", 0),
+                            ("id IN (1, 2, NULL)", 2), ("NOT (note LIKE 's%')", 0),
+                            ("NOT (note IS NULL OR id > 3)", 3)):
+    print(condition, [len(vm.query(f"SELECT * FROM {table} WHERE {condition};")) == expected
+                      for table in ("row_items", "col_items")])
+
+print("--- Error Test ---")
+print(vm.execute_command("SELECT * FROM col_items WHERE id IN (1, 'abc');"))
+
+print("--- Update/Delete Test ---")
+print(vm.execute_command("UPDATE col_items SET price = 0.5 WHERE name = 'item0' AND id > 100;"))
+print(vm.execute_command("UPDATE row_items SET price = 0.5 WHERE name = 'item0' AND id > 100;"))
+print(vm.execute_command("DELETE FROM col_items WHERE price < 1 OR active = false;"))
+print(vm.execute_command("DELETE FROM row_items WHERE price < 1 OR active = false;"))
+print(list(vm.query("SELECT * FROM row_items;")) == list(vm.query("SELECT * FROM col_items;")))
+
+print("--- IN Condition Test ---")
+print([row["id"] for row in vm.in_condition("col_items", "name", ["item2"])][:5])
+
+print("--- Trace Test ---")
+print(vm.execute_command("SET TRACE = 'plan';"))
+print(vm.execute_command("SELECT id FROM col_items WHERE id > 190;"))
+print(vm.execute_command("SET TRACE = 'off';"))
@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+# Add the parent directory to the Python path so we can import sqlvm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sqlvm import SQLVM
+from src.wal import WriteAheadLog
+
+temp_dir = tempfile.mkdtemp()
+log_path = os.path.join(temp_dir, "test.wal")
+snapshot_path = os.path.join(temp_dir, "test.db")
+
+vm = SQLVM()
+wal = WriteAheadLog(log_path, snapshot_path)
+wal.attach(vm)
+
+# Set up test environment
+print(vm.execute_command("CREATE DATABASE test_db;"))
+print(vm.execute_command("USE test_db;"))
+print(vm.execute_command("CREATE TABLE users (id INT AUTO_INCREMENT PRIMARY KEY, name TEXT, age INT);"))
+print(vm.execute_command("INSERT INTO users VALUES (NULL, 'Alice', 30);"))
+print(vm.execute_command("INSERT INTO users VALUES (NULL, 'Bob', 25);"))
+print(vm.execute_command("INSERT INTO users VALUES (NULL, 'Charlie', 35);"))
+print(vm.execute_command("UPDATE users SET age = 26 WHERE name = 'Bob';"))
+print(vm.execute_command("DELETE FROM users WHERE name = 'Alice';"))
+print(vm.execute_command("ALTER TABLE users ADD email TEXT;"))
+print(vm.execute_command("CREATE TABLE logs (message TEXT);"))
+print(vm.execute_command("DROP TABLE logs;"))
+
+# Recover into a new VM without closing the log, as after a crash
+print("--- Recovery Test ---")
+recovered = SQLVM()
+print(WriteAheadLog(log_path, snapshot_path).recover(recovered))
+print(recovered.execute_command("USE test_db;"))
+print(recovered.execute_command("SELECT * FROM users;"))
+print(recovered.execute_command("SELECT * FROM logs;"))
+
+# Auto-increment counters and unique indexes are restored
+print(recovered.execute_command("INSERT INTO users VALUES (NULL, 'Dave', 40, 'dave@example.com');"))
+print(recovered.execute_command("INSERT INTO users VALUES (2, 'Eve', 22, 'eve@example.com');"))
+
+# A checkpoint writes a snapshot and truncates the log
+print("--- Checkpoint Test ---")
+print(wal.checkpoint())
+print(os.path.getsize(log_path))
+print(vm.execute_command("INSERT INTO users VALUES (NULL, 'Frank', 50, 'frank@example.com');"))
+
+# Records after the last commit marker (a torn statement) are ignored
+with open(log_path, "a") as log_file:
+    log_file.write('{"op": "delete", "db": "test_db", "table": "users", "positions": [0], "lsn": 99}\n{"op": "comm')
+
+recovered = SQLVM()
+print(WriteAheadLog(log_path, snapshot_path).recover(recovered))
+print(recovered.execute_command("USE test_db;"))
+print(recovered.execute_command("SELECT * FROM users;"))
+wal.close()
+
+# After a crash the log is cut back to its last commit marker, so the records
+# of the next session are read back and the torn statement never commits
+print("--- Restart Test ---")
+with open(log_path, "a") as log_file:
+    log_file.write('{"op": "delete", "db": "test_db", "table": "users", "positions": [0], "lsn": 120}\n{"op": "ins')
+restarted = SQLVM()
+restart_wal = WriteAheadLog(log_path, snapshot_path)
+print(restart_wal.recover(restarted))
+restart_wal.attach(restarted)
+print(restarted.execute_command("USE test_db;"))
+print(restarted.execute_command("INSERT INTO users VALUES (NULL, 'Grace', 28, 'grace@example.com');"))
+restart_wal.close()
+recovered = SQLVM()
+print(WriteAheadLog(log_path, snapshot_path).recover(recovered))
+print(recovered.execute_command("USE test_db;"))
+print(recovered.execute_command("SELECT * FROM users;"))
@@ -219,7 +219,7 @@ class UserManagementApp:
         created_at = datetime.now().strftime("%Y-%m-%d")
         
         # Insert into database
-        result = self.vm.execute_command(f'INSERT INTO users VALUES (NULL, "{username}", "{email}", "{role}", "{created_at}")')
+        result = self.vm.execute("INSERT INTO users VALUES (NULL, ?, ?, ?, ?)", [username, email, role, created_at])
         
         if "Error" in result:
             messagebox.showerror("Database Error", result)
@@ -283,7 +283,7 @@ class UserManagementApp:
         confirm = messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete user with ID {user_id}?")
         
         if confirm:
-            result = self.vm.execute_command(f"DELETE FROM users WHERE id = {user_id}")
+            result = self.vm.execute("DELETE FROM users WHERE id = ?", [user_id])
             if "Error" in result:
                 messagebox.showerror("Database Error", result)
             else: